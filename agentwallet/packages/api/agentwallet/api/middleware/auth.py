@@ -17,6 +17,7 @@ from ...core.config import get_settings
 from ...core.database import get_db
 from ...models.api_key import ApiKey
 from ...models.organization import Organization
+from ...services.auth_cache import get_api_key_usage, get_auth_cache
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
@@ -133,8 +134,14 @@ async def _verify_agent_belongs_to_org(db: AsyncSession, agent_id: uuid.UUID, or
     """Verify that an agent belongs to the given organization."""
     from ...models.agent import Agent
 
-    agent = await db.get(Agent, agent_id)
-    if not agent or agent.org_id != org_id:
+    cache = get_auth_cache()
+    owner = await cache.get(f"agent:{agent_id}")
+    if owner is None:
+        agent = await db.get(Agent, agent_id)
+        if agent:
+            owner = {"org_id": str(agent.org_id)}
+            await cache.put(f"agent:{agent_id}", owner)
+    if not owner or owner["org_id"] != str(org_id):
         raise HTTPException(
             status_code=403,
             detail="Agent does not belong to your organization — check the X-Agent-Id header",
@@ -154,29 +161,40 @@ async def get_auth_context(
     api_key_header = request.headers.get("X-API-Key")
     if api_key_header:
         key_hash = hash_api_key(api_key_header)
-        api_key = await db.scalar(select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.is_active.is_(True)))
-        if not api_key:
-            raise HTTPException(
-                status_code=401,
-                detail="Invalid API key — generate a valid key via POST /api-keys or the dashboard",
-            )
-
-        # Update last used
-        api_key.last_used_at = datetime.now(timezone.utc)
-
-        org = await db.get(Organization, api_key.org_id)
+        cache = get_auth_cache()
+        identity = await cache.get(f"key:{key_hash}")
+        if identity is None:
+            api_key = await db.scalar(select(ApiKey).where(ApiKey.key_hash == key_hash, ApiKey.is_active.is_(True)))
+            if not api_key:
+                raise HTTPException(
+                    status_code=401,
+                    detail="Invalid API key — generate a valid key via POST /api-keys or the dashboard",
+                )
+            org = await db.get(Organization, api_key.org_id)
+            identity = {
+                "org_id": str(api_key.org_id),
+                "api_key_id": str(api_key.id),
+                "org_tier": org.tier if org else "free",
+                "permissions": api_key.permissions or {},
+            }
+            await cache.put(f"key:{key_hash}", identity)
+
+        # Update last used (coalesced into a periodic batched write)
+        org_id = uuid.UUID(identity["org_id"])
+        api_key_id = uuid.UUID(identity["api_key_id"])
+        get_api_key_usage().touch(api_key_id)
 
         # Verify agent belongs to this org if specified
         if agent_id:
-            await _verify_agent_belongs_to_org(db, agent_id, api_key.org_id)
+            await _verify_agent_belongs_to_org(db, agent_id, org_id)
 
         return AuthContext(
-            org_id=api_key.org_id,
-            api_key_id=api_key.id,
+            org_id=org_id,
+            api_key_id=api_key_id,
             agent_id=agent_id,
-            org_tier=org.tier if org else "free",
+            org_tier=identity["org_tier"],
             actor_type="api_key",
-            permissions=api_key.permissions or {},
+            permissions=identity["permissions"],
         )
 
     # Check for JWT bearer token (dashboard auth)
@@ -190,25 +208,31 @@ async def get_auth_context(
             user_id = uuid.UUID(payload["sub"])
             org_id = uuid.UUID(payload["org_id"])
 
-            from ...models.user import User
+            cache = get_auth_cache()
+            identity = await cache.get(f"user:{user_id}:{org_id}")
+            if identity is None:
+                from ...models.user import User
 
-            user = await db.get(User, user_id)
-            if not user or not user.is_active:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Invalid token: user not found or disabled — log in again",
-                )
+                user = await db.get(User, user_id)
+                if not user or not user.is_active:
+                    raise HTTPException(
+                        status_code=401,
+                        detail="Invalid token: user not found or disabled — log in again",
+                    )
 
-            org = await db.get(Organization, org_id)
-            if not org or not org.is_active:
-                raise HTTPException(
-                    status_code=401,
-                    detail="Organization inactive — contact support to reactivate it",
-                )
+                org = await db.get(Organization, org_id)
+                if not org or not org.is_active:
+                    raise HTTPException(
+                        status_code=401,
+                        detail="Organization inactive — contact support to reactivate it",
+                    )
+
+                # Verify the user belongs to the org encoded in the token
+                if user.org_id != org_id:
+                    raise HTTPException(status_code=401, detail="Invalid token: user-org mismatch")
 
-            # Verify the user belongs to the org encoded in the token
-            if user.org_id != org_id:
-                raise HTTPException(status_code=401, detail="Invalid token: user-org mismatch")
+                identity = {"org_id": str(org_id), "org_tier": org.tier}
+                await cache.put(f"user:{user_id}:{org_id}", identity)
 
             # Verify agent belongs to this org if specified
             if agent_id:
@@ -218,7 +242,7 @@ async def get_auth_context(
                 org_id=org_id,
                 user_id=user_id,
                 agent_id=agent_id,
-                org_tier=org.tier,
+                org_tier=identity["org_tier"],
                 actor_type="user",
             )
         except (JWTError, KeyError, ValueError):
@@ -1,10 +1,23 @@
-"""Rate limiting middleware using Redis sliding window with in-process fallback."""
+"""Rate limiting middleware -- GCRA token buckets in Redis with in-process fallback.
 
+Every request is charged against two budgets at once: the org's budget for
+the route (the tier limit per minute) and an org-wide budget across all
+routes (the tier limit times ``rate_limit_org_multiplier``). Both are
+checked and updated by one Lua script in a single round-trip, so there is
+no window between reading and bumping a counter.
+
+GCRA (the generic cell rate algorithm) stores one number per bucket -- the
+"theoretical arrival time" -- which makes the in-process fallback O(1) per
+request as well. The outcome is exposed as ``RateLimit-*`` headers.
+"""
+
+import math
 import time
-from collections import defaultdict
+from dataclasses import dataclass
 
 from fastapi import Depends, HTTPException, Request
 
+from ...core.config import get_settings
 from ...core.logging import get_logger
 from ...core.redis_client import get_redis
 from .auth import get_auth_context
@@ -17,40 +30,118 @@ TIER_LIMITS = {
     "enterprise": 6000,
 }
 
+WINDOW_SECONDS = 60
+
 _redis_available: bool | None = None
 _redis_last_check: float = 0.0
 _REDIS_RECHECK_INTERVAL = 60.0  # Re-check Redis availability every 60 seconds
 
-# In-process fallback rate limiter (used when Redis is unavailable)
-_local_counters: dict[str, list[float]] = defaultdict(list)
-_LOCAL_CLEANUP_INTERVAL = 300.0  # Cleanup stale entries every 5 minutes
-_local_last_cleanup: float = 0.0
-
-
-def _local_rate_check(key: str, limit: int, window: int = 60) -> bool:
-    """In-process sliding window rate limiter. Returns True if within limit."""
-    global _local_last_cleanup
-
-    now = time.monotonic()
-
-    # Periodic cleanup of stale keys
-    if now - _local_last_cleanup > _LOCAL_CLEANUP_INTERVAL:
-        stale_keys = [k for k, v in _local_counters.items() if not v or v[-1] < now - window * 2]
-        for k in stale_keys:
-            del _local_counters[k]
-        _local_last_cleanup = now
-
-    # Remove timestamps outside the window
-    timestamps = _local_counters[key]
-    cutoff = now - window
-    while timestamps and timestamps[0] < cutoff:
-        timestamps.pop(0)
-
-    if len(timestamps) >= limit:
-        return False
-
-    timestamps.append(now)
-    return True
+# KEYS[i] = bucket i; ARGV[2i-1], ARGV[2i] = emission interval (ms) and burst
+# of bucket i. A request is admitted only if every bucket admits it; the
+# tightest bucket decides the reported quota.
+# Returns {allowed, binding bucket index, remaining, reset_ms, retry_after_ms}.
+GCRA_SCRIPT = """
+local t = redis.call('TIME')
+local now = t[1] * 1000 + math.floor(t[2] / 1000)
+local allowed = 1
+local binding, remaining, reset, retry = 1, nil, 0, 0
+local tats = {}
+for i = 1, #KEYS do
+  local interval = tonumber(ARGV[2 * i - 1])
+  local burst = tonumber(ARGV[2 * i])
+  local tat = tonumber(redis.call('GET', KEYS[i]) or now)
+  if tat < now then tat = now end
+  local new_tat = tat + interval
+  local allow_at = new_tat - burst * interval
+  local left
+  if allow_at > now then
+    allowed = 0
+    retry = math.max(retry, allow_at - now)
+    left = 0
+    new_tat = tat
+  else
+    left = math.floor((now - allow_at) / interval)
+  end
+  tats[i] = new_tat
+  if remaining == nil or left < remaining then
+    binding, remaining = i, left
+  end
+  reset = math.max(reset, new_tat - now)
+end
+if allowed == 1 then
+  for i = 1, #KEYS do
+    redis.call('SET', KEYS[i], tats[i], 'PX', math.max(1, math.ceil(tats[i] - now)))
+  end
+end
+return {allowed, binding, remaining, reset, retry}
+"""
+
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    reset_seconds: float
+    retry_after_seconds: float = 0.0
+
+    def headers(self) -> dict[str, str]:
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(max(0, self.remaining)),
+            "RateLimit-Reset": str(math.ceil(self.reset_seconds)),
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after_seconds)))
+        return headers
+
+
+class LocalGCRA:
+    """In-process GCRA limiter: one float per bucket, O(1) per check."""
+
+    _CLEANUP_INTERVAL = 300.0  # Drop idle buckets every 5 minutes
+
+    def __init__(self):
+        self._tats: dict[str, float] = {}
+        self._last_cleanup = 0.0
+
+    def check(self, buckets: list[tuple[str, int]], now: float | None = None) -> RateLimitResult:
+        """Charge one request to every (key, limit-per-window) bucket."""
+        now = time.monotonic() if now is None else now
+        if now - self._last_cleanup > self._CLEANUP_INTERVAL:
+            self._tats = {k: tat for k, tat in self._tats.items() if tat > now}
+            self._last_cleanup = now
+
+        allowed = True
+        binding, remaining, reset, retry = 0, None, 0.0, 0.0
+        new_tats = []
+        for i, (key, limit) in enumerate(buckets):
+            interval = WINDOW_SECONDS / limit
+            tat = max(self._tats.get(key, now), now)
+            new_tat = tat + interval
+            allow_at = new_tat - limit * interval
+            if allow_at > now:
+                allowed = False
+                retry = max(retry, allow_at - now)
+                left = 0
+                new_tat = tat
+            else:
+                left = math.floor((now - allow_at) / interval)
+            new_tats.append(new_tat)
+            if remaining is None or left < remaining:
+                binding, remaining = i, left
+            reset = max(reset, new_tat - now)
+
+        if allowed:
+            for (key, _), new_tat in zip(buckets, new_tats):
+                self._tats[key] = new_tat
+        return RateLimitResult(allowed, buckets[binding][1], remaining or 0, reset, retry)
+
+    def clear(self) -> None:
+        self._tats.clear()
+
+
+_local_limiter = LocalGCRA()
 
 
 async def _check_redis() -> bool:
@@ -78,6 +169,29 @@ async def _check_redis() -> bool:
     return _redis_available
 
 
+async def _redis_rate_check(buckets: list[tuple[str, int]]) -> RateLimitResult:
+    r = await get_redis()
+    args = []
+    for _, limit in buckets:
+        args += [WINDOW_SECONDS * 1000 / limit, limit]
+    allowed, binding, remaining, reset_ms, retry_ms = await r.eval(
+        GCRA_SCRIPT, len(buckets), *(key for key, _ in buckets), *args
+    )
+    return RateLimitResult(
+        allowed=bool(allowed),
+        limit=buckets[int(binding) - 1][1],
+        remaining=int(remaining),
+        reset_seconds=float(reset_ms) / 1000,
+        retry_after_seconds=float(retry_ms) / 1000,
+    )
+
+
+def _route_path(request: Request) -> str:
+    """The matched route template, so /wallets/{id} is one budget for every id."""
+    route = request.scope.get("route")
+    return getattr(route, "path", None) or request.url.path
+
+
 async def rate_limited_auth(
     request: Request,
     auth=Depends(get_auth_context),
@@ -94,58 +208,43 @@ async def check_rate_limit(
     request: Request,
     org_id: str,
     tier: str = "free",
+    route_limit: int | None = None,
 ) -> None:
     """Check if the request is within rate limits. Raises 429 if exceeded.
 
-    Uses Redis when available, falls back to in-process sliding window.
+    Charges the org's per-route budget (``route_limit`` per minute, default
+    the tier limit) and its org-wide budget. Uses Redis when available,
+    falls back to the in-process limiter. The result is left on
+    ``request.state.rate_limit`` for the response headers.
     """
     limit = TIER_LIMITS.get(tier, 60)
-    rate_key = f"rl:{org_id}:{request.url.path}"
+    buckets = [
+        (f"rl:{org_id}:{_route_path(request)}", route_limit or limit),
+        (f"rl:{org_id}", limit * get_settings().rate_limit_org_multiplier),
+    ]
 
-    # Try Redis first
+    result = None
     if await _check_redis():
         try:
-            from ...core.redis_client import CacheService
-
-            r = await get_redis()
-            cache = CacheService(r)
-            count = await cache.incr_with_ttl(rate_key, ttl=60)
-
-            if count > limit:
-                logger.warning(
-                    "rate_limit_exceeded",
-                    org_id=org_id,
-                    path=request.url.path,
-                    count=count,
-                    limit=limit,
-                )
-                raise HTTPException(
-                    status_code=429,
-                    detail=(
-                        f"Rate limit exceeded ({limit}/min). "
-                        "Wait for the window to reset (~60s), then retry, or upgrade your tier for higher limits."
-                    ),
-                    headers={"Retry-After": "60"},
-                )
-            return  # Within limit
-        except HTTPException:
-            raise
+            result = await _redis_rate_check(buckets)
         except Exception as e:
             logger.warning("rate_limit_redis_error", error=str(e), msg="Falling back to local limiter")
+    if result is None:
+        result = _local_limiter.check(buckets)
 
-    # Fallback: in-process rate limiter
-    if not _local_rate_check(rate_key, limit):
+    request.state.rate_limit = result
+    if not result.allowed:
         logger.warning(
-            "rate_limit_exceeded_local",
+            "rate_limit_exceeded",
             org_id=org_id,
             path=request.url.path,
-            limit=limit,
+            limit=result.limit,
         )
         raise HTTPException(
             status_code=429,
             detail=(
-                f"Rate limit exceeded ({limit}/min). "
-                "Wait for the window to reset (~60s), then retry, or upgrade your tier for higher limits."
+                f"Rate limit exceeded ({result.limit}/min). "
+                f"Retry in ~{math.ceil(result.retry_after_seconds)}s, or upgrade your tier for higher limits."
             ),
-            headers={"Retry-After": "60"},
+            headers=result.headers(),
         )
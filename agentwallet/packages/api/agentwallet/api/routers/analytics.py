@@ -1,6 +1,7 @@
 """Analytics router -- dashboard metrics, spending reports."""
 
 import uuid
+from datetime import date, datetime, time, timedelta, timezone
 
 from fastapi import APIRouter, Depends, Request
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -9,7 +10,7 @@ from ...core.database import get_db
 from ...services.analytics_engine import AnalyticsEngine
 from ..middleware.auth import AuthContext, get_auth_context
 from ..middleware.rate_limit import check_rate_limit
-from ..schemas.analytics import AnalyticsSummaryResponse, DailyMetricResponse
+from ..schemas.analytics import AnalyticsQueryResponse, AnalyticsSummaryResponse, DailyMetricResponse
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
@@ -49,3 +50,22 @@ async def get_agent_analytics(
     await check_rate_limit(request, str(auth.org_id), auth.org_tier)
     engine = AnalyticsEngine(db)
     return await engine.get_agent_analytics(auth.org_id, days=days)
+
+
+@router.get("/query", response_model=AnalyticsQueryResponse)
+async def query_analytics(
+    request: Request,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    group_by: str | None = None,
+    agent_id: uuid.UUID | None = None,
+    token: str | None = None,
+    auth: AuthContext = Depends(get_auth_context),
+    db: AsyncSession = Depends(get_db),
+):
+    """Metrics over [start, end), defaulting to the last 30 whole days."""
+    await check_rate_limit(request, str(auth.org_id), auth.org_tier)
+    end = end or datetime.combine(date.today() + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    start = start or end - timedelta(days=30)
+    engine = AnalyticsEngine(db)
+    return await engine.query(auth.org_id, start, end, group_by=group_by, agent_id=agent_id, token=token)
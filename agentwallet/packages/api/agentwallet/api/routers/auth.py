@@ -24,6 +24,7 @@ from ...core.logging import get_logger
 from ...models.api_key import ApiKey
 from ...models.organization import Organization
 from ...models.user import User
+from ...services.auth_cache import get_auth_cache
 from ..middleware.auth import (
     AuthContext,
     create_access_token,
@@ -213,4 +214,7 @@ async def revoke_api_key(
     if not key or key.org_id != auth.org_id:
         raise HTTPException(status_code=404, detail="API key not found")
     key.is_active = False
+    # Commit before invalidating so no request can re-cache the live key
+    await db.commit()
+    await get_auth_cache().invalidate(f"key:{key.key_hash}")
     return {"status": "revoked"}
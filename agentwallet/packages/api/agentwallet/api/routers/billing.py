@@ -14,6 +14,7 @@ from ...core.exceptions import (
     TransactionFailedError,
     ValidationError,
 )
+from ...services.auth_cache import invalidate_org_auth
 from ...services.usdc_billing import PLANS, UsdcBillingService
 from ..middleware.auth import AuthContext, get_auth_context, require_permission
 from ..middleware.rate_limit import check_rate_limit
@@ -41,6 +42,12 @@ def _build_response(info: dict, message: str) -> SubscribeResponse:
     )
 
 
+async def _commit_tier_change(db: AsyncSession, auth: AuthContext) -> None:
+    # Commit before invalidating so no request can re-cache the old tier
+    await db.commit()
+    await invalidate_org_auth(auth.org_id)
+
+
 @router.get("/plans", response_model=PlansResponse)
 async def list_plans(
     request: Request,
@@ -147,6 +154,7 @@ async def subscribe(
         raise HTTPException(status_code=400, detail=str(e))
     except TransactionFailedError as e:
         raise HTTPException(status_code=502, detail=str(e))
+    await _commit_tier_change(db, auth)
 
     if req.tier == "free":
         message = "Downgraded to the free tier."
@@ -198,6 +206,7 @@ async def renew(
         raise HTTPException(status_code=400, detail=str(e))
     except TransactionFailedError as e:
         raise HTTPException(status_code=502, detail=str(e))
+    await _commit_tier_change(db, auth)
 
     return _build_response(info, f"Subscription renewed for another {info['tier']} billing period.")
 
@@ -218,5 +227,6 @@ async def cancel(
         raise HTTPException(status_code=400, detail=str(e))
     except NotFoundError as e:
         raise HTTPException(status_code=404, detail=str(e))
+    await _commit_tier_change(db, auth)
 
     return _build_response(info, "Subscription cancelled — org downgraded to free tier.")
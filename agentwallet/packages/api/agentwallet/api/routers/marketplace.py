@@ -28,13 +28,14 @@ from ..schemas.marketplace import (
     ServiceAnalyticsResponse,
     ServiceCreate,
     ServiceResponse,
+    ServiceSearchResponse,
     ServiceUpdate,
 )
 
 router = APIRouter(prefix="/marketplace", tags=["marketplace"])
 
 
-def _service_to_response(s) -> ServiceResponse:
+def _service_to_response(s, agent_name: Optional[str] = None) -> ServiceResponse:
     return ServiceResponse(
         id=s.id,
         agent_id=s.agent_id,
@@ -54,7 +55,7 @@ def _service_to_response(s) -> ServiceResponse:
         success_rate=s.success_rate,
         created_at=s.created_at,
         updated_at=s.updated_at,
-        agent_name=getattr(s, "agent", None) and s.agent.name,
+        agent_name=agent_name or (getattr(s, "agent", None) and s.agent.name),
         agent_reputation_score=None,
     )
 
@@ -146,7 +147,7 @@ async def discover_services(
 ):
     await check_rate_limit(request, str(auth.org_id), auth.org_tier)
     svc = MarketplaceService(db)
-    services = await svc.discover_services(
+    result = await svc.search_services(
         query=query,
         capability=capability,
         max_price=max_price,
@@ -155,7 +156,45 @@ async def discover_services(
         limit=limit,
         offset=offset,
     )
-    return [_service_to_response(s) for s in services]
+    return [_service_to_response(s, result["agent_names"].get(s.agent_id)) for s in result["services"]]
+
+
+@router.get("/services/search", response_model=ServiceSearchResponse)
+async def search_services(
+    request: Request,
+    query: Optional[str] = None,
+    capability: Optional[str] = None,
+    max_price: Optional[float] = None,
+    min_rating: Optional[float] = None,
+    agent_id: Optional[uuid.UUID] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    facets: bool = True,
+    auth: AuthContext = Depends(get_auth_context),
+    db: AsyncSession = Depends(get_db),
+):
+    """Ranked full-text service search with facet counts; page with `next_cursor`."""
+    await check_rate_limit(request, str(auth.org_id), auth.org_tier)
+    svc = MarketplaceService(db)
+    try:
+        result = await svc.search_services(
+            query=query,
+            capability=capability,
+            max_price=max_price,
+            min_rating=min_rating,
+            agent_id=agent_id,
+            limit=limit,
+            cursor=cursor,
+            facets=facets,
+        )
+    except ValidationError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return ServiceSearchResponse(
+        data=[_service_to_response(s, result["agent_names"].get(s.agent_id)) for s in result["services"]],
+        next_cursor=result["next_cursor"],
+        total=result["total"],
+        facets=result["facets"],
+    )
 
 
 @router.get("/services/{service_id}", response_model=ServiceResponse)
@@ -137,9 +137,9 @@ async def playground_status(
     wallet = await _ensure_wallet(db, auth)
     balance = 0.0
     try:
-        async with httpx.AsyncClient(timeout=10) as client:
-            lamports = await solana.get_balance(client, wallet.address)
-            balance = lamports / 1e9
+        client = solana.get_rpc_client()
+        lamports = await solana.get_balance(client, wallet.address)
+        balance = lamports / 1e9
     except Exception:
         pass
     return PlaygroundStatusResponse(
@@ -193,23 +193,23 @@ async def playground_fund(
     platform = solana.load_platform_keypair()
     lamports = int(FUND_SOL * 1e9)
 
-    async with httpx.AsyncClient(timeout=25) as client:
-        balance = await solana.get_balance(client, str(platform.pubkey()))
-        if balance < lamports + 5000:
-            raise HTTPException(
-                status_code=503,
-                detail=(
-                    "Platform wallet is out of devnet SOL — please try again later, "
-                    "or contact support to refill the custody wallet"
-                ),
-            )
-        signature = await solana.transfer_sol(
-            client=client,
-            from_keypair=platform,
-            to_address=wallet.address,
-            lamports=lamports,
+    client = solana.get_rpc_client()
+    balance = await solana.get_balance(client, str(platform.pubkey()))
+    if balance < lamports + 5000:
+        raise HTTPException(
+            status_code=503,
+            detail=(
+                "Platform wallet is out of devnet SOL — please try again later, "
+                "or contact support to refill the custody wallet"
+            ),
         )
-        confirmed = await solana.confirm_transaction(client, signature)
+    signature = await solana.transfer_sol(
+        client=client,
+        from_keypair=platform,
+        to_address=wallet.address,
+        lamports=lamports,
+    )
+    confirmed = await solana.confirm_transaction(client, signature)
 
     _fund_cooldown[org_key] = now
     return FundResponse(
@@ -505,15 +505,15 @@ async def playground_usdc(
     platform = solana.load_platform_keypair()
     amount_raw = int(USDC_GRANT * 1e6)
 
-    async with httpx.AsyncClient(timeout=30) as client:
-        signature = await solana.mint_spl_token(
-            client=client,
-            mint_authority_keypair=platform,
-            mint=mint,
-            owner_address=wallet.address,
-            amount_raw=amount_raw,
-            confirm=True,
-        )
+    client = solana.get_rpc_client()
+    signature = await solana.mint_spl_token(
+        client=client,
+        mint_authority_keypair=platform,
+        mint=mint,
+        owner_address=wallet.address,
+        amount_raw=amount_raw,
+        confirm=True,
+    )
 
     _usdc_cooldown[org_key] = now
     return UsdcDemoResponse(
@@ -547,21 +547,21 @@ async def playground_transfer(
     recipient = _platform_address()
     lamports = int(TRANSFER_SOL * 1e9)
 
-    keypair = WalletManager(db)._decrypt_keypair(wallet)
-    async with httpx.AsyncClient(timeout=25) as client:
-        balance = await solana.get_balance(client, wallet.address)
-        if balance < lamports + 5000:
-            raise HTTPException(
-                status_code=400,
-                detail="Not enough SOL in your wallet — click 'Get 0.01 SOL' first to fund it, then retry",
-            )
-        signature = await solana.transfer_sol(
-            client=client,
-            from_keypair=keypair,
-            to_address=recipient,
-            lamports=lamports,
+    keypair = await WalletManager(db).decrypt_keypair(wallet)
+    client = solana.get_rpc_client()
+    balance = await solana.get_balance(client, wallet.address)
+    if balance < lamports + 5000:
+        raise HTTPException(
+            status_code=400,
+            detail="Not enough SOL in your wallet — click 'Get 0.01 SOL' first to fund it, then retry",
         )
-        confirmed = await solana.confirm_transaction(client, signature)
+    signature = await solana.transfer_sol(
+        client=client,
+        from_keypair=keypair,
+        to_address=recipient,
+        lamports=lamports,
+    )
+    confirmed = await solana.confirm_transaction(client, signature)
 
     return TransferDemoResponse(
         wallet_id=str(wallet.id),
@@ -8,6 +8,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 from ...core.database import get_db
 from ...models.policy import Policy
+from ...services.policy_compiler import invalidate_policy_plans
 from ..middleware.auth import AuthContext, get_auth_context
 from ..middleware.rate_limit import check_rate_limit
 from ..schemas.policies import (
@@ -54,6 +55,9 @@ async def create_policy(
     )
     db.add(policy)
     await db.flush()
+    # Commit before invalidating so no reader can re-cache the old plan set
+    await db.commit()
+    await invalidate_policy_plans(auth.org_id)
     return _policy_to_response(policy)
 
 
@@ -110,6 +114,8 @@ async def update_policy(
         setattr(policy, key, value)
     await db.flush()
     await db.refresh(policy)
+    await db.commit()
+    await invalidate_policy_plans(auth.org_id)
     return _policy_to_response(policy)
 
 
@@ -125,4 +131,6 @@ async def delete_policy(
     if not policy or policy.org_id != auth.org_id:
         raise HTTPException(status_code=404, detail="Policy not found")
     await db.delete(policy)
+    await db.commit()
+    await invalidate_policy_plans(auth.org_id)
     return {"status": "deleted"}
@@ -94,7 +94,7 @@ async def batch_transfer(
     _perm: None = Depends(require_permission("wallets", "w")),
     db: AsyncSession = Depends(get_db),
 ):
-    """Execute multiple SOL transfers in parallel (semaphore-gated).
+    """Execute multiple SOL transfers, packed into one transaction per source wallet where they fit.
 
     Returns a list of results where each item has a 'transaction' (or null)
     and an 'error' (or null), so callers know which succeeded and which failed.
@@ -250,6 +250,7 @@ async def get_x402_status(
         total_incoming_lamports=config.get_total_incoming(),
         total_outgoing_lamports=0,
         payment_count=len(payments),
+        verification_cache=config.verification_cache.stats(),
     )
 
 
@@ -25,6 +25,11 @@ class DailyMetricResponse(BaseModel):
     failed_tx_count: int
 
 
+class AnalyticsQueryResponse(BaseModel):
+    cube: str  # which rollup cube answered: daily, hourly or destination_daily
+    rows: list[dict]
+
+
 class AgentAnalyticsResponse(BaseModel):
     agent_id: uuid.UUID
     agent_name: str
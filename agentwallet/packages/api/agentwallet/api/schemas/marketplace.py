@@ -73,6 +73,13 @@ class ServiceSearchRequest(BaseModel):
     offset: int = Field(0, ge=0, description="Results offset")
 
 
+class ServiceSearchResponse(BaseModel):
+    data: List[ServiceResponse]
+    next_cursor: Optional[str] = Field(None, description="Pass as `cursor` for the next page")
+    total: Optional[int] = Field(None, description="All matches (first page, with facets)")
+    facets: Optional[Dict[str, Dict[str, int]]] = Field(None, description="Counts by capability and price_usdc")
+
+
 class JobCreate(BaseModel):
     buyer_agent_id: uuid.UUID
     service_id: uuid.UUID
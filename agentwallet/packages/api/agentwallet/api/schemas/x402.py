@@ -146,6 +146,7 @@ class X402StatusResponse(BaseModel):
     total_incoming_lamports: int = 0
     total_outgoing_lamports: int = 0
     payment_count: int = 0
+    verification_cache: dict = Field(default_factory=dict)
 
 
 # ---------------------------------------------------------------------------
@@ -48,12 +48,106 @@ class Settings(BaseSettings):
     stripe_secret_key: str = ""
     stripe_webhook_secret: str = ""
 
+    # Compiled policy plans are cached in-process and in Redis for this long
+    # (policy writes invalidate them immediately)
+    policy_cache_ttl_seconds: int = 300
+
+    # Resolved auth contexts are cached briefly in-process and in Redis;
+    # API-key last_used_at writes are batched on this interval
+    auth_cache_local_ttl_seconds: float = 5.0
+    auth_cache_ttl_seconds: int = 60
+    api_key_usage_flush_seconds: float = 30.0
+
+    # x402 payment verification cache (in-process LRU + shared Redis tier).
+    # Accepted proofs are remembered this long past their deadline so
+    # replays are rejected rather than re-verified.
+    x402_verification_cache_size: int = 10000
+    x402_replay_retention_seconds: int = 3600
+
+    # Outbox relay: events fanned out per batch; the relay and webhook
+    # dispatcher wake on LISTEN/NOTIFY and poll at most this often otherwise
+    outbox_relay_batch_size: int = 500
+    outbox_poll_seconds: float = 5.0
+
+    # Webhook delivery: concurrency overall and per endpoint (host), with a
+    # per-endpoint circuit breaker after consecutive failures. One batch
+    # claims at most webhook_batch_per_endpoint rows per subscription.
+    webhook_batch_size: int = 200
+    webhook_batch_per_endpoint: int = 20
+    webhook_max_concurrency: int = 64
+    webhook_per_endpoint_concurrency: int = 4
+    webhook_timeout_seconds: float = 10.0
+    webhook_breaker_threshold: int = 5
+    webhook_breaker_cooldown_seconds: float = 60.0
+
+    # Analytics rollups: transactions folded in per pass, and how far behind
+    # the watermark each pass re-reads to catch late-committing writers
+    analytics_rollup_batch_size: int = 5000
+    analytics_watermark_lag_seconds: int = 300
+
+    # Worker scheduling: exclusive workers hold a lease (renewed every third
+    # of its TTL); idle workers back off up to factor x their interval
+    worker_lease_ttl_seconds: float = 30.0
+    worker_idle_backoff_factor: float = 8.0
+    worker_start_jitter_seconds: float = 5.0
+    worker_stats_log_seconds: float = 300.0
+
+    # Task execution pool: tasks run concurrently per worker process, each
+    # claimed for a lease; LLM providers get an adaptive concurrency limit
+    # (halved on 429) and an optional token budget (0 = unlimited)
+    task_pool_size: int = 16
+    task_claim_lease_seconds: int = 600
+    task_llm_max_concurrency: int = 8
+    task_llm_tokens_per_minute: int = 0
+
+    # Escrow expiry: escrows expired per UPDATE, and the refund pipeline's
+    # batch and attempt cap (refunds are packed several per transaction)
+    escrow_expiry_batch_size: int = 1000
+    escrow_refund_batch_size: int = 200
+    escrow_refund_max_attempts: int = 5
+
+    # Subscriptions expired per subscription_expiry pass
+    subscription_expiry_batch_size: int = 500
+
+    # Reputation: agents whose jobs changed are rescored in batches once
+    # the debounce window has passed since their first unscored change
+    reputation_rescore_batch_size: int = 1000
+    reputation_debounce_seconds: float = 30.0
+
+    # Usage metering: seconds an org's current-period usage is cached
+    # in-process for tier-limit checks on the request path
+    usage_cache_seconds: float = 30.0
+
+    # Balance aggregation: concurrent RPC calls across all fan-outs in the
+    # process, and how long a Redis balance snapshot is served as-is (fresh)
+    # or while it is refreshed in the background (stale)
+    balance_rpc_concurrency: int = 16
+    balance_snapshot_fresh_seconds: float = 15.0
+    balance_snapshot_stale_seconds: float = 300.0
+    # Per-wallet balance cache (bal:{address}); transfers invalidate their
+    # wallets' entries and the balance tracker rewrites entries that move
+    balance_cache_seconds: int = 30
+    balance_tracker_page_size: int = 1000
+    # USD price cache; without a feed URL the static reference prices are used
+    price_cache_seconds: float = 60.0
+    price_feed_url: str = ""
+
     # Rate limits (requests per minute)
     rate_limit_default: int = 60
+    # Org-wide budget across all routes, as a multiple of the per-route tier limit
+    rate_limit_org_multiplier: int = 10
 
     # AWS KMS (production key encryption)
     aws_kms_key_id: str = ""
     aws_region: str = "us-east-1"
+    # Unwrapped per-org data keys are cached (in locked memory, at most
+    # kms_data_key_cache_size of them) this long, so KMS is called once per
+    # org per window; decrypted keys of hot wallets can also be cached in
+    # locked memory (0 = off)
+    kms_data_key_cache_seconds: float = 300.0
+    kms_data_key_cache_size: int = 1024
+    keypair_cache_seconds: float = 0.0
+    keypair_cache_size: int = 256
 
     # Logging
     log_level: str = "INFO"
@@ -96,6 +190,30 @@ class Settings(BaseSettings):
     rpc_timeout: int = 15
     rpc_confirm_max_polls: int = 20
     rpc_confirm_poll_interval: float = 2.0
+    # "poll" (getSignatureStatuses) or "websocket" (signatureSubscribe over
+    # one shared PubSub connection, falling back to polling)
+    rpc_confirm_mode: str = "poll"
+    solana_ws_url: str = ""  # derived from solana_rpc_url when empty
+
+    # Shared Solana RPC connection pool (per endpoint)
+    rpc_http2: bool = True
+    rpc_max_connections: int = 100
+    rpc_max_keepalive_connections: int = 20
+    rpc_keepalive_expiry: float = 30.0
+    # Concurrent RPC calls issued within this window share one JSON-RPC
+    # batch request (0 disables batching)
+    rpc_batch_window_ms: float = 2.0
+    rpc_batch_max_size: int = 100
+
+    # Blockhash cache: serve a warm hash for at most this long, refreshing
+    # in the background (a blockhash is valid for ~60-90s)
+    blockhash_max_age_seconds: float = 30.0
+    blockhash_refresh_interval: float = 10.0
+
+    # Confirmation pipeline: submitted txs checked per worker tick, and how
+    # long a signature with no recorded expiry height may stay unknown
+    tx_confirm_batch_size: int = 5000
+    tx_unknown_expiry_seconds: float = 180.0
 
     @field_validator("jwt_secret_key")
     @classmethod
@@ -85,6 +85,15 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
             raise
 
 
+def upsert_insert(db: AsyncSession, model):
+    """Dialect-specific INSERT supporting ``on_conflict_do_update`` / ``on_conflict_do_nothing``."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
+
 async def close_db() -> None:
     global _engine, _session_factory
     if _engine is not None:
@@ -152,6 +152,21 @@ async def eth_call(
     return body.get("result", "0x")
 
 
+@retry(max_attempts=3)
+async def get_native_balance(client: httpx.AsyncClient, address: str, block: str = "latest") -> int:
+    """Native token balance of an address, in wei."""
+    resp = await client.post(
+        _rpc_url(),
+        json={"jsonrpc": "2.0", "id": 1, "method": "eth_getBalance", "params": [address, block]},
+        timeout=_rpc_timeout(),
+    )
+    resp.raise_for_status()
+    body = resp.json()
+    if "error" in body:
+        raise RetryableError(f"eth_getBalance error: {body['error']}")
+    return int(body["result"], 16)
+
+
 @retry(max_attempts=3)
 async def send_raw_transaction(client: httpx.AsyncClient, signed_tx: str) -> str:
     """Submit a signed transaction. Returns tx hash."""
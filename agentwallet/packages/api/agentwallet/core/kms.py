@@ -1,9 +1,31 @@
 """Key Management Service for encrypting/decrypting wallet private keys.
 
 Uses local Fernet encryption in dev, AWS KMS in production.
+
+In KMS mode keys are envelope-encrypted: each org has one data key from
+KMS GenerateDataKey, stored KMS-wrapped on the org (see
+services.data_keys), wallet keys are Fernet-encrypted locally with it, and
+the wrapped data key travels inside the ciphertext
+(``env1:<wrapped key>:<token>``). Unwrapped data keys are cached in a
+bounded set of locked buffers for ``kms_data_key_cache_seconds``, so KMS
+is called once per org per TTL rather than once per signature, and the
+async paths run those calls in a worker thread instead of on the event
+loop. Ciphertexts written before envelopes (a bare KMS blob) still
+decrypt through KMS Decrypt.
+
+Decrypted key material of hot wallets can additionally be kept for
+``keypair_cache_seconds`` (off by default) in mlock'd buffers that are
+zeroed on eviction.
 """
 
+import asyncio
 import base64
+import ctypes
+import ctypes.util
+import hashlib
+import os
+import time
+from collections import OrderedDict
 
 from cryptography.fernet import Fernet
 
@@ -12,13 +34,137 @@ from .logging import get_logger
 
 logger = get_logger(__name__)
 
+ENVELOPE_PREFIX = "env1:"
+
+
+def _libc():
+    try:
+        return ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+    except OSError:
+        return None
+
+
+_LIBC = _libc()
+
+
+class _SecretBuffer:
+    """Key material in a buffer locked out of swap (best effort), zeroed on wipe."""
+
+    def __init__(self, data: bytes):
+        self._buf = ctypes.create_string_buffer(data, len(data))
+        self.size = len(data)
+        self.locked = False
+        if _LIBC is not None:
+            try:
+                self.locked = _LIBC.mlock(ctypes.addressof(self._buf), ctypes.c_size_t(self.size)) == 0
+            except (AttributeError, OSError):
+                pass
+
+    def read(self) -> bytes:
+        return self._buf.raw
+
+    def wipe(self) -> None:
+        ctypes.memset(ctypes.addressof(self._buf), 0, self.size)
+        if self.locked:
+            _LIBC.munlock(ctypes.addressof(self._buf), ctypes.c_size_t(self.size))
+            self.locked = False
+
+
+class SecretCache:
+    """Short-lived LRU of decrypted key material, keyed by ciphertext digest.
+
+    Entries live in locked buffers. Reads hand out a copy as ``bytes``,
+    which Python cannot lock or wipe, so callers should use it and drop it.
+    Every insert first wipes the entries that have expired, and the cache
+    never holds more than ``max_entries``.
+    """
+
+    def __init__(self, ttl_seconds: float, max_entries: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries: OrderedDict[bytes, tuple[_SecretBuffer, float]] = OrderedDict()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl_seconds > 0 and self.max_entries > 0
+
+    @staticmethod
+    def _key(ciphertext: str) -> bytes:
+        return hashlib.sha256(ciphertext.encode()).digest()
+
+    def get(self, ciphertext: str) -> bytes | None:
+        if not self.enabled:
+            return None
+        key = self._key(ciphertext)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        buf, expires = entry
+        if expires <= time.monotonic():
+            self._evict(key)
+            return None
+        self._entries.move_to_end(key)
+        return buf.read()
+
+    def put(self, ciphertext: str, plaintext: bytes) -> None:
+        if not self.enabled:
+            return
+        now = time.monotonic()
+        for stale in [k for k, (_, expires) in self._entries.items() if expires <= now]:
+            self._evict(stale)
+        key = self._key(ciphertext)
+        if key in self._entries:
+            self._evict(key)
+        self._entries[key] = (_SecretBuffer(plaintext), now + self.ttl_seconds)
+        while len(self._entries) > self.max_entries:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, key: bytes) -> None:
+        buf, _ = self._entries.pop(key)
+        buf.wipe()
+
+    def clear(self) -> None:
+        for key in list(self._entries):
+            self._evict(key)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class LocalKMS:
+    """In-process stand-in for the AWS KMS client calls used here.
+
+    Wraps data keys with a local Fernet master key. For tests and local
+    development of the KMS code path only.
+    """
+
+    def __init__(self, master_key: bytes | None = None):
+        self._master = Fernet(master_key or Fernet.generate_key())
+        self.calls: dict[str, int] = {"generate_data_key": 0, "decrypt": 0}
+
+    def generate_data_key(self, KeyId: str, KeySpec: str = "AES_256") -> dict:  # noqa: N803 -- boto3 names
+        self.calls["generate_data_key"] += 1
+        plaintext = os.urandom(32)
+        return {"KeyId": KeyId, "Plaintext": plaintext, "CiphertextBlob": self._master.encrypt(plaintext)}
+
+    def decrypt(self, CiphertextBlob: bytes) -> dict:  # noqa: N803
+        self.calls["decrypt"] += 1
+        return {"Plaintext": self._master.decrypt(CiphertextBlob)}
+
 
 class KeyManager:
     """Encrypt and decrypt private key material."""
 
-    def __init__(self):
+    def __init__(self, kms_client=None):
         settings = get_settings()
-        self._use_kms = bool(settings.aws_kms_key_id)
+        self._use_kms = kms_client is not None or bool(settings.aws_kms_key_id)
+        self._kms = kms_client
+        self._key_id = settings.aws_kms_key_id or "local"
+        # wrapped data key -> its plaintext, in locked memory
+        self._data_keys = SecretCache(settings.kms_data_key_cache_seconds, settings.kms_data_key_cache_size)
+        # wrapped data key -> KMS Decrypt in flight
+        self._unwrapping: dict[bytes, asyncio.Future] = {}
+        self.secrets = SecretCache(settings.keypair_cache_seconds, settings.keypair_cache_size)
         if not self._use_kms:
             key = settings.encryption_key
             if not key:
@@ -32,44 +178,133 @@ class KeyManager:
                 )
             self._fernet = Fernet(key.encode() if isinstance(key, str) else key)
 
-    def encrypt(self, plaintext: bytes) -> str:
-        """Encrypt raw private key bytes. Returns base64-encoded ciphertext."""
+    @property
+    def uses_envelopes(self) -> bool:
+        """True in KMS mode, where encrypting needs the org's wrapped data key."""
+        return self._use_kms
+
+    def encrypt(self, plaintext: bytes, data_key: bytes | None = None) -> str:
+        """Encrypt raw private key bytes. Returns base64-encoded ciphertext.
+
+        In KMS mode the ciphertext is an envelope under `data_key`, the
+        org's KMS-wrapped data key.
+        """
         if self._use_kms:
-            return self._kms_encrypt(plaintext)
+            wrapped = self._require_data_key(data_key)
+            return self._seal(wrapped, self._cached_unwrap(wrapped) or self._unwrap(wrapped), plaintext)
         ct = self._fernet.encrypt(plaintext)
         return base64.b64encode(ct).decode()
 
+    async def encrypt_async(self, plaintext: bytes, data_key: bytes | None = None) -> str:
+        """encrypt(), with any KMS call made off the event loop."""
+        if self._use_kms:
+            wrapped = self._require_data_key(data_key)
+            cipher = self._cached_unwrap(wrapped) or await self._unwrap_async(wrapped)
+            return self._seal(wrapped, cipher, plaintext)
+        return self.encrypt(plaintext)
+
+    def new_data_key(self) -> bytes:
+        """Generate a data key through KMS. Returns it wrapped; the plaintext stays cached."""
+        resp = self._client().generate_data_key(KeyId=self._key_id, KeySpec="AES_256")
+        wrapped = resp["CiphertextBlob"]
+        self._data_keys.put(_cache_key(wrapped), resp["Plaintext"])
+        logger.info("kms_data_key_generated")
+        return wrapped
+
+    async def new_data_key_async(self) -> bytes:
+        """new_data_key() in a worker thread."""
+        return await asyncio.to_thread(self.new_data_key)
+
     def decrypt(self, ciphertext: str) -> bytes:
         """Decrypt base64-encoded ciphertext. Returns raw private key bytes."""
         if self._use_kms:
+            if ciphertext.startswith(ENVELOPE_PREFIX):
+                wrapped, token = self._open(ciphertext)
+                cipher = self._cached_unwrap(wrapped) or self._unwrap(wrapped)
+                return cipher.decrypt(token)
             return self._kms_decrypt(ciphertext)
         ct = base64.b64decode(ciphertext)
         return self._fernet.decrypt(ct)
 
-    def _kms_encrypt(self, plaintext: bytes) -> str:
-        """AWS KMS encryption (production)."""
-        import boto3
+    async def decrypt_async(self, ciphertext: str, cache: bool = False) -> bytes:
+        """decrypt(), with any KMS call made off the event loop.
 
-        settings = get_settings()
-        client = boto3.client("kms", region_name=settings.aws_region)
-        resp = client.encrypt(
-            KeyId=settings.aws_kms_key_id,
-            Plaintext=plaintext,
-        )
-        return base64.b64encode(resp["CiphertextBlob"]).decode()
+        With `cache`, the plaintext is served from / kept in the
+        short-lived secret cache (when keypair_cache_seconds is set).
+        """
+        if cache:
+            plaintext = self.secrets.get(ciphertext)
+            if plaintext is not None:
+                return plaintext
+        if not self._use_kms:
+            plaintext = self.decrypt(ciphertext)
+        elif ciphertext.startswith(ENVELOPE_PREFIX):
+            wrapped, token = self._open(ciphertext)
+            cipher = self._cached_unwrap(wrapped) or await self._unwrap_async(wrapped)
+            plaintext = cipher.decrypt(token)
+        else:
+            plaintext = await asyncio.to_thread(self._kms_decrypt, ciphertext)
+        if cache:
+            self.secrets.put(ciphertext, plaintext)
+        return plaintext
 
-    def _kms_decrypt(self, ciphertext: str) -> bytes:
-        """AWS KMS decryption (production)."""
-        import boto3
+    # -- Envelope ---------------------------------------------------------
 
-        settings = get_settings()
-        client = boto3.client("kms", region_name=settings.aws_region)
-        resp = client.decrypt(
-            CiphertextBlob=base64.b64decode(ciphertext),
-        )
+    @staticmethod
+    def _seal(wrapped: bytes, cipher: Fernet, plaintext: bytes) -> str:
+        return f"{ENVELOPE_PREFIX}{base64.b64encode(wrapped).decode()}:{cipher.encrypt(plaintext).decode()}"
+
+    @staticmethod
+    def _open(ciphertext: str) -> tuple[bytes, bytes]:
+        wrapped, token = ciphertext[len(ENVELOPE_PREFIX) :].split(":", 1)
+        return base64.b64decode(wrapped), token.encode()
+
+    @staticmethod
+    def _require_data_key(data_key: bytes | None) -> bytes:
+        if data_key is None:
+            raise ValueError("KMS mode seals keys under the org's data key; none was given")
+        return data_key
+
+    def _cached_unwrap(self, wrapped: bytes) -> Fernet | None:
+        plaintext = self._data_keys.get(_cache_key(wrapped))
+        return None if plaintext is None else Fernet(base64.urlsafe_b64encode(plaintext))
+
+    def _unwrap(self, wrapped: bytes) -> Fernet:
+        """KMS-decrypt a data key and cache it."""
+        plaintext = self._client().decrypt(CiphertextBlob=wrapped)["Plaintext"]
+        self._data_keys.put(_cache_key(wrapped), plaintext)
+        return Fernet(base64.urlsafe_b64encode(plaintext))
+
+    async def _unwrap_async(self, wrapped: bytes) -> Fernet:
+        """_unwrap() in a worker thread; concurrent callers share one KMS call."""
+        pending = self._unwrapping.get(wrapped)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        future = asyncio.ensure_future(asyncio.to_thread(self._unwrap, wrapped))
+        self._unwrapping[wrapped] = future
+        future.add_done_callback(lambda _: self._unwrapping.pop(wrapped, None))
+        return await asyncio.shield(future)
+
+    # -- KMS client -------------------------------------------------------
+
+    def _client(self):
+        """The KMS client, created once (boto3 clients are thread-safe)."""
+        if self._kms is None:
+            import boto3
+
+            self._kms = boto3.client("kms", region_name=get_settings().aws_region)
+        return self._kms
+
+    def _kms_decrypt(self, ciphertext: str) -> bytes:
+        """Direct AWS KMS decryption of a pre-envelope ciphertext."""
+        resp = self._client().decrypt(CiphertextBlob=base64.b64decode(ciphertext))
         return resp["Plaintext"]
 
 
+def _cache_key(wrapped: bytes) -> str:
+    return base64.b64encode(wrapped).decode()
+
+
 _km: KeyManager | None = None
 
 
@@ -0,0 +1,74 @@
+"""Postgres LISTEN/NOTIFY wake-ups for background workers.
+
+Producers NOTIFY a channel inside the transaction that creates work, so
+the notification is delivered only once that work has committed. Workers
+hold a ChannelListener and sleep until notified, falling back to their
+poll interval -- which is all they get on SQLite or if the listening
+connection drops.
+"""
+
+import asyncio
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from .database import get_engine
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+OUTBOX_CHANNEL = "agentwallet_outbox"
+WEBHOOK_CHANNEL = "agentwallet_webhooks"
+
+
+async def notify(db: AsyncSession, channel: str) -> None:
+    """Queue a NOTIFY on `channel`; delivered when `db`'s transaction commits."""
+    if db.bind.dialect.name == "postgresql":
+        await db.execute(text("SELECT pg_notify(:channel, '')"), {"channel": channel})
+
+
+class ChannelListener:
+    def __init__(self, channel: str):
+        self.channel = channel
+        self._event = asyncio.Event()
+        self._conn: AsyncConnection | None = None
+        self._driver = None
+
+    async def start(self) -> None:
+        engine = get_engine()
+        if engine.dialect.name != "postgresql":
+            return
+        try:
+            self._conn = await engine.connect()
+            raw = await self._conn.get_raw_connection()
+            self._driver = raw.driver_connection
+            await self._driver.add_listener(self.channel, self._on_notify)
+            logger.info("listening", channel=self.channel)
+        except Exception as e:
+            logger.warning("listen_failed", channel=self.channel, error=str(e))
+            await self.stop()
+
+    def _on_notify(self, connection, pid, channel, payload) -> None:
+        self._event.set()
+
+    async def wait(self, timeout: float) -> bool:
+        """Sleep until notified or `timeout` elapses. Returns True if notified."""
+        if self._driver is not None and self._driver.is_closed():
+            await self.stop()
+            await self.start()
+        try:
+            await asyncio.wait_for(self._event.wait(), timeout)
+            notified = True
+        except asyncio.TimeoutError:
+            notified = False
+        self._event.clear()
+        return notified
+
+    async def stop(self) -> None:
+        if self._conn is not None:
+            try:
+                await self._conn.close()
+            except Exception:
+                pass
+        self._conn = None
+        self._driver = None
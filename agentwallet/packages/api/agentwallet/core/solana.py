@@ -4,10 +4,17 @@ Provides: balance queries, SOL/SPL transfers, transaction signing,
 confirmation polling, and decode utilities.
 """
 
+import asyncio
 import base64 as b64
+import hashlib
+import time
+import weakref
+from collections import OrderedDict
+from dataclasses import asdict, dataclass
 
 import base58
 import httpx
+from solders.compute_budget import set_compute_unit_price
 from solders.hash import Hash
 from solders.instruction import Instruction
 from solders.keypair import Keypair
@@ -44,13 +51,103 @@ def _rpc_timeout() -> int:
     return get_settings().rpc_timeout
 
 
-async def _rpc_post(
-    client: httpx.AsyncClient,
-    method: str,
-    params: list,
-    rpc_id: int = 1,
-) -> httpx.Response:
-    """POST a JSON-RPC call with retry-on-429/5xx backoff.
+# ---------------------------------------------------------------------------
+# Shared RPC client pool
+# ---------------------------------------------------------------------------
+
+# endpoint URL -> long-lived pooled client. Every service, worker and the
+# x402 middleware share these instead of opening a fresh AsyncClient (and
+# paying TCP + TLS setup) per request. Closed by the app/worker lifespan.
+_rpc_clients: dict[str, httpx.AsyncClient] = {}
+
+
+@dataclass
+class RpcPoolStats:
+    """Per-endpoint request counters used to spot connection-pool saturation."""
+
+    max_connections: int = 0
+    requests: int = 0
+    # JSON-RPC calls carried by those requests (> requests when batching)
+    calls: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+    # Requests issued while every pooled connection was already busy (they
+    # queue for a free connection, or an HTTP/2 stream on an existing one).
+    saturated: int = 0
+
+
+_rpc_stats: dict[str, RpcPoolStats] = {}
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional `h2` package (httpx[http2])."""
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def get_rpc_client(endpoint: str | None = None) -> httpx.AsyncClient:
+    """Get or create the process-wide pooled client for a Solana RPC endpoint.
+
+    Connections are kept alive (HTTP/2 when available) and bounded per
+    endpoint by the rpc_max_connections / rpc_max_keepalive_connections
+    settings. Callers must NOT close the returned client -- use
+    close_rpc_clients() at shutdown.
+    """
+    url = endpoint or _rpc_url()
+    client = _rpc_clients.get(url)
+    if client is None or client.is_closed:
+        settings = get_settings()
+        http2 = settings.rpc_http2 and _http2_available()
+        client = httpx.AsyncClient(
+            http2=http2,
+            timeout=settings.rpc_timeout,
+            limits=httpx.Limits(
+                max_connections=settings.rpc_max_connections,
+                max_keepalive_connections=settings.rpc_max_keepalive_connections,
+                keepalive_expiry=settings.rpc_keepalive_expiry,
+            ),
+        )
+        _rpc_clients[url] = client
+        _rpc_stats.setdefault(url, RpcPoolStats()).max_connections = settings.rpc_max_connections
+        logger.info("rpc_client_created", endpoint=url, http2=http2)
+    return client
+
+
+async def close_rpc_clients() -> None:
+    """Close every pooled RPC client (app / worker shutdown)."""
+    clients = list(_rpc_clients.values())
+    _rpc_clients.clear()
+    for client in clients:
+        await client.aclose()
+
+
+def rpc_pool_stats() -> dict[str, dict]:
+    """Snapshot of per-endpoint pool counters, keyed by RPC URL."""
+    return {url: asdict(stats) for url, stats in _rpc_stats.items()}
+
+
+async def _tracked_post(client: httpx.AsyncClient, url: str, payload: dict | list) -> httpx.Response:
+    """POST to the RPC while keeping the endpoint's pool counters current."""
+    stats = _rpc_stats.setdefault(url, RpcPoolStats(max_connections=get_settings().rpc_max_connections))
+    stats.requests += 1
+    stats.calls += len(payload) if isinstance(payload, list) else 1
+    if stats.in_flight >= stats.max_connections:
+        stats.saturated += 1
+        if stats.saturated == 1 or stats.saturated % 100 == 0:
+            logger.warning("rpc_pool_saturated", endpoint=url, in_flight=stats.in_flight, saturated=stats.saturated)
+    stats.in_flight += 1
+    stats.peak_in_flight = max(stats.peak_in_flight, stats.in_flight)
+    try:
+        return await client.post(url, json=payload, timeout=_rpc_timeout())
+    finally:
+        stats.in_flight -= 1
+
+
+async def _post_with_retry(client: httpx.AsyncClient, label: str, build_payload) -> httpx.Response:
+    """POST `build_payload(attempt)` with retry-on-429/5xx backoff.
 
     The public devnet RPC rate-limits aggressively (429) and is load-balanced
     with eventual consistency, so transient failures are retried with
@@ -59,23 +156,15 @@ async def _rpc_post(
     import asyncio
     import random
 
+    url = _rpc_url()
     max_attempts = 4
     for attempt in range(max_attempts):
-        resp = await client.post(
-            _rpc_url(),
-            json={
-                "jsonrpc": "2.0",
-                "id": rpc_id + attempt,
-                "method": method,
-                "params": params,
-            },
-            timeout=_rpc_timeout(),
-        )
+        resp = await _tracked_post(client, url, build_payload(attempt))
         if resp.status_code in (429, 500, 502, 503, 504) and attempt < max_attempts - 1:
             delay = min(1.0 * (2**attempt), 8.0) + random.uniform(0, 0.5)
             logger.warning(
                 "rpc_retry",
-                method=method,
+                method=label,
                 status=resp.status_code,
                 attempt=attempt + 1,
                 backoff_s=round(delay, 1),
@@ -84,7 +173,133 @@ async def _rpc_post(
             continue
         resp.raise_for_status()
         return resp
-    raise RetryableError(f"RPC {method} failed after {max_attempts} attempts")
+    raise RetryableError(f"RPC {label} failed after {max_attempts} attempts")
+
+
+async def _rpc_post(
+    client: httpx.AsyncClient,
+    method: str,
+    params: list,
+    rpc_id: int = 1,
+) -> httpx.Response:
+    """POST a single JSON-RPC call with retry-on-429/5xx backoff."""
+    return await _post_with_retry(
+        client,
+        method,
+        lambda attempt: {
+            "jsonrpc": "2.0",
+            "id": rpc_id + attempt,
+            "method": method,
+            "params": params,
+        },
+    )
+
+
+# ---------------------------------------------------------------------------
+# JSON-RPC batching
+# ---------------------------------------------------------------------------
+
+
+class RpcBatcher:
+    """Coalesces concurrent JSON-RPC calls on one client into batch requests.
+
+    Calls issued within `window` seconds of each other (e.g. the legs of an
+    asyncio.gather) are sent as a single JSON-RPC batch array, so N
+    independent reads cost one HTTP round-trip and one rate-limit token
+    instead of N. A lone call is sent as a plain request.
+
+    Only a weak reference to the client is kept: batchers live as values in
+    the `_batchers` WeakKeyDictionary, and a strong one would keep their own
+    key alive forever.
+    """
+
+    def __init__(self, client: httpx.AsyncClient, window: float, max_batch: int):
+        self._client = weakref.ref(client)
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: list[tuple[dict, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._sending: set[asyncio.Task] = set()
+        self._next_id = 1
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        client = self._client()
+        if client is None:
+            raise RuntimeError("RPC client was closed before its batch was sent")
+        return client
+
+    async def call(self, method: str, params: list) -> dict:
+        """Queue one call and wait for its JSON-RPC response object."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append(({"jsonrpc": "2.0", "id": self._next_id, "method": method, "params": params}, fut))
+        self._next_id += 1
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await fut
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.ensure_future(self._send(batch))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, batch: list[tuple[dict, asyncio.Future]]) -> None:
+        try:
+            client = self.client
+            if len(batch) == 1:
+                req = batch[0][0]
+                bodies = [(await _post_with_retry(client, req["method"], lambda _a: req)).json()]
+            else:
+                payload = [req for req, _ in batch]
+                bodies = (await _post_with_retry(client, f"batch[{len(batch)}]", lambda _a: payload)).json()
+                if not isinstance(bodies, list):
+                    # Endpoint does not support batch arrays -- resend one by one.
+                    logger.warning("rpc_batch_unsupported", size=len(batch), body=str(bodies)[:200])
+                    responses = await asyncio.gather(
+                        *(_rpc_post(client, req["method"], req["params"], rpc_id=req["id"]) for req in payload)
+                    )
+                    bodies = [r.json() for r in responses]
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        by_id = {body.get("id"): body for body in bodies if isinstance(body, dict)}
+        for req, fut in batch:
+            if fut.done():
+                continue
+            body = by_id.get(req["id"])
+            if body is None:
+                body = {"jsonrpc": "2.0", "id": req["id"], "error": {"message": "No response in RPC batch"}}
+            fut.set_result(body)
+
+
+_batchers: weakref.WeakKeyDictionary[httpx.AsyncClient, RpcBatcher] = weakref.WeakKeyDictionary()
+
+
+async def _rpc_call(client: httpx.AsyncClient, method: str, params: list) -> dict:
+    """Make one JSON-RPC call and return its decoded response object.
+
+    Goes through the client's RpcBatcher so concurrent calls share a batch
+    request; set RPC_BATCH_WINDOW_MS=0 to send every call on its own.
+    """
+    settings = get_settings()
+    if settings.rpc_batch_window_ms <= 0:
+        return (await _rpc_post(client, method, params)).json()
+    batcher = _batchers.get(client)
+    if batcher is None:
+        batcher = RpcBatcher(client, settings.rpc_batch_window_ms / 1000, settings.rpc_batch_max_size)
+        _batchers[client] = batcher
+    return await batcher.call(method, params)
 
 
 def load_platform_keypair() -> Keypair:
@@ -122,8 +337,7 @@ def load_platform_keypair() -> Keypair:
 @retry()
 async def get_balance(client: httpx.AsyncClient, address: str) -> int:
     """Get SOL balance in lamports. Raises RetryableError on RPC failure."""
-    resp = await _rpc_post(client, "getBalance", [address])
-    body = resp.json()
+    body = await _rpc_call(client, "getBalance", [address])
     if "error" in body:
         raise RetryableError(f"RPC error: {body['error']}")
     result = body.get("result")
@@ -132,6 +346,21 @@ async def get_balance(client: httpx.AsyncClient, address: str) -> int:
     return result.get("value", 0)
 
 
+MAX_ACCOUNTS_PER_CALL = 100  # getMultipleAccounts limit
+
+
+@retry()
+async def get_multiple_accounts(client: httpx.AsyncClient, addresses: list[str]) -> list[dict | None]:
+    """Parsed account infos for up to MAX_ACCOUNTS_PER_CALL addresses, None where no account exists."""
+    body = await _rpc_call(client, "getMultipleAccounts", [addresses, {"encoding": "jsonParsed"}])
+    if "error" in body:
+        raise RetryableError(f"RPC error: {body['error']}")
+    result = body.get("result")
+    if result is None:
+        raise RetryableError("RPC returned no result")
+    return result.get("value") or [None] * len(addresses)
+
+
 async def get_balance_sol(client: httpx.AsyncClient, address: str) -> float | None:
     """Get SOL balance as float, or None on failure."""
     try:
@@ -148,14 +377,194 @@ async def get_rent_exempt_min(client: httpx.AsyncClient) -> int:
     Falls back to RENT_EXEMPT_MIN_LAMPORTS if the RPC does not answer, so
     callers still get a sane guard value.
     """
-    resp = await _rpc_post(client, "getMinimumBalanceForRentExemption", [0])
-    body = resp.json()
+    body = await _rpc_call(client, "getMinimumBalanceForRentExemption", [0])
     if "error" in body:
         raise RetryableError(f"RPC error: {body['error']}")
     result = body.get("result")
     return int(result) if isinstance(result, int) else RENT_EXEMPT_MIN_LAMPORTS
 
 
+# ---------------------------------------------------------------------------
+# Blockhash cache
+# ---------------------------------------------------------------------------
+
+
+@dataclass
+class CachedBlockhash:
+    blockhash: Hash
+    last_valid_block_height: int
+    fetched_at: float  # time.monotonic()
+
+
+async def fetch_latest_blockhash(client: httpx.AsyncClient) -> CachedBlockhash:
+    """Fetch a fresh blockhash (and its lastValidBlockHeight) from the RPC."""
+    body = await _rpc_call(client, "getLatestBlockhash", [])
+    if "error" in body:
+        raise RetryableError(f"Blockhash RPC error: {body['error']}")
+    value = body["result"]["value"]
+    return CachedBlockhash(
+        blockhash=Hash.from_string(value["blockhash"]),
+        last_valid_block_height=int(value.get("lastValidBlockHeight") or 0),
+        fetched_at=time.monotonic(),
+    )
+
+
+class BlockhashProvider:
+    """Keeps a recent blockhash warm so signing doesn't pay a round-trip.
+
+    A blockhash stays valid for ~150 slots (60-90s). The provider serves the
+    cached hash while it is younger than `max_age` seconds, refreshes it
+    in the background every `refresh_interval` seconds once started, and
+    single-flights on-demand refreshes so a burst of transfers triggers one
+    getLatestBlockhash. Call invalidate() when the RPC reports
+    BlockhashNotFound to force the next caller onto a fresh hash.
+
+    Sharing a hash means two identical transfers (same payer, recipients
+    and amounts) would sign to the same bytes -- and the same signature, so
+    the second is rejected as AlreadyProcessed. Build messages through
+    message(), which makes each one unique under its blockhash.
+    """
+
+    # Messages remembered per process; older entries' hashes have expired
+    MAX_TRACKED_MESSAGES = 4096
+
+    def __init__(self, max_age: float, refresh_interval: float):
+        self.max_age = max_age
+        self.refresh_interval = refresh_interval
+        self._current: CachedBlockhash | None = None
+        self._lock: asyncio.Lock | None = None
+        self._task: asyncio.Task | None = None
+        # digest of (blockhash, message) -> times signed
+        self._signed: OrderedDict[bytes, int] = OrderedDict()
+
+    @property
+    def current(self) -> CachedBlockhash | None:
+        """The cached blockhash if it is still fresh enough to sign with."""
+        cur = self._current
+        if cur is None or time.monotonic() - cur.fetched_at > self.max_age:
+            return None
+        return cur
+
+    async def get(self, client: httpx.AsyncClient) -> CachedBlockhash:
+        cur = self.current
+        if cur is not None:
+            return cur
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            # Another caller may have refreshed while we waited on the lock.
+            cur = self.current
+            if cur is not None:
+                return cur
+            return await self.refresh(client)
+
+    async def refresh(self, client: httpx.AsyncClient) -> CachedBlockhash:
+        self._current = await fetch_latest_blockhash(client)
+        return self._current
+
+    def invalidate(self) -> None:
+        self._current = None
+
+    def message(self, instructions: list, payer: Pubkey, blockhash: Hash) -> Message:
+        """Message for `instructions` that no earlier one under `blockhash` matches.
+
+        A repeat gets a compute-unit-price instruction carrying its repeat
+        count, which changes the bytes (and so the signature) for a
+        negligible priority fee.
+        """
+        key = hashlib.sha256(bytes(blockhash) + bytes(Message(instructions, payer))).digest()
+        repeats = self._signed.pop(key, 0)
+        self._signed[key] = repeats + 1
+        while len(self._signed) > self.MAX_TRACKED_MESSAGES:
+            self._signed.popitem(last=False)
+        if repeats:
+            instructions = [*instructions, set_compute_unit_price(repeats)]
+        return Message(instructions, payer)
+
+    def start(self) -> None:
+        """Start the background refresh loop (idempotent)."""
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _refresh_loop(self) -> None:
+        while True:
+            try:
+                await self.refresh(get_rpc_client())
+            except Exception as e:
+                logger.warning("blockhash_refresh_failed", error=str(e))
+            await asyncio.sleep(self.refresh_interval)
+
+
+_blockhash_provider: BlockhashProvider | None = None
+
+
+def get_blockhash_provider() -> BlockhashProvider:
+    """Get or create the process-wide blockhash provider."""
+    global _blockhash_provider
+    if _blockhash_provider is None:
+        settings = get_settings()
+        _blockhash_provider = BlockhashProvider(
+            max_age=settings.blockhash_max_age_seconds,
+            refresh_interval=settings.blockhash_refresh_interval,
+        )
+    return _blockhash_provider
+
+
+async def get_latest_blockhash(client: httpx.AsyncClient) -> Hash:
+    """Blockhash to sign a transaction against (served from the warm cache)."""
+    return (await get_blockhash_provider().get(client)).blockhash
+
+
+def is_blockhash_not_found(error) -> bool:
+    """True if a sendTransaction error means the signed blockhash expired."""
+    text = str(error)
+    return "BlockhashNotFound" in text or "Blockhash not found" in text
+
+
+def _send_error(error) -> RetryableError:
+    """Build the error for a failed sendTransaction.
+
+    An expired/unknown blockhash means the cached one is stale: drop it so
+    the retry signs against a fresh hash.
+    """
+    if is_blockhash_not_found(error):
+        get_blockhash_provider().invalidate()
+        logger.warning("blockhash_not_found_refreshing")
+    return RetryableError(f"sendTransaction error: {error}")
+
+
+class SubmittedSignature(str):
+    """Transaction signature that remembers its blockhash expiry height.
+
+    Behaves exactly like the signature string; ``last_valid_block_height``
+    lets callers persist when the transaction can no longer land.
+    """
+
+    last_valid_block_height: int | None = None
+
+    def __new__(cls, signature: str, last_valid_block_height: int | None = None):
+        obj = super().__new__(cls, signature)
+        obj.last_valid_block_height = last_valid_block_height
+        return obj
+
+
+async def get_block_height(client: httpx.AsyncClient) -> int:
+    """Current block height (compare against lastValidBlockHeight)."""
+    body = await _rpc_call(client, "getBlockHeight", [{"commitment": "confirmed"}])
+    if body.get("error"):
+        raise RetryableError(f"getBlockHeight error: {body['error']}")
+    return int(body["result"])
+
+
 # ---------------------------------------------------------------------------
 # Transfer SOL (ported from moltfarm lib/wallet.py transfer_sol)
 # ---------------------------------------------------------------------------
@@ -169,30 +578,26 @@ async def transfer_sol(
     lamports: int,
     fee_lamports: int = 0,
     fee_recipient: str | None = None,
-) -> str:
+) -> SubmittedSignature:
     """Transfer SOL with optional platform fee.
 
     If fee_lamports > 0 and fee_recipient is set, an additional transfer
     instruction is added atomically in the same transaction.
 
-    Returns the transaction signature.
+    Returns the transaction signature (carrying its last valid block height).
     """
     from_addr = str(from_keypair.pubkey())
 
+    # Balance and blockhash are independent reads -- issue them together so
+    # the batcher sends them as a single JSON-RPC batch.
+    bal, cached = await asyncio.gather(get_balance(client, from_addr), get_blockhash_provider().get(client))
+
     # Validate balance
-    bal = await get_balance(client, from_addr)
     tx_fee = 5000  # base tx fee
     total_needed = lamports + fee_lamports + tx_fee
     if bal < total_needed:
         raise InsufficientBalanceError(available=bal, required=total_needed)
 
-    # Get blockhash
-    resp = await _rpc_post(client, "getLatestBlockhash", [])
-    bh_data = resp.json()
-    if "error" in bh_data:
-        raise RetryableError(f"Blockhash RPC error: {bh_data['error']}")
-    bh = Hash.from_string(bh_data["result"]["value"]["blockhash"])
-
     # Build instructions
     instructions = [
         transfer(
@@ -215,8 +620,8 @@ async def transfer_sol(
             )
         )
 
-    msg = Message(instructions, from_keypair.pubkey())
-    tx = Transaction([from_keypair], msg, bh)
+    msg = get_blockhash_provider().message(instructions, from_keypair.pubkey(), cached.blockhash)
+    tx = Transaction([from_keypair], msg, cached.blockhash)
     tx_b58 = base58.b58encode(bytes(tx)).decode()
 
     # Send
@@ -224,7 +629,7 @@ async def transfer_sol(
     result = resp.json()
 
     if result.get("error"):
-        raise RetryableError(f"sendTransaction error: {result['error']}")
+        raise _send_error(result["error"])
 
     sig = result.get("result")
     if not sig:
@@ -238,7 +643,35 @@ async def transfer_sol(
         fee_lamports=fee_lamports,
         signature=sig[:24],
     )
-    return sig
+    return SubmittedSignature(sig, cached.last_valid_block_height)
+
+
+# A legacy transaction is capped at 1232 bytes; with one signer that leaves
+# room for about 21 system transfers to distinct recipients (20 plus the
+# compute-unit-price instruction a repeated message may carry).
+MAX_TRANSFERS_PER_TX = 20
+
+
+def build_sol_transfers(from_keypair: Keypair, transfers: list[tuple[str, int]], blockhash: Hash) -> Transaction:
+    """Sign one transaction carrying a SOL transfer per (address, lamports).
+
+    The signature (``tx.signatures[0]``) is fixed once signed, so callers can
+    record it before sending and reconcile an ambiguous send afterwards.
+    """
+    if not 0 < len(transfers) <= MAX_TRANSFERS_PER_TX:
+        raise ValueError(f"A transaction packs 1..{MAX_TRANSFERS_PER_TX} transfers, got {len(transfers)}")
+    instructions = [
+        transfer(
+            TransferParams(
+                from_pubkey=from_keypair.pubkey(),
+                to_pubkey=Pubkey.from_string(address),
+                lamports=lamports,
+            )
+        )
+        for address, lamports in transfers
+    ]
+    message = get_blockhash_provider().message(instructions, from_keypair.pubkey(), blockhash)
+    return Transaction([from_keypair], message, blockhash)
 
 
 # ---------------------------------------------------------------------------
@@ -252,24 +685,34 @@ async def confirm_transaction(
     max_polls: int | None = None,
     poll_interval: float | None = None,
 ) -> bool:
-    """Poll getSignatureStatuses until confirmed/finalized or timeout.
+    """Wait until a signature is confirmed/finalized or timeout.
+
+    Polls getSignatureStatuses, or -- with ``rpc_confirm_mode="websocket"``
+    -- waits on a signatureSubscribe notification over the shared PubSub
+    connection, falling back to polling if the socket is unavailable.
 
     Returns True if confirmed, False if timed out or errored.
     """
-    import asyncio
-
     settings = get_settings()
     max_polls = max_polls or settings.rpc_confirm_max_polls
     poll_interval = poll_interval or settings.rpc_confirm_poll_interval
 
+    if settings.rpc_confirm_mode == "websocket":
+        from .solana_pubsub import get_signature_subscriber, websockets_available
+
+        if websockets_available():
+            try:
+                return await get_signature_subscriber().confirm(client, signature, timeout=max_polls * poll_interval)
+            except Exception as e:
+                logger.warning("pubsub_confirm_fallback", signature=signature[:24], error=str(e))
+
     for _i in range(max_polls):
         try:
-            resp = await _rpc_post(
+            body = await _rpc_call(
                 client,
                 "getSignatureStatuses",
                 [[signature], {"searchTransactionHistory": True}],
             )
-            body = resp.json()
             statuses = body.get("result", {}).get("value", [])
             if statuses and statuses[0]:
                 status = statuses[0]
@@ -288,6 +731,52 @@ async def confirm_transaction(
     return False
 
 
+# getSignatureStatuses accepts at most this many signatures per call.
+MAX_SIGNATURES_PER_STATUS_CALL = 256
+
+
+async def confirm_transactions(
+    client: httpx.AsyncClient,
+    signatures: list[str],
+) -> dict[str, str | None]:
+    """Check many signatures in one pass (no polling).
+
+    Signatures are chunked into getSignatureStatuses calls of up to 256;
+    the chunks are issued concurrently, so the batcher usually sends them as
+    a single HTTP request.
+
+    Returns {signature: status} where status is "confirmed", "finalized",
+    "failed" (landed with an error) or None (unknown / still processing).
+    Signatures whose chunk got a JSON-RPC error are left out: their status
+    was not read, so callers must not take them as absent.
+    """
+    chunks = [
+        signatures[i : i + MAX_SIGNATURES_PER_STATUS_CALL]
+        for i in range(0, len(signatures), MAX_SIGNATURES_PER_STATUS_CALL)
+    ]
+    bodies = await asyncio.gather(
+        *(_rpc_call(client, "getSignatureStatuses", [chunk, {"searchTransactionHistory": True}]) for chunk in chunks)
+    )
+
+    results: dict[str, str | None] = {}
+    for chunk, body in zip(chunks, bodies):
+        if body.get("error"):
+            logger.warning("signature_statuses_rpc_error", count=len(chunk), error=body["error"])
+            continue
+        statuses = (body.get("result") or {}).get("value") or []
+        for i, sig in enumerate(chunk):
+            status = statuses[i] if i < len(statuses) else None
+            if not status:
+                results[sig] = None
+            elif status.get("err"):
+                results[sig] = "failed"
+            elif status.get("confirmationStatus") in ("confirmed", "finalized"):
+                results[sig] = status["confirmationStatus"]
+            else:
+                results[sig] = None
+    return results
+
+
 async def get_parsed_transaction(
     client: httpx.AsyncClient,
     signature: str,
@@ -343,6 +832,8 @@ async def verify_transfer_on_chain(
 
     Returns dict with:
         valid, payer, payee, amount, token_mint, error
+    and ``retryable=True`` when the rejection may be transient (the RPC did
+    not return the transaction yet) rather than a verdict on the payment.
     """
     # Poll for the parsed tx -- right after submission the RPC may not have
     # full parsed data yet, and some validators return partial results.
@@ -355,7 +846,7 @@ async def verify_transfer_on_chain(
             break
         await asyncio.sleep(0.5)
     if not tx:
-        return {"valid": False, "error": "Transaction not found on-chain"}
+        return {"valid": False, "retryable": True, "error": "Transaction not found on-chain"}
 
     meta = tx.get("meta") or {}
     if meta.get("err"):
@@ -581,6 +1072,8 @@ async def submit_transaction(
     rpc = resp.json()
 
     if rpc.get("error"):
+        if is_blockhash_not_found(rpc["error"]):
+            get_blockhash_provider().invalidate()
         raise TransactionFailedError(f"sendTransaction error: {rpc['error']}")
 
     sig = rpc.get("result", "")
@@ -619,7 +1112,7 @@ async def transfer_spl_token(
     amount: int,  # raw amount in token's smallest unit
     fee_lamports: int = 0,
     fee_recipient: str | None = None,
-) -> str:
+) -> SubmittedSignature:
     """Transfer SPL tokens with optional platform fee.
 
     Args:
@@ -632,7 +1125,7 @@ async def transfer_spl_token(
         fee_recipient: Platform fee recipient address
 
     Returns:
-        Transaction signature
+        Transaction signature (carrying its last valid block height)
     """
     from solders.instruction import Instruction
     from solders.pubkey import Pubkey
@@ -640,15 +1133,28 @@ async def transfer_spl_token(
 
     from_addr = str(from_keypair.pubkey())
 
+    # Validate addresses before touching the RPC
+    Pubkey.from_string(to_address)
+    Pubkey.from_string(mint)
+    token_program = Pubkey.from_string(TOKEN_PROGRAM_ID)
+
+    # Every read below is independent -- issue them together so the batcher
+    # sends one JSON-RPC batch instead of five sequential round-trips.
+    sol_balance, token_accounts, sender_accounts, recipient_accounts, cached = await asyncio.gather(
+        get_balance(client, from_addr),
+        get_token_accounts(client, from_addr),
+        _token_account_addresses(client, from_addr, mint),
+        _token_account_addresses(client, to_address, mint),
+        get_blockhash_provider().get(client),
+    )
+
     # Check SOL balance for transaction fees
-    sol_balance = await get_balance(client, from_addr)
     tx_fee = 5000  # base transaction fee
     total_fee_needed = fee_lamports + tx_fee
     if sol_balance < total_fee_needed:
         raise InsufficientBalanceError(available=sol_balance, required=total_fee_needed)
 
-    # Get sender's token account
-    token_accounts = await get_token_accounts(client, from_addr)
+    # Check sender's token balance
     sender_token_account = None
     for account in token_accounts:
         if account["mint"] == mint:
@@ -659,59 +1165,15 @@ async def transfer_spl_token(
         available = sender_token_account["amount"] if sender_token_account else 0
         raise InsufficientBalanceError(available=available, required=amount)
 
-    # Get or create recipient's associated token account
-    Pubkey.from_string(to_address)
-    Pubkey.from_string(mint)
-
-    # Calculate associated token account address for recipient
-    # Using the standard Associated Token Program formula
-    Pubkey.from_string("ATokenGPvbdGVxr1b2hvZbsiqW5xWH25efTNsLJA8knL")
-    token_program = Pubkey.from_string("TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA")
-
-    # Find recipient's associated token account
-    try:
-        recipient_accounts = await get_token_accounts(client, to_address)
-        for account in recipient_accounts:
-            if account["mint"] == mint:
-                break
-    except Exception:
-        pass  # Recipient might not have any token accounts yet
-
-    # For simplicity, we'll assume the associated token account exists
+    # For simplicity, we'll assume the recipient's token account exists
     # In a production system, you'd want to check and create it if needed
-
-    # Get sender's token account address (we need the actual account pubkey)
-    sender_accounts_resp = await _rpc_post(
-        client,
-        "getTokenAccountsByOwner",
-        [from_addr, {"mint": mint}, {"encoding": "jsonParsed"}],
-    )
-    sender_accounts_data = sender_accounts_resp.json()
-
-    if not sender_accounts_data.get("result", {}).get("value"):
+    if not sender_accounts:
         raise InsufficientBalanceError(available=0, required=amount)
+    sender_token_account_pubkey = Pubkey.from_string(sender_accounts[0])
 
-    sender_token_account_pubkey = Pubkey.from_string(sender_accounts_data["result"]["value"][0]["pubkey"])
-
-    # Get recipient's token account address
-    recipient_accounts_resp = await _rpc_post(
-        client,
-        "getTokenAccountsByOwner",
-        [to_address, {"mint": mint}, {"encoding": "jsonParsed"}],
-    )
-    recipient_accounts_data = recipient_accounts_resp.json()
-
-    if not recipient_accounts_data.get("result", {}).get("value"):
+    if not recipient_accounts:
         raise ValueError(f"Recipient {to_address} does not have a token account for mint {mint}")
-
-    recipient_token_account_pubkey = Pubkey.from_string(recipient_accounts_data["result"]["value"][0]["pubkey"])
-
-    # Get blockhash
-    resp = await _rpc_post(client, "getLatestBlockhash", [])
-    bh_data = resp.json()
-    if "error" in bh_data:
-        raise RetryableError(f"Blockhash RPC error: {bh_data['error']}")
-    bh = Hash.from_string(bh_data["result"]["value"]["blockhash"])
+    recipient_token_account_pubkey = Pubkey.from_string(recipient_accounts[0])
 
     # Build SPL token transfer instruction
     # Token transfer instruction data: opcode 3 (Transfer) + amount (8 bytes little endian)
@@ -745,8 +1207,8 @@ async def transfer_spl_token(
         )
 
     # Build and sign transaction
-    msg = Message(instructions, from_keypair.pubkey())
-    tx = Transaction([from_keypair], msg, bh)
+    msg = get_blockhash_provider().message(instructions, from_keypair.pubkey(), cached.blockhash)
+    tx = Transaction([from_keypair], msg, cached.blockhash)
     tx_b58 = base58.b58encode(bytes(tx)).decode()
 
     # Send transaction
@@ -754,7 +1216,7 @@ async def transfer_spl_token(
     result = resp.json()
 
     if result.get("error"):
-        raise RetryableError(f"sendTransaction error: {result['error']}")
+        raise _send_error(result["error"])
 
     sig = result.get("result")
     if not sig:
@@ -769,12 +1231,12 @@ async def transfer_spl_token(
         fee_lamports=fee_lamports,
         signature=sig[:24],
     )
-    return sig
+    return SubmittedSignature(sig, cached.last_valid_block_height)
 
 
 async def get_token_accounts(client: httpx.AsyncClient, owner: str) -> list[dict]:
     """Get all SPL token accounts for an owner. Returns list of {mint, amount, decimals}."""
-    resp = await _rpc_post(
+    body = await _rpc_call(
         client,
         "getTokenAccountsByOwner",
         [
@@ -783,7 +1245,6 @@ async def get_token_accounts(client: httpx.AsyncClient, owner: str) -> list[dict
             {"encoding": "jsonParsed"},
         ],
     )
-    body = resp.json()
     accounts = []
     for item in body.get("result", {}).get("value", []):
         info = item.get("account", {}).get("data", {}).get("parsed", {}).get("info", {})
@@ -822,8 +1283,7 @@ def associated_token_address(owner: str, mint: str) -> str:
 
 async def account_exists(client: httpx.AsyncClient, address: str) -> bool:
     """Check whether an account exists on-chain."""
-    resp = await _rpc_post(client, "getAccountInfo", [address, {"encoding": "base64"}])
-    body = resp.json()
+    body = await _rpc_call(client, "getAccountInfo", [address, {"encoding": "base64"}])
     if "error" in body:
         raise RetryableError(f"RPC error: {body['error']}")
     return body.get("result", {}).get("value") is not None
@@ -869,20 +1329,16 @@ async def _send_instructions(
     attempts = 3 if retry_simulation else 1
     last_error: Exception | None = None
     for attempt in range(attempts):
-        resp = await _rpc_post(client, "getLatestBlockhash", [])
-        bh_data = resp.json()
-        if "error" in bh_data:
-            raise RetryableError(f"Blockhash RPC error: {bh_data['error']}")
-        bh = Hash.from_string(bh_data["result"]["value"]["blockhash"])
+        bh = await get_latest_blockhash(client)
 
-        msg = Message(instructions, signers[0].pubkey())
+        msg = get_blockhash_provider().message(instructions, signers[0].pubkey(), bh)
         tx = Transaction(signers, msg, bh)
         tx_b58 = base58.b58encode(bytes(tx)).decode()
 
         resp = await _rpc_post(client, "sendTransaction", [tx_b58, {"encoding": "base58"}], rpc_id=2)
         result = resp.json()
         if result.get("error"):
-            last_error = RetryableError(f"sendTransaction error: {result['error']}")
+            last_error = _send_error(result["error"])
             msg_text = str(last_error)
             if retry_simulation and "simulation" in msg_text and attempt < attempts - 1:
                 await asyncio.sleep(1.0 + attempt)
@@ -986,8 +1442,7 @@ async def create_spl_mint(
     from solders.system_program import CreateAccountParams, create_account
 
     mint_kp = Keypair()
-    resp = await _rpc_post(client, "getMinimumBalanceForRentExemption", [MINT_ACCOUNT_SPACE])
-    rent_body = resp.json()
+    rent_body = await _rpc_call(client, "getMinimumBalanceForRentExemption", [MINT_ACCOUNT_SPACE])
     if "error" in rent_body:
         raise RetryableError(f"RPC error: {rent_body['error']}")
     rent = rent_body["result"]
@@ -1017,12 +1472,7 @@ async def create_spl_mint(
 
 async def _token_account_addresses(client: httpx.AsyncClient, owner: str, mint: str) -> list[str]:
     """Return the pubkeys of `owner`'s token accounts holding `mint`."""
-    resp = await _rpc_post(
-        client,
-        "getTokenAccountsByOwner",
-        [owner, {"mint": mint}, {"encoding": "jsonParsed"}],
-    )
-    body = resp.json()
+    body = await _rpc_call(client, "getTokenAccountsByOwner", [owner, {"mint": mint}, {"encoding": "jsonParsed"}])
     return [item.get("pubkey", "") for item in body.get("result", {}).get("value", [])]
 
 
@@ -1038,8 +1488,7 @@ async def ensure_token_account(
         return existing[0]
 
     # Rent-exempt lamports for a 165-byte token account.
-    resp = await _rpc_post(client, "getMinimumBalanceForRentExemption", [165])
-    rent_body = resp.json()
+    rent_body = await _rpc_call(client, "getMinimumBalanceForRentExemption", [165])
     if "error" in rent_body:
         raise RetryableError(f"RPC error: {rent_body['error']}")
     rent = rent_body["result"]
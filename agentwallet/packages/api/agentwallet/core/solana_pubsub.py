@@ -0,0 +1,189 @@
+"""Solana PubSub confirmation backend -- signatureSubscribe over one websocket.
+
+Optional alternative to polling getSignatureStatuses (enable with
+``RPC_CONFIRM_MODE=websocket``). Every waiter in the process shares a single
+multiplexed connection; notifications resolve per-signature futures. If the
+socket is unavailable or drops, callers fall back to batched polling.
+"""
+
+import asyncio
+import itertools
+import json
+
+import httpx
+
+from .config import get_settings
+from .logging import get_logger
+
+logger = get_logger(__name__)
+
+
+def websockets_available() -> bool:
+    """The websocket backend needs the optional `websockets` package."""
+    try:
+        import websockets  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def ws_url_for(rpc_url: str) -> str:
+    """Derive the PubSub endpoint from an HTTP RPC URL (https -> wss)."""
+    if rpc_url.startswith("https://"):
+        return "wss://" + rpc_url[len("https://") :]
+    if rpc_url.startswith("http://"):
+        return "ws://" + rpc_url[len("http://") :]
+    return rpc_url
+
+
+class SignatureSubscriber:
+    """Multiplexes signatureSubscribe calls over one websocket connection."""
+
+    def __init__(self, ws_url: str, commitment: str = "confirmed"):
+        self.ws_url = ws_url
+        self.commitment = commitment
+        self._ws = None
+        self._reader: asyncio.Task | None = None
+        self._connect_lock = asyncio.Lock()
+        self._ids = itertools.count(1)
+        # request id -> future resolved with (subscription id, outcome future)
+        self._acks: dict[int, asyncio.Future] = {}
+        # subscription id -> future resolved with True (ok) / False (failed)
+        self._subscriptions: dict[int, asyncio.Future] = {}
+
+    @property
+    def connected(self) -> bool:
+        return self._ws is not None and self._reader is not None and not self._reader.done()
+
+    async def _ensure_connected(self) -> None:
+        if self.connected:
+            return
+        async with self._connect_lock:
+            if self.connected:
+                return
+            from websockets.asyncio.client import connect
+
+            self._ws = await connect(self.ws_url, max_size=None)
+            self._reader = asyncio.create_task(self._read_loop(self._ws))
+            logger.info("pubsub_connected", url=self.ws_url)
+
+    async def _read_loop(self, ws) -> None:
+        try:
+            async for raw in ws:
+                self._dispatch(json.loads(raw))
+        except Exception as e:
+            logger.warning("pubsub_connection_lost", error=str(e))
+        finally:
+            if self._ws is ws:
+                self._ws = None
+            self._fail_pending(ConnectionError("PubSub connection closed"))
+
+    def _dispatch(self, msg: dict) -> None:
+        if msg.get("method") == "signatureNotification":
+            params = msg.get("params") or {}
+            future = self._subscriptions.pop(params.get("subscription"), None)
+            if future and not future.done():
+                value = (params.get("result") or {}).get("value") or {}
+                future.set_result(not value.get("err"))
+            return
+
+        ack = self._acks.pop(msg.get("id"), None)
+        if ack is None or ack.done():
+            return
+        if msg.get("error"):
+            ack.set_exception(ConnectionError(f"signatureSubscribe error: {msg['error']}"))
+            return
+        # Register the outcome future here, not in subscribe(): the
+        # notification can follow the ack before the waiter resumes.
+        outcome = asyncio.get_running_loop().create_future()
+        self._subscriptions[msg.get("result")] = outcome
+        ack.set_result((msg.get("result"), outcome))
+
+    def _fail_pending(self, exc: Exception) -> None:
+        for future in [*self._acks.values(), *self._subscriptions.values()]:
+            if not future.done():
+                future.set_exception(exc)
+        self._acks.clear()
+        self._subscriptions.clear()
+
+    async def _send(self, request_id: int, method: str, params: list) -> None:
+        await self._ws.send(json.dumps({"jsonrpc": "2.0", "id": request_id, "method": method, "params": params}))
+
+    async def subscribe(self, signature: str) -> tuple[int, asyncio.Future]:
+        """Subscribe to a signature; returns (subscription id, outcome future)."""
+        await self._ensure_connected()
+        request_id = next(self._ids)
+        ack = asyncio.get_running_loop().create_future()
+        self._acks[request_id] = ack
+        try:
+            await self._send(request_id, "signatureSubscribe", [signature, {"commitment": self.commitment}])
+            return await asyncio.wait_for(ack, get_settings().rpc_timeout)
+        finally:
+            self._acks.pop(request_id, None)
+
+    async def unsubscribe(self, subscription_id: int) -> None:
+        future = self._subscriptions.pop(subscription_id, None)
+        if future and not future.done():
+            future.cancel()
+        if self.connected:
+            try:
+                await self._send(next(self._ids), "signatureUnsubscribe", [subscription_id])
+            except Exception as e:
+                logger.debug("pubsub_unsubscribe_failed", error=str(e))
+
+    async def confirm(self, client: httpx.AsyncClient, signature: str, timeout: float) -> bool:
+        """Wait for a signature to confirm; True if confirmed, False otherwise.
+
+        Subscribes first, then checks the current status once (via the
+        batched getSignatureStatuses path) so a transaction that landed
+        before the subscription is not missed. Raises ConnectionError if the
+        socket fails, so the caller can fall back to polling.
+        """
+        from .solana import confirm_transactions
+
+        subscription_id, outcome = await self.subscribe(signature)
+        try:
+            status = (await confirm_transactions(client, [signature])).get(signature)
+            if status in ("confirmed", "finalized"):
+                return True
+            if status == "failed":
+                return False
+            try:
+                return await asyncio.wait_for(asyncio.shield(outcome), timeout)
+            except asyncio.TimeoutError:
+                logger.warning("tx_confirmation_timeout", signature=signature[:24], backend="websocket")
+                return False
+        finally:
+            if not outcome.done():
+                await self.unsubscribe(subscription_id)
+            elif not outcome.cancelled():
+                outcome.exception()  # a late connection error is not ours to raise
+
+    async def close(self) -> None:
+        ws, self._ws = self._ws, None
+        if ws is not None:
+            await ws.close()
+        if self._reader is not None:
+            await asyncio.gather(self._reader, return_exceptions=True)
+            self._reader = None
+        self._fail_pending(ConnectionError("PubSub subscriber closed"))
+
+
+_subscriber: SignatureSubscriber | None = None
+
+
+def get_signature_subscriber() -> SignatureSubscriber:
+    """Get or create the process-wide subscriber (one connection per process)."""
+    global _subscriber
+    if _subscriber is None:
+        settings = get_settings()
+        _subscriber = SignatureSubscriber(settings.solana_ws_url or ws_url_for(settings.solana_rpc_url))
+    return _subscriber
+
+
+async def close_signature_subscriber() -> None:
+    """Close the shared PubSub connection. Called on app/worker shutdown."""
+    global _subscriber
+    if _subscriber is not None:
+        await _subscriber.close()
+        _subscriber = None
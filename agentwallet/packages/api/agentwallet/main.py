@@ -49,6 +49,9 @@ from .core.exceptions import (
 )
 from .core.logging import setup_logging
 from .core.redis_client import close_redis
+from .core.solana import close_rpc_clients, get_blockhash_provider
+from .core.solana_pubsub import close_signature_subscriber
+from .services.auth_cache import get_api_key_usage
 from .services.x402_server import X402ServerMiddleware
 
 
@@ -56,7 +59,13 @@ from .services.x402_server import X402ServerMiddleware
 async def lifespan(app: FastAPI):
     settings = get_settings()
     setup_logging(settings.log_level, settings.log_format)
+    get_blockhash_provider().start()
+    get_api_key_usage().start()
     yield
+    await get_api_key_usage().stop()
+    await get_blockhash_provider().stop()
+    await close_signature_subscriber()
+    await close_rpc_clients()
     await close_db()
     await close_redis()
 
@@ -78,6 +87,9 @@ app = FastAPI(
 class SecurityHeadersMiddleware(BaseHTTPMiddleware):
     async def dispatch(self, request: Request, call_next):
         response = await call_next(request)
+        rate_limit = getattr(request.state, "rate_limit", None)
+        if rate_limit is not None:
+            response.headers.update(rate_limit.headers())
         response.headers["X-Content-Type-Options"] = "nosniff"
         response.headers["X-Frame-Options"] = "DENY"
         response.headers["X-XSS-Protection"] = "1; mode=block"
@@ -117,6 +129,7 @@ app.add_middleware(
         "X-Payment-Proof",
         "X-PAYMENT-REQUIRED",
     ],
+    expose_headers=["RateLimit-Limit", "RateLimit-Remaining", "RateLimit-Reset", "Retry-After"],
 )
 
 # Register routers under /v1
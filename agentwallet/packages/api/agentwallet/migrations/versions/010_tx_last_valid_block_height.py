@@ -0,0 +1,24 @@
+"""Add last_valid_block_height to transactions for blockhash expiry tracking.
+
+Revision ID: 010_tx_last_valid_block_height
+Revises: 009_task_failure_count
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "010_tx_last_valid_block_height"
+down_revision: Union[str, None] = "009_task_failure_count"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("transactions", sa.Column("last_valid_block_height", sa.BigInteger, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("transactions", "last_valid_block_height")
@@ -0,0 +1,34 @@
+"""Transactional outbox for domain events feeding webhook deliveries.
+
+Revision ID: 011_outbox_events
+Revises: 010_tx_last_valid_block_height
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "011_outbox_events"
+down_revision: Union[str, None] = "010_tx_last_valid_block_height"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "outbox_events",
+        sa.Column("id", postgresql.UUID(as_uuid=True), primary_key=True),
+        sa.Column("org_id", postgresql.UUID(as_uuid=True), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("event_type", sa.String(100), nullable=False),
+        sa.Column("payload", sa.JSON, nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_outbox_events_created", "outbox_events", ["created_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_outbox_events_created", table_name="outbox_events")
+    op.drop_table("outbox_events")
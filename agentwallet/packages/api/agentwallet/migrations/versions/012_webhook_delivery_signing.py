@@ -0,0 +1,33 @@
+"""Pre-signed webhook delivery bodies and a pending-deliveries index.
+
+Revision ID: 012_webhook_delivery_signing
+Revises: 011_outbox_events
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "012_webhook_delivery_signing"
+down_revision: Union[str, None] = "011_outbox_events"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("webhook_deliveries", sa.Column("body", sa.Text, nullable=True))
+    op.add_column("webhook_deliveries", sa.Column("signature", sa.String(64), nullable=True))
+    op.create_index(
+        "ix_webhook_deliveries_pending",
+        "webhook_deliveries",
+        ["next_retry_at"],
+        postgresql_where=sa.text("delivered_at IS NULL"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_webhook_deliveries_pending", table_name="webhook_deliveries")
+    op.drop_column("webhook_deliveries", "signature")
+    op.drop_column("webhook_deliveries", "body")
@@ -0,0 +1,58 @@
+"""Incremental analytics rollups: change tracking on transactions, upsert targets.
+
+Revision ID: 013_incremental_analytics
+Revises: 012_webhook_delivery_signing
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "013_incremental_analytics"
+down_revision: Union[str, None] = "012_webhook_delivery_signing"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "transactions",
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    )
+    op.add_column("transactions", sa.Column("rollup_status", sa.String(50), nullable=True))
+    # Existing rows are already reflected in analytics_daily
+    op.execute("UPDATE transactions SET rollup_status = status")
+    op.create_index("ix_transactions_updated", "transactions", ["updated_at"])
+
+    op.create_index(
+        "uq_analytics_daily_org_day",
+        "analytics_daily",
+        ["org_id", "date"],
+        unique=True,
+        postgresql_where=sa.text("agent_id IS NULL"),
+    )
+    op.create_index(
+        "uq_analytics_daily_agent_day",
+        "analytics_daily",
+        ["org_id", "agent_id", "date"],
+        unique=True,
+        postgresql_where=sa.text("agent_id IS NOT NULL"),
+    )
+
+    op.create_table(
+        "analytics_watermarks",
+        sa.Column("name", sa.String(100), primary_key=True),
+        sa.Column("watermark", sa.DateTime(timezone=True), nullable=False),
+    )
+    op.execute("INSERT INTO analytics_watermarks (name, watermark) VALUES ('daily', now())")
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_watermarks")
+    op.drop_index("uq_analytics_daily_agent_day", table_name="analytics_daily")
+    op.drop_index("uq_analytics_daily_org_day", table_name="analytics_daily")
+    op.drop_index("ix_transactions_updated", table_name="transactions")
+    op.drop_column("transactions", "rollup_status")
+    op.drop_column("transactions", "updated_at")
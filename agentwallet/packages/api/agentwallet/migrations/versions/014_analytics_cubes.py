@@ -0,0 +1,76 @@
+"""Analytics cubes: hourly and per-destination rollups, HyperLogLog sketches.
+
+Existing history is not re-cut into the new cubes here; run
+``AnalyticsEngine.backfill`` over the days that need them.
+
+Revision ID: 014_analytics_cubes
+Revises: 013_incremental_analytics
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects.postgresql import UUID
+
+revision: str = "014_analytics_cubes"
+down_revision: Union[str, None] = "013_incremental_analytics"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("analytics_daily", sa.Column("destinations_hll", sa.LargeBinary(), nullable=True))
+
+    op.create_table(
+        "analytics_hourly",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("org_id", UUID(as_uuid=True), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("agent_id", UUID(as_uuid=True), sa.ForeignKey("agents.id"), nullable=True),
+        sa.Column("token", sa.String(64), nullable=False),
+        sa.Column("hour", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("tx_count", sa.Integer(), server_default="0"),
+        sa.Column("total_spend_lamports", sa.BigInteger(), server_default="0"),
+        sa.Column("total_fees_lamports", sa.BigInteger(), server_default="0"),
+        sa.Column("failed_tx_count", sa.Integer(), server_default="0"),
+        sa.Column("destinations_hll", sa.LargeBinary(), nullable=True),
+    )
+    op.create_index("ix_analytics_hourly_org_hour", "analytics_hourly", ["org_id", "hour"])
+    op.create_index(
+        "uq_analytics_hourly_org",
+        "analytics_hourly",
+        ["org_id", "token", "hour"],
+        unique=True,
+        postgresql_where=sa.text("agent_id IS NULL"),
+    )
+    op.create_index(
+        "uq_analytics_hourly_agent",
+        "analytics_hourly",
+        ["org_id", "agent_id", "token", "hour"],
+        unique=True,
+        postgresql_where=sa.text("agent_id IS NOT NULL"),
+    )
+
+    op.create_table(
+        "analytics_destination_daily",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("org_id", UUID(as_uuid=True), sa.ForeignKey("organizations.id"), nullable=False),
+        sa.Column("date", sa.Date(), nullable=False),
+        sa.Column("token", sa.String(64), nullable=False),
+        sa.Column("to_address", sa.String(64), nullable=False),
+        sa.Column("tx_count", sa.Integer(), server_default="0"),
+        sa.Column("total_spend_lamports", sa.BigInteger(), server_default="0"),
+    )
+    op.create_index(
+        "uq_analytics_destination_daily_key",
+        "analytics_destination_daily",
+        ["org_id", "date", "token", "to_address"],
+        unique=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("analytics_destination_daily")
+    op.drop_table("analytics_hourly")
+    op.drop_column("analytics_daily", "destinations_hll")
@@ -0,0 +1,24 @@
+"""Task claims: lease column for the concurrent task worker.
+
+Revision ID: 016_task_claims
+Revises: 015_worker_leases
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "016_task_claims"
+down_revision: Union[str, None] = "015_worker_leases"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("tasks", sa.Column("claimed_until", sa.DateTime(timezone=True), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("tasks", "claimed_until")
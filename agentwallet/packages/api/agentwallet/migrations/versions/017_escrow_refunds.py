@@ -0,0 +1,37 @@
+"""Escrow refunds: refund pipeline columns and expiry/queue indexes.
+
+Revision ID: 017_escrow_refunds
+Revises: 016_task_claims
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "017_escrow_refunds"
+down_revision: Union[str, None] = "016_task_claims"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("escrows", sa.Column("refund_status", sa.String(20), nullable=True))
+    op.add_column("escrows", sa.Column("refund_attempts", sa.Integer(), nullable=False, server_default="0"))
+    op.add_column("escrows", sa.Column("refund_last_valid_block_height", sa.BigInteger(), nullable=True))
+    op.create_index("ix_escrows_status_expires", "escrows", ["status", "expires_at"])
+    op.create_index(
+        "ix_escrows_refund_queue",
+        "escrows",
+        ["refund_status"],
+        postgresql_where=sa.text("refund_status IN ('pending', 'submitted')"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_escrows_refund_queue", table_name="escrows")
+    op.drop_index("ix_escrows_status_expires", table_name="escrows")
+    op.drop_column("escrows", "refund_last_valid_block_height")
+    op.drop_column("escrows", "refund_attempts")
+    op.drop_column("escrows", "refund_status")
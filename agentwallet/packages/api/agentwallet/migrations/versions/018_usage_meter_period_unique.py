@@ -0,0 +1,32 @@
+"""Usage meters: one row per org and billing period (bulk upsert target).
+
+Revision ID: 018_usage_meter_period_unique
+Revises: 017_escrow_refunds
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "018_usage_meter_period_unique"
+down_revision: Union[str, None] = "017_escrow_refunds"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Keep the most recently updated meter where a race left duplicates
+    op.execute(
+        """
+        DELETE FROM usage_meters a USING usage_meters b
+        WHERE a.org_id = b.org_id
+          AND a.period_start = b.period_start
+          AND (a.updated_at, a.id::text) < (b.updated_at, b.id::text)
+        """
+    )
+    op.create_index("uq_usage_meters_org_period", "usage_meters", ["org_id", "period_start"], unique=True)
+
+
+def downgrade() -> None:
+    op.drop_index("uq_usage_meters_org_period", table_name="usage_meters")
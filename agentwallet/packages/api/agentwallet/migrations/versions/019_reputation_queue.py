@@ -0,0 +1,26 @@
+"""Reputation queue: stale marker for debounced batch rescoring.
+
+Revision ID: 019_reputation_queue
+Revises: 018_usage_meter_period_unique
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "019_reputation_queue"
+down_revision: Union[str, None] = "018_usage_meter_period_unique"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("agent_reputations", sa.Column("stale_at", sa.DateTime(timezone=True), nullable=True))
+    op.create_index("ix_agent_reputations_stale_at", "agent_reputations", ["stale_at"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_agent_reputations_stale_at", table_name="agent_reputations")
+    op.drop_column("agent_reputations", "stale_at")
@@ -0,0 +1,48 @@
+"""Marketplace search: full-text index on services and a capability inverted index.
+
+Revision ID: 020_marketplace_search
+Revises: 019_reputation_queue
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+from sqlalchemy.dialects import postgresql
+
+revision: str = "020_marketplace_search"
+down_revision: Union[str, None] = "019_reputation_queue"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "service_capabilities",
+        sa.Column("capability", sa.String(255), primary_key=True),
+        sa.Column(
+            "service_id",
+            postgresql.UUID(as_uuid=True),
+            sa.ForeignKey("services.id", ondelete="CASCADE"),
+            primary_key=True,
+        ),
+    )
+    op.create_index("ix_service_capabilities_service", "service_capabilities", ["service_id"])
+    op.execute(
+        """
+        INSERT INTO service_capabilities (capability, service_id)
+        SELECT DISTINCT json_array_elements_text(capabilities), id FROM services
+        WHERE json_typeof(capabilities) = 'array'
+        """
+    )
+    # Must match SERVICE_SEARCH_VECTOR in models/marketplace.py for the planner to use it
+    op.execute(
+        "CREATE INDEX ix_services_search ON services USING GIN (to_tsvector('english', name || ' ' || description))"
+    )
+
+
+def downgrade() -> None:
+    op.execute("DROP INDEX IF EXISTS ix_services_search")
+    op.drop_index("ix_service_capabilities_service", table_name="service_capabilities")
+    op.drop_table("service_capabilities")
@@ -0,0 +1,24 @@
+"""Per-org envelope data key: one KMS-wrapped data key stored on the org.
+
+Revision ID: 021_org_data_keys
+Revises: 020_marketplace_search
+Create Date: 2026-10-17 00:00:00.000000
+"""
+
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "021_org_data_keys"
+down_revision: Union[str, None] = "020_marketplace_search"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("organizations", sa.Column("data_key", sa.LargeBinary, nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("organizations", "data_key")
@@ -1,14 +1,15 @@
 from .acp import AcpJob, AcpMemo, ResourceOffering
 from .agent import Agent
-from .analytics_daily import AnalyticsDaily
+from .analytics_daily import AnalyticsDaily, AnalyticsDestinationDaily, AnalyticsHourly, AnalyticsWatermark
 from .api_key import ApiKey
 from .approval_request import ApprovalRequest
 from .audit_event import AuditEvent
 from .billing_subscription import BillingSubscription
 from .erc8004_identity import ERC8004Feedback, ERC8004Identity, EVMWallet
 from .escrow import Escrow
-from .marketplace import AgentReputation, Job, JobMessage, Service, ServiceCategory
+from .marketplace import AgentReputation, Job, JobMessage, Service, ServiceCapability, ServiceCategory
 from .organization import Organization
+from .outbox import OutboxEvent
 from .pda_wallet import PDAWallet
 from .policy import Policy
 from .swarm import AgentSwarm, SwarmMember, SwarmTask
@@ -18,6 +19,7 @@ from .usage_meter import UsageMeter
 from .user import User
 from .wallet import Wallet
 from .webhook import Webhook, WebhookDelivery
+from .worker_lease import WorkerLease
 
 __all__ = [
     "Organization",
@@ -30,15 +32,21 @@ __all__ = [
     "Policy",
     "AuditEvent",
     "AnalyticsDaily",
+    "AnalyticsHourly",
+    "AnalyticsDestinationDaily",
+    "AnalyticsWatermark",
     "BillingSubscription",
     "Webhook",
     "WebhookDelivery",
+    "WorkerLease",
+    "OutboxEvent",
     "ApprovalRequest",
     "UsageMeter",
     "ERC8004Identity",
     "ERC8004Feedback",
     "EVMWallet",
     "Service",
+    "ServiceCapability",
     "Job",
     "AgentReputation",
     "ServiceCategory",
@@ -1,9 +1,9 @@
-"""Analytics daily rollup model -- pre-aggregated metrics."""
+"""Analytics rollup models -- pre-aggregated metric cubes."""
 
 import uuid
 from datetime import date, datetime
 
-from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Index, Integer, func
+from sqlalchemy import BigInteger, Date, DateTime, ForeignKey, Index, Integer, LargeBinary, String, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -23,10 +23,99 @@ class AnalyticsDaily(Base):
     total_fees_lamports: Mapped[int] = mapped_column(BigInteger, default=0)
     unique_destinations: Mapped[int] = mapped_column(Integer, default=0)
     failed_tx_count: Mapped[int] = mapped_column(Integer, default=0)
+    # HyperLogLog of destination addresses; merged across rows for distinct counts
+    destinations_hll: Mapped[bytes | None] = mapped_column(LargeBinary)
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
 
     __table_args__ = (
         Index("ix_analytics_daily_org_date", "org_id", "date"),
         Index("ix_analytics_daily_agent_date", "agent_id", "date"),
+        # One org-level and one per-agent row per day: the rollup's upsert targets
+        Index(
+            "uq_analytics_daily_org_day",
+            "org_id",
+            "date",
+            unique=True,
+            postgresql_where=text("agent_id IS NULL"),
+            sqlite_where=text("agent_id IS NULL"),
+        ),
+        Index(
+            "uq_analytics_daily_agent_day",
+            "org_id",
+            "agent_id",
+            "date",
+            unique=True,
+            postgresql_where=text("agent_id IS NOT NULL"),
+            sqlite_where=text("agent_id IS NOT NULL"),
+        ),
     )
+
+
+class AnalyticsHourly(Base):
+    """Hourly cube by org, agent (NULL = all agents) and token ("SOL" for native)."""
+
+    __tablename__ = "analytics_hourly"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    org_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
+    agent_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), ForeignKey("agents.id"))
+    token: Mapped[str] = mapped_column(String(64), nullable=False)
+    hour: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
+
+    tx_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_spend_lamports: Mapped[int] = mapped_column(BigInteger, default=0)
+    total_fees_lamports: Mapped[int] = mapped_column(BigInteger, default=0)
+    failed_tx_count: Mapped[int] = mapped_column(Integer, default=0)
+    destinations_hll: Mapped[bytes | None] = mapped_column(LargeBinary)
+
+    __table_args__ = (
+        Index("ix_analytics_hourly_org_hour", "org_id", "hour"),
+        Index(
+            "uq_analytics_hourly_org",
+            "org_id",
+            "token",
+            "hour",
+            unique=True,
+            postgresql_where=text("agent_id IS NULL"),
+            sqlite_where=text("agent_id IS NULL"),
+        ),
+        Index(
+            "uq_analytics_hourly_agent",
+            "org_id",
+            "agent_id",
+            "token",
+            "hour",
+            unique=True,
+            postgresql_where=text("agent_id IS NOT NULL"),
+            sqlite_where=text("agent_id IS NOT NULL"),
+        ),
+    )
+
+
+class AnalyticsDestinationDaily(Base):
+    """Daily cube by org, token and destination address."""
+
+    __tablename__ = "analytics_destination_daily"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    org_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
+    date: Mapped[date] = mapped_column(Date, nullable=False)
+    token: Mapped[str] = mapped_column(String(64), nullable=False)
+    to_address: Mapped[str] = mapped_column(String(64), nullable=False)
+
+    tx_count: Mapped[int] = mapped_column(Integer, default=0)
+    total_spend_lamports: Mapped[int] = mapped_column(BigInteger, default=0)
+
+    __table_args__ = (
+        Index("uq_analytics_destination_daily_key", "org_id", "date", "token", "to_address", unique=True),
+    )
+
+
+class AnalyticsWatermark(Base):
+    """High-water mark of ``transactions.updated_at`` a rollup has consumed."""
+
+    __tablename__ = "analytics_watermarks"
+
+    name: Mapped[str] = mapped_column(String(100), primary_key=True)
+    watermark: Mapped[datetime] = mapped_column(DateTime(timezone=True), nullable=False)
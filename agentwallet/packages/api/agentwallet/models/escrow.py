@@ -3,7 +3,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, String, Text, func
+from sqlalchemy import JSON, BigInteger, DateTime, ForeignKey, Index, Integer, String, Text, func, text
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column
 
@@ -34,6 +34,12 @@ class Escrow(Base):
     release_signature: Mapped[str | None] = mapped_column(String(128))
     refund_signature: Mapped[str | None] = mapped_column(String(128))
 
+    # Refund pipeline for funded escrows that expired:
+    # pending -> submitted -> refunded, or failed after too many attempts
+    refund_status: Mapped[str | None] = mapped_column(String(20))
+    refund_attempts: Mapped[int] = mapped_column(Integer, default=0)
+    refund_last_valid_block_height: Mapped[int | None] = mapped_column(BigInteger)
+
     dispute_reason: Mapped[str | None] = mapped_column(Text)
     resolution_notes: Mapped[str | None] = mapped_column(Text)
 
@@ -41,3 +47,12 @@ class Escrow(Base):
     funded_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     completed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_escrows_status_expires", "status", "expires_at"),
+        Index(
+            "ix_escrows_refund_queue",
+            "refund_status",
+            postgresql_where=text("refund_status IN ('pending', 'submitted')"),
+        ),
+    )
@@ -4,19 +4,25 @@ import uuid
 from datetime import datetime
 
 from sqlalchemy import (
+    DDL,
     JSON,
     BigInteger,
     Boolean,
     DateTime,
     Float,
     ForeignKey,
+    Index,
     Integer,
     String,
     Text,
+    delete,
+    event,
     func,
+    insert,
+    inspect,
 )
 from sqlalchemy.dialects.postgresql import UUID
-from sqlalchemy.orm import Mapped, mapped_column, relationship
+from sqlalchemy.orm import Mapped, Session, mapped_column, relationship
 
 from ..core.database import Base
 
@@ -55,6 +61,19 @@ class Service(Base):
     jobs = relationship("Job", back_populates="service", lazy="noload")
 
 
+class ServiceCapability(Base):
+    """Inverted index of service capabilities, kept in sync on flush."""
+
+    __tablename__ = "service_capabilities"
+
+    capability: Mapped[str] = mapped_column(String(255), primary_key=True)
+    service_id: Mapped[uuid.UUID] = mapped_column(
+        UUID(as_uuid=True), ForeignKey("services.id", ondelete="CASCADE"), primary_key=True
+    )
+
+    __table_args__ = (Index("ix_service_capabilities_service", "service_id"),)
+
+
 class Job(Base):
     __tablename__ = "jobs"
 
@@ -135,6 +154,8 @@ class AgentReputation(Base):
     # Timestamps
     first_job_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     last_job_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    # Set when the agent's jobs change; the reputation scorer rescores it once quiet
+    stale_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
     updated_at: Mapped[datetime] = mapped_column(
         DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
     )
@@ -142,6 +163,8 @@ class AgentReputation(Base):
     # Relationships
     agent = relationship("Agent", backref="reputation", lazy="noload")
 
+    __table_args__ = (Index("ix_agent_reputations_stale_at", "stale_at"),)
+
 
 class ServiceCategory(Base):
     __tablename__ = "service_categories"
@@ -178,3 +201,56 @@ class JobMessage(Base):
     # Relationships
     job = relationship("Job", backref="messages", lazy="noload")
     sender = relationship("Agent", backref="sent_job_messages", lazy="noload")
+
+
+# ── Search index ──────────────────────────────────────────
+# Full-text search over service name and description: a GIN index on the
+# tsvector expression on Postgres (the search query uses the same
+# expression), an FTS5 table kept in sync by triggers on SQLite.
+
+SERVICE_SEARCH_VECTOR = "to_tsvector('english', services.name || ' ' || services.description)"
+
+event.listen(
+    Service.__table__,
+    "after_create",
+    DDL(
+        "CREATE INDEX IF NOT EXISTS ix_services_search ON services "
+        "USING GIN (to_tsvector('english', name || ' ' || description))"
+    ).execute_if(dialect="postgresql"),
+)
+for _statement in (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS services_fts USING fts5("
+    "name, description, content='services', content_rowid='rowid', tokenize='porter unicode61')",
+    "CREATE TRIGGER IF NOT EXISTS services_fts_ai AFTER INSERT ON services BEGIN "
+    "INSERT INTO services_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description); END",
+    "CREATE TRIGGER IF NOT EXISTS services_fts_ad AFTER DELETE ON services BEGIN "
+    "INSERT INTO services_fts(services_fts, rowid, name, description) "
+    "VALUES ('delete', old.rowid, old.name, old.description); END",
+    "CREATE TRIGGER IF NOT EXISTS services_fts_au AFTER UPDATE OF name, description ON services BEGIN "
+    "INSERT INTO services_fts(services_fts, rowid, name, description) "
+    "VALUES ('delete', old.rowid, old.name, old.description); "
+    "INSERT INTO services_fts(rowid, name, description) VALUES (new.rowid, new.name, new.description); END",
+):
+    event.listen(Service.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(Service.__table__, "before_drop", DDL("DROP TABLE IF EXISTS services_fts").execute_if(dialect="sqlite"))
+
+
+@event.listens_for(Session, "after_flush")
+def _index_service_capabilities(session: Session, flush_context) -> None:
+    """Rewrite the capability index rows of services whose capabilities changed."""
+    changed = [
+        obj
+        for obj in list(session.new) + list(session.dirty)
+        if isinstance(obj, Service) and (obj in session.new or inspect(obj).attrs.capabilities.history.has_changes())
+    ]
+    if not changed:
+        return
+    conn = session.connection()
+    conn.execute(delete(ServiceCapability).where(ServiceCapability.service_id.in_([obj.id for obj in changed])))
+    rows = [
+        {"service_id": obj.id, "capability": capability}
+        for obj in changed
+        for capability in dict.fromkeys(obj.capabilities or [])
+    ]
+    if rows:
+        conn.execute(insert(ServiceCapability), rows)
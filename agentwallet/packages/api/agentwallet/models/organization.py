@@ -3,7 +3,7 @@
 import uuid
 from datetime import datetime
 
-from sqlalchemy import JSON, DateTime, String, func
+from sqlalchemy import JSON, DateTime, LargeBinary, String, func
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
@@ -19,6 +19,8 @@ class Organization(Base):
     tier: Mapped[str] = mapped_column(String(50), default="free")  # free, pro, enterprise
     stripe_customer_id: Mapped[str | None] = mapped_column(String(255))
     settings: Mapped[dict] = mapped_column(JSON, default=dict)
+    # KMS-wrapped envelope data key its wallet keys are sealed with (KMS mode)
+    data_key: Mapped[bytes | None] = mapped_column(LargeBinary)
     is_active: Mapped[bool] = mapped_column(default=True)
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     updated_at: Mapped[datetime] = mapped_column(
@@ -0,0 +1,121 @@
+"""Outbox event model -- domain events awaiting fan-out to webhooks.
+
+State changes on transactions, escrows, tasks and ACP jobs are captured as
+outbox rows in the same flush (and therefore the same DB transaction) that
+writes them, so an event exists if and only if the change committed. The
+outbox relay turns them into WebhookDelivery rows and deletes them.
+"""
+
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import JSON, DateTime, ForeignKey, Index, String, event, func, inspect
+from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.orm import Mapped, Session, mapped_column
+
+from ..core.database import Base
+from ..core.pg_notify import OUTBOX_CHANNEL
+from .acp import AcpJob
+from .escrow import Escrow
+from .task import Task
+from .transaction import Transaction
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox_events"
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    org_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), ForeignKey("organizations.id"), nullable=False)
+    event_type: Mapped[str] = mapped_column(String(100), nullable=False)  # e.g. escrow.funded
+    payload: Mapped[dict] = mapped_column(JSON, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_outbox_events_created", "created_at"),)
+
+
+# model -> (resource type, state column, fields copied into the payload)
+TRACKED_STATE: dict[type, tuple[str, str, tuple[str, ...]]] = {
+    Transaction: (
+        "transaction",
+        "status",
+        ("agent_id", "wallet_id", "tx_type", "signature", "to_address", "amount_lamports", "token_mint", "error"),
+    ),
+    Escrow: ("escrow", "status", ("funder_wallet_id", "recipient_address", "amount_lamports", "token_mint")),
+    Task: ("task", "status", ("agent_id", "escrow_id", "price_lamports", "token_symbol")),
+    AcpJob: ("acp_job", "phase", ("buyer_agent_id", "seller_agent_id", "agreed_price_lamports", "escrow_id")),
+}
+
+
+def _jsonable(value):
+    if isinstance(value, (uuid.UUID, datetime)):
+        return str(value)
+    return value
+
+
+def build_event(
+    resource: str,
+    resource_id: uuid.UUID,
+    org_id: uuid.UUID,
+    state: str,
+    previous: str | None = None,
+    data: dict | None = None,
+) -> OutboxEvent:
+    """Build the outbox row for `resource` entering `state`."""
+    event_type = f"{resource}.{state}"
+    return OutboxEvent(
+        id=uuid.uuid4(),
+        org_id=org_id,
+        event_type=event_type,
+        payload={
+            "event": event_type,
+            "org_id": str(org_id),
+            "resource_type": resource,
+            "resource_id": str(resource_id),
+            "state": state,
+            "previous_state": previous,
+            "data": {k: _jsonable(v) for k, v in (data or {}).items()},
+            "occurred_at": datetime.now(timezone.utc).isoformat(),
+        },
+    )
+
+
+def _column_default(model: type, column: str):
+    default = model.__table__.c[column].default
+    return default.arg if default is not None and default.is_scalar else None
+
+
+@event.listens_for(Session, "before_flush")
+def _capture_state_changes(session: Session, flush_context, instances) -> None:
+    """Append an outbox row for every tracked state change in this flush."""
+    for obj in list(session.new) + list(session.dirty):
+        tracked = TRACKED_STATE.get(type(obj))
+        if tracked is None:
+            continue
+        resource, column, fields = tracked
+        state = getattr(obj, column)
+        previous = None
+        if obj in session.new:
+            state = state or _column_default(type(obj), column)
+        else:
+            history = inspect(obj).attrs[column].history
+            if not history.added:
+                continue
+            previous = history.deleted[0] if history.deleted else None
+            if previous == state:
+                continue
+        if state is None or obj.org_id is None:
+            continue
+        if obj.id is None:
+            obj.id = uuid.uuid4()
+        # Only loaded values: a lazy load here would need IO mid-flush
+        data = {name: obj.__dict__.get(name) for name in fields}
+        session.add(build_event(resource, obj.id, obj.org_id, state, previous, data))
+    if any(isinstance(obj, OutboxEvent) for obj in session.new):
+        session.info["outbox_notify"] = True
+
+
+@event.listens_for(Session, "after_flush")
+def _notify_outbox(session: Session, flush_context) -> None:
+    """Wake the outbox relay once this transaction commits."""
+    if session.info.pop("outbox_notify", False) and session.get_bind().dialect.name == "postgresql":
+        session.connection().exec_driver_sql(f"NOTIFY {OUTBOX_CHANNEL}")
@@ -46,6 +46,8 @@ class Task(Base):
     status: Mapped[str] = mapped_column(String(50), default="posted")
     # posted -> funded -> assigned -> in_progress -> delivered -> released | refunded | disputed
     failure_count: Mapped[int] = mapped_column(Integer, default=0)  # consecutive worker execution failures
+    # Task worker lease: not picked up again before this (deferred or in flight)
+    claimed_until: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
 
     # Execution + delivery
     input_data: Mapped[dict] = mapped_column(JSON, default=dict)
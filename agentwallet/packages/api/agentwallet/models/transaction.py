@@ -23,6 +23,8 @@ class Transaction(Base):
     )  # transfer_sol, transfer_spl, escrow_fund, escrow_release
     status: Mapped[str] = mapped_column(String(50), default="pending")  # pending, submitted, confirmed, failed
     signature: Mapped[str | None] = mapped_column(String(128))
+    # Block height after which the signed blockhash expires (tx can no longer land)
+    last_valid_block_height: Mapped[int | None] = mapped_column(BigInteger)
 
     from_address: Mapped[str] = mapped_column(String(64), nullable=False)
     to_address: Mapped[str] = mapped_column(String(64), nullable=False)
@@ -37,9 +39,15 @@ class Transaction(Base):
 
     created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     confirmed_at: Mapped[datetime | None] = mapped_column(DateTime(timezone=True))
+    updated_at: Mapped[datetime] = mapped_column(
+        DateTime(timezone=True), server_default=func.now(), onupdate=func.now()
+    )
+    # Status as last counted by the analytics rollup (None = not yet counted)
+    rollup_status: Mapped[str | None] = mapped_column(String(50))
 
     __table_args__ = (
         Index("ix_transactions_org_created", "org_id", "created_at"),
         Index("ix_transactions_status", "status"),
         Index("ix_transactions_agent", "agent_id"),
+        Index("ix_transactions_updated", "updated_at"),
     )
@@ -1,17 +1,41 @@
-"""Analytics Engine -- pre-aggregated daily rollups and reporting."""
+"""Analytics Engine -- pre-aggregated rollup cubes and reporting.
+
+Transactions are folded incrementally into three cubes:
+
+- ``analytics_daily``: org/agent x day;
+- ``analytics_hourly``: org/agent x token x hour;
+- ``analytics_destination_daily``: org x token x destination x day.
+
+Daily and hourly cells carry a HyperLogLog sketch of their destinations,
+so distinct counts over any range or breakdown merge sketches instead of
+summing per-cell counts (which counts a repeat destination once per day).
+``query`` answers a request from the coarsest cube that can.
+"""
 
 import uuid
-from datetime import date, timedelta
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
 
-from sqlalchemy import Integer, func, select
+from sqlalchemy import bindparam, case, delete, func, or_, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.config import get_settings
+from ..core.database import upsert_insert
+from ..core.exceptions import ValidationError
+from ..core.hll import HyperLogLog, merge_sketches
 from ..core.logging import get_logger
-from ..models.analytics_daily import AnalyticsDaily
+from ..models.analytics_daily import AnalyticsDaily, AnalyticsDestinationDaily, AnalyticsHourly, AnalyticsWatermark
 from ..models.transaction import Transaction
 
 logger = get_logger(__name__)
 
+_WATERMARK = "daily"
+_UPSERT_CHUNK = 500
+_ADDITIVE = ("tx_count", "total_spend_lamports", "total_fees_lamports", "failed_tx_count")
+
+NATIVE_TOKEN = "SOL"  # token dimension value for native SOL transfers
+QUERY_GROUPS = (None, "hour", "day", "agent", "token", "destination")
+
 
 class AnalyticsEngine:
     def __init__(self, db: AsyncSession):
@@ -32,14 +56,22 @@ class AnalyticsEngine:
                 func.coalesce(func.sum(AnalyticsDaily.total_spend_lamports), 0),
                 func.coalesce(func.sum(AnalyticsDaily.total_fees_lamports), 0),
                 func.coalesce(func.sum(AnalyticsDaily.failed_tx_count), 0),
-                func.coalesce(func.sum(AnalyticsDaily.unique_destinations), 0),
             ).where(
                 AnalyticsDaily.org_id == org_id,
+                AnalyticsDaily.agent_id.is_(None),
                 AnalyticsDaily.date >= start,
                 AnalyticsDaily.date <= end,
             )
         )
         row = result.one()
+        cells = await self.db.execute(
+            select(AnalyticsDaily.destinations_hll, AnalyticsDaily.unique_destinations).where(
+                AnalyticsDaily.org_id == org_id,
+                AnalyticsDaily.agent_id.is_(None),
+                AnalyticsDaily.date >= start,
+                AnalyticsDaily.date <= end,
+            )
+        )
 
         # Count active agents
         active_agents = await self.db.scalar(
@@ -56,7 +88,7 @@ class AnalyticsEngine:
             "tx_count": row[0],
             "failed_tx_count": row[3],
             "active_agents": active_agents or 0,
-            "unique_destinations": row[4],
+            "unique_destinations": _distinct(cells.all()),
             "period_start": str(start),
             "period_end": str(end),
         }
@@ -127,101 +159,366 @@ class AnalyticsEngine:
             for row in result.all()
         ]
 
-    async def aggregate_daily(self, target_date: date | None = None) -> int:
-        """Aggregate transaction data into daily rollups.
+    async def query(
+        self,
+        org_id: uuid.UUID,
+        start: datetime,
+        end: datetime,
+        group_by: str | None = None,
+        agent_id: uuid.UUID | None = None,
+        token: str | None = None,
+    ) -> dict:
+        """Aggregate metrics over ``[start, end)`` from the coarsest cube that can answer.
 
-        Called by analytics_aggregator worker.
+        ``group_by`` is one of None (totals), "hour", "day", "agent", "token"
+        or "destination". Day-aligned ranges without an hour or token
+        dimension read the daily cube; anything finer reads the hourly cube;
+        destination breakdowns read the destination cube (daily, no agent
+        dimension). Distinct destination counts merge the cells' sketches.
         """
-        target = target_date or date.today()
+        if group_by not in QUERY_GROUPS:
+            raise ValidationError(f"group_by must be one of: {', '.join(g for g in QUERY_GROUPS if g)}")
+        start, end = _as_utc(start), _as_utc(end)
+        if end <= start:
+            raise ValidationError("end must be after start")
 
-        # Aggregate org-level
-        org_result = await self.db.execute(
-            select(
-                Transaction.org_id,
-                func.count().label("tx_count"),
-                func.coalesce(func.sum(Transaction.amount_lamports), 0),
-                func.coalesce(func.sum(Transaction.platform_fee_lamports), 0),
-                func.count(func.distinct(Transaction.to_address)),
-                func.sum(func.cast(Transaction.status == "failed", Integer)),
-            )
-            .where(func.date(Transaction.created_at) == target)
-            .group_by(Transaction.org_id)
-        )
+        day_aligned = start.time() == time.min and end.time() == time.min
+        if group_by == "destination":
+            if agent_id is not None:
+                raise ValidationError("Destination breakdowns are not available per agent")
+            if not day_aligned:
+                raise ValidationError("Destination breakdowns need a day-aligned range")
+            return {"cube": "destination_daily", "rows": await self._query_destinations(org_id, start, end, token)}
 
-        count = 0
-        for row in org_result.all():
-            # Upsert org-level rollup
-            existing = await self.db.scalar(
-                select(AnalyticsDaily).where(
-                    AnalyticsDaily.org_id == row[0],
-                    AnalyticsDaily.date == target,
-                    AnalyticsDaily.agent_id.is_(None),
-                )
-            )
-            if existing:
-                existing.tx_count = row[1]
-                existing.total_spend_lamports = row[2]
-                existing.total_fees_lamports = row[3]
-                existing.unique_destinations = row[4]
-                existing.failed_tx_count = row[5] or 0
+        if day_aligned and token is None and group_by not in ("hour", "token"):
+            cube, model = "daily", AnalyticsDaily
+            time_col = model.date
+            scope = (time_col >= start.date(), time_col < end.date())
+            key_cols = {"day": time_col}
+        else:
+            cube, model = "hourly", AnalyticsHourly
+            time_col = model.hour
+            scope = (time_col >= start, time_col < end)
+            key_cols = {"hour": time_col, "token": model.token}
+            if token is not None:
+                scope += (model.token == token,)
+        key_cols["agent"] = model.agent_id
+
+        query = select(*key_cols.values(), *(getattr(model, name) for name in _ADDITIVE), model.destinations_hll)
+        query = query.where(model.org_id == org_id, *scope)
+        if agent_id is not None:
+            query = query.where(model.agent_id == agent_id)
+        elif group_by == "agent":
+            query = query.where(model.agent_id.is_not(None))
+        else:
+            query = query.where(model.agent_id.is_(None))
+        result = await self.db.execute(query)
+
+        groups: dict = defaultdict(lambda: ([0, 0, 0, 0], []))
+        for row in result.all():
+            cell = dict(zip(key_cols, row))
+            if group_by == "day" and cube == "hourly":
+                key = _as_utc(cell["hour"]).date()
+            elif group_by == "hour":
+                key = _as_utc(cell["hour"])
+            elif group_by is not None:
+                key = cell[group_by]
             else:
-                self.db.add(
-                    AnalyticsDaily(
-                        org_id=row[0],
-                        date=target,
-                        tx_count=row[1],
-                        total_spend_lamports=row[2],
-                        total_fees_lamports=row[3],
-                        unique_destinations=row[4],
-                        failed_tx_count=row[5] or 0,
-                    )
-                )
-            count += 1
+                key = None
+            totals, sketches = groups[key]
+            for i, value in enumerate(row[len(key_cols) : len(key_cols) + len(_ADDITIVE)]):
+                totals[i] += value or 0
+            sketches.append(row[-1])
+
+        rows = []
+        for key in sorted(groups, key=lambda k: (k is None, str(k))):
+            totals, sketches = groups[key]
+            entry = {group_by: _jsonable(key)} if group_by else {}
+            entry.update(_metrics(totals), unique_destinations=merge_sketches(sketches).count())
+            rows.append(entry)
+        if group_by is None and not rows:
+            rows.append({**_metrics([0, 0, 0, 0]), "unique_destinations": 0})
+        return {"cube": cube, "rows": rows}
 
-        # Aggregate per-agent
-        agent_result = await self.db.execute(
+    async def _query_destinations(
+        self, org_id: uuid.UUID, start: datetime, end: datetime, token: str | None
+    ) -> list[dict]:
+        cube = AnalyticsDestinationDaily
+        query = (
+            select(cube.to_address, func.sum(cube.tx_count), func.sum(cube.total_spend_lamports))
+            .where(cube.org_id == org_id, cube.date >= start.date(), cube.date < end.date())
+            .group_by(cube.to_address)
+            .order_by(func.sum(cube.total_spend_lamports).desc(), cube.to_address)
+        )
+        if token is not None:
+            query = query.where(cube.token == token)
+        result = await self.db.execute(query)
+        return [
+            {"destination": address, "tx_count": tx_count, "total_spend_lamports": spend}
+            for address, tx_count, spend in result.all()
+        ]
+
+    async def rollup(self, batch_size: int = 5000) -> int:
+        """Fold transactions changed since the watermark into the daily rollups.
+
+        Each transaction records the status it was last counted with
+        (``rollup_status``), so a batch turns into exact deltas: a new
+        transaction adds its counts, a late status change (submitted ->
+        failed) only moves ``failed_tx_count``. Deltas for the whole batch
+        are applied with one INSERT ... ON CONFLICT DO UPDATE per rollup
+        level. Called by the analytics_aggregator worker until it drains.
+        Returns the number of transactions folded in.
+        """
+        watermark = await self._get_watermark()
+        # Overlap the watermark: updated_at is stamped at statement time, so a
+        # slow writer can commit a row that sorts before rows already consumed
+        since = watermark - timedelta(seconds=get_settings().analytics_watermark_lag_seconds)
+        result = await self.db.execute(
             select(
+                Transaction.id,
                 Transaction.org_id,
                 Transaction.agent_id,
-                func.count(),
-                func.coalesce(func.sum(Transaction.amount_lamports), 0),
-                func.coalesce(func.sum(Transaction.platform_fee_lamports), 0),
-                func.count(func.distinct(Transaction.to_address)),
+                Transaction.created_at,
+                Transaction.updated_at,
+                Transaction.status,
+                Transaction.rollup_status,
+                Transaction.amount_lamports,
+                Transaction.platform_fee_lamports,
+                Transaction.token_mint,
+                Transaction.to_address,
             )
             .where(
-                func.date(Transaction.created_at) == target,
-                Transaction.agent_id.isnot(None),
+                Transaction.updated_at >= since,
+                or_(Transaction.rollup_status.is_(None), Transaction.rollup_status != Transaction.status),
             )
-            .group_by(Transaction.org_id, Transaction.agent_id)
+            .order_by(Transaction.updated_at)
+            .limit(batch_size)
         )
+        rows = result.all()
+        if not rows:
+            return 0
 
-        for row in agent_result.all():
-            existing = await self.db.scalar(
-                select(AnalyticsDaily).where(
-                    AnalyticsDaily.org_id == row[0],
-                    AnalyticsDaily.agent_id == row[1],
-                    AnalyticsDaily.date == target,
-                )
+        # Deltas per cube cell: daily/hourly [tx, spend, fees, failed],
+        # per destination [tx, spend]; plus the destinations new rows add
+        # to each daily/hourly cell's sketch
+        daily: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+        hourly: dict[tuple, list[int]] = defaultdict(lambda: [0, 0, 0, 0])
+        by_destination: dict[tuple, list[int]] = defaultdict(lambda: [0, 0])
+        new_destinations: dict[tuple, set[str]] = defaultdict(set)
+        for row in rows:
+            created = _as_utc(row.created_at)
+            day = created.date()
+            hour = created.replace(minute=0, second=0, microsecond=0)
+            token = row.token_mint or NATIVE_TOKEN
+            is_new = row.rollup_status is None
+            failed = int(row.status == "failed") - int(row.rollup_status == "failed")
+            agents = [None] if row.agent_id is None else [None, row.agent_id]
+            cells = [(daily, (row.org_id, agent, day)) for agent in agents]
+            cells += [(hourly, (row.org_id, agent, token, hour)) for agent in agents]
+            for cube, key in cells:
+                delta = cube[key]
+                delta[3] += failed
+                if is_new:
+                    delta[0] += 1
+                    delta[1] += row.amount_lamports or 0
+                    delta[2] += row.platform_fee_lamports or 0
+                    new_destinations[key].add(row.to_address)
+            if is_new:
+                delta = by_destination[(row.org_id, day, token, row.to_address)]
+                delta[0] += 1
+                delta[1] += row.amount_lamports or 0
+
+        daily_sketches = await self._updated_sketches(AnalyticsDaily, daily, new_destinations)
+        # The per-cell distinct count is read off the cell's updated sketch
+        destinations = {key: HyperLogLog.from_bytes(sketch).count() for key, sketch in daily_sketches.items()}
+        hourly_sketches = await self._updated_sketches(AnalyticsHourly, hourly, new_destinations)
+        for agent_level in (False, True):
+            await self._upsert(
+                AnalyticsDaily,
+                ["org_id", "agent_id", "date"] if agent_level else ["org_id", "date"],
+                AnalyticsDaily.agent_id.is_not(None) if agent_level else AnalyticsDaily.agent_id.is_(None),
+                [
+                    {
+                        "org_id": org_id,
+                        "agent_id": agent_id,
+                        "date": day,
+                        **_metrics(d),
+                        "unique_destinations": destinations.get((org_id, agent_id, day), -1),
+                        "destinations_hll": daily_sketches.get((org_id, agent_id, day)),
+                    }
+                    for (org_id, agent_id, day), d in daily.items()
+                    if (agent_id is not None) == agent_level
+                ],
             )
-            if existing:
-                existing.tx_count = row[2]
-                existing.total_spend_lamports = row[3]
-                existing.total_fees_lamports = row[4]
-                existing.unique_destinations = row[5]
-            else:
-                self.db.add(
-                    AnalyticsDaily(
-                        org_id=row[0],
-                        agent_id=row[1],
-                        date=target,
-                        tx_count=row[2],
-                        total_spend_lamports=row[3],
-                        total_fees_lamports=row[4],
-                        unique_destinations=row[5],
-                    )
-                )
-            count += 1
+            await self._upsert(
+                AnalyticsHourly,
+                ["org_id", "agent_id", "token", "hour"] if agent_level else ["org_id", "token", "hour"],
+                AnalyticsHourly.agent_id.is_not(None) if agent_level else AnalyticsHourly.agent_id.is_(None),
+                [
+                    {
+                        "org_id": org_id,
+                        "agent_id": agent_id,
+                        "token": token,
+                        "hour": hour,
+                        **_metrics(d),
+                        "destinations_hll": hourly_sketches.get((org_id, agent_id, token, hour)),
+                    }
+                    for (org_id, agent_id, token, hour), d in hourly.items()
+                    if (agent_id is not None) == agent_level
+                ],
+            )
+        await self._upsert(
+            AnalyticsDestinationDaily,
+            ["org_id", "date", "token", "to_address"],
+            None,
+            [
+                {
+                    "org_id": org_id,
+                    "date": day,
+                    "token": token,
+                    "to_address": address,
+                    "tx_count": d[0],
+                    "total_spend_lamports": d[1],
+                }
+                for (org_id, day, token, address), d in by_destination.items()
+            ],
+        )
 
+        # Record what was counted, per row, so re-reading a row is a no-op.
+        # Guarded on the status we read: a row that changed meanwhile stays
+        # uncounted for the next pass. updated_at is kept so the stamp does
+        # not drag the row past the watermark again.
+        table = Transaction.__table__
+        await self.db.execute(
+            update(table)
+            .where(table.c.id == bindparam("b_id"), table.c.status == bindparam("b_status"))
+            .values(rollup_status=bindparam("b_status"), updated_at=bindparam("b_updated_at")),
+            [{"b_id": row.id, "b_status": row.status, "b_updated_at": row.updated_at} for row in rows],
+        )
+        await self._set_watermark(max([watermark, *(_as_utc(row.updated_at) for row in rows)]))
         await self.db.flush()
-        logger.info("analytics_aggregated", date=str(target), rollups=count)
+
+        logger.info("analytics_rolled_up", transactions=len(rows), daily=len(daily), hourly=len(hourly))
+        return len(rows)
+
+    async def backfill(self, start: date, end: date) -> int:
+        """Rebuild the rollup cubes for days ``start``..``end`` (inclusive).
+
+        Drops the days' cells and marks their transactions uncounted;
+        the following ``rollup`` passes recount them. Returns the number of
+        transactions queued for recounting.
+        """
+        lo = datetime.combine(start, time.min, tzinfo=timezone.utc)
+        hi = datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc)
+        await self.db.execute(delete(AnalyticsDaily).where(AnalyticsDaily.date >= start, AnalyticsDaily.date <= end))
+        await self.db.execute(delete(AnalyticsHourly).where(AnalyticsHourly.hour >= lo, AnalyticsHourly.hour < hi))
+        await self.db.execute(
+            delete(AnalyticsDestinationDaily).where(
+                AnalyticsDestinationDaily.date >= start, AnalyticsDestinationDaily.date <= end
+            )
+        )
+        result = await self.db.execute(
+            update(Transaction)
+            .where(Transaction.created_at >= lo, Transaction.created_at < hi)
+            .values(rollup_status=None)
+            .execution_options(synchronize_session=False)
+        )
+        await self.db.flush()
+        logger.info("analytics_backfill_queued", start=str(start), end=str(end), transactions=result.rowcount)
+        return result.rowcount
+
+    async def aggregate_daily(self, target_date: date | None = None) -> int:
+        """Recompute one day's rollups from scratch (backfill + rollup)."""
+        target = target_date or date.today()
+        await self.backfill(target, target)
+        count = 0
+        while folded := await self.rollup():
+            count += folded
         return count
+
+    async def _updated_sketches(self, model, cells: dict, new_destinations: dict) -> dict[tuple, bytes]:
+        """Stored sketches of the cells that gained destinations, with those added."""
+        keys = [key for key in cells if key in new_destinations]
+        if not keys:
+            return {}
+        time_col = model.date if model is AnalyticsDaily else model.hour
+        key_cols = [model.org_id, model.agent_id] + ([] if model is AnalyticsDaily else [model.token]) + [time_col]
+        result = await self.db.execute(
+            select(*key_cols, model.destinations_hll).where(
+                model.org_id.in_({key[0] for key in keys}),
+                time_col.in_({key[-1] for key in keys}),
+            )
+        )
+        stored = {}
+        for row in result.all():
+            *key, sketch = row
+            if model is AnalyticsHourly:
+                key[-1] = _as_utc(key[-1])
+            stored[tuple(key)] = sketch
+
+        sketches = {}
+        for key in keys:
+            hll = HyperLogLog.from_bytes(stored.get(key))
+            for address in new_destinations[key]:
+                hll.add(address)
+            sketches[key] = hll.to_bytes()
+        return sketches
+
+    async def _upsert(self, model, conflict: list[str], where, values: list[dict]) -> None:
+        """Add the metric deltas in `values` to `model`'s cells, creating missing ones."""
+        for start in range(0, len(values), _UPSERT_CHUNK):
+            chunk = [{"id": uuid.uuid4(), **v} for v in values[start : start + _UPSERT_CHUNK]]
+            stmt = upsert_insert(self.db, model).values(chunk)
+            excluded = stmt.excluded
+            set_ = {name: getattr(model, name) + getattr(excluded, name) for name in _ADDITIVE if name in chunk[0]}
+            if "unique_destinations" in chunk[0]:
+                # -1: cell gained no rows, keep its stored distinct count
+                set_["unique_destinations"] = case(
+                    (excluded.unique_destinations < 0, model.unique_destinations),
+                    else_=excluded.unique_destinations,
+                )
+            if "destinations_hll" in chunk[0]:
+                set_["destinations_hll"] = func.coalesce(excluded.destinations_hll, model.destinations_hll)
+            stmt = stmt.on_conflict_do_update(index_elements=conflict, index_where=where, set_=set_)
+            await self.db.execute(stmt)
+
+    async def _get_watermark(self) -> datetime:
+        mark = await self.db.get(AnalyticsWatermark, _WATERMARK)
+        return _as_utc(mark.watermark) if mark else datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+    async def _set_watermark(self, value: datetime) -> None:
+        stmt = upsert_insert(self.db, AnalyticsWatermark).values(name=_WATERMARK, watermark=value)
+        stmt = stmt.on_conflict_do_update(index_elements=["name"], set_={"watermark": stmt.excluded.watermark})
+        await self.db.execute(stmt)
+
+
+def _distinct(cells) -> int:
+    """Distinct destinations over (sketch, per-cell count) pairs.
+
+    Cells rolled up before sketches existed only have their own count;
+    those are added on top (an upper bound until the days are backfilled).
+    """
+    unsketched = sum(n or 0 for sketch, n in cells if sketch is None)
+    return merge_sketches(sketch for sketch, _ in cells).count() + unsketched
+
+
+def _metrics(delta: list[int]) -> dict:
+    return {
+        "tx_count": delta[0],
+        "total_spend_lamports": delta[1],
+        "total_fees_lamports": delta[2],
+        "failed_tx_count": delta[3],
+    }
+
+
+def _jsonable(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite hands back naive timestamps; treat them as UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
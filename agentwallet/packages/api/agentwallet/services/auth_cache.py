@@ -0,0 +1,175 @@
+"""Auth context cache -- keep per-request authentication off the database.
+
+Resolved identities (API key -> org/permissions/tier, JWT subject -> org
+tier, agent -> owning org) are cached in-process for a few seconds and in
+Redis for longer, so every replica shares them. Each entry is indexed under
+its org, which lets key revocation and org changes (deactivation, tier
+change) drop everything for that org at once.
+
+API-key ``last_used_at`` writes are coalesced in memory and flushed in one
+batched UPDATE every ``api_key_usage_flush_seconds``.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime, timezone
+
+from sqlalchemy import update
+
+from ..core.config import get_settings
+from ..core.database import get_session_factory
+from ..core.logging import get_logger
+from ..core.redis_client import get_redis
+from ..models.api_key import ApiKey
+
+logger = get_logger(__name__)
+
+_PREFIX = "authctx:"
+
+
+def _org_index_key(org_id: str) -> str:
+    return f"{_PREFIX}org:{org_id}"
+
+
+class AuthContextCache:
+    def __init__(self, local_ttl: float, redis_ttl: int):
+        self.local_ttl = local_ttl
+        self.redis_ttl = redis_ttl
+        # cache key -> (expires_at, entry); entries always carry "org_id"
+        self._local: dict[str, tuple[float, dict]] = {}
+
+    async def get(self, key: str) -> dict | None:
+        now = time.monotonic()
+        hit = self._local.get(key)
+        if hit is not None:
+            if hit[0] > now:
+                return hit[1]
+            del self._local[key]
+
+        try:
+            r = await get_redis()
+            raw = await r.get(_PREFIX + key)
+        except Exception:
+            return None
+        if not raw:
+            return None
+        entry = json.loads(raw)
+        self._local[key] = (now + self.local_ttl, entry)
+        return entry
+
+    async def put(self, key: str, entry: dict) -> None:
+        self._local[key] = (time.monotonic() + self.local_ttl, entry)
+        try:
+            r = await get_redis()
+            pipe = r.pipeline()
+            pipe.set(_PREFIX + key, json.dumps(entry), ex=self.redis_ttl)
+            pipe.sadd(_org_index_key(entry["org_id"]), key)
+            pipe.expire(_org_index_key(entry["org_id"]), self.redis_ttl)
+            await pipe.execute()
+        except Exception:
+            logger.debug("auth_cache_redis_unavailable", msg="Redis down — auth cached in-process only")
+
+    async def invalidate(self, key: str) -> None:
+        self._local.pop(key, None)
+        try:
+            r = await get_redis()
+            await r.delete(_PREFIX + key)
+        except Exception:
+            logger.warning("auth_cache_invalidate_failed", key=key)
+
+    async def invalidate_org(self, org_id: uuid.UUID | str) -> None:
+        """Drop every cached identity that belongs to an org."""
+        org_id = str(org_id)
+        for key in [k for k, (_, entry) in self._local.items() if entry.get("org_id") == org_id]:
+            del self._local[key]
+        try:
+            r = await get_redis()
+            members = await r.smembers(_org_index_key(org_id))
+            if members:
+                await r.delete(*(_PREFIX + m for m in members))
+            await r.delete(_org_index_key(org_id))
+        except Exception:
+            logger.warning("auth_cache_invalidate_failed", org_id=org_id)
+
+    def clear(self) -> None:
+        self._local.clear()
+
+
+class ApiKeyUsageRecorder:
+    """Coalesces API-key ``last_used_at`` writes into periodic batched flushes."""
+
+    def __init__(self, flush_interval: float):
+        self.flush_interval = flush_interval
+        self._pending: dict[uuid.UUID, datetime] = {}
+        self._task: asyncio.Task | None = None
+
+    def touch(self, api_key_id: uuid.UUID) -> None:
+        self._pending[api_key_id] = datetime.now(timezone.utc)
+
+    async def flush(self) -> int:
+        if not self._pending:
+            return 0
+        batch, self._pending = self._pending, {}
+        try:
+            factory = get_session_factory()
+            async with factory() as db:
+                await db.execute(
+                    update(ApiKey),
+                    [{"id": key_id, "last_used_at": used_at} for key_id, used_at in batch.items()],
+                )
+                await db.commit()
+        except Exception as e:
+            # Keep the newest timestamps for the next attempt
+            for key_id, used_at in batch.items():
+                self._pending.setdefault(key_id, used_at)
+            logger.warning("api_key_usage_flush_failed", count=len(batch), error=str(e))
+            return 0
+        return len(batch)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self.flush()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+
+_auth_cache: AuthContextCache | None = None
+_usage_recorder: ApiKeyUsageRecorder | None = None
+
+
+def get_auth_cache() -> AuthContextCache:
+    global _auth_cache
+    if _auth_cache is None:
+        settings = get_settings()
+        _auth_cache = AuthContextCache(
+            local_ttl=settings.auth_cache_local_ttl_seconds,
+            redis_ttl=settings.auth_cache_ttl_seconds,
+        )
+    return _auth_cache
+
+
+def get_api_key_usage() -> ApiKeyUsageRecorder:
+    global _usage_recorder
+    if _usage_recorder is None:
+        _usage_recorder = ApiKeyUsageRecorder(get_settings().api_key_usage_flush_seconds)
+    return _usage_recorder
+
+
+async def invalidate_org_auth(org_id: uuid.UUID) -> None:
+    """Call after an org is deactivated or changes tier."""
+    await get_auth_cache().invalidate_org(org_id)
@@ -0,0 +1,211 @@
+"""Balance tracker -- keep cached wallet balances correct between reads.
+
+``WalletManager.get_balance`` caches each wallet's SOL and SPL balances in
+Redis under ``bal:{address}``. Those entries stay correct two ways:
+
+- our own transfers drop the sender's and recipient's entries as soon as
+  they are submitted (``invalidate_balances``), so the next read refetches,
+  along with the spending agent's priced balance snapshot;
+- the balance tracker polls every cached managed wallet in bulk with
+  getMultipleAccounts (the wallet and its USDC token account, so 50 wallets
+  per call) and rewrites entries whose SOL or USDC balance moved. That
+  catches inbound transfers and our own transfers landing after submit.
+  The rewrite is a compare-and-set against the value the poll read, so an
+  entry invalidated and re-cached meanwhile is left alone. Entries holding
+  any other SPL token cannot be kept current this way and are dropped
+  instead, so their next read refetches.
+
+Wallets are found through the ``balance:tracked`` sorted set, which
+``track_balance`` fills whenever an entry is cached, scored by the entry's
+expiry; a wallet nobody reads costs nothing per pass.
+"""
+
+import asyncio
+import json
+import time
+import uuid
+from collections.abc import Iterable
+
+import httpx
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+from ..core.redis_client import get_redis
+from ..core.solana import MAX_ACCOUNTS_PER_CALL, associated_token_address, get_multiple_accounts, get_rpc_client
+
+logger = get_logger(__name__)
+
+BALANCE_KEY_PREFIX = "bal:"
+# agent id -> priced cross-chain holdings (see universal_balance_service)
+SNAPSHOT_KEY_PREFIX = "balance:snapshot:"
+# address -> expiry (unix time) of its cached entry
+TRACKED_KEY = "balance:tracked"
+
+# KEYS[1] = balance entry, KEYS[2] = tracked set, ARGV[1] = value the poll
+# read, ARGV[2] = new value, ARGV[3] = ttl, ARGV[4] = address, ARGV[5] = new
+# expiry. A missing or changed entry is left as it is.
+REWRITE_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+redis.call('SET', KEYS[1], ARGV[2], 'EX', ARGV[3])
+redis.call('ZADD', KEYS[2], ARGV[5], ARGV[4])
+return 1
+"""
+
+# KEYS[1] = balance entry, KEYS[2] = tracked set, ARGV[1] = value the poll
+# read, ARGV[2] = address
+DROP_SCRIPT = """
+if redis.call('GET', KEYS[1]) ~= ARGV[1] then
+  return 0
+end
+redis.call('DEL', KEYS[1])
+redis.call('ZREM', KEYS[2], ARGV[2])
+return 1
+"""
+
+
+def balance_cache_key(address: str) -> str:
+    return BALANCE_KEY_PREFIX + address
+
+
+def balance_snapshot_key(agent_id: uuid.UUID) -> str:
+    return SNAPSHOT_KEY_PREFIX + str(agent_id)
+
+
+async def track_balance(address: str, ttl: int) -> None:
+    """Register a wallet whose balance was just cached for `ttl` seconds."""
+    try:
+        r = await get_redis()
+        await r.zadd(TRACKED_KEY, {address: time.time() + ttl})
+    except Exception:
+        logger.debug("balance_cache_redis_unavailable", msg="Redis down — cached balances expire on their TTL")
+
+
+async def invalidate_balances(*addresses: str | None, agent_ids: Iterable[uuid.UUID | None] = ()) -> None:
+    """Drop the cached balances of addresses a transfer just touched.
+
+    ``agent_ids`` are the agents owning the spending wallets; their balance
+    snapshots are dropped too, so spending power is recomputed on next read.
+    """
+    keys = [balance_cache_key(a) for a in dict.fromkeys(addresses) if a]
+    keys += [balance_snapshot_key(a) for a in dict.fromkeys(agent_ids) if a]
+    if not keys:
+        return
+    try:
+        r = await get_redis()
+        await r.delete(*keys)
+    except Exception:
+        logger.debug("balance_cache_redis_unavailable", msg="Redis down — cached balances expire on their TTL")
+
+
+class BalanceTracker:
+    def __init__(self, rpc: httpx.AsyncClient | None = None):
+        settings = get_settings()
+        self.rpc = rpc or get_rpc_client()
+        self.page_size = settings.balance_tracker_page_size
+        self.ttl = settings.balance_cache_seconds
+        self.usdc_mint = settings.usdc_mint_address
+
+    async def sync(self) -> dict:
+        """One pass over every tracked wallet. Returns {"tracked", "updated", "dropped"}."""
+        r = await get_redis()
+        # Forget wallets whose cache entry has expired since it was tracked
+        await r.zremrangebyscore(TRACKED_KEY, "-inf", time.time())
+        tracked = updated = dropped = 0
+        start = 0
+        while True:
+            addresses = await r.zrange(TRACKED_KEY, start, start + self.page_size - 1)
+            if not addresses:
+                break
+            page_tracked, page_updated, page_dropped = await self._sync_page(r, addresses)
+            tracked += page_tracked
+            updated += page_updated
+            dropped += page_dropped
+            if len(addresses) < self.page_size:
+                break
+            start += self.page_size
+        return {"tracked": tracked, "updated": updated, "dropped": dropped}
+
+    async def _sync_page(self, r, addresses: list[str]) -> tuple[int, int, int]:
+        raw = dict(zip(addresses, await r.mget([balance_cache_key(a) for a in addresses])))
+        cached = {a: json.loads(v) for a, v in raw.items() if v}
+        tracked = len(cached)
+
+        dropped = 0
+        for address in [a for a, entry in cached.items() if self._holds_other_tokens(entry)]:
+            del cached[address]
+            if await r.eval(DROP_SCRIPT, 2, balance_cache_key(address), TRACKED_KEY, raw[address], address):
+                dropped += 1
+        if not cached:
+            return tracked, 0, dropped
+
+        usdc_accounts = {}
+        for address in cached:
+            try:
+                usdc_accounts[address] = associated_token_address(address, self.usdc_mint)
+            except ValueError:
+                pass  # not a valid public key; only its SOL balance is tracked
+        queried = [*cached, *usdc_accounts.values()]
+        chunks = [queried[i : i + MAX_ACCOUNTS_PER_CALL] for i in range(0, len(queried), MAX_ACCOUNTS_PER_CALL)]
+        results = await asyncio.gather(*(get_multiple_accounts(self.rpc, c) for c in chunks), return_exceptions=True)
+        infos: dict[str, dict | None] = {}
+        for chunk, outcome in zip(chunks, results):
+            if isinstance(outcome, BaseException):
+                logger.warning("balance_tracker_poll_failed", accounts=len(chunk), error=str(outcome))
+                continue
+            infos.update(zip(chunk, outcome))
+
+        updated = 0
+        for address, entry in cached.items():
+            if address not in infos:
+                continue
+            info = infos[address]
+            usdc = None
+            if usdc_accounts.get(address) in infos:
+                usdc = _token_amount(infos[usdc_accounts[address]])
+            if not self._apply(entry, (info or {}).get("lamports", 0), usdc):
+                continue
+            # Never resurrect or overwrite an entry a transfer invalidated meanwhile
+            key = balance_cache_key(address)
+            expires = time.time() + self.ttl
+            if await r.eval(
+                REWRITE_SCRIPT, 2, key, TRACKED_KEY, raw[address], json.dumps(entry), self.ttl, address, expires
+            ):
+                updated += 1
+        return tracked, updated, dropped
+
+    def _holds_other_tokens(self, entry: dict) -> bool:
+        return any(t.get("mint") != self.usdc_mint for t in entry.get("tokens") or [])
+
+    def _apply(self, entry: dict, lamports: int, usdc: tuple[int, int] | None) -> bool:
+        """Update a cached balance in place; True if anything changed."""
+        changed = entry.get("lamports") != lamports
+        entry["lamports"] = lamports
+        entry["sol_balance"] = lamports / 1e9
+        if usdc is None:
+            return changed
+
+        amount, decimals = usdc
+        tokens = entry.setdefault("tokens", [])
+        token = next((t for t in tokens if t.get("mint") == self.usdc_mint), None)
+        if token is None:
+            if not amount:
+                return changed
+            token = {"mint": self.usdc_mint, "amount": 0, "decimals": decimals, "ui_amount": 0}
+            tokens.append(token)
+        if token["amount"] != amount:
+            token["amount"] = amount
+            token["ui_amount"] = amount / 10**decimals
+            changed = True
+        return changed
+
+
+def _token_amount(info: dict | None) -> tuple[int, int]:
+    """(raw amount, decimals) of a parsed token account; a missing account holds 0."""
+    if not info:
+        return 0, 6
+    data = info.get("data")
+    parsed = data.get("parsed", {}) if isinstance(data, dict) else {}
+    token_amount = parsed.get("info", {}).get("tokenAmount", {})
+    return int(token_amount.get("amount", "0")), token_amount.get("decimals", 6)
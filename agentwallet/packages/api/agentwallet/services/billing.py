@@ -1,17 +1,25 @@
 """Billing Service -- Stripe subscription and usage-based billing."""
 
+import time
 import uuid
+from collections import defaultdict
 from datetime import datetime, timezone
 
-from sqlalchemy import select
+from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import get_settings
+from ..core.database import upsert_insert
 from ..core.logging import get_logger
+from ..models.analytics_daily import AnalyticsDaily
+from ..models.escrow import Escrow
+from ..models.organization import Organization
 from ..models.usage_meter import UsageMeter
 
 logger = get_logger(__name__)
 
+_UPSERT_CHUNK = 500
+
 TIER_PRICES = {
     "free": 0,
     "pro": 4900,  # $49/mo in cents
@@ -19,14 +27,35 @@ TIER_PRICES = {
 }
 
 
+def billing_period(now: datetime | None = None) -> tuple[datetime, datetime]:
+    """Start and end of the calendar-month billing period containing `now`."""
+    now = now or datetime.now(timezone.utc)
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        return start, start.replace(year=start.year + 1, month=1)
+    return start, start.replace(month=start.month + 1)
+
+
+# (org_id, period_start) -> (expires_at, usage), per process
+_usage_cache: dict[tuple[uuid.UUID, datetime], tuple[float, dict]] = {}
+
+
 class BillingService:
     def __init__(self, db: AsyncSession):
         self.db = db
 
     async def get_current_usage(self, org_id: uuid.UUID) -> dict:
-        """Get current billing period usage."""
+        """Get current billing period usage.
+
+        Served from a short in-process cache, so tier-limit checks on the
+        request path cost at most one indexed lookup per org every
+        ``usage_cache_seconds``.
+        """
         now = datetime.now(timezone.utc)
-        period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+        period_start, _ = billing_period(now)
+        hit = _usage_cache.get((org_id, period_start))
+        if hit is not None and hit[0] > time.monotonic():
+            return hit[1]
 
         meter = await self.db.scalar(
             select(UsageMeter).where(
@@ -36,7 +65,7 @@ class BillingService:
         )
 
         if meter:
-            return {
+            usage = {
                 "period_start": meter.period_start.isoformat(),
                 "period_end": meter.period_end.isoformat(),
                 "tx_count": meter.tx_count,
@@ -44,15 +73,91 @@ class BillingService:
                 "api_calls": meter.api_calls,
                 "escrow_count": meter.escrow_count,
             }
-
-        return {
-            "period_start": period_start.isoformat(),
-            "period_end": now.isoformat(),
-            "tx_count": 0,
-            "tx_volume_lamports": 0,
-            "api_calls": 0,
-            "escrow_count": 0,
-        }
+        else:
+            usage = {
+                "period_start": period_start.isoformat(),
+                "period_end": now.isoformat(),
+                "tx_count": 0,
+                "tx_volume_lamports": 0,
+                "api_calls": 0,
+                "escrow_count": 0,
+            }
+        _usage_cache[(org_id, period_start)] = (time.monotonic() + get_settings().usage_cache_seconds, usage)
+        return usage
+
+    async def meter_usage(self, now: datetime | None = None) -> int:
+        """Write every active org's usage for the period containing `now`.
+
+        Transaction counts and volume come from the org-level daily
+        analytics rollups, escrows from one grouped count, so the cost is
+        two grouped queries and one bulk upsert however many orgs there
+        are. Meters are set, not incremented, so re-running is idempotent.
+        Returns the number of orgs metered.
+        """
+        period_start, period_end = billing_period(now)
+        usage: dict[uuid.UUID, dict] = defaultdict(lambda: {"tx_count": 0, "tx_volume_lamports": 0, "escrow_count": 0})
+
+        result = await self.db.execute(
+            select(
+                AnalyticsDaily.org_id,
+                func.sum(AnalyticsDaily.tx_count),
+                func.sum(AnalyticsDaily.total_spend_lamports),
+            )
+            .join(Organization, Organization.id == AnalyticsDaily.org_id)
+            .where(
+                Organization.is_active.is_(True),
+                AnalyticsDaily.agent_id.is_(None),
+                AnalyticsDaily.date >= period_start.date(),
+                AnalyticsDaily.date < period_end.date(),
+            )
+            .group_by(AnalyticsDaily.org_id)
+        )
+        for org_id, tx_count, volume in result.all():
+            usage[org_id]["tx_count"] = int(tx_count or 0)
+            usage[org_id]["tx_volume_lamports"] = int(volume or 0)
+
+        result = await self.db.execute(
+            select(Escrow.org_id, func.count())
+            .join(Organization, Organization.id == Escrow.org_id)
+            .where(
+                Organization.is_active.is_(True),
+                Escrow.created_at >= period_start,
+                Escrow.created_at < period_end,
+            )
+            .group_by(Escrow.org_id)
+        )
+        for org_id, escrow_count in result.all():
+            usage[org_id]["escrow_count"] = escrow_count
+
+        rows = [
+            {
+                "id": uuid.uuid4(),
+                "org_id": org_id,
+                "period_start": period_start,
+                "period_end": period_end,
+                "api_calls": 0,
+                **counts,
+            }
+            for org_id, counts in usage.items()
+        ]
+        for i in range(0, len(rows), _UPSERT_CHUNK):
+            stmt = upsert_insert(self.db, UsageMeter).values(rows[i : i + _UPSERT_CHUNK])
+            excluded = stmt.excluded
+            await self.db.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["org_id", "period_start"],
+                    set_={
+                        "tx_count": excluded.tx_count,
+                        "tx_volume_lamports": excluded.tx_volume_lamports,
+                        "escrow_count": excluded.escrow_count,
+                        "updated_at": func.now(),
+                    },
+                )
+            )
+        await self.db.flush()
+        for org_id in usage:
+            _usage_cache.pop((org_id, period_start), None)
+        return len(rows)
 
     async def increment_usage(
         self,
@@ -62,41 +167,32 @@ class BillingService:
         api_calls: int = 0,
         escrow_count: int = 0,
     ) -> None:
-        """Increment usage counters for the current period."""
-        now = datetime.now(timezone.utc)
-        period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-        # next month
-        if now.month == 12:
-            period_end = period_start.replace(year=now.year + 1, month=1)
-        else:
-            period_end = period_start.replace(month=now.month + 1)
-
-        meter = await self.db.scalar(
-            select(UsageMeter).where(
-                UsageMeter.org_id == org_id,
-                UsageMeter.period_start == period_start,
-            )
+        """Increment usage counters for the current period (one atomic upsert)."""
+        period_start, period_end = billing_period()
+        stmt = upsert_insert(self.db, UsageMeter).values(
+            id=uuid.uuid4(),
+            org_id=org_id,
+            period_start=period_start,
+            period_end=period_end,
+            tx_count=tx_count,
+            tx_volume_lamports=tx_volume,
+            api_calls=api_calls,
+            escrow_count=escrow_count,
         )
-
-        if meter:
-            meter.tx_count += tx_count
-            meter.tx_volume_lamports += tx_volume
-            meter.api_calls += api_calls
-            meter.escrow_count += escrow_count
-        else:
-            meter = UsageMeter(
-                org_id=org_id,
-                period_start=period_start,
-                period_end=period_end,
-                tx_count=tx_count,
-                tx_volume_lamports=tx_volume,
-                api_calls=api_calls,
-                escrow_count=escrow_count,
+        excluded = stmt.excluded
+        await self.db.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["org_id", "period_start"],
+                set_={
+                    "tx_count": UsageMeter.tx_count + excluded.tx_count,
+                    "tx_volume_lamports": UsageMeter.tx_volume_lamports + excluded.tx_volume_lamports,
+                    "api_calls": UsageMeter.api_calls + excluded.api_calls,
+                    "escrow_count": UsageMeter.escrow_count + excluded.escrow_count,
+                    "updated_at": func.now(),
+                },
             )
-            self.db.add(meter)
-
-        await self.db.flush()
+        )
+        _usage_cache.pop((org_id, period_start), None)
 
     async def create_stripe_customer(self, org_id: uuid.UUID, email: str) -> str | None:
         """Create a Stripe customer for the org."""
@@ -0,0 +1,52 @@
+"""Per-org envelope data keys.
+
+In KMS mode every wallet key of an org is sealed under the org's one data
+key, stored KMS-wrapped in ``organizations.data_key`` and reused, so
+decrypting any of an org's wallets costs one KMS unwrap per cache window
+however many wallets the org has created. Rotation is an explicit
+operation (``rotate_org_data_key``); ciphertexts carry the wrapped key they
+were sealed with, so existing wallets keep decrypting after a rotation.
+"""
+
+import uuid
+
+from sqlalchemy import select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.kms import get_key_manager
+from ..core.logging import get_logger
+from ..models.organization import Organization
+
+logger = get_logger(__name__)
+
+
+async def org_data_key(db: AsyncSession, org_id: uuid.UUID) -> bytes | None:
+    """The org's wrapped data key, generated on first use. None outside KMS mode."""
+    km = get_key_manager()
+    if not km.uses_envelopes:
+        return None
+    query = select(Organization.data_key).where(Organization.id == org_id)
+    wrapped = await db.scalar(query)
+    if wrapped is not None:
+        return wrapped
+    await db.execute(
+        update(Organization)
+        .where(Organization.id == org_id, Organization.data_key.is_(None))
+        .values(data_key=await km.new_data_key_async())
+        .execution_options(synchronize_session=False)
+    )
+    # A concurrent first use may have stored its key first: use whichever won
+    return await db.scalar(query)
+
+
+async def rotate_org_data_key(db: AsyncSession, org_id: uuid.UUID) -> bytes:
+    """Give the org a new data key; wallets created from now on are sealed under it."""
+    wrapped = await get_key_manager().new_data_key_async()
+    await db.execute(
+        update(Organization)
+        .where(Organization.id == org_id)
+        .values(data_key=wrapped)
+        .execution_options(synchronize_session=False)
+    )
+    logger.info("org_data_key_rotated", org_id=str(org_id))
+    return wrapped
@@ -30,6 +30,7 @@ from ..core.kms import get_key_manager
 from ..core.logging import get_logger
 from ..models.agent import Agent
 from ..models.erc8004_identity import ERC8004Feedback, ERC8004Identity, EVMWallet
+from .data_keys import org_data_key
 
 logger = get_logger(__name__)
 
@@ -55,7 +56,9 @@ class ERC8004Service:
 
         # Generate keypair
         account = Account.create()
-        encrypted_key = self.km.encrypt(bytes.fromhex(account.key.hex().removeprefix("0x")))
+        encrypted_key = await self.km.encrypt_async(
+            bytes.fromhex(account.key.hex().removeprefix("0x")), data_key=await org_data_key(self.db, org_id)
+        )
 
         wallet = EVMWallet(
             org_id=org_id,
@@ -0,0 +1,200 @@
+"""Escrow refund pipeline -- return expired escrows' funds on-chain.
+
+``EscrowService.expire_stale_escrows`` queues every funded escrow it
+expires (``refund_status = "pending"``). Each pass of the pipeline:
+
+1. reconciles refunds already submitted: a landed signature settles them
+   ("refunded"); one that failed, or whose blockhash expired without
+   landing, puts them back to "pending" (or "failed" past the attempt cap);
+2. sums pending refunds per funder wallet, tops each wallet up to
+   rent-exempt where needed, and packs the transfers into transactions of
+   up to MAX_TRANSFERS_PER_TX.
+
+A transaction's signature is recorded before it is sent, and an escrow is
+only resent once that signature provably cannot land, so retries never pay
+twice. Escrows that already failed once are retried one wallet per
+transaction, so a bad recipient cannot sink a whole pack again.
+"""
+
+import asyncio
+from collections import defaultdict
+
+import httpx
+from sqlalchemy import case, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+from ..core.solana import (
+    MAX_TRANSFERS_PER_TX,
+    RENT_EXEMPT_MIN_LAMPORTS,
+    build_sol_transfers,
+    confirm_transactions,
+    get_balance,
+    get_block_height,
+    get_blockhash_provider,
+    get_rent_exempt_min,
+    get_rpc_client,
+    load_platform_keypair,
+    submit_transaction,
+)
+from ..models.escrow import Escrow
+from ..models.wallet import Wallet
+from .balance_tracker import invalidate_balances
+
+logger = get_logger(__name__)
+
+TX_FEE_LAMPORTS = 5000  # one signature
+
+
+class EscrowRefundPipeline:
+    def __init__(self, db: AsyncSession, rpc: httpx.AsyncClient | None = None):
+        settings = get_settings()
+        self.db = db
+        self.rpc = rpc or get_rpc_client()
+        self.batch_size = settings.escrow_refund_batch_size
+        self.max_attempts = settings.escrow_refund_max_attempts
+
+    async def run(self) -> dict:
+        """One pass: reconcile submitted refunds, then send pending ones."""
+        outcome = await self.reconcile()
+        outcome["submitted"] = await self.submit()
+        return outcome
+
+    async def reconcile(self) -> dict:
+        """Settle or re-queue submitted refunds from their signatures' status."""
+        result = await self.db.execute(
+            select(Escrow.refund_signature, Escrow.refund_last_valid_block_height)
+            .where(Escrow.refund_status == "submitted")
+            .distinct()
+            .limit(self.batch_size)
+        )
+        submitted = dict(result.all())
+        if not submitted:
+            return {"refunded": 0, "requeued": 0}
+
+        # Block height before statuses: a signature still unknown afterwards,
+        # with its blockhash already past this height, can never land
+        try:
+            block_height = await get_block_height(self.rpc)
+        except Exception as e:
+            logger.warning("block_height_fetch_failed", error=str(e))
+            block_height = None
+        statuses = await confirm_transactions(self.rpc, list(submitted))
+
+        landed, retry = [], []
+        for signature, last_valid in submitted.items():
+            if signature not in statuses:
+                continue  # status read failed: only a successful read may show it absent
+            status = statuses[signature]
+            if status in ("confirmed", "finalized"):
+                landed.append(signature)
+            elif status == "failed" or (
+                block_height is not None and last_valid is not None and block_height > last_valid
+            ):
+                retry.append(signature)
+
+        refunded = requeued = 0
+        if landed:
+            result = await self.db.execute(
+                update(Escrow)
+                .where(Escrow.refund_signature.in_(landed), Escrow.refund_status == "submitted")
+                .values(refund_status="refunded")
+                .execution_options(synchronize_session=False)
+            )
+            refunded = result.rowcount
+        if retry:
+            result = await self.db.execute(
+                update(Escrow)
+                .where(Escrow.refund_signature.in_(retry), Escrow.refund_status == "submitted")
+                .values(
+                    refund_status=case(
+                        (Escrow.refund_attempts >= self.max_attempts, "failed"),
+                        else_="pending",
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+            requeued = result.rowcount
+        await self.db.commit()
+        if refunded or requeued:
+            logger.info("escrow_refunds_reconciled", refunded=refunded, requeued=requeued)
+        return {"refunded": refunded, "requeued": requeued}
+
+    async def submit(self) -> int:
+        """Send pending refunds in packed transactions. Returns escrows submitted."""
+        result = await self.db.execute(
+            select(Escrow.id, Escrow.amount_lamports, Escrow.refund_attempts, Wallet.address)
+            .join(Wallet, Wallet.id == Escrow.funder_wallet_id)
+            .where(Escrow.status == "expired", Escrow.refund_status == "pending")
+            .order_by(Escrow.expires_at)
+            .limit(self.batch_size)
+        )
+        rows = result.all()
+        if not rows:
+            return 0
+
+        # One transfer per funder wallet, summing its escrows
+        by_address: dict[str, list] = defaultdict(list)
+        for row in rows:
+            by_address[row.address].append(row)
+        addresses = list(by_address)
+        try:
+            rent_min = await get_rent_exempt_min(self.rpc)
+        except Exception:
+            rent_min = RENT_EXEMPT_MIN_LAMPORTS
+        balances = await asyncio.gather(*(get_balance(self.rpc, a) for a in addresses), return_exceptions=True)
+
+        fresh, retried = [], []
+        for address, balance in zip(addresses, balances):
+            if isinstance(balance, BaseException):
+                # Unknown balance, unknown top-up: its escrows stay pending for the next pass
+                logger.warning("escrow_refund_balance_unavailable", wallet=address[:16], error=str(balance))
+                continue
+            escrows = by_address[address]
+            amount = sum(e.amount_lamports for e in escrows)
+            # Platform absorbs the top-up, as with single refunds
+            topup = max(0, rent_min - (balance + amount))
+            item = (address, amount + topup, [e.id for e in escrows])
+            (retried if any(e.refund_attempts for e in escrows) else fresh).append(item)
+        packs = [fresh[i : i + MAX_TRANSFERS_PER_TX] for i in range(0, len(fresh), MAX_TRANSFERS_PER_TX)]
+        packs += [[item] for item in retried]
+
+        keypair = load_platform_keypair()
+        available = await get_balance(self.rpc, str(keypair.pubkey()))
+        submitted = 0
+        for pack in packs:
+            needed = sum(lamports for _, lamports, _ in pack) + TX_FEE_LAMPORTS
+            if needed > available:
+                logger.warning("escrow_refund_custody_short", available=available, required=needed)
+                break
+            cached = await get_blockhash_provider().get(self.rpc)
+            tx = build_sol_transfers(keypair, [(address, lamports) for address, lamports, _ in pack], cached.blockhash)
+            signature = str(tx.signatures[0])
+            ids = [escrow_id for _, _, escrow_ids in pack for escrow_id in escrow_ids]
+
+            # Record the signature first: a crash or an ambiguous send is
+            # reconciled from it, never blindly resent
+            await self.db.execute(
+                update(Escrow)
+                .where(Escrow.id.in_(ids), Escrow.status == "expired", Escrow.refund_status == "pending")
+                .values(
+                    refund_status="submitted",
+                    refund_signature=signature,
+                    refund_last_valid_block_height=cached.last_valid_block_height,
+                    refund_attempts=Escrow.refund_attempts + 1,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await self.db.commit()
+            try:
+                await submit_transaction(self.rpc, bytes(tx))
+            except Exception as e:
+                # Stays "submitted": re-queued once its blockhash has expired
+                logger.warning("escrow_refund_send_failed", signature=signature[:24], escrows=len(ids), error=str(e))
+            await invalidate_balances(str(keypair.pubkey()), *(address for address, _, _ in pack))
+            available -= needed
+            submitted += len(ids)
+
+        logger.info("escrow_refunds_submitted", escrows=submitted, transactions=len(packs))
+        return submitted
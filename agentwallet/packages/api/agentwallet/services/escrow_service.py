@@ -10,7 +10,7 @@ import uuid
 from datetime import datetime, timedelta, timezone
 
 import httpx
-from sqlalchemy import select
+from sqlalchemy import case, select, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import get_settings
@@ -21,10 +21,13 @@ from ..core.solana import (
     confirm_transaction,
     get_balance,
     get_rent_exempt_min,
+    get_rpc_client,
     load_platform_keypair,
     transfer_sol,
 )
 from ..models.escrow import Escrow
+from ..models.outbox import build_event
+from .balance_tracker import invalidate_balances
 from .wallet_manager import WalletManager
 
 logger = get_logger(__name__)
@@ -41,9 +44,10 @@ VALID_TRANSITIONS = {
 
 
 class EscrowService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, rpc: httpx.AsyncClient | None = None):
         self.db = db
-        self.wallet_mgr = WalletManager(db)
+        self.rpc = rpc or get_rpc_client()
+        self.wallet_mgr = WalletManager(db, rpc=self.rpc)
 
     async def create_escrow(
         self,
@@ -76,19 +80,19 @@ class EscrowService:
         # Fund the escrow (transfer to platform-managed escrow wallet)
         try:
             settings = get_settings()
-            keypair = self.wallet_mgr._decrypt_keypair(wallet)
+            keypair = await self.wallet_mgr.decrypt_keypair(wallet)
             # For MVP, escrow funds go to the platform wallet
             # In production, this would be an on-chain PDA
             escrow_target = settings.platform_wallet_address or recipient_address
 
-            async with httpx.AsyncClient(timeout=15) as client:
-                sig = await transfer_sol(
-                    client=client,
-                    from_keypair=keypair,
-                    to_address=escrow_target,
-                    lamports=amount_lamports,
-                )
-                confirmed = await confirm_transaction(client, sig)
+            sig = await transfer_sol(
+                client=self.rpc,
+                from_keypair=keypair,
+                to_address=escrow_target,
+                lamports=amount_lamports,
+            )
+            await invalidate_balances(wallet.address, escrow_target, agent_ids=[wallet.agent_id])
+            confirmed = await confirm_transaction(self.rpc, sig)
 
             if confirmed:
                 escrow.status = "funded"
@@ -142,7 +146,7 @@ class EscrowService:
         held after funding), NOT from the funder's wallet — the funder pays
         exactly once (at fund time).
         """
-        escrow = await self._get_escrow(escrow_id, org_id)
+        escrow = await self._get_escrow(escrow_id, org_id, lock=True)
         self._validate_transition(escrow.status, "released")
 
         # Transfer escrowed funds from custody to the recipient on-chain.
@@ -151,26 +155,26 @@ class EscrowService:
         # (absorbed as a platform subsidy) so small escrows just work.
         try:
             keypair = load_platform_keypair()
-            async with httpx.AsyncClient(timeout=15) as client:
-                topup = await self._rent_exempt_shortfall(
-                    client,
-                    to_address=escrow.recipient_address,
-                    amount_lamports=escrow.amount_lamports,
-                )
-                if topup:
-                    logger.info(
-                        "escrow_release_rent_topup",
-                        escrow_id=str(escrow_id),
-                        topup_lamports=topup,
-                        msg="Platform topped recipient up to rent-exempt minimum",
-                    )
-                sig = await transfer_sol(
-                    client=client,
-                    from_keypair=keypair,
-                    to_address=escrow.recipient_address,
-                    lamports=escrow.amount_lamports + topup,
+            topup = await self._rent_exempt_shortfall(
+                self.rpc,
+                to_address=escrow.recipient_address,
+                amount_lamports=escrow.amount_lamports,
+            )
+            if topup:
+                logger.info(
+                    "escrow_release_rent_topup",
+                    escrow_id=str(escrow_id),
+                    topup_lamports=topup,
+                    msg="Platform topped recipient up to rent-exempt minimum",
                 )
-                confirmed = await confirm_transaction(client, sig)
+            sig = await transfer_sol(
+                client=self.rpc,
+                from_keypair=keypair,
+                to_address=escrow.recipient_address,
+                lamports=escrow.amount_lamports + topup,
+            )
+            await invalidate_balances(get_settings().platform_wallet_address, escrow.recipient_address)
+            confirmed = await confirm_transaction(self.rpc, sig)
 
             escrow.status = "released"
             escrow.release_signature = sig
@@ -212,7 +216,7 @@ class EscrowService:
         Returns the escrowed funds held in custody (platform wallet) to the
         funder's wallet — the funder pays exactly once, at fund time.
         """
-        escrow = await self._get_escrow(escrow_id, org_id)
+        escrow = await self._get_escrow(escrow_id, org_id, lock=True)
         self._validate_transition(escrow.status, "refunded")
 
         # Transfer escrowed funds from custody back to the funder wallet.
@@ -221,26 +225,26 @@ class EscrowService:
         try:
             wallet = await self.wallet_mgr.get_wallet(escrow.funder_wallet_id, org_id)
             keypair = load_platform_keypair()
-            async with httpx.AsyncClient(timeout=15) as client:
-                topup = await self._rent_exempt_shortfall(
-                    client,
-                    to_address=wallet.address,
-                    amount_lamports=escrow.amount_lamports,
-                )
-                if topup:
-                    logger.info(
-                        "escrow_refund_rent_topup",
-                        escrow_id=str(escrow_id),
-                        topup_lamports=topup,
-                        msg="Platform topped funder wallet up to rent-exempt minimum",
-                    )
-                sig = await transfer_sol(
-                    client=client,
-                    from_keypair=keypair,
-                    to_address=wallet.address,
-                    lamports=escrow.amount_lamports + topup,
+            topup = await self._rent_exempt_shortfall(
+                self.rpc,
+                to_address=wallet.address,
+                amount_lamports=escrow.amount_lamports,
+            )
+            if topup:
+                logger.info(
+                    "escrow_refund_rent_topup",
+                    escrow_id=str(escrow_id),
+                    topup_lamports=topup,
+                    msg="Platform topped funder wallet up to rent-exempt minimum",
                 )
-                confirmed = await confirm_transaction(client, sig)
+            sig = await transfer_sol(
+                client=self.rpc,
+                from_keypair=keypair,
+                to_address=wallet.address,
+                lamports=escrow.amount_lamports + topup,
+            )
+            await invalidate_balances(get_settings().platform_wallet_address, wallet.address)
+            confirmed = await confirm_transaction(self.rpc, sig)
 
             escrow.status = "refunded"
             escrow.refund_signature = sig
@@ -262,7 +266,7 @@ class EscrowService:
 
     async def dispute_escrow(self, escrow_id: uuid.UUID, org_id: uuid.UUID, reason: str) -> Escrow:
         """Mark escrow as disputed."""
-        escrow = await self._get_escrow(escrow_id, org_id)
+        escrow = await self._get_escrow(escrow_id, org_id, lock=True)
         self._validate_transition(escrow.status, "disputed")
 
         escrow.status = "disputed"
@@ -295,26 +299,82 @@ class EscrowService:
         result = await self.db.execute(query.order_by(Escrow.created_at.desc()).offset(offset).limit(limit))
         return list(result.scalars().all()), total or 0
 
-    async def expire_stale_escrows(self) -> int:
-        """Expire escrows past their expiry date. Called by escrow_expiry worker."""
+    async def expire_stale_escrows(self, limit: int | None = None) -> int:
+        """Expire escrows past their expiry date. Called by escrow_expiry worker.
+
+        A single UPDATE expires up to `limit` escrows and queues the funded
+        ones for the refund pipeline (``refund_status = "pending"``), which
+        returns their custody funds on-chain.
+        """
         now = datetime.now(timezone.utc)
+        stale = select(Escrow.id).where(
+            Escrow.status.in_(["created", "funded"]),
+            Escrow.expires_at < now,
+        )
+        if limit is not None:
+            stale = stale.order_by(Escrow.expires_at).limit(limit)
+        if self.db.bind.dialect.name == "postgresql":
+            stale = stale.with_for_update(skip_locked=True)
         result = await self.db.execute(
-            select(Escrow).where(
-                Escrow.status.in_(["created", "funded"]),
-                Escrow.expires_at < now,
+            update(Escrow)
+            .where(Escrow.id.in_(stale.scalar_subquery()), Escrow.status.in_(["created", "funded"]))
+            .values(
+                status="expired",
+                completed_at=now,
+                refund_status=case((Escrow.status == "funded", "pending"), else_=None),
+            )
+            .returning(
+                Escrow.id,
+                Escrow.org_id,
+                Escrow.refund_status,
+                Escrow.funder_wallet_id,
+                Escrow.recipient_address,
+                Escrow.amount_lamports,
+                Escrow.token_mint,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        expired = result.all()
+
+        # Bulk UPDATEs bypass the ORM's state capture: add their events here
+        self.db.add_all(
+            build_event(
+                "escrow",
+                row.id,
+                row.org_id,
+                "expired",
+                "funded" if row.refund_status else "created",
+                {
+                    "funder_wallet_id": row.funder_wallet_id,
+                    "recipient_address": row.recipient_address,
+                    "amount_lamports": row.amount_lamports,
+                    "token_mint": row.token_mint,
+                },
             )
+            for row in expired
         )
-        expired = result.scalars().all()
-        for escrow in expired:
-            escrow.status = "expired"
-            escrow.completed_at = now
         await self.db.flush()
         if expired:
-            logger.info("escrows_expired", count=len(expired))
+            logger.info(
+                "escrows_expired",
+                count=len(expired),
+                refunds_queued=sum(1 for row in expired if row.refund_status),
+            )
         return len(expired)
 
-    async def _get_escrow(self, escrow_id: uuid.UUID, org_id: uuid.UUID) -> Escrow:
-        escrow = await self.db.get(Escrow, escrow_id)
+    async def _get_escrow(self, escrow_id: uuid.UUID, org_id: uuid.UUID, lock: bool = False) -> Escrow:
+        """Load an escrow; with `lock`, re-read it under a row lock held until commit.
+
+        Transitions lock first, so they lose cleanly to a concurrent expiry
+        (they see "expired"), and expiry's SKIP LOCKED passes over an escrow
+        that is being released or refunded.
+        """
+        if lock:
+            escrow = await self.db.scalar(
+                select(Escrow).where(Escrow.id == escrow_id).with_for_update().execution_options(populate_existing=True)
+            )
+        else:
+            escrow = await self.db.get(Escrow, escrow_id)
         if not escrow or escrow.org_id != org_id:
             raise NotFoundError("Escrow", str(escrow_id))
         return escrow
@@ -0,0 +1,68 @@
+"""Event bus -- fan outbox events out to webhook subscriptions.
+
+Outbox rows are captured in the same transaction as the state change that
+produced them (see models.outbox). The relay claims a batch, matches it
+against the orgs' active webhooks with one query, bulk-inserts the
+WebhookDelivery rows (serialized and signed once, here), deletes the
+relayed events and wakes the dispatcher -- all in one transaction, so an event is delivered to each subscriber
+exactly once even with several relays running.
+"""
+
+import fnmatch
+from collections import defaultdict
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.logging import get_logger
+from ..core.pg_notify import WEBHOOK_CHANNEL, notify
+from ..models.outbox import OutboxEvent
+from ..models.webhook import Webhook, WebhookDelivery
+from .webhook_delivery import new_delivery_row, serialize_payload
+
+logger = get_logger(__name__)
+
+
+def is_subscribed(patterns: list[str], event_type: str) -> bool:
+    """Match an event against a webhook's event list ("*" and "escrow.*" allowed)."""
+    return any(p == event_type or fnmatch.fnmatchcase(event_type, p) for p in patterns or [])
+
+
+async def relay_outbox(db: AsyncSession, limit: int = 500) -> int:
+    """Relay up to `limit` pending events into webhook deliveries. Returns events relayed."""
+    query = select(OutboxEvent).order_by(OutboxEvent.created_at).limit(limit)
+    if db.bind.dialect.name == "postgresql":
+        query = query.with_for_update(skip_locked=True)
+    events = (await db.execute(query)).scalars().all()
+    if not events:
+        return 0
+
+    result = await db.execute(
+        select(Webhook.id, Webhook.org_id, Webhook.events, Webhook.secret).where(
+            Webhook.org_id.in_({e.org_id for e in events}),
+            Webhook.is_active.is_(True),
+        )
+    )
+    hooks_by_org = defaultdict(list)
+    for hook in result.all():
+        hooks_by_org[hook.org_id].append(hook)
+
+    deliveries = []
+    for e in events:
+        subscribers = [hook for hook in hooks_by_org[e.org_id] if is_subscribed(hook.events, e.event_type)]
+        if not subscribers:
+            continue
+        body = serialize_payload(e.payload)  # once per event, shared by every subscriber
+        deliveries.extend(new_delivery_row(hook.id, hook.secret, e.event_type, e.payload, body) for hook in subscribers)
+    if deliveries:
+        await db.execute(insert(WebhookDelivery), deliveries)
+        await notify(db, WEBHOOK_CHANNEL)
+    await db.execute(
+        delete(OutboxEvent)
+        .where(OutboxEvent.id.in_([e.id for e in events]))
+        .execution_options(synchronize_session=False)
+    )
+    await db.commit()
+
+    logger.info("outbox_relayed", events=len(events), deliveries=len(deliveries))
+    return len(events)
@@ -0,0 +1,227 @@
+"""Pooled LLM provider clients with adaptive concurrency.
+
+Task execution calls an OpenAI-compatible provider configured by the
+X402_LLM_* env vars (falling back to OPENAI_COMPAT_*). Each provider gets
+one pooled httpx client shared by every call, plus:
+
+- an AIMD concurrency limit: halved when the provider throttles (429/5xx),
+  paused for its Retry-After, and grown back by one per window of
+  successful calls;
+- an optional tokens-per-minute budget, charged with an estimate of each
+  request's prompt and completion tokens.
+
+A call makes a single attempt. Throttling surfaces as LLMRateLimitedError
+carrying the provider's retry hint, so callers defer the work instead of
+sleeping on it.
+"""
+
+import asyncio
+import os
+import time
+
+import httpx
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+_THROTTLED = {429, 500, 502, 503, 504}
+DEFAULT_RETRY_SECONDS = 5.0
+MAX_TOKENS = 400
+
+
+class LLMRateLimitedError(Exception):
+    """The provider throttled or failed the call.
+
+    ``throttled`` is set for 429s: the task should be deferred, not counted
+    as a failure. ``retry_after`` is the provider's hint in seconds.
+    """
+
+    def __init__(self, message: str, retry_after: float = 0.0, throttled: bool = False):
+        super().__init__(message)
+        self.retry_after = retry_after
+        self.throttled = throttled
+
+
+class AdaptiveLimiter:
+    """AIMD concurrency limit: +1 per `limit` successes, halved on throttling."""
+
+    def __init__(self, max_limit: int):
+        self.max_limit = max_limit
+        self.limit = max_limit
+        self.in_flight = 0
+        self.paused_until = 0.0
+        self._successes = 0
+        self._cond = asyncio.Condition()
+
+    def headroom(self) -> int:
+        if time.monotonic() < self.paused_until:
+            return 0
+        return max(0, self.limit - self.in_flight)
+
+    async def acquire(self) -> None:
+        async with self._cond:
+            while True:
+                pause = self.paused_until - time.monotonic()
+                if pause <= 0 and self.in_flight < self.limit:
+                    break
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout=pause if pause > 0 else None)
+                except asyncio.TimeoutError:
+                    pass
+            self.in_flight += 1
+
+    async def release(self, throttled: bool = False, retry_after: float = 0.0) -> None:
+        async with self._cond:
+            self.in_flight -= 1
+            if throttled:
+                self.limit = max(1, self.limit // 2)
+                self._successes = 0
+                self.paused_until = max(self.paused_until, time.monotonic() + retry_after)
+            else:
+                self._successes += 1
+                if self._successes >= self.limit and self.limit < self.max_limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+class TokenBucket:
+    """Tokens-per-minute budget; a request larger than the bucket waits for a full one."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def take(self, n: int) -> None:
+        async with self._lock:
+            need = min(float(n), self.capacity)
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= need:
+                    self.tokens -= need
+                    return
+                await asyncio.sleep((need - self.tokens) / self.rate)
+
+
+class LLMProvider:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str,
+        model: str,
+        max_concurrency: int,
+        tokens_per_minute: int = 0,
+        timeout: float = 90.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.model = model
+        self.limiter = AdaptiveLimiter(max_concurrency)
+        self.budget = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self.client = httpx.AsyncClient(
+            transport=transport,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url and self.api_key)
+
+    def headroom(self) -> int:
+        """Calls that could start right now."""
+        return self.limiter.headroom() if self.configured else self.limiter.max_limit
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+    async def complete(self, system_prompt: str, prompt: str) -> str:
+        """One chat completion attempt. Raises LLMRateLimitedError on any failure."""
+        if self.budget is not None:
+            # ~4 characters per token, plus the completion we ask for
+            await self.budget.take((len(system_prompt) + len(prompt)) // 4 + MAX_TOKENS)
+        await self.limiter.acquire()
+        backoff, retry_after = False, 0.0
+        try:
+            try:
+                resp = await self.client.post(
+                    f"{self.base_url}/chat/completions",
+                    headers={"Authorization": f"Bearer {self.api_key}", "Content-Type": "application/json"},
+                    json={
+                        "model": self.model,
+                        "messages": [
+                            {"role": "system", "content": system_prompt},
+                            {"role": "user", "content": prompt},
+                        ],
+                        "max_tokens": MAX_TOKENS,
+                    },
+                )
+            except (httpx.HTTPError, asyncio.TimeoutError) as e:
+                backoff, retry_after = True, DEFAULT_RETRY_SECONDS
+                raise LLMRateLimitedError(f"LLM call failed: {e}", retry_after=retry_after) from e
+
+            if resp.status_code in _THROTTLED:
+                backoff, retry_after = True, _retry_after(resp)
+                raise LLMRateLimitedError(
+                    f"LLM returned HTTP {resp.status_code}",
+                    retry_after=retry_after,
+                    throttled=resp.status_code == 429,
+                )
+            if resp.status_code != 200:
+                raise LLMRateLimitedError(f"LLM returned HTTP {resp.status_code}: {resp.text[:200]}")
+            content = (resp.json().get("choices") or [{}])[0].get("message", {}).get("content")
+            if not content:
+                raise LLMRateLimitedError("LLM returned an empty completion")
+            return content.strip()
+        finally:
+            if backoff:
+                logger.warning(
+                    "llm_throttled",
+                    provider=self.base_url,
+                    limit=self.limiter.limit,
+                    retry_after=retry_after,
+                )
+            await self.limiter.release(throttled=backoff, retry_after=retry_after)
+
+
+def _retry_after(resp: httpx.Response) -> float:
+    try:
+        return max(float(resp.headers.get("Retry-After") or 0), 0.0) or DEFAULT_RETRY_SECONDS
+    except ValueError:
+        return DEFAULT_RETRY_SECONDS
+
+
+_providers: dict[tuple[str, str, str], LLMProvider] = {}
+
+
+def get_llm_provider() -> LLMProvider:
+    """The pooled provider for the current LLM env configuration."""
+    base = (os.getenv("X402_LLM_BASE_URL") or os.getenv("OPENAI_COMPAT_BASE_URL") or "").rstrip("/")
+    key = os.getenv("X402_LLM_KEY") or os.getenv("OPENAI_COMPAT_API_KEY") or ""
+    model = os.getenv("X402_LLM_MODEL") or os.getenv("OPENAI_COMPAT_MODEL") or "demo"
+    provider = _providers.get((base, key, model))
+    if provider is None:
+        settings = get_settings()
+        provider = LLMProvider(
+            base,
+            key,
+            model,
+            max_concurrency=settings.task_llm_max_concurrency,
+            tokens_per_minute=settings.task_llm_tokens_per_minute,
+        )
+        _providers[(base, key, model)] = provider
+    return provider
+
+
+async def close_llm_providers() -> None:
+    for provider in _providers.values():
+        await provider.close()
+    _providers.clear()
@@ -0,0 +1,168 @@
+"""Marketplace search -- ranked, faceted, keyset-paginated service discovery.
+
+Keyword matches come from the full-text index on service name and
+description (a GIN-indexed tsvector expression on Postgres, FTS5 on SQLite),
+capability filters and facets from the ``service_capabilities`` inverted
+index, so a search never scans the services table. Results are ranked by a
+blend of text relevance (BM25 on SQLite, ts_rank_cd on Postgres, both
+normalised to 0..1) with the service's rating and success rate, and paged
+with an opaque (rank, id) cursor instead of OFFSET.
+"""
+
+import base64
+import json
+import re
+import uuid
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import and_, case, column, desc, func, literal_column, or_, select, table
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.exceptions import ValidationError
+from ..models.agent import Agent
+from ..models.marketplace import SERVICE_SEARCH_VECTOR, Service, ServiceCapability
+
+# rank = relevance * w + avg_rating / 5 * w + success_rate * w
+RELEVANCE_WEIGHT = 0.6
+RATING_WEIGHT = 0.25
+SUCCESS_WEIGHT = 0.15
+
+FACET_LIMIT = 20
+PRICE_BUCKETS_USDC = (1, 10, 100)
+
+_TOKEN = re.compile(r"\w+")
+_services_fts = table("services_fts", column("rowid"))
+
+
+class ServiceSearch:
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    async def search(
+        self,
+        query: Optional[str] = None,
+        capability: Optional[str] = None,
+        max_price: Optional[float] = None,
+        min_rating: Optional[float] = None,
+        agent_id: Optional[uuid.UUID] = None,
+        limit: int = 20,
+        cursor: Optional[str] = None,
+        offset: int = 0,
+        facets: bool = False,
+    ) -> Dict[str, Any]:
+        """One page of active services matching the filters, best first.
+
+        Returns ``services``, ``agent_names`` (agent id -> name for the
+        page), ``next_cursor`` (None on the last page) and, when `facets` is
+        set on the first page, ``total`` and ``facets`` counts over every
+        match. `offset` is only honoured without a cursor.
+        """
+        stmt, relevance = self._text_match(query)
+        stmt = stmt.where(Service.is_active)
+        if capability:
+            stmt = stmt.where(
+                Service.id.in_(select(ServiceCapability.service_id).where(ServiceCapability.capability == capability))
+            )
+        if max_price:
+            stmt = stmt.where(Service.price_lamports <= int(max_price * 1_000_000))
+        if min_rating:
+            stmt = stmt.where(Service.avg_rating >= min_rating)
+        if agent_id:
+            stmt = stmt.where(Service.agent_id == agent_id)
+
+        result: Dict[str, Any] = {"total": None, "facets": None}
+        if facets and cursor is None:
+            result["total"], result["facets"] = await self._facets(stmt)
+
+        rating = func.coalesce(Service.avg_rating, 0.0) / 5
+        rank = RATING_WEIGHT * rating + SUCCESS_WEIGHT * func.coalesce(Service.success_rate, 0.0)
+        if relevance is not None:
+            rank = RELEVANCE_WEIGHT * relevance + rank
+        page = stmt.add_columns(rank.label("rank")).order_by(desc(rank), Service.id)
+        if cursor:
+            last_rank, last_id = _decode_cursor(cursor)
+            page = page.where(or_(rank < last_rank, and_(rank == last_rank, Service.id > last_id)))
+        elif offset:
+            page = page.offset(offset)
+        rows = (await self.session.execute(page.limit(limit + 1))).all()
+
+        more = len(rows) > limit
+        rows = rows[:limit]
+        services = [row[0] for row in rows]
+        result["services"] = services
+        result["agent_names"] = await self._agent_names(services)
+        result["next_cursor"] = _encode_cursor(rows[-1].rank, services[-1].id) if more else None
+        return result
+
+    def _text_match(self, query: Optional[str]):
+        """Statement restricted to full-text matches of `query`, and its relevance (None without a query)."""
+        stmt = select(Service)
+        tokens = _TOKEN.findall(query or "")
+        if not tokens:
+            return stmt, None
+
+        if self.session.bind.dialect.name == "postgresql":
+            vector = literal_column(SERVICE_SEARCH_VECTOR)
+            tsquery = func.plainto_tsquery(literal_column("'english'"), " ".join(tokens))
+            # Normalisation 32 scales the rank to rank / (rank + 1)
+            return stmt.where(vector.op("@@")(tsquery)), func.ts_rank_cd(vector, tsquery, 32)
+
+        # Quoted terms: user input never reaches the FTS5 query syntax
+        match = " ".join(f'"{token}"' for token in tokens)
+        score = -func.bm25(literal_column("services_fts"))  # bm25() is negative, lower is better
+        stmt = stmt.join(_services_fts, _services_fts.c.rowid == literal_column("services.rowid")).where(
+            literal_column("services_fts").op("MATCH")(match)
+        )
+        return stmt, score / (1 + score)
+
+    async def _facets(self, stmt) -> tuple[int, Dict[str, Dict[str, int]]]:
+        """Match count plus capability and price-bucket counts over all matches."""
+        matched = stmt.with_only_columns(Service.id, Service.price_lamports).subquery()
+        total = await self.session.scalar(select(func.count()).select_from(matched))
+
+        count = func.count().label("count")
+        result = await self.session.execute(
+            select(ServiceCapability.capability, count)
+            .join(matched, matched.c.id == ServiceCapability.service_id)
+            .group_by(ServiceCapability.capability)
+            .order_by(desc(count), ServiceCapability.capability)
+            .limit(FACET_LIMIT)
+        )
+        capabilities = {capability: n for capability, n in result.all()}
+
+        labels = [f"<{PRICE_BUCKETS_USDC[0]}"]
+        labels += [f"{lo}-{hi}" for lo, hi in zip(PRICE_BUCKETS_USDC, PRICE_BUCKETS_USDC[1:])]
+        labels.append(f"{PRICE_BUCKETS_USDC[-1]}+")
+        bucket = case(
+            *(
+                (matched.c.price_lamports < bound * 1_000_000, label)
+                for bound, label in zip(PRICE_BUCKETS_USDC, labels)
+            ),
+            else_=labels[-1],
+        ).label("bucket")
+        result = await self.session.execute(select(bucket, func.count()).group_by(bucket))
+        counts = dict(result.all())
+        prices = {label: counts.get(label, 0) for label in labels}
+
+        return total or 0, {"capability": capabilities, "price_usdc": prices}
+
+    async def _agent_names(self, services: List[Service]) -> Dict[uuid.UUID, str]:
+        agent_ids = {s.agent_id for s in services}
+        if not agent_ids:
+            return {}
+        result = await self.session.execute(select(Agent.id, Agent.name).where(Agent.id.in_(agent_ids)))
+        return dict(result.all())
+
+
+def _encode_cursor(rank: float, service_id: uuid.UUID) -> str:
+    raw = json.dumps([float(rank), str(service_id)]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> tuple[float, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        rank, service_id = json.loads(raw)
+        return float(rank), uuid.UUID(service_id)
+    except (ValueError, TypeError) as e:
+        raise ValidationError("Invalid search cursor") from e
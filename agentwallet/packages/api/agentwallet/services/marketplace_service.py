@@ -13,6 +13,7 @@ from ..models.agent import Agent
 from ..models.escrow import Escrow
 from ..models.marketplace import Job, JobMessage, Service
 from ..services.escrow_service import EscrowService
+from ..services.marketplace_search import ServiceSearch
 from ..services.reputation_service import ReputationService
 
 
@@ -86,41 +87,21 @@ class MarketplaceService:
     ) -> List[Service]:
         """Search for agent services by keyword, capability, price, or rating."""
 
-        stmt = select(Service).options(joinedload(Service.agent)).where(Service.is_active)
-
-        # Keyword search in name and description
-        if query:
-            search_term = f"%{query.lower()}%"
-            stmt = stmt.where(
-                or_(
-                    func.lower(Service.name).contains(search_term),
-                    func.lower(Service.description).contains(search_term),
-                )
-            )
-
-        # Filter by capability
-        if capability:
-            stmt = stmt.where(Service.capabilities.contains([capability]))
-
-        # Filter by max price
-        if max_price:
-            max_price_lamports = int(max_price * 1_000_000)
-            stmt = stmt.where(Service.price_lamports <= max_price_lamports)
-
-        # Filter by minimum rating
-        if min_rating:
-            stmt = stmt.where(Service.avg_rating >= min_rating)
-
-        # Filter by specific agent
-        if agent_id:
-            stmt = stmt.where(Service.agent_id == agent_id)
+        result = await self.search_services(
+            query=query,
+            capability=capability,
+            max_price=max_price,
+            min_rating=min_rating,
+            agent_id=agent_id,
+            limit=limit,
+            offset=offset,
+        )
+        return result["services"]
 
-        # Order by reputation score and rating
-        stmt = stmt.order_by(desc(Service.avg_rating), desc(Service.success_rate))
-        stmt = stmt.limit(limit).offset(offset)
+    async def search_services(self, **kwargs) -> Dict[str, Any]:
+        """Ranked, faceted, cursor-paginated service search (see ServiceSearch.search)."""
 
-        result = await self.session.execute(stmt)
-        return result.scalars().all()
+        return await ServiceSearch(self.session).search(**kwargs)
 
     async def hire_agent(
         self,
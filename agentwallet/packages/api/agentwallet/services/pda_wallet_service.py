@@ -6,14 +6,13 @@ import base58
 import httpx
 from solders.hash import Hash
 from solders.keypair import Keypair
-from solders.message import Message
 from solders.pubkey import Pubkey
 from solders.transaction import Transaction
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import get_settings
-from ..core.exceptions import NotFoundError, TransactionFailedError, ValidationError
+from ..core.exceptions import NotFoundError, RetryableError, TransactionFailedError, ValidationError
 from ..core.kms import get_key_manager
 from ..core.logging import get_logger
 from ..core.pda import (
@@ -23,7 +22,14 @@ from ..core.pda import (
     derive_pda,
     get_pda_account_info,
 )
-from ..core.solana import confirm_transaction, get_balance
+from ..core.solana import (
+    confirm_transaction,
+    get_balance,
+    get_blockhash_provider,
+    get_latest_blockhash,
+    get_rpc_client,
+    is_blockhash_not_found,
+)
 from ..models.pda_wallet import PDAWallet
 from ..models.wallet import Wallet
 
@@ -39,13 +45,14 @@ def _rpc_timeout() -> int:
 
 
 class PDAWalletService:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, rpc: httpx.AsyncClient | None = None):
         self.db = db
+        self.rpc = rpc or get_rpc_client()
         self.km = get_key_manager()
 
-    def _decrypt_keypair(self, wallet: Wallet) -> Keypair:
+    async def _decrypt_keypair(self, wallet: Wallet) -> Keypair:
         """Decrypt wallet private key. Internal only."""
-        raw = self.km.decrypt(wallet.encrypted_key)
+        raw = await self.km.decrypt_async(wallet.encrypted_key, cache=True)
         return Keypair.from_bytes(raw)
 
     async def _get_authority_wallet(self, wallet_id: uuid.UUID, org_id: uuid.UUID) -> Wallet:
@@ -58,17 +65,11 @@ class PDAWalletService:
         return wallet
 
     async def _get_latest_blockhash(self, client: httpx.AsyncClient) -> Hash:
-        """Fetch latest blockhash from RPC."""
-        resp = await client.post(
-            _rpc_url(),
-            json={"jsonrpc": "2.0", "id": 1, "method": "getLatestBlockhash"},
-            timeout=_rpc_timeout(),
-        )
-        resp.raise_for_status()
-        bh_data = resp.json()
-        if "error" in bh_data:
-            raise TransactionFailedError(f"Blockhash RPC error: {bh_data['error']}")
-        return Hash.from_string(bh_data["result"]["value"]["blockhash"])
+        """Latest blockhash from the shared warm cache."""
+        try:
+            return await get_latest_blockhash(client)
+        except RetryableError as e:
+            raise TransactionFailedError(str(e)) from e
 
     async def _send_transaction(self, client: httpx.AsyncClient, tx: Transaction) -> str:
         """Sign and send a transaction, return signature."""
@@ -86,6 +87,8 @@ class PDAWalletService:
         resp.raise_for_status()
         result = resp.json()
         if result.get("error"):
+            if is_blockhash_not_found(result["error"]):
+                get_blockhash_provider().invalidate()
             raise TransactionFailedError(f"sendTransaction error: {result['error']}")
         sig = result.get("result")
         if not sig:
@@ -107,7 +110,7 @@ class PDAWalletService:
     ) -> PDAWallet:
         """Create a PDA wallet on-chain and save to DB."""
         authority_wallet = await self._get_authority_wallet(authority_wallet_id, org_id)
-        authority_kp = self._decrypt_keypair(authority_wallet)
+        authority_kp = await self._decrypt_keypair(authority_wallet)
         authority_pubkey = authority_kp.pubkey()
         org_pubkey = authority_pubkey  # use authority as org pubkey for derivation
 
@@ -121,16 +124,15 @@ class PDAWalletService:
         )
 
         # Build, sign, send transaction
-        async with httpx.AsyncClient(timeout=_rpc_timeout()) as client:
-            bh = await self._get_latest_blockhash(client)
-            msg = Message([ix], authority_pubkey)
-            tx = Transaction([authority_kp], msg, bh)
-            sig = await self._send_transaction(client, tx)
+        bh = await self._get_latest_blockhash(self.rpc)
+        msg = get_blockhash_provider().message([ix], authority_pubkey, bh)
+        tx = Transaction([authority_kp], msg, bh)
+        sig = await self._send_transaction(self.rpc, tx)
 
-            # Confirm
-            confirmed = await confirm_transaction(client, sig)
-            if not confirmed:
-                logger.warning("pda_create_unconfirmed", signature=sig[:24])
+        # Confirm
+        confirmed = await confirm_transaction(self.rpc, sig)
+        if not confirmed:
+            logger.warning("pda_create_unconfirmed", signature=sig[:24])
 
         # Save to DB
         pda_wallet = PDAWallet(
@@ -164,14 +166,13 @@ class PDAWalletService:
 
     async def get_pda_state(self, pda_address: str) -> dict:
         """Read PDA account data from on-chain and return deserialized state + SOL balance."""
-        async with httpx.AsyncClient(timeout=_rpc_timeout()) as client:
-            state = await get_pda_account_info(client, pda_address)
-            if state is None:
-                raise NotFoundError("PDA account", pda_address)
+        state = await get_pda_account_info(self.rpc, pda_address)
+        if state is None:
+            raise NotFoundError("PDA account", pda_address)
 
-            balance = await get_balance(client, pda_address)
-            state["sol_balance"] = balance / 1e9
-            state["pda_address"] = pda_address
+        balance = await get_balance(self.rpc, pda_address)
+        state["sol_balance"] = balance / 1e9
+        state["pda_address"] = pda_address
 
         return state
 
@@ -189,7 +190,7 @@ class PDAWalletService:
         """Execute a transfer_with_limit through the PDA wallet."""
         pda_wallet = await self.get_pda_wallet(pda_wallet_id, org_id)
         authority_wallet = await self._get_authority_wallet(pda_wallet.authority_wallet_id, org_id)
-        authority_kp = self._decrypt_keypair(authority_wallet)
+        authority_kp = await self._decrypt_keypair(authority_wallet)
 
         pda_pubkey = Pubkey.from_string(pda_wallet.pda_address)
         recipient_pubkey = Pubkey.from_string(recipient)
@@ -201,12 +202,11 @@ class PDAWalletService:
             amount=amount_lamports,
         )
 
-        async with httpx.AsyncClient(timeout=_rpc_timeout()) as client:
-            bh = await self._get_latest_blockhash(client)
-            msg = Message([ix], authority_kp.pubkey())
-            tx = Transaction([authority_kp], msg, bh)
-            sig = await self._send_transaction(client, tx)
-            confirmed = await confirm_transaction(client, sig)
+        bh = await self._get_latest_blockhash(self.rpc)
+        msg = get_blockhash_provider().message([ix], authority_kp.pubkey(), bh)
+        tx = Transaction([authority_kp], msg, bh)
+        sig = await self._send_transaction(self.rpc, tx)
+        confirmed = await confirm_transaction(self.rpc, sig)
 
         logger.info(
             "pda_transfer",
@@ -232,7 +232,7 @@ class PDAWalletService:
         """Update PDA wallet limits on-chain and in DB."""
         pda_wallet = await self.get_pda_wallet(pda_wallet_id, org_id)
         authority_wallet = await self._get_authority_wallet(pda_wallet.authority_wallet_id, org_id)
-        authority_kp = self._decrypt_keypair(authority_wallet)
+        authority_kp = await self._decrypt_keypair(authority_wallet)
 
         new_spending = spending_limit_per_tx if spending_limit_per_tx is not None else pda_wallet.spending_limit_per_tx
         new_daily = daily_limit if daily_limit is not None else pda_wallet.daily_limit
@@ -248,12 +248,11 @@ class PDAWalletService:
             is_active=new_active,
         )
 
-        async with httpx.AsyncClient(timeout=_rpc_timeout()) as client:
-            bh = await self._get_latest_blockhash(client)
-            msg = Message([ix], authority_kp.pubkey())
-            tx = Transaction([authority_kp], msg, bh)
-            sig = await self._send_transaction(client, tx)
-            await confirm_transaction(client, sig)
+        bh = await self._get_latest_blockhash(self.rpc)
+        msg = get_blockhash_provider().message([ix], authority_kp.pubkey(), bh)
+        tx = Transaction([authority_kp], msg, bh)
+        sig = await self._send_transaction(self.rpc, tx)
+        await confirm_transaction(self.rpc, sig)
 
         # Update DB
         pda_wallet.spending_limit_per_tx = new_spending
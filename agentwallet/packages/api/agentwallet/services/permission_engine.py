@@ -4,15 +4,13 @@ Outcomes: allow, deny, require_approval.
 """
 
 import uuid
-from datetime import date, datetime, timezone
 
-from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.logging import get_logger
 from ..models.approval_request import ApprovalRequest
-from ..models.policy import Policy
-from ..models.transaction import Transaction
+from .policy_compiler import get_policy_plan
+from .spend_ledger import SpendLedger
 
 logger = get_logger(__name__)
 
@@ -26,6 +24,8 @@ class PolicyEvaluation:
         self.denied_by: str | None = None
         self.denial_reason: str | None = None
         self.approval_policy_id: uuid.UUID | None = None
+        # Amount held in today's spend ledger for an allowed transfer
+        self.reserved_lamports = 0
 
     @property
     def outcome(self) -> str:
@@ -39,6 +39,7 @@ class PolicyEvaluation:
 class PermissionEngine:
     def __init__(self, db: AsyncSession):
         self.db = db
+        self.spend_ledger = SpendLedger(db)
 
     async def evaluate(
         self,
@@ -53,93 +54,172 @@ class PermissionEngine:
 
         Policies are checked in priority order (lower number = higher priority).
         First deny wins. require_approval accumulates.
+
+        An allowed evaluation reserves the amount in today's spend ledger
+        (atomically re-checking the tightest daily limit); callers must
+        ``release_spend`` it if the transfer does not go out.
         """
         evaluation = PolicyEvaluation()
 
-        # Load applicable policies (org-level + agent-level + wallet-level)
-        policies = await self._load_policies(org_id, agent_id, wallet_id)
+        # Compiled plan for this scope (org-level + agent-level + wallet-level)
+        plan = await get_policy_plan(self.db, org_id, agent_id, wallet_id)
+        daily_spent = await self._daily_spent_if_limited(plan, org_id, agent_id, wallet_id)
+        self._check(plan, evaluation, to_address, amount_lamports, token_mint, daily_spent)
 
-        for policy in policies:
-            rules = policy.rules or {}
+        if evaluation.outcome == "allow":
+            await self._reserve_spend(plan, org_id, agent_id, wallet_id, [(evaluation, amount_lamports)])
+        return evaluation
 
+    async def evaluate_batch(
+        self,
+        org_id: uuid.UUID,
+        agent_id: uuid.UUID | None,
+        wallet_id: uuid.UUID,
+        transfers: list[tuple[str, int]],
+        token_mint: str | None = None,
+    ) -> list[PolicyEvaluation]:
+        """Evaluate several (to_address, amount) transfers from one wallet in one pass.
+
+        The plan and today's spend are read once, each allowed transfer
+        counts toward the daily total the next one is checked against, and
+        the allowed total is reserved with a single ledger check-and-add.
+        """
+        plan = await get_policy_plan(self.db, org_id, agent_id, wallet_id)
+        daily_spent = await self._daily_spent_if_limited(plan, org_id, agent_id, wallet_id)
+
+        evaluations, allowed = [], []
+        for to_address, amount_lamports in transfers:
+            evaluation = PolicyEvaluation()
+            self._check(plan, evaluation, to_address, amount_lamports, token_mint, daily_spent)
+            if evaluation.outcome == "allow":
+                daily_spent += amount_lamports
+                allowed.append((evaluation, amount_lamports))
+            evaluations.append(evaluation)
+
+        if allowed:
+            await self._reserve_spend(plan, org_id, agent_id, wallet_id, allowed)
+        return evaluations
+
+    async def _daily_spent_if_limited(self, plan, org_id, agent_id, wallet_id) -> int:
+        if any(p.daily_limit is not None for p in plan.policies):
+            return await self._get_daily_spend(org_id, agent_id, wallet_id)
+        return 0
+
+    def _check(
+        self,
+        plan,
+        evaluation: PolicyEvaluation,
+        to_address: str,
+        amount_lamports: int,
+        token_mint: str | None,
+        daily_spent: int,
+    ) -> None:
+        """Apply the plan's policies in priority order. First deny wins;
+        require_approval accumulates."""
+        for policy in plan.policies:
             # Check per-transaction spending limit
-            limit = rules.get("spending_limit_lamports")
+            limit = policy.spending_limit
             if limit is not None and amount_lamports > limit:
                 evaluation.allowed = False
                 evaluation.denied_by = policy.name
                 evaluation.denial_reason = f"Amount {amount_lamports} exceeds per-tx limit {limit}"
-                return evaluation
+                return
 
             # Check daily spending limit
-            daily_limit = rules.get("daily_limit_lamports")
-            if daily_limit is not None:
-                daily_spent = await self._get_daily_spend(org_id, agent_id, wallet_id)
-                if daily_spent + amount_lamports > daily_limit:
-                    evaluation.allowed = False
-                    evaluation.denied_by = policy.name
-                    evaluation.denial_reason = (
-                        f"Daily spend {daily_spent + amount_lamports} would exceed limit {daily_limit}"
-                    )
-                    return evaluation
+            daily_limit = policy.daily_limit
+            if daily_limit is not None and daily_spent + amount_lamports > daily_limit:
+                evaluation.allowed = False
+                evaluation.denied_by = policy.name
+                evaluation.denial_reason = (
+                    f"Daily spend {daily_spent + amount_lamports} would exceed limit {daily_limit}"
+                )
+                return
 
             # Check destination whitelist
-            whitelist = rules.get("destination_whitelist")
-            if whitelist and to_address not in whitelist:
+            if policy.destination_whitelist is not None and to_address not in policy.destination_whitelist:
                 evaluation.allowed = False
                 evaluation.denied_by = policy.name
                 evaluation.denial_reason = f"Destination {to_address[:16]}... not in whitelist"
-                return evaluation
+                return
 
             # Check destination blacklist
-            blacklist = rules.get("destination_blacklist")
-            if blacklist and to_address in blacklist:
+            if to_address in policy.destination_blacklist:
                 evaluation.allowed = False
                 evaluation.denied_by = policy.name
                 evaluation.denial_reason = f"Destination {to_address[:16]}... is blacklisted"
-                return evaluation
+                return
 
             # Check token whitelist
-            token_whitelist = rules.get("token_whitelist")
-            if token_whitelist:
+            if policy.token_whitelist is not None:
                 token_id = token_mint or "SOL"
-                if token_id not in token_whitelist:
+                if token_id not in policy.token_whitelist:
                     evaluation.allowed = False
                     evaluation.denied_by = policy.name
                     evaluation.denial_reason = f"Token {token_id} not in whitelist"
-                    return evaluation
+                    return
 
             # Check time window
-            time_window = rules.get("time_window")
-            if time_window:
-                from zoneinfo import ZoneInfo
-
-                tz_name = time_window.get("timezone", "UTC")
-                try:
-                    tz = ZoneInfo(tz_name)
-                except (KeyError, Exception):
-                    tz = timezone.utc
-
-                now_local = datetime.now(tz)
-                start_h, start_m = map(int, time_window.get("start", "00:00").split(":"))
-                end_h, end_m = map(int, time_window.get("end", "23:59").split(":"))
-                current_minutes = now_local.hour * 60 + now_local.minute
-                start_minutes = start_h * 60 + start_m
-                end_minutes = end_h * 60 + end_m
-                if not (start_minutes <= current_minutes <= end_minutes):
-                    evaluation.allowed = False
-                    evaluation.denied_by = policy.name
-                    evaluation.denial_reason = (
-                        f"Outside allowed time window {time_window['start']}-{time_window['end']} {tz_name}"
-                    )
-                    return evaluation
+            window = policy.time_window
+            if window and not window.contains():
+                evaluation.allowed = False
+                evaluation.denied_by = policy.name
+                evaluation.denial_reason = f"Outside allowed time window {window.start}-{window.end} {window.tz_name}"
+                return
 
             # Check approval threshold
-            approval_threshold = rules.get("require_approval_above_lamports")
+            approval_threshold = policy.approval_threshold
             if approval_threshold is not None and amount_lamports > approval_threshold:
                 evaluation.requires_approval = True
                 evaluation.approval_policy_id = policy.id
 
-        return evaluation
+    async def _reserve_spend(
+        self, plan, org_id, agent_id, wallet_id, items: list[tuple[PolicyEvaluation, int]]
+    ) -> None:
+        """Hold the allowed amounts against today's total.
+
+        All of them are tried in one check-and-add first. If a concurrent
+        transfer got there first and they no longer fit together, they are
+        reserved one at a time in order, and only those from the first that
+        does not fit onward are denied.
+        """
+        limited = [p for p in plan.policies if p.daily_limit is not None]
+        tightest = min(limited, key=lambda p: p.daily_limit) if limited else None
+        limit = tightest.daily_limit if tightest else None
+        reserved, total = await self.spend_ledger.reserve(
+            org_id, agent_id, wallet_id, sum(amount for _, amount in items), limit
+        )
+        if reserved:
+            for evaluation, amount in items:
+                evaluation.reserved_lamports = amount
+            return
+        if total is None:
+            return  # ledger unavailable: nothing reserved, nothing to deny on
+
+        refused_at = None
+        for evaluation, amount in items:
+            if refused_at is None:
+                if len(items) > 1:
+                    reserved, total = await self.spend_ledger.reserve(org_id, agent_id, wallet_id, amount, limit)
+                    if reserved:
+                        evaluation.reserved_lamports = amount
+                        continue
+                    if total is None:
+                        return
+                refused_at = total
+            evaluation.allowed = False
+            evaluation.denied_by = tightest.name
+            evaluation.denial_reason = f"Daily spend {refused_at + amount} would exceed limit {tightest.daily_limit}"
+
+    async def release_spend(
+        self,
+        evaluation: PolicyEvaluation,
+        agent_id: uuid.UUID | None,
+        wallet_id: uuid.UUID,
+    ) -> None:
+        """Return an evaluation's reservation (the transfer failed)."""
+        if evaluation.reserved_lamports:
+            await self.spend_ledger.release(agent_id, wallet_id, evaluation.reserved_lamports)
+            evaluation.reserved_lamports = 0
 
     async def create_approval_request(
         self,
@@ -159,48 +239,11 @@ class PermissionEngine:
         logger.info("approval_request_created", id=str(req.id), org_id=str(org_id))
         return req
 
-    async def _load_policies(
-        self,
-        org_id: uuid.UUID,
-        agent_id: uuid.UUID | None,
-        wallet_id: uuid.UUID,
-    ) -> list[Policy]:
-        """Load all applicable policies in priority order."""
-        query = (
-            select(Policy)
-            .where(
-                Policy.org_id == org_id,
-                Policy.enabled.is_(True),
-            )
-            .order_by(Policy.priority)
-        )
-        result = await self.db.execute(query)
-        all_policies = result.scalars().all()
-
-        applicable = []
-        for p in all_policies:
-            if p.scope_type == "org":
-                applicable.append(p)
-            elif p.scope_type == "agent" and p.scope_id == agent_id:
-                applicable.append(p)
-            elif p.scope_type == "wallet" and p.scope_id == wallet_id:
-                applicable.append(p)
-        return applicable
-
     async def _get_daily_spend(
         self,
         org_id: uuid.UUID,
         agent_id: uuid.UUID | None,
         wallet_id: uuid.UUID,
     ) -> int:
-        """Sum today's confirmed transaction amounts for the given wallet/agent."""
-        today = date.today()
-        query = select(func.coalesce(func.sum(Transaction.amount_lamports), 0)).where(
-            Transaction.org_id == org_id,
-            Transaction.wallet_id == wallet_id,
-            Transaction.status.in_(["confirmed", "submitted"]),
-            func.date(Transaction.created_at) == today,
-        )
-        if agent_id:
-            query = query.where(Transaction.agent_id == agent_id)
-        return await self.db.scalar(query)
+        """Today's reserved/submitted/confirmed spend for the wallet/agent (O(1) ledger read)."""
+        return await self.spend_ledger.get(org_id, agent_id, wallet_id)
@@ -0,0 +1,214 @@
+"""Policy compiler -- turn policy rows into cached evaluation plans.
+
+A plan is the priority-ordered set of enabled policies that apply to one
+(org, agent, wallet) scope, with each policy's ``rules`` JSON pre-parsed:
+address lists become frozensets, time windows carry minute offsets and a
+resolved tzinfo. Plans are cached in-process and in Redis; writes through
+the policies router bump a per-org version, which invalidates both tiers.
+"""
+
+import json
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone, tzinfo
+from functools import lru_cache
+
+from sqlalchemy import and_, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+from ..core.redis_client import get_redis
+from ..models.policy import Policy
+
+logger = get_logger(__name__)
+
+_LOCAL_MAX_ENTRIES = 10_000
+
+
+@lru_cache(maxsize=256)
+def _resolve_tz(tz_name: str) -> tzinfo:
+    from zoneinfo import ZoneInfo
+
+    try:
+        return ZoneInfo(tz_name)
+    except Exception:
+        return timezone.utc
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = map(int, hhmm.split(":"))
+    return hours * 60 + minutes
+
+
+@dataclass(frozen=True)
+class TimeWindow:
+    start: str
+    end: str
+    tz_name: str
+    start_minutes: int
+    end_minutes: int
+
+    @property
+    def tz(self) -> tzinfo:
+        return _resolve_tz(self.tz_name)
+
+    def contains(self, now: datetime | None = None) -> bool:
+        local = (now or datetime.now(timezone.utc)).astimezone(self.tz)
+        return self.start_minutes <= local.hour * 60 + local.minute <= self.end_minutes
+
+
+@dataclass(frozen=True)
+class CompiledPolicy:
+    id: uuid.UUID
+    name: str
+    spending_limit: int | None
+    daily_limit: int | None
+    destination_whitelist: frozenset[str] | None
+    destination_blacklist: frozenset[str]
+    token_whitelist: frozenset[str] | None
+    time_window: TimeWindow | None
+    approval_threshold: int | None
+
+
+def compile_policy(policy_id: uuid.UUID, name: str, rules: dict | None) -> CompiledPolicy:
+    """Pre-parse one policy's rules JSON."""
+    rules = rules or {}
+
+    window = None
+    if rules.get("time_window"):
+        raw = rules["time_window"]
+        start, end = raw.get("start", "00:00"), raw.get("end", "23:59")
+        window = TimeWindow(
+            start=start,
+            end=end,
+            tz_name=raw.get("timezone", "UTC"),
+            start_minutes=_minutes(start),
+            end_minutes=_minutes(end),
+        )
+
+    return CompiledPolicy(
+        id=policy_id,
+        name=name,
+        spending_limit=rules.get("spending_limit_lamports"),
+        daily_limit=rules.get("daily_limit_lamports"),
+        destination_whitelist=frozenset(rules["destination_whitelist"]) if rules.get("destination_whitelist") else None,
+        destination_blacklist=frozenset(rules.get("destination_blacklist") or ()),
+        token_whitelist=frozenset(rules["token_whitelist"]) if rules.get("token_whitelist") else None,
+        time_window=window,
+        approval_threshold=rules.get("require_approval_above_lamports"),
+    )
+
+
+class PolicyPlan:
+    """Compiled, priority-ordered policies for one (org, agent, wallet) scope."""
+
+    def __init__(self, sources: list[dict]):
+        # sources: [{"id", "name", "rules"}] in priority order -- kept so the
+        # plan can be shipped through Redis as JSON and recompiled cheaply.
+        self.sources = sources
+        self.policies = tuple(compile_policy(uuid.UUID(s["id"]), s["name"], s["rules"]) for s in sources)
+
+    @classmethod
+    def from_policies(cls, policies: list[Policy]) -> "PolicyPlan":
+        return cls([{"id": str(p.id), "name": p.name, "rules": p.rules or {}} for p in policies])
+
+    def to_json(self) -> str:
+        return json.dumps(self.sources)
+
+    @classmethod
+    def from_json(cls, raw: str) -> "PolicyPlan":
+        return cls(json.loads(raw))
+
+
+# (org_id, agent_id, wallet_id) -> (org version, expires_at, plan)
+_local_plans: OrderedDict[tuple, tuple[str | None, float, PolicyPlan]] = OrderedDict()
+
+
+def _version_key(org_id: uuid.UUID) -> str:
+    return f"policyver:{org_id}"
+
+
+def _plan_key(org_id: uuid.UUID, version: str, agent_id: uuid.UUID | None, wallet_id: uuid.UUID) -> str:
+    return f"policyplan:{org_id}:{version}:{agent_id}:{wallet_id}"
+
+
+async def _load_applicable(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    agent_id: uuid.UUID | None,
+    wallet_id: uuid.UUID,
+) -> list[Policy]:
+    """Enabled policies in scope, in priority order (scope filtered in SQL)."""
+    scope = [
+        Policy.scope_type == "org",
+        and_(Policy.scope_type == "wallet", Policy.scope_id == wallet_id),
+    ]
+    if agent_id is not None:
+        scope.append(and_(Policy.scope_type == "agent", Policy.scope_id == agent_id))
+    result = await db.execute(
+        select(Policy).where(Policy.org_id == org_id, Policy.enabled.is_(True), or_(*scope)).order_by(Policy.priority)
+    )
+    return list(result.scalars().all())
+
+
+async def get_policy_plan(
+    db: AsyncSession,
+    org_id: uuid.UUID,
+    agent_id: uuid.UUID | None,
+    wallet_id: uuid.UUID,
+) -> PolicyPlan:
+    """Return the compiled plan for a scope: in-process, then Redis, then DB."""
+    ttl = get_settings().policy_cache_ttl_seconds
+    local_key = (org_id, agent_id, wallet_id)
+
+    r = None
+    version = None
+    try:
+        r = await get_redis()
+        version = await r.get(_version_key(org_id)) or "0"
+    except Exception:
+        logger.debug("policy_cache_redis_unavailable", msg="Redis down — using in-process policy plans")
+        r = None
+
+    now = time.monotonic()
+    cached = _local_plans.get(local_key)
+    if cached and cached[0] == version and cached[1] > now:
+        _local_plans.move_to_end(local_key)
+        return cached[2]
+
+    plan = None
+    if r is not None:
+        try:
+            raw = await r.get(_plan_key(org_id, version, agent_id, wallet_id))
+            if raw:
+                plan = PolicyPlan.from_json(raw)
+        except Exception:
+            plan = None
+
+    if plan is None:
+        plan = PolicyPlan.from_policies(await _load_applicable(db, org_id, agent_id, wallet_id))
+        if r is not None:
+            try:
+                await r.set(_plan_key(org_id, version, agent_id, wallet_id), plan.to_json(), ex=ttl)
+            except Exception:
+                pass
+
+    _local_plans[local_key] = (version, now + ttl, plan)
+    _local_plans.move_to_end(local_key)
+    while len(_local_plans) > _LOCAL_MAX_ENTRIES:
+        _local_plans.popitem(last=False)
+    return plan
+
+
+async def invalidate_policy_plans(org_id: uuid.UUID) -> None:
+    """Drop every cached plan for an org (call after committing policy writes)."""
+    for key in [k for k in _local_plans if k[0] == org_id]:
+        del _local_plans[key]
+    try:
+        r = await get_redis()
+        await r.incr(_version_key(org_id))
+    except Exception:
+        logger.warning("policy_cache_invalidate_failed", org_id=str(org_id))
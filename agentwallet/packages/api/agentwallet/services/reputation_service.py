@@ -1,15 +1,35 @@
-"""On-chain reputation scoring for agents."""
+"""On-chain reputation scoring for agents.
+
+All of an agent's statistics come from one grouped query over its jobs, and
+``rescore`` applies that to thousands of agents per statement. Job changes
+only mark the seller stale; the reputation_scorer worker rescores stale
+agents in batches a debounce window after their first unscored change.
+"""
 
 import uuid
-from datetime import datetime
-from typing import Dict, List, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+from typing import Dict, Iterable, List, Optional, Tuple
 
-from sqlalchemy import and_, desc, func, select
+from sqlalchemy import and_, desc, func, literal, select, union_all, update
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.database import upsert_insert
 from ..core.exceptions import NotFoundError
 from ..models.agent import Agent
-from ..models.marketplace import AgentReputation, Job, Service
+from ..models.marketplace import AgentReputation, Job, Service, ServiceCapability
+
+RESCORE_CHUNK = 500
+
+
+def _float_or_none(value) -> Optional[float]:
+    return float(value) if value is not None else None
+
+
+def _days_since(value: datetime) -> int:
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return (datetime.now(timezone.utc) - value).days
 
 
 class ReputationService:
@@ -24,22 +44,92 @@ class ReputationService:
         # Get or create reputation record
         reputation = await self.get_or_create_reputation(agent_id)
 
-        # Gather all metrics
-        job_stats = await self._calculate_job_statistics(agent_id)
-        rating_stats = await self._calculate_rating_statistics(agent_id)
-        financial_stats = await self._calculate_financial_statistics(agent_id)
-        performance_stats = await self._calculate_performance_statistics(agent_id)
+        # Gather all metrics in one grouped pass
+        stats = (await self._collect_statistics([agent_id]))[agent_id]
+        stats.update(self._composite_scores(SimpleNamespace(**stats)))
+        for field, value in stats.items():
+            setattr(reputation, field, value)
+        await self.session.flush()
 
-        # Update reputation record
-        await self._update_reputation_record(reputation, job_stats, rating_stats, financial_stats, performance_stats)
+        return reputation.score
+
+    async def rescore(self, agent_ids: Iterable[uuid.UUID]) -> Dict[uuid.UUID, float]:
+        """Batch mode: recompute and store the reputation of many agents.
+
+        Each chunk of agents costs one grouped statistics query and one bulk
+        upsert. Returns the new score per agent.
+        """
+        agent_ids = list(dict.fromkeys(agent_ids))
+        scores: Dict[uuid.UUID, float] = {}
+        for i in range(0, len(agent_ids), RESCORE_CHUNK):
+            chunk = agent_ids[i : i + RESCORE_CHUNK]
+            rows = []
+            for agent_id, stats in (await self._collect_statistics(chunk)).items():
+                stats.update(self._composite_scores(SimpleNamespace(**stats)))
+                rows.append({"id": uuid.uuid4(), "agent_id": agent_id, **stats})
+                scores[agent_id] = stats["score"]
+            stmt = upsert_insert(self.session, AgentReputation).values(rows)
+            await self.session.execute(
+                stmt.on_conflict_do_update(
+                    index_elements=["agent_id"],
+                    set_={
+                        **{
+                            field: getattr(stmt.excluded, field) for field in rows[0] if field not in ("id", "agent_id")
+                        },
+                        "updated_at": func.now(),
+                    },
+                )
+            )
+        await self.session.flush()
+        return scores
+
+    async def mark_stale(self, agent_ids: Iterable[uuid.UUID]) -> None:
+        """Queue agents for rescoring by the reputation scorer (one upsert).
+
+        An agent already queued keeps its earlier mark, so a steady stream of
+        job changes cannot push its rescore back indefinitely.
+        """
+        now = datetime.now(timezone.utc)
+        rows = [{"id": uuid.uuid4(), "agent_id": agent_id, "stale_at": now} for agent_id in dict.fromkeys(agent_ids)]
+        if not rows:
+            return
+        stmt = upsert_insert(self.session, AgentReputation).values(rows)
+        await self.session.execute(
+            stmt.on_conflict_do_update(
+                index_elements=["agent_id"],
+                set_={"stale_at": func.coalesce(AgentReputation.stale_at, stmt.excluded.stale_at)},
+            )
+        )
 
-        # Calculate composite score
-        score = await self._calculate_composite_score(reputation)
+    async def rescore_stale(self, limit: int, debounce_seconds: float) -> int:
+        """Rescore agents first marked stale at least `debounce_seconds` ago.
 
-        reputation.score = score
+        A burst of job updates marks an agent stale many times but rescores
+        it once. An agent marked again while its batch is scored stays queued
+        for the next pass. Returns the number of agents rescored.
+        """
+        cutoff = datetime.now(timezone.utc) - timedelta(seconds=debounce_seconds)
+        stmt = (
+            select(AgentReputation.agent_id)
+            .where(AgentReputation.stale_at <= cutoff)
+            .order_by(AgentReputation.stale_at)
+            .limit(limit)
+        )
+        if self.session.bind.dialect.name == "postgresql":
+            stmt = stmt.with_for_update(skip_locked=True)
+        agent_ids = list((await self.session.execute(stmt)).scalars().all())
+        if not agent_ids:
+            return 0
+
+        await self.rescore(agent_ids)
+        await self.session.execute(
+            update(AgentReputation)
+            .where(AgentReputation.agent_id.in_(agent_ids), AgentReputation.stale_at <= cutoff)
+            .values(stale_at=None)
+            .execution_options(synchronize_session=False)
+        )
         await self.session.flush()
-
-        return score
+        return len(agent_ids)
 
     async def get_or_create_reputation(self, agent_id: uuid.UUID) -> AgentReputation:
         """Get existing reputation or create new one."""
@@ -60,183 +150,102 @@ class ReputationService:
 
         return reputation
 
-    async def _calculate_job_statistics(self, agent_id: uuid.UUID) -> Dict:
-        """Calculate job completion statistics."""
-
-        # Jobs as seller (primary reputation factor)
-        seller_stats_result = await self.session.execute(
-            select(
-                func.count(Job.id).label("total"),
-                func.count(Job.id).filter(Job.status == "completed").label("completed"),
-                func.count(Job.id).filter(Job.status == "cancelled").label("cancelled"),
-                func.count(Job.id).filter(Job.status == "disputed").label("disputed"),
-                func.min(Job.created_at).label("first_job"),
-                func.max(Job.completed_at).label("last_job"),
-            ).where(Job.seller_agent_id == agent_id)
-        )
-
-        seller_stats = seller_stats_result.first()
-
-        # Jobs as buyer (secondary factor)
-        buyer_stats_result = await self.session.execute(
-            select(func.count(Job.id).label("total_as_buyer")).where(Job.buyer_agent_id == agent_id)
-        )
-
-        buyer_stats = buyer_stats_result.first()
-
-        return {
-            "total_jobs": seller_stats.total or 0,
-            "completed_jobs": seller_stats.completed or 0,
-            "cancelled_jobs": seller_stats.cancelled or 0,
-            "disputed_jobs": seller_stats.disputed or 0,
-            "total_as_buyer": buyer_stats.total_as_buyer or 0,
-            "first_job_at": seller_stats.first_job,
-            "last_job_at": seller_stats.last_job,
-        }
-
-    async def _calculate_rating_statistics(self, agent_id: uuid.UUID) -> Dict:
-        """Calculate rating statistics from completed jobs."""
-
-        ratings_result = await self.session.execute(
-            select(Job.rating, func.count(Job.rating).label("count"))
-            .where(and_(Job.seller_agent_id == agent_id, Job.rating.isnot(None)))
-            .group_by(Job.rating)
-        )
-
-        rating_counts = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-        total_rating_score = 0
-        total_ratings = 0
-
-        for rating, count in ratings_result.all():
-            rating_counts[rating] = count
-            total_rating_score += rating * count
-            total_ratings += count
-
-        avg_rating = total_rating_score / total_ratings if total_ratings > 0 else None
-
-        return {
-            "avg_rating": avg_rating,
-            "rating_count": total_ratings,
-            "five_star_count": rating_counts[5],
-            "four_star_count": rating_counts[4],
-            "three_star_count": rating_counts[3],
-            "two_star_count": rating_counts[2],
-            "one_star_count": rating_counts[1],
-        }
-
-    async def _calculate_financial_statistics(self, agent_id: uuid.UUID) -> Dict:
-        """Calculate transaction volume and earnings."""
-
-        # Earnings as seller
-        seller_financial_result = await self.session.execute(
-            select(
-                func.sum(Service.price_lamports).label("total_earnings"),
-                func.sum(Service.price_lamports).label("total_volume_seller"),
+    async def _collect_statistics(self, agent_ids: List[uuid.UUID]) -> Dict[uuid.UUID, Dict]:
+        """Job, rating, financial and performance statistics for `agent_ids` in one query.
+
+        Jobs are read once per role (seller, buyer) through a UNION ALL and
+        aggregated per agent with filtered aggregates; completion and
+        response times are averaged in SQL rather than loaded row by row.
+        Returns AgentReputation field values per agent, agents without jobs
+        included.
+        """
+
+        def role_rows(agent_column, role: str):
+            return (
+                select(
+                    agent_column.label("agent_id"),
+                    literal(role).label("role"),
+                    Job.status,
+                    Job.rating,
+                    Job.created_at,
+                    Job.started_at,
+                    Job.completed_at,
+                    Job.deadline,
+                    Service.price_lamports,
+                )
+                .select_from(Job)
+                .outerjoin(Service, Service.id == Job.service_id)
+                .where(agent_column.in_(agent_ids))
             )
-            .select_from(Job)
-            .join(Service)
-            .where(and_(Job.seller_agent_id == agent_id, Job.status == "completed"))
-        )
-
-        seller_financial = seller_financial_result.first()
-
-        # Spending as buyer
-        buyer_financial_result = await self.session.execute(
-            select(func.sum(Service.price_lamports).label("total_spent"))
-            .select_from(Job)
-            .join(Service)
-            .where(and_(Job.buyer_agent_id == agent_id, Job.status == "completed"))
-        )
-
-        buyer_financial = buyer_financial_result.first()
-
-        earnings = seller_financial.total_earnings or 0
-        spent = buyer_financial.total_spent or 0
-        volume = earnings + spent
-
-        return {"total_volume_lamports": volume, "total_earnings_lamports": earnings, "total_spent_lamports": spent}
 
-    async def _calculate_performance_statistics(self, agent_id: uuid.UUID) -> Dict:
-        """Calculate performance metrics like delivery time and response rate."""
+        jobs = union_all(role_rows(Job.seller_agent_id, "seller"), role_rows(Job.buyer_agent_id, "buyer")).subquery()
+        c = jobs.c
+        hours = self._hours_between
+        as_seller = c.role == "seller"
+        completed = and_(as_seller, c.status == "completed")
+        timed = and_(completed, c.completed_at.isnot(None), c.created_at.isnot(None))
+        with_deadline = and_(timed, c.deadline.isnot(None))
 
-        # Completion time analysis
-        completion_times_result = await self.session.execute(
-            select(Job.created_at, Job.started_at, Job.completed_at, Job.deadline).where(
-                and_(Job.seller_agent_id == agent_id, Job.status == "completed")
-            )
+        result = await self.session.execute(
+            select(
+                c.agent_id,
+                func.count().filter(as_seller).label("total_jobs"),
+                func.count().filter(completed).label("completed_jobs"),
+                func.count().filter(and_(as_seller, c.status == "cancelled")).label("cancelled_jobs"),
+                func.count().filter(and_(as_seller, c.status == "disputed")).label("disputed_jobs"),
+                func.min(c.created_at).filter(as_seller).label("first_job_at"),
+                func.max(c.completed_at).filter(as_seller).label("last_job_at"),
+                *(func.count().filter(and_(as_seller, c.rating == n)).label(f"rated_{n}") for n in range(1, 6)),
+                func.sum(c.price_lamports).filter(completed).label("earnings"),
+                func.sum(c.price_lamports).filter(and_(c.role == "buyer", c.status == "completed")).label("spent"),
+                func.avg(hours(c.completed_at, c.created_at)).filter(timed).label("avg_completion"),
+                func.count().filter(with_deadline).label("with_deadline"),
+                func.count().filter(and_(with_deadline, hours(c.deadline, c.completed_at) >= 0)).label("on_time"),
+                func.avg(hours(c.started_at, c.created_at))
+                .filter(and_(timed, c.started_at.isnot(None)))
+                .label("avg_response"),
+            ).group_by(c.agent_id)
         )
-
-        completion_times = []
-        on_time_count = 0
-        total_with_deadline = 0
-        response_times = []
-
-        for job in completion_times_result.all():
-            if job.completed_at and job.created_at:
-                # Calculate completion time
-                completion_hours = (job.completed_at - job.created_at).total_seconds() / 3600
-                completion_times.append(completion_hours)
-
-                # Check if delivered on time
-                if job.deadline:
-                    total_with_deadline += 1
-                    if job.completed_at <= job.deadline:
-                        on_time_count += 1
-
-                # Calculate response time (acceptance time)
-                if job.started_at:
-                    response_hours = (job.started_at - job.created_at).total_seconds() / 3600
-                    response_times.append(response_hours)
-
-        avg_completion_time = sum(completion_times) / len(completion_times) if completion_times else None
-        on_time_rate = on_time_count / total_with_deadline if total_with_deadline > 0 else 0.0
-        avg_response_time = sum(response_times) / len(response_times) if response_times else None
-
-        return {
-            "avg_completion_time_hours": avg_completion_time,
-            "on_time_delivery_rate": on_time_rate,
-            "response_time_hours": avg_response_time,
-        }
-
-    async def _update_reputation_record(
-        self,
-        reputation: AgentReputation,
-        job_stats: Dict,
-        rating_stats: Dict,
-        financial_stats: Dict,
-        performance_stats: Dict,
-    ):
-        """Update the reputation record with calculated statistics."""
-
-        # Job statistics
-        reputation.total_jobs = job_stats["total_jobs"]
-        reputation.completed_jobs = job_stats["completed_jobs"]
-        reputation.cancelled_jobs = job_stats["cancelled_jobs"]
-        reputation.disputed_jobs = job_stats["disputed_jobs"]
-        reputation.first_job_at = job_stats["first_job_at"]
-        reputation.last_job_at = job_stats["last_job_at"]
-
-        # Rating statistics
-        reputation.avg_rating = rating_stats["avg_rating"]
-        reputation.rating_count = rating_stats["rating_count"]
-        reputation.five_star_count = rating_stats["five_star_count"]
-        reputation.four_star_count = rating_stats["four_star_count"]
-        reputation.three_star_count = rating_stats["three_star_count"]
-        reputation.two_star_count = rating_stats["two_star_count"]
-        reputation.one_star_count = rating_stats["one_star_count"]
-
-        # Financial statistics
-        reputation.total_volume_lamports = financial_stats["total_volume_lamports"]
-        reputation.total_earnings_lamports = financial_stats["total_earnings_lamports"]
-        reputation.total_spent_lamports = financial_stats["total_spent_lamports"]
-
-        # Performance statistics
-        reputation.avg_completion_time_hours = performance_stats["avg_completion_time_hours"]
-        reputation.on_time_delivery_rate = performance_stats["on_time_delivery_rate"]
-        reputation.response_time_hours = performance_stats["response_time_hours"]
-
-    async def _calculate_composite_score(self, reputation: AgentReputation) -> float:
-        """Calculate weighted composite reputation score (0.0 to 1.0)."""
+        rows = {row.agent_id: row for row in result.all()}
+
+        stats = {}
+        for agent_id in agent_ids:
+            row = rows.get(agent_id)
+            rated = {n: getattr(row, f"rated_{n}") if row else 0 for n in range(1, 6)}
+            rating_count = sum(rated.values())
+            earnings = int(row.earnings or 0) if row else 0
+            spent = int(row.spent or 0) if row else 0
+            stats[agent_id] = {
+                "total_jobs": row.total_jobs if row else 0,
+                "completed_jobs": row.completed_jobs if row else 0,
+                "cancelled_jobs": row.cancelled_jobs if row else 0,
+                "disputed_jobs": row.disputed_jobs if row else 0,
+                "first_job_at": row.first_job_at if row else None,
+                "last_job_at": row.last_job_at if row else None,
+                "avg_rating": sum(n * k for n, k in rated.items()) / rating_count if rating_count else None,
+                "rating_count": rating_count,
+                "five_star_count": rated[5],
+                "four_star_count": rated[4],
+                "three_star_count": rated[3],
+                "two_star_count": rated[2],
+                "one_star_count": rated[1],
+                "total_volume_lamports": earnings + spent,
+                "total_earnings_lamports": earnings,
+                "total_spent_lamports": spent,
+                "avg_completion_time_hours": _float_or_none(row.avg_completion) if row else None,
+                "on_time_delivery_rate": row.on_time / row.with_deadline if row and row.with_deadline else 0.0,
+                "response_time_hours": _float_or_none(row.avg_response) if row else None,
+            }
+        return stats
+
+    def _hours_between(self, later, earlier):
+        """SQL expression for the hours from `earlier` to `later`."""
+        if self.session.bind.dialect.name == "postgresql":
+            return func.extract("epoch", later - earlier) / 3600.0
+        return (func.julianday(later) - func.julianday(earlier)) * 24.0
+
+    def _composite_scores(self, reputation) -> Dict[str, float]:
+        """Weighted composite reputation score (0.0 to 1.0) and its component scores."""
 
         # Base score components
         reliability_score = self._calculate_reliability_score(reputation)
@@ -244,11 +253,6 @@ class ReputationService:
         communication_score = self._calculate_communication_score(reputation)
         experience_score = self._calculate_experience_score(reputation)
 
-        # Update individual scores
-        reputation.reliability_score = reliability_score
-        reputation.quality_score = quality_score
-        reputation.communication_score = communication_score
-
         # Weighted average (can be tuned based on business priorities)
         weights = {
             "reliability": 0.35,  # Completion rate, on-time delivery
@@ -264,8 +268,13 @@ class ReputationService:
             + experience_score * weights["experience"]
         )
 
-        # Ensure score is between 0.0 and 1.0
-        return max(0.0, min(1.0, composite_score))
+        return {
+            "reliability_score": reliability_score,
+            "quality_score": quality_score,
+            "communication_score": communication_score,
+            # Ensure score is between 0.0 and 1.0
+            "score": max(0.0, min(1.0, composite_score)),
+        }
 
     def _calculate_reliability_score(self, reputation: AgentReputation) -> float:
         """Calculate reliability based on completion rate and on-time delivery."""
@@ -351,7 +360,7 @@ class ReputationService:
 
         # Tenure scoring
         if reputation.first_job_at:
-            days_active = (datetime.utcnow() - reputation.first_job_at).days
+            days_active = _days_since(reputation.first_job_at)
             if days_active >= 365:  # 1+ years
                 tenure_score = 1.0
             elif days_active >= 180:  # 6+ months
@@ -385,7 +394,8 @@ class ReputationService:
         if category:
             stmt = (
                 stmt.join(Service, Service.agent_id == Agent.id)
-                .where(Service.capabilities.contains([category]))
+                .join(ServiceCapability, ServiceCapability.service_id == Service.id)
+                .where(ServiceCapability.capability == category)
                 .distinct()
             )
 
@@ -393,9 +403,9 @@ class ReputationService:
         return result.all()
 
     async def update_agent_reputation(self, agent_id: uuid.UUID):
-        """Trigger reputation recalculation for an agent."""
+        """Queue reputation recalculation for an agent (debounced, off the request path)."""
 
-        await self.calculate_score(agent_id)
+        await self.mark_stale([agent_id])
 
     async def get_reputation_summary(self, agent_id: uuid.UUID) -> Dict:
         """Get comprehensive reputation summary for an agent."""
@@ -428,6 +438,6 @@ class ReputationService:
             "total_earnings_usdc": reputation.total_earnings_lamports / 1_000_000,
             "on_time_delivery_rate": reputation.on_time_delivery_rate,
             "avg_response_time_hours": reputation.response_time_hours,
-            "tenure_days": (datetime.utcnow() - reputation.first_job_at).days if reputation.first_job_at else 0,
+            "tenure_days": _days_since(reputation.first_job_at) if reputation.first_job_at else 0,
             "last_active": reputation.last_job_at,
         }
@@ -0,0 +1,212 @@
+"""Spend ledger -- running per-day spend counters for daily policy limits.
+
+Counters live in Redis, one per (UTC day, wallet) and per (UTC day, wallet,
+agent), and hold the summed amount of the day's transfers that are
+reserved, submitted or confirmed. An allowed policy evaluation reserves its
+amount with an atomic check-and-add, so concurrent transfers can no longer
+all pass against the same stale total; a transfer that fails releases it.
+
+A missing counter (new day, evicted key, Redis flush) is rebuilt from the
+transactions table with an index-friendly created_at range. Without Redis
+the ledger degrades to that DB sum.
+"""
+
+import uuid
+from datetime import datetime, time, timedelta, timezone
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.logging import get_logger
+from ..core.redis_client import get_redis
+from ..models.transaction import Transaction
+
+logger = get_logger(__name__)
+
+COUNTER_TTL_SECONDS = 2 * 24 * 3600
+
+# KEYS[1] = counter checked against the limit, KEYS[1..n] = counters to bump
+# ARGV[1] = amount, ARGV[2] = limit (-1 = unlimited), ARGV[3] = ttl
+RESERVE_SCRIPT = """
+local current = tonumber(redis.call('GET', KEYS[1]) or '0')
+local amount = tonumber(ARGV[1])
+local limit = tonumber(ARGV[2])
+if limit >= 0 and current + amount > limit then
+  return {0, current}
+end
+for i = 1, #KEYS do
+  redis.call('INCRBY', KEYS[i], amount)
+  redis.call('EXPIRE', KEYS[i], ARGV[3])
+end
+return {1, current + amount}
+"""
+
+# Only decrement live counters: an expired/missing one is rebuilt from the DB
+RELEASE_SCRIPT = """
+for i = 1, #KEYS do
+  if redis.call('EXISTS', KEYS[i]) == 1 then
+    redis.call('DECRBY', KEYS[i], ARGV[1])
+  end
+end
+return 1
+"""
+
+
+def spend_day(when: datetime | None = None) -> str:
+    """UTC calendar day a transaction's spend is booked against."""
+    when = when or datetime.now(timezone.utc)
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return when.astimezone(timezone.utc).date().isoformat()
+
+
+def _counter_key(day: str, wallet_id: uuid.UUID, agent_id: uuid.UUID | None = None) -> str:
+    if agent_id is None:
+        return f"spend:{day}:{wallet_id}"
+    return f"spend:{day}:{wallet_id}:{agent_id}"
+
+
+class SpendLedger:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get(
+        self,
+        org_id: uuid.UUID,
+        agent_id: uuid.UUID | None,
+        wallet_id: uuid.UUID,
+    ) -> int:
+        """Today's spend for the wallet (narrowed to the agent when given)."""
+        day = spend_day()
+        key = _counter_key(day, wallet_id, agent_id)
+        try:
+            r = await get_redis()
+            cached = await r.get(key)
+            if cached is not None:
+                return int(cached)
+            return await self._rebuild(r, key, org_id, agent_id, wallet_id, day)
+        except Exception:
+            logger.debug("spend_ledger_redis_unavailable", msg="Redis down — summing spend from the DB")
+            return await self._db_total(org_id, agent_id, wallet_id, day)
+
+    async def get_many(
+        self,
+        org_id: uuid.UUID,
+        agent_id: uuid.UUID | None,
+        wallet_ids: list[uuid.UUID],
+    ) -> dict[uuid.UUID, int]:
+        """Today's spend for several wallets: one MGET, one grouped DB sum for the misses."""
+        day = spend_day()
+        if not wallet_ids:
+            return {}
+        keys = [_counter_key(day, wallet_id, agent_id) for wallet_id in wallet_ids]
+        try:
+            r = await get_redis()
+            cached = await r.mget(keys)
+            totals = {wallet_id: int(value) for wallet_id, value in zip(wallet_ids, cached) if value is not None}
+            missing = [(key, wallet_id) for key, wallet_id in zip(keys, wallet_ids) if wallet_id not in totals]
+            if missing:
+                rebuilt = await self._db_totals(org_id, agent_id, [wallet_id for _, wallet_id in missing], day)
+                for key, wallet_id in missing:
+                    totals[wallet_id] = await self._seed(r, key, rebuilt.get(wallet_id, 0))
+            return totals
+        except Exception:
+            logger.debug("spend_ledger_redis_unavailable", msg="Redis down — summing spend from the DB")
+            totals = await self._db_totals(org_id, agent_id, wallet_ids, day)
+            return {wallet_id: totals.get(wallet_id, 0) for wallet_id in wallet_ids}
+
+    async def reserve(
+        self,
+        org_id: uuid.UUID,
+        agent_id: uuid.UUID | None,
+        wallet_id: uuid.UUID,
+        amount: int,
+        limit: int | None = None,
+    ) -> tuple[bool, int | None]:
+        """Atomically add `amount` to today's counters unless it would exceed `limit`.
+
+        Returns (reserved, total): total is the counter after a successful
+        reservation, or the current counter when the limit refused it. Returns
+        (False, None) when Redis is unavailable -- nothing was reserved.
+        """
+        day = spend_day()
+        keys = self._keys(day, wallet_id, agent_id)
+        try:
+            r = await get_redis()
+            for key, scoped_agent in zip(keys, (agent_id, None)):
+                if await r.get(key) is None:
+                    await self._rebuild(r, key, org_id, scoped_agent, wallet_id, day)
+            ok, total = await r.eval(
+                RESERVE_SCRIPT, len(keys), *keys, amount, -1 if limit is None else limit, COUNTER_TTL_SECONDS
+            )
+            return bool(ok), int(total)
+        except Exception as e:
+            logger.warning("spend_reserve_failed", wallet_id=str(wallet_id), error=str(e))
+            return False, None
+
+    async def release(
+        self,
+        agent_id: uuid.UUID | None,
+        wallet_id: uuid.UUID,
+        amount: int,
+        created_at: datetime | None = None,
+    ) -> None:
+        """Give back a reservation whose transaction failed."""
+        keys = self._keys(spend_day(created_at), wallet_id, agent_id)
+        try:
+            r = await get_redis()
+            await r.eval(RELEASE_SCRIPT, len(keys), *keys, amount)
+        except Exception as e:
+            logger.warning("spend_release_failed", wallet_id=str(wallet_id), error=str(e))
+
+    @staticmethod
+    def _keys(day: str, wallet_id: uuid.UUID, agent_id: uuid.UUID | None) -> list[str]:
+        # The first key is the one limits are checked against
+        if agent_id is None:
+            return [_counter_key(day, wallet_id)]
+        return [_counter_key(day, wallet_id, agent_id), _counter_key(day, wallet_id)]
+
+    async def _rebuild(self, r, key, org_id, agent_id, wallet_id, day) -> int:
+        return await self._seed(r, key, await self._db_total(org_id, agent_id, wallet_id, day))
+
+    @staticmethod
+    async def _seed(r, key: str, total: int) -> int:
+        # NX: never clobber a counter a concurrent reservation just created
+        if not await r.set(key, total, ex=COUNTER_TTL_SECONDS, nx=True):
+            cached = await r.get(key)
+            if cached is not None:
+                return int(cached)
+        return total
+
+    async def _db_total(
+        self,
+        org_id: uuid.UUID,
+        agent_id: uuid.UUID | None,
+        wallet_id: uuid.UUID,
+        day: str,
+    ) -> int:
+        return (await self._db_totals(org_id, agent_id, [wallet_id], day)).get(wallet_id, 0)
+
+    async def _db_totals(
+        self,
+        org_id: uuid.UUID,
+        agent_id: uuid.UUID | None,
+        wallet_ids: list[uuid.UUID],
+        day: str,
+    ) -> dict[uuid.UUID, int]:
+        start = datetime.combine(datetime.fromisoformat(day).date(), time.min, tzinfo=timezone.utc)
+        query = (
+            select(Transaction.wallet_id, func.sum(Transaction.amount_lamports))
+            .where(
+                Transaction.org_id == org_id,
+                Transaction.wallet_id.in_(wallet_ids),
+                Transaction.status.in_(["confirmed", "submitted"]),
+                Transaction.created_at >= start,
+                Transaction.created_at < start + timedelta(days=1),
+            )
+            .group_by(Transaction.wallet_id)
+        )
+        if agent_id:
+            query = query.where(Transaction.agent_id == agent_id)
+        result = await self.db.execute(query)
+        return {wallet_id: int(total or 0) for wallet_id, total in result.all()}
@@ -0,0 +1,161 @@
+"""Token metadata registry and a shared, TTL-cached USD price oracle.
+
+Prices are fetched per symbol and cached in-process for
+``price_cache_seconds``; every balance aggregation in the process shares the
+cache, and concurrent misses are coalesced into one feed request for all
+missing symbols. With ``price_feed_url`` set, prices come from a
+Jupiter-style endpoint (``GET {url}?ids=SOL,ETH`` returning
+``{"data": {"SOL": {"price": ...}}}``); without it, or when the feed fails
+for a symbol that was never fetched, the static reference prices are used.
+A failed refresh keeps serving the last fetched price.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+import httpx
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+
+logger = get_logger(__name__)
+
+REFERENCE_PRICES_USD: Dict[str, Decimal] = {
+    "SOL": Decimal("100.0"),
+    "USDC": Decimal("1.0"),
+    "ETH": Decimal("3000.0"),
+    "MATIC": Decimal("0.8"),
+    "BNB": Decimal("300.0"),
+    "AVAX": Decimal("35.0"),
+}
+
+WRAPPED_SOL_MINT = "So11111111111111111111111111111111111111112"
+
+
+@dataclass(frozen=True)
+class TokenInfo:
+    symbol: str
+    decimals: int
+
+
+# Solana mint -> metadata. Unknown mints get a truncated-mint symbol and
+# whatever decimals their token accounts report.
+_KNOWN_MINTS: Dict[str, TokenInfo] = {
+    "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": TokenInfo("USDC", 6),
+    WRAPPED_SOL_MINT: TokenInfo("SOL", 9),
+}
+_learned_decimals: Dict[str, int] = {}
+
+# EVM chain id -> (chain name, native symbol)
+EVM_CHAINS: Dict[int, tuple[str, str]] = {
+    1: ("ethereum", "ETH"),
+    10: ("optimism", "ETH"),
+    137: ("polygon", "MATIC"),
+    8453: ("base", "ETH"),
+    42161: ("arbitrum", "ETH"),
+    84532: ("base-sepolia", "ETH"),
+}
+
+
+def token_info(mint: Optional[str], decimals: Optional[int] = None) -> TokenInfo:
+    """Metadata for a Solana mint (None is native SOL).
+
+    `decimals`, when a token account reports them, is remembered for mints
+    the registry does not know.
+    """
+    if not mint:
+        return TokenInfo("SOL", 9)
+    if mint == get_settings().usdc_mint_address:
+        return TokenInfo("USDC", 6)
+    known = _KNOWN_MINTS.get(mint)
+    if known is not None:
+        return known
+    if decimals is not None:
+        _learned_decimals[mint] = decimals
+    return TokenInfo(mint[:8] + "...", _learned_decimals.get(mint, 6))
+
+
+def evm_chain(chain_id: int) -> tuple[str, str]:
+    """(chain name, native symbol) for an EVM chain id."""
+    return EVM_CHAINS.get(chain_id, (f"evm-{chain_id}", "ETH"))
+
+
+class PriceOracle:
+    def __init__(
+        self,
+        ttl_seconds: float,
+        feed_url: str = "",
+        timeout: float = 5.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self.feed_url = feed_url
+        self.timeout = timeout
+        self.transport = transport
+        self._prices: Dict[str, tuple[Decimal, float]] = {}  # symbol -> (price, fetched at)
+        self._lock = asyncio.Lock()
+        self._client: httpx.AsyncClient | None = None
+        self.hits = 0
+        self.fetches = 0
+
+    def _stale(self, now: float) -> set[str]:
+        return {s for s, (_, at) in self._prices.items() if now - at >= self.ttl_seconds}
+
+    async def prices(self, symbols: Iterable[str]) -> Dict[str, Decimal]:
+        """USD price per symbol; 0 for symbols no source knows."""
+        wanted = set(symbols)
+        missing = {s for s in wanted if s not in self._prices} | (wanted & self._stale(time.monotonic()))
+        self.hits += len(wanted - missing)
+        if missing:
+            async with self._lock:
+                # Another caller may have fetched them while we waited
+                now = time.monotonic()
+                missing = {s for s in missing if s not in self._prices} | (missing & self._stale(now))
+                if missing:
+                    fetched = await self._fetch(sorted(missing))
+                    for symbol in missing:
+                        price = fetched.get(symbol)
+                        if price is None:
+                            # Keep the last price (or the reference) until the next TTL
+                            previous = self._prices.get(symbol)
+                            price = previous[0] if previous else REFERENCE_PRICES_USD.get(symbol, Decimal("0"))
+                        self._prices[symbol] = (price, now)
+        return {s: self._prices[s][0] for s in wanted}
+
+    async def _fetch(self, symbols: list[str]) -> Dict[str, Decimal]:
+        self.fetches += 1
+        if not self.feed_url:
+            return {s: REFERENCE_PRICES_USD[s] for s in symbols if s in REFERENCE_PRICES_USD}
+        if self._client is None:
+            self._client = httpx.AsyncClient(timeout=self.timeout, transport=self.transport)
+        try:
+            resp = await self._client.get(self.feed_url, params={"ids": ",".join(symbols)})
+            resp.raise_for_status()
+            data = resp.json().get("data") or {}
+            return {s: Decimal(str(data[s]["price"])) for s in symbols if (data.get(s) or {}).get("price") is not None}
+        except (httpx.HTTPError, ValueError, KeyError, TypeError) as e:
+            logger.warning("price_feed_failed", symbols=len(symbols), error=str(e))
+            return {}
+
+    def clear(self) -> None:
+        self._prices.clear()
+        self.hits = self.fetches = 0
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+
+_oracle: PriceOracle | None = None
+
+
+def get_price_oracle() -> PriceOracle:
+    global _oracle
+    if _oracle is None:
+        settings = get_settings()
+        _oracle = PriceOracle(settings.price_cache_seconds, settings.price_feed_url)
+    return _oracle
@@ -1,6 +1,7 @@
 """Token Service -- SPL token transfer service for stablecoins."""
 
 import uuid
+from datetime import datetime, timezone
 from typing import Any, Dict
 
 import httpx
@@ -17,11 +18,13 @@ from ..core.exceptions import (
 from ..core.logging import get_logger
 from ..core.solana import (
     confirm_transaction,
+    get_rpc_client,
     get_token_accounts,
     get_token_balance,
     transfer_spl_token,
 )
 from ..models.transaction import Transaction
+from .balance_tracker import invalidate_balances
 from .fee_collector import FeeCollector
 from .permission_engine import PermissionEngine
 from .wallet_manager import WalletManager
@@ -47,9 +50,10 @@ class TokenService:
         },
     }
 
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, rpc: httpx.AsyncClient | None = None):
         self.db = db
-        self.wallet_mgr = WalletManager(db)
+        self.rpc = rpc or get_rpc_client()
+        self.wallet_mgr = WalletManager(db, rpc=self.rpc)
         self.permission_engine = PermissionEngine(db)
         self.fee_collector = FeeCollector()
 
@@ -127,7 +131,7 @@ class TokenService:
         wallet = await self.wallet_mgr.get_wallet(from_wallet_id, org_id)
 
         # Decrypt private key
-        from_keypair = self.wallet_mgr._decrypt_keypair(wallet)
+        from_keypair = await self.wallet_mgr.decrypt_keypair(wallet)
         from_address = str(from_keypair.pubkey())
 
         # Check token balance. The public devnet RPC is load-balanced and
@@ -138,13 +142,12 @@ class TokenService:
 
         # The public devnet RPC lags ~5s on token balance reads after a mint
         # (measured), so poll with a ~10s window before declaring insufficiency.
-        async with httpx.AsyncClient() as client:
-            balance_info = await get_token_balance(client, from_address, token_config["mint"])
-            for _attempt in range(6):
-                if balance_info["amount"] >= amount_raw:
-                    break
-                await asyncio.sleep(1.5)
-                balance_info = await get_token_balance(client, from_address, token_config["mint"])
+        balance_info = await get_token_balance(self.rpc, from_address, token_config["mint"])
+        for _attempt in range(6):
+            if balance_info["amount"] >= amount_raw:
+                break
+            await asyncio.sleep(1.5)
+            balance_info = await get_token_balance(self.rpc, from_address, token_config["mint"])
 
         if balance_info["amount"] < amount_raw:
             raise InsufficientBalanceError(available=balance_info["amount"], required=amount_raw)
@@ -177,44 +180,51 @@ class TokenService:
             )
             raise ApprovalRequiredError(str(req.id))
 
-        # Calculate platform fee
-        fee_lamports = self.fee_collector.calculate_fee(amount, org_tier)
-        fee_recipient = get_settings().platform_wallet_address or None
+        # The evaluation now holds a spend reservation: give it back if the
+        # transfer cannot even be recorded
+        try:
+            # Calculate platform fee
+            fee_lamports = self.fee_collector.calculate_fee(amount, org_tier)
+            fee_recipient = get_settings().platform_wallet_address or None
 
-        # Create transaction record
-        tx = Transaction(
-            org_id=org_id,
-            agent_id=agent_id,
-            wallet_id=from_wallet_id,
-            tx_type="token_transfer",
-            status="pending",
-            from_address=from_address,
-            to_address=to_address,
-            amount_lamports=amount_raw,  # Store raw amount
-            token_mint=token_config["mint"],
-            platform_fee_lamports=fee_lamports,
-            memo=memo,
-            idempotency_key=idempotency_key,
-        )
-        self.db.add(tx)
-        await self.db.flush()
+            # Create transaction record
+            tx = Transaction(
+                org_id=org_id,
+                agent_id=agent_id,
+                wallet_id=from_wallet_id,
+                tx_type="token_transfer",
+                status="pending",
+                from_address=from_address,
+                to_address=to_address,
+                amount_lamports=amount_raw,  # Store raw amount
+                token_mint=token_config["mint"],
+                platform_fee_lamports=fee_lamports,
+                memo=memo,
+                idempotency_key=idempotency_key,
+            )
+            self.db.add(tx)
+            await self.db.flush()
+        except Exception:
+            await self.permission_engine.release_spend(evaluation, agent_id, from_wallet_id)
+            raise
 
         try:
             # Execute transfer
-            async with httpx.AsyncClient() as client:
-                signature = await transfer_spl_token(
-                    client=client,
-                    from_keypair=from_keypair,
-                    to_address=to_address,
-                    mint=token_config["mint"],
-                    amount=amount_raw,
-                    fee_lamports=fee_lamports,
-                    fee_recipient=fee_recipient,
-                )
+            signature = await transfer_spl_token(
+                client=self.rpc,
+                from_keypair=from_keypair,
+                to_address=to_address,
+                mint=token_config["mint"],
+                amount=amount_raw,
+                fee_lamports=fee_lamports,
+                fee_recipient=fee_recipient,
+            )
 
             # Update transaction with signature
             tx.signature = signature
+            tx.last_valid_block_height = getattr(signature, "last_valid_block_height", None)
             tx.status = "submitted"
+            await invalidate_balances(from_address, to_address, agent_ids=[wallet.agent_id])
             await self.db.flush()
 
             # Background confirmation (fire and forget)
@@ -233,8 +243,11 @@ class TokenService:
             return tx
 
         except Exception as e:
+            if tx.status != "pending":
+                raise  # submitted: the spend is real, the tx processor settles it
             tx.status = "failed"
             tx.error = str(e)
+            await self.permission_engine.release_spend(evaluation, agent_id, from_wallet_id)
             await self.db.flush()
             raise
 
@@ -256,8 +269,7 @@ class TokenService:
 
         token_config = self.SUPPORTED_TOKENS[token_symbol]
 
-        async with httpx.AsyncClient() as client:
-            balance_info = await get_token_balance(client, wallet_address, token_config["mint"])
+        balance_info = await get_token_balance(self.rpc, wallet_address, token_config["mint"])
 
         return {
             "token_symbol": token_symbol,
@@ -276,14 +288,13 @@ class TokenService:
         Returns:
             Dict with SOL balance and all token balances
         """
-        async with httpx.AsyncClient() as client:
-            # Get SOL balance
-            from ..core.solana import get_balance_sol
+        # Get SOL balance
+        from ..core.solana import get_balance_sol
 
-            sol_balance = await get_balance_sol(client, wallet_address)
+        sol_balance = await get_balance_sol(self.rpc, wallet_address)
 
-            # Get all token accounts
-            token_accounts = await get_token_accounts(client, wallet_address)
+        # Get all token accounts
+        token_accounts = await get_token_accounts(self.rpc, wallet_address)
 
         # Map token accounts to supported tokens
         token_balances = []
@@ -336,37 +347,25 @@ class TokenService:
     async def _confirm_transaction(self, tx_id: uuid.UUID, signature: str):
         """Background task to confirm transaction and update status."""
         try:
-            async with httpx.AsyncClient() as client:
-                confirmed = await confirm_transaction(client, signature)
+            confirmed = await confirm_transaction(self.rpc, signature)
 
             # Update transaction status
-            from sqlalchemy import func, update
-
             from ..core.database import get_session_factory
 
-            # Create a new session for this background task
+            # Create a new session for this background task. Going through
+            # the ORM records the outcome in the event outbox as well.
             factory = get_session_factory()
             async with factory() as session:
-                if confirmed:
-                    stmt = (
-                        update(Transaction)
-                        .where(Transaction.id == tx_id)
-                        .values(
-                            status="confirmed",
-                            confirmed_at=func.now(),
-                        )
-                    )
-                else:
-                    stmt = (
-                        update(Transaction)
-                        .where(Transaction.id == tx_id)
-                        .values(
-                            status="timeout",
-                            error="Transaction confirmation timeout",
-                        )
-                    )
-
-                await session.execute(stmt)
+                tx = await session.get(Transaction, tx_id)
+                if tx is None or tx.status != "submitted":
+                    return
+                if not confirmed:
+                    # Left "submitted": the tx processor settles it from the
+                    # signature, releasing its spend if it never lands
+                    logger.warning("token_confirmation_timeout", tx_id=str(tx_id), signature=signature[:24])
+                    return
+                tx.status = "confirmed"
+                tx.confirmed_at = datetime.now(timezone.utc)
                 await session.commit()
 
         except Exception as e:
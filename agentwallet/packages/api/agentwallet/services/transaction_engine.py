@@ -1,37 +1,50 @@
-"""Transaction Engine -- SOL/SPL transfers with policy enforcement and fee collection.
-
-Ported batch/semaphore pattern from moltfarm farm.py.
-"""
+"""Transaction Engine -- SOL/SPL transfers with policy enforcement and fee collection."""
 
 import asyncio
 import uuid
+from collections import defaultdict
 
 import httpx
+from solders.pubkey import Pubkey
+from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..core.config import get_settings
 from ..core.exceptions import (
     ApprovalRequiredError,
     IdempotencyConflictError,
+    InsufficientBalanceError,
+    NotFoundError,
     PolicyDeniedError,
+    TransactionFailedError,
 )
 from ..core.logging import get_logger
-from ..core.solana import transfer_sol
+from ..core.solana import (
+    MAX_TRANSFERS_PER_TX,
+    build_sol_transfers,
+    get_balance,
+    get_blockhash_provider,
+    get_rpc_client,
+    submit_transaction,
+    transfer_sol,
+)
 from ..models.transaction import Transaction
+from ..models.wallet import Wallet
+from .balance_tracker import invalidate_balances
 from .fee_collector import FeeCollector
 from .permission_engine import PermissionEngine
 from .wallet_manager import WalletManager
 
 logger = get_logger(__name__)
 
-# Semaphore for batch transfers (from moltfarm pattern)
-BATCH_SEMAPHORE = asyncio.Semaphore(5)
+TX_FEE_LAMPORTS = 5000  # one signature
 
 
 class TransactionEngine:
-    def __init__(self, db: AsyncSession):
+    def __init__(self, db: AsyncSession, rpc: httpx.AsyncClient | None = None):
         self.db = db
-        self.wallet_mgr = WalletManager(db)
+        self.rpc = rpc or get_rpc_client()
+        self.wallet_mgr = WalletManager(db, rpc=self.rpc)
         self.permission_engine = PermissionEngine(db)
         self.fee_collector = FeeCollector()
 
@@ -92,41 +105,48 @@ class TransactionEngine:
             )
             raise ApprovalRequiredError(str(req.id))
 
-        # Calculate fee
-        fee_lamports = self.fee_collector.calculate_fee(amount_lamports, org_tier)
-        settings = get_settings()
+        # The evaluation now holds a spend reservation: give it back if the
+        # transfer cannot even be recorded
+        try:
+            # Calculate fee
+            fee_lamports = self.fee_collector.calculate_fee(amount_lamports, org_tier)
+            settings = get_settings()
 
-        # Create transaction record (pending)
-        tx_record = Transaction(
-            org_id=org_id,
-            agent_id=agent_id,
-            wallet_id=wallet_id,
-            tx_type="transfer_sol",
-            status="pending",
-            from_address=wallet.address,
-            to_address=to_address,
-            amount_lamports=amount_lamports,
-            platform_fee_lamports=fee_lamports,
-            idempotency_key=idempotency_key,
-            memo=memo,
-        )
-        self.db.add(tx_record)
-        await self.db.flush()
+            # Create transaction record (pending)
+            tx_record = Transaction(
+                org_id=org_id,
+                agent_id=agent_id,
+                wallet_id=wallet_id,
+                tx_type="transfer_sol",
+                status="pending",
+                from_address=wallet.address,
+                to_address=to_address,
+                amount_lamports=amount_lamports,
+                platform_fee_lamports=fee_lamports,
+                idempotency_key=idempotency_key,
+                memo=memo,
+            )
+            self.db.add(tx_record)
+            await self.db.flush()
+        except Exception:
+            await self.permission_engine.release_spend(evaluation, agent_id, wallet_id)
+            raise
 
         # Execute on-chain
         try:
-            keypair = self.wallet_mgr._decrypt_keypair(wallet)
-            async with httpx.AsyncClient(timeout=15) as client:
-                signature = await transfer_sol(
-                    client=client,
-                    from_keypair=keypair,
-                    to_address=to_address,
-                    lamports=amount_lamports,
-                    fee_lamports=fee_lamports,
-                    fee_recipient=settings.platform_wallet_address or None,
-                )
+            keypair = await self.wallet_mgr.decrypt_keypair(wallet)
+            signature = await transfer_sol(
+                client=self.rpc,
+                from_keypair=keypair,
+                to_address=to_address,
+                lamports=amount_lamports,
+                fee_lamports=fee_lamports,
+                fee_recipient=settings.platform_wallet_address or None,
+            )
             tx_record.signature = signature
+            tx_record.last_valid_block_height = getattr(signature, "last_valid_block_height", None)
             tx_record.status = "submitted"
+            await invalidate_balances(wallet.address, to_address, agent_ids=[wallet.agent_id])
             logger.info(
                 "transaction_submitted",
                 tx_id=str(tx_record.id),
@@ -135,8 +155,11 @@ class TransactionEngine:
                 fee=fee_lamports,
             )
         except Exception as e:
+            if tx_record.status != "pending":
+                raise  # submitted: the spend is real, the tx processor settles it
             tx_record.status = "failed"
             tx_record.error = str(e)
+            await self.permission_engine.release_spend(evaluation, agent_id, wallet_id)
             logger.error("transaction_failed", tx_id=str(tx_record.id), error=str(e))
 
         await self.db.flush()
@@ -148,38 +171,213 @@ class TransactionEngine:
         org_tier: str,
         transfers: list[dict],
     ) -> list[dict]:
-        """Execute multiple SOL transfers with semaphore-gated concurrency.
+        """Execute multiple SOL transfers, packed per source wallet.
+
+        Transfers from one wallet are policy-checked in a single pass, then
+        packed into as few signed transactions as fit MAX_TRANSFERS_PER_TX
+        instructions (one of them carrying the pack's summed platform fee)
+        and recorded with one bulk insert. Signatures are recorded before
+        sending: a pack the RPC rejects fails as a unit and releases its
+        spend, while an ambiguous send stays "submitted" for the
+        confirmation worker to settle.
 
-        Returns a list of dicts: {"transaction": Transaction, "error": str|None}
-        for each transfer, so callers know which succeeded and which failed.
+        Returns a list of dicts: {"transaction": Transaction|None, "error": str|None}
+        for each transfer, in input order, so callers know which succeeded
+        and which failed; "transaction" is None whenever "error" is set.
         """
-        results = []
-
-        async def _single(t: dict):
-            async with BATCH_SEMAPHORE:
-                return await self.transfer_sol(
-                    org_id=org_id,
-                    org_tier=org_tier,
-                    wallet_id=t["from_wallet_id"],
-                    to_address=t["to_address"],
-                    amount_lamports=int(t["amount_sol"] * 1e9),
-                    agent_id=t.get("agent_id"),
-                    memo=t.get("memo"),
-                    idempotency_key=t.get("idempotency_key"),
-                )
+        results = [{"transaction": None, "error": None} for _ in transfers]
+        amounts = [int(t["amount_sol"] * 1e9) for t in transfers]
 
-        tasks = [_single(t) for t in transfers]
-        completed = await asyncio.gather(*tasks, return_exceptions=True)
+        # Idempotency: one lookup for every key in the batch
+        keys = {t["idempotency_key"] for t in transfers if t.get("idempotency_key")}
+        existing = {}
+        if keys:
+            found = await self.db.execute(select(Transaction).where(Transaction.idempotency_key.in_(keys)))
+            existing = {tx.idempotency_key: tx for tx in found.scalars()}
 
-        for i, item in enumerate(completed):
-            if isinstance(item, Transaction):
-                results.append({"transaction": item, "error": None})
-            else:
-                logger.error("batch_transfer_error", index=i, error=str(item))
-                results.append({"transaction": None, "error": str(item)})
+        wallet_ids = {t["from_wallet_id"] for t in transfers}
+        found = await self.db.execute(select(Wallet).where(Wallet.id.in_(wallet_ids), Wallet.org_id == org_id))
+        wallets = {w.id: w for w in found.scalars()}
+
+        first_by_key: dict[str, int] = {}
+        repeats: list[tuple[int, int]] = []
+        scopes: dict[tuple, list[int]] = defaultdict(list)
+        for i, t in enumerate(transfers):
+            key = t.get("idempotency_key")
+            if key and (key in existing or key in first_by_key):
+                prior = existing.get(key) or transfers[first_by_key[key]]
+                prior_org = prior.org_id if key in existing else org_id
+                prior_amount = prior.amount_lamports if key in existing else amounts[first_by_key[key]]
+                if prior_org != org_id or prior_amount != amounts[i]:
+                    results[i]["error"] = str(
+                        IdempotencyConflictError(f"Idempotency key '{key}' already used with different params")
+                    )
+                elif key in existing:
+                    results[i]["transaction"] = existing[key]
+                else:
+                    repeats.append((i, first_by_key[key]))
+                continue
+            if key:
+                first_by_key[key] = i
+            if t["from_wallet_id"] not in wallets:
+                results[i]["error"] = str(NotFoundError("Wallet", str(t["from_wallet_id"])))
+                continue
+            try:
+                Pubkey.from_string(t["to_address"])
+            except ValueError as e:
+                results[i]["error"] = f"Invalid destination {t['to_address']}: {e}"
+                continue
+            scopes[(t["from_wallet_id"], t.get("agent_id"))].append(i)
+
+        # Policy: one evaluation pass per wallet/agent scope
+        allowed: dict[uuid.UUID, list[tuple[int, object]]] = defaultdict(list)
+        for (wallet_id, agent_id), indices in scopes.items():
+            evaluations = await self.permission_engine.evaluate_batch(
+                org_id=org_id,
+                agent_id=agent_id,
+                wallet_id=wallet_id,
+                transfers=[(transfers[i]["to_address"], amounts[i]) for i in indices],
+            )
+            for i, evaluation in zip(indices, evaluations):
+                if evaluation.outcome == "deny":
+                    results[i]["error"] = str(PolicyDeniedError(evaluation.denied_by, evaluation.denial_reason))
+                elif evaluation.outcome == "require_approval":
+                    t = transfers[i]
+                    req = await self.permission_engine.create_approval_request(
+                        org_id=org_id,
+                        transaction_request={
+                            "wallet_id": str(wallet_id),
+                            "to_address": t["to_address"],
+                            "amount_lamports": amounts[i],
+                            "agent_id": str(agent_id) if agent_id else None,
+                            "memo": t.get("memo"),
+                        },
+                        policy_id=evaluation.approval_policy_id,
+                    )
+                    results[i]["error"] = str(ApprovalRequiredError(str(req.id)))
+                else:
+                    allowed[wallet_id].append((i, evaluation))
 
+        if allowed:
+            await self._send_packed(org_id, org_tier, transfers, amounts, wallets, allowed, results)
+
+        for i, first in repeats:
+            results[i] = dict(results[first])
+        for i, r in enumerate(results):
+            if r["error"]:
+                logger.error("batch_transfer_error", index=i, error=r["error"])
         return results
 
+    async def _send_packed(self, org_id, org_tier, transfers, amounts, wallets, allowed, results) -> None:
+        """Pack each wallet's allowed transfers, record them, then send the packs."""
+        settings = get_settings()
+        fee_recipient = settings.platform_wallet_address or None
+        per_pack = MAX_TRANSFERS_PER_TX - 1 if fee_recipient else MAX_TRANSFERS_PER_TX
+
+        async def release(items, error: str) -> None:
+            for i, evaluation in items:
+                results[i]["error"] = error
+                await self.permission_engine.release_spend(
+                    evaluation, transfers[i].get("agent_id"), transfers[i]["from_wallet_id"]
+                )
+
+        # Reservations are held from here on: if packing or recording fails
+        # nothing has been sent, so give back every one not yet released
+        try:
+            fees = {
+                i: self.fee_collector.calculate_fee(amounts[i], org_tier)
+                for items in allowed.values()
+                for i, _ in items
+            }
+
+            wallet_ids = list(allowed)
+            balances, cached = await asyncio.gather(
+                asyncio.gather(
+                    *(get_balance(self.rpc, wallets[w].address) for w in wallet_ids), return_exceptions=True
+                ),
+                get_blockhash_provider().get(self.rpc),
+            )
+
+            packs = []  # (wallet, signed tx, items, rows)
+            for wallet_id, balance in zip(wallet_ids, balances):
+                wallet, items = wallets[wallet_id], allowed[wallet_id]
+                if isinstance(balance, BaseException):
+                    await release(items, str(balance))
+                    continue
+                try:
+                    keypair = await self.wallet_mgr.decrypt_keypair(wallet)
+                except Exception as e:
+                    await release(items, str(e))
+                    continue
+                available = balance
+                for start in range(0, len(items), per_pack):
+                    pack = items[start : start + per_pack]
+                    fee_total = sum(fees[i] for i, _ in pack)
+                    needed = sum(amounts[i] for i, _ in pack) + fee_total + TX_FEE_LAMPORTS
+                    if needed > available:
+                        await release(pack, str(InsufficientBalanceError(available=available, required=needed)))
+                        continue
+                    instructions = [(transfers[i]["to_address"], amounts[i]) for i, _ in pack]
+                    if fee_recipient and fee_total:
+                        instructions.append((fee_recipient, fee_total))
+                    tx = build_sol_transfers(keypair, instructions, cached.blockhash)
+                    signature = str(tx.signatures[0])
+                    rows = [
+                        Transaction(
+                            org_id=org_id,
+                            agent_id=transfers[i].get("agent_id"),
+                            wallet_id=wallet_id,
+                            tx_type="transfer_sol",
+                            status="submitted",
+                            from_address=wallet.address,
+                            to_address=transfers[i]["to_address"],
+                            amount_lamports=amounts[i],
+                            platform_fee_lamports=fees[i],
+                            idempotency_key=transfers[i].get("idempotency_key"),
+                            memo=transfers[i].get("memo"),
+                            signature=signature,
+                            last_valid_block_height=cached.last_valid_block_height,
+                        )
+                        for i, _ in pack
+                    ]
+                    packs.append((wallet, tx, pack, rows))
+                    available -= needed
+
+            if not packs:
+                return
+            # Record every pack's rows (and signature) in one bulk insert before sending
+            self.db.add_all([row for _, _, _, rows in packs for row in rows])
+            await self.db.flush()
+        except Exception as e:
+            await release(
+                [(i, ev) for items in allowed.values() for i, ev in items if results[i]["error"] is None], str(e)
+            )
+            raise
+
+        sent = await asyncio.gather(
+            *(submit_transaction(self.rpc, bytes(tx)) for _, tx, _, _ in packs), return_exceptions=True
+        )
+        for (wallet, tx, pack, rows), outcome in zip(packs, sent):
+            signature = str(tx.signatures[0])
+            if isinstance(outcome, TransactionFailedError):
+                for row in rows:
+                    row.status = "failed"
+                    row.error = str(outcome)
+                await release(pack, str(outcome))
+                logger.error("batch_pack_failed", signature=signature[:24], transfers=len(pack), error=str(outcome))
+                continue
+            if isinstance(outcome, BaseException):
+                # Stays "submitted": settled from the signature once it lands or its blockhash expires
+                logger.warning(
+                    "batch_pack_send_failed", signature=signature[:24], transfers=len(pack), error=str(outcome)
+                )
+            else:
+                logger.info("batch_pack_submitted", signature=signature[:24], transfers=len(pack))
+            for (i, _), row in zip(pack, rows):
+                results[i]["transaction"] = row
+            await invalidate_balances(wallet.address, *(row.to_address for row in rows), agent_ids=[wallet.agent_id])
+        await self.db.flush()
+
     async def get_transaction(self, tx_id: uuid.UUID, org_id: uuid.UUID) -> Transaction:
         from ..core.exceptions import NotFoundError
 
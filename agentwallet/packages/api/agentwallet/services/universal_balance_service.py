@@ -1,493 +1,420 @@
-"""Unified cross-chain balance aggregation."""
-
+"""Unified cross-chain balance aggregation.
+
+On-chain holdings are read by fanning out every wallet's RPC calls at once
+(SOL balance and SPL token accounts per Solana wallet, native balance per
+EVM address) under a process-wide concurrency budget, then priced in a
+single lookup against the shared price oracle. The priced holdings are kept
+as a Redis snapshot per agent: a fresh snapshot is served as-is, a stale one
+is served while a background refresh replaces it, and only a missing or
+expired one makes the caller wait for the crawl. A crawl in which any
+wallet read failed is returned but never stored as the snapshot, and a
+transfer drops the snapshot of the agent that spent. Escrow locks and
+pending transactions are read from the database on every call.
+"""
+
+import asyncio
+import json
+import time
 import uuid
+from collections import defaultdict
+from datetime import datetime, timezone
 from decimal import Decimal
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List
 
-from sqlalchemy import func, select
+import httpx
+from sqlalchemy import func, or_, select
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload
 
+from ..core.config import get_settings
+from ..core.database import get_session_factory
+from ..core.evm import get_native_balance
 from ..core.exceptions import NotFoundError
 from ..core.logging import get_logger
+from ..core.redis_client import get_redis
+from ..core.solana import get_balance, get_rpc_client, get_token_accounts
 from ..models.agent import Agent
+from ..models.erc8004_identity import EVMWallet
 from ..models.escrow import Escrow
 from ..models.policy import Policy
 from ..models.transaction import Transaction
 from ..models.wallet import Wallet
+from .balance_tracker import balance_snapshot_key
+from .spend_ledger import SpendLedger
+from .token_prices import evm_chain, get_price_oracle, token_info
 
 logger = get_logger(__name__)
 
+EVM_DECIMALS = 18
+
+_budget: asyncio.Semaphore | None = None
+# agent id -> background snapshot refresh in flight
+_revalidating: Dict[uuid.UUID, asyncio.Task] = {}
+
+
+def _rpc_budget() -> asyncio.Semaphore:
+    """Process-wide cap on concurrent balance RPC calls."""
+    global _budget
+    if _budget is None:
+        _budget = asyncio.Semaphore(get_settings().balance_rpc_concurrency)
+    return _budget
+
+
+async def _bounded(call):
+    async with _rpc_budget():
+        return await call
+
 
 class UniversalBalanceService:
     """Unified cross-chain balance aggregation."""
 
-    def __init__(self, session: AsyncSession):
+    def __init__(
+        self,
+        session: AsyncSession,
+        rpc: httpx.AsyncClient | None = None,
+        evm_rpc: httpx.AsyncClient | None = None,
+    ):
         self.session = session
+        self.rpc = rpc or get_rpc_client()
+        self.evm_rpc = evm_rpc or get_rpc_client(get_settings().evm_rpc_url)
 
     async def get_universal_balance(self, agent_id: uuid.UUID) -> Dict[str, Any]:
         """Get unified balance across all wallets and tokens.
         Returns total USD value + per-chain breakdown."""
+        agent = await self._get_agent(agent_id)
+        return await self._balance(agent, await self._holdings(agent))
 
-        # Verify agent exists
-        agent_result = await self.session.execute(
-            select(Agent).options(joinedload(Agent.wallets)).where(Agent.id == agent_id)
-        )
-        agent = agent_result.scalar_one_or_none()
-        if not agent:
-            raise NotFoundError("Agent", str(agent_id))
-
-        total_balance_usd = Decimal("0")
-        chain_balances = {}
-        token_balances = {}
-
-        # Get Solana balances
-        solana_data = await self._get_solana_balances(agent.wallets)
-        if solana_data:
-            total_balance_usd += solana_data["total_usd"]
-            chain_balances["solana"] = solana_data
-            for token, balance in solana_data["tokens"].items():
-                if token not in token_balances:
-                    token_balances[token] = {"total_amount": Decimal("0"), "total_usd": Decimal("0"), "chains": {}}
-                token_balances[token]["total_amount"] += balance["amount"]
-                token_balances[token]["total_usd"] += balance["usd_value"]
-                token_balances[token]["chains"]["solana"] = balance
-
-        # Get EVM balances (Ethereum, Polygon, etc.)
-        evm_data = await self._get_evm_balances(agent)
-        for chain_name, chain_data in evm_data.items():
-            if chain_data:
-                total_balance_usd += chain_data["total_usd"]
-                chain_balances[chain_name] = chain_data
-                for token, balance in chain_data["tokens"].items():
-                    if token not in token_balances:
-                        token_balances[token] = {"total_amount": Decimal("0"), "total_usd": Decimal("0"), "chains": {}}
-                    token_balances[token]["total_amount"] += balance["amount"]
-                    token_balances[token]["total_usd"] += balance["usd_value"]
-                    token_balances[token]["chains"][chain_name] = balance
-
-        # Get pending transactions that might affect balance
-        pending_txs = await self._get_pending_transactions(agent_id)
-
-        # Calculate available vs locked balances
-        locked_balances = await self._get_locked_balances(agent_id)
-
-        return {
-            "agent_id": str(agent_id),
-            "total_balance_usd": float(total_balance_usd),
-            "available_balance_usd": float(total_balance_usd - locked_balances.get("total_usd", Decimal("0"))),
-            "locked_balance_usd": float(locked_balances.get("total_usd", Decimal("0"))),
-            "chain_breakdown": {
-                chain: {
-                    "total_usd": float(data["total_usd"]),
-                    "native_token": data.get("native_token", {}),
-                    "token_count": len(data["tokens"]),
-                    "tokens": {
-                        token: {
-                            "amount": float(balance["amount"]),
-                            "usd_value": float(balance["usd_value"]),
-                            "symbol": balance.get("symbol", token),
-                            "decimals": balance.get("decimals", 18),
-                        }
-                        for token, balance in data["tokens"].items()
-                    },
-                }
-                for chain, data in chain_balances.items()
-            },
-            "token_summary": {
-                token: {
-                    "total_amount": float(data["total_amount"]),
-                    "total_usd": float(data["total_usd"]),
-                    "chain_distribution": {
-                        chain: {"amount": float(balance["amount"]), "usd_value": float(balance["usd_value"])}
-                        for chain, balance in data["chains"].items()
-                    },
-                }
-                for token, data in token_balances.items()
-            },
-            "pending_transactions": pending_txs,
-            "locked_balances": locked_balances,
-            "last_updated": agent.updated_at.isoformat(),
-        }
+    async def refresh_balance_cache(self, agent_id: uuid.UUID) -> Dict[str, Any]:
+        """Force refresh of cached balance data."""
+        agent = await self._get_agent(agent_id)
+        return await self._balance(agent, await self._holdings(agent, force=True))
 
     async def get_spending_power(self, agent_id: uuid.UUID) -> Dict[str, Any]:
-        """How much can this agent spend (considering policies)?"""
+        """How much can this agent spend (considering policies)?
 
-        # Get universal balance first
-        balance_data = await self.get_universal_balance(agent_id)
+        Served from the balance snapshot, so it never waits on a chain crawl
+        while a usable snapshot exists.
+        """
+        agent = await self._get_agent(agent_id)
+        balance_data = await self._balance(agent, await self._holdings(agent))
+        policies = await self._get_spending_policies(agent)
+        spent_lamports = await self._get_daily_spending(agent)
 
-        # Get spending policies for the agent
-        policies = await self._get_spending_policies(agent_id)
-
-        # Calculate spending limits per token/chain
         spending_limits = {}
         available_spending = {}
-
         for token, token_data in balance_data["token_summary"].items():
-            available_amount = token_data["total_amount"]
-            available_usd = token_data["total_usd"]
-
-            # Apply policy limits
-            token_limits = await self._apply_policy_limits(agent_id, token, available_amount, available_usd, policies)
-
-            spending_limits[token] = token_limits
+            limits = self._apply_policy_limits(token, token_data, policies, spent_lamports)
+            spending_limits[token] = limits
             available_spending[token] = {
-                "max_amount": min(available_amount, token_limits["daily_limit_amount"]),
-                "max_usd": min(available_usd, token_limits["daily_limit_usd"]),
-                "remaining_today": token_limits["remaining_today"],
+                "max_amount": min(token_data["total_amount"], limits["remaining_today"]),
+                "max_usd": min(token_data["total_usd"], limits["daily_limit_usd"]),
+                "remaining_today": limits["remaining_today"],
                 "chain_distribution": token_data["chain_distribution"],
             }
 
-        # Calculate total spending power in USD
-        total_spending_power_usd = sum(spending["max_usd"] for spending in available_spending.values())
-
         return {
             "agent_id": str(agent_id),
-            "total_spending_power_usd": total_spending_power_usd,
+            "total_spending_power_usd": sum(spending["max_usd"] for spending in available_spending.values()),
             "available_spending": available_spending,
             "spending_limits": spending_limits,
             "policies_applied": [
-                {"policy_id": str(policy.id), "name": policy.name, "type": policy.type, "is_active": policy.is_active}
-                for policy in policies
+                {"policy_id": str(p.id), "name": p.name, "scope_type": p.scope_type, "enabled": p.enabled}
+                for p in policies
             ],
             "balance_snapshot": {
                 "total_balance_usd": balance_data["total_balance_usd"],
                 "available_balance_usd": balance_data["available_balance_usd"],
                 "locked_balance_usd": balance_data["locked_balance_usd"],
+                "last_updated": balance_data["last_updated"],
             },
         }
 
-    async def _get_solana_balances(self, wallets: List[Wallet]) -> Optional[Dict[str, Any]]:
-        """Get balances for all Solana wallets."""
-
-        solana_wallets = [w for w in wallets if w.chain == "solana"]
-        if not solana_wallets:
-            return None
-
-        total_usd = Decimal("0")
-        all_tokens = {}
-        native_sol = Decimal("0")
-
-        for wallet in solana_wallets:
-            try:
-                # Get SOL balance
-                sol_balance = await self.solana_client.get_balance(wallet.address)
-                sol_usd = await self._get_token_price("SOL") * Decimal(str(sol_balance))
-                native_sol += Decimal(str(sol_balance))
-                total_usd += sol_usd
-
-                # Get SPL token balances
-                token_balances = await self.solana_client.get_token_balances(wallet.address)
-
-                for token_mint, balance_data in token_balances.items():
-                    token_symbol = await self._get_token_symbol(token_mint, "solana")
-                    amount = Decimal(str(balance_data["amount"]))
-                    decimals = balance_data["decimals"]
-
-                    # Convert to human readable amount
-                    readable_amount = amount / (10**decimals)
-
-                    # Get USD value
-                    token_price = await self._get_token_price(token_symbol)
-                    usd_value = readable_amount * token_price
-
-                    if token_symbol not in all_tokens:
-                        all_tokens[token_symbol] = {
-                            "amount": Decimal("0"),
-                            "usd_value": Decimal("0"),
-                            "symbol": token_symbol,
-                            "decimals": decimals,
-                            "mint": token_mint,
-                        }
-
-                    all_tokens[token_symbol]["amount"] += readable_amount
-                    all_tokens[token_symbol]["usd_value"] += usd_value
-                    total_usd += usd_value
-
-            except Exception as e:
-                # Log error but continue with other wallets
-                logger.warning("balance_fetch_error", wallet=wallet.address[:16], error=str(e))
-                continue
-
-        # Add SOL to tokens if there's any balance
-        if native_sol > 0:
-            sol_price = await self._get_token_price("SOL")
-            sol_usd = native_sol * sol_price
-            all_tokens["SOL"] = {
-                "amount": native_sol,
-                "usd_value": sol_usd,
-                "symbol": "SOL",
-                "decimals": 9,
-                "mint": "native",
-            }
-
-        return {
-            "total_usd": total_usd,
-            "native_token": {
-                "symbol": "SOL",
-                "amount": float(native_sol),
-                "usd_value": float(native_sol * await self._get_token_price("SOL")),
-            },
-            "tokens": all_tokens,
-            "wallet_count": len(solana_wallets),
-        }
-
-    async def _get_evm_balances(self, agent: Agent) -> Dict[str, Optional[Dict[str, Any]]]:
-        """Get balances for all EVM-compatible chains."""
-
-        evm_balances = {}
-
-        # Check if agent has EVM addresses
-        if not agent.evm_address:
-            return {}
-
-        # Supported EVM chains
-        chains = ["ethereum", "polygon", "bsc", "arbitrum", "optimism"]
-
-        for chain in chains:
-            try:
-                chain_data = await self._get_chain_balances(agent.evm_address, chain)
-                evm_balances[chain] = chain_data
-            except Exception as e:
-                logger.warning("evm_balance_fetch_error", chain=chain, error=str(e))
-                evm_balances[chain] = None
+    async def _get_agent(self, agent_id: uuid.UUID) -> Agent:
+        agent = await self.session.get(Agent, agent_id)
+        if not agent:
+            raise NotFoundError("Agent", str(agent_id))
+        return agent
+
+    # -- Snapshot ---------------------------------------------------------
+
+    async def _holdings(self, agent: Agent, force: bool = False) -> Dict[str, Any]:
+        """The agent's priced on-chain holdings, from the snapshot when usable."""
+        settings = get_settings()
+        if not force:
+            snapshot = await _load_snapshot(agent.id)
+            if snapshot is not None:
+                age = time.time() - snapshot["computed_at"]
+                if age < settings.balance_snapshot_fresh_seconds:
+                    return snapshot
+                if age < settings.balance_snapshot_stale_seconds:
+                    _revalidate(agent.id)
+                    return snapshot
+
+        snapshot = await self._crawl(agent)
+        await _store_snapshot(agent.id, snapshot)
+        return snapshot
+
+    async def _crawl(self, agent: Agent) -> Dict[str, Any]:
+        """Read every wallet's balances concurrently and price them."""
+        result = await self.session.execute(
+            select(Wallet.address).where(Wallet.agent_id == agent.id, Wallet.is_active).order_by(Wallet.created_at)
+        )
+        solana_addresses = list(result.scalars().all())
 
-        return evm_balances
+        chain_id = get_settings().evm_chain_id
+        result = await self.session.execute(
+            select(EVMWallet.address).where(EVMWallet.agent_id == agent.id, EVMWallet.chain_id == chain_id)
+        )
+        evm_addresses = list(dict.fromkeys(a.lower() for a in [agent.evm_address, *result.scalars().all()] if a))
 
-    async def _get_chain_balances(self, address: str, chain: str) -> Dict[str, Any]:
-        """Get balances for a specific EVM chain."""
+        calls = [
+            asyncio.gather(_bounded(get_balance(self.rpc, a)), _bounded(get_token_accounts(self.rpc, a)))
+            for a in solana_addresses
+        ]
+        calls += [_bounded(get_native_balance(self.evm_rpc, a)) for a in evm_addresses]
+        results = await asyncio.gather(*calls, return_exceptions=True)
+        solana_results, evm_results = results[: len(solana_addresses)], results[len(solana_addresses) :]
+
+        # chain -> symbol -> {raw, decimals, mint|contract}
+        holdings: Dict[str, Dict[str, dict]] = {}
+        native: Dict[str, str] = {}
+        errors = 0
+        if solana_addresses:
+            chain = holdings["solana"] = {}
+            native["solana"] = "SOL"
+            _add(chain, "SOL", 0, 9, mint="native")
+            for address, outcome in zip(solana_addresses, solana_results):
+                if isinstance(outcome, BaseException):
+                    errors += 1
+                    logger.warning("balance_fetch_error", wallet=address[:16], error=str(outcome))
+                    continue
+                lamports, accounts = outcome
+                _add(chain, "SOL", lamports, 9, mint="native")
+                for account in accounts:
+                    info = token_info(account["mint"], account["decimals"])
+                    _add(chain, info.symbol, account["amount"], account["decimals"], mint=account["mint"])
+        if evm_addresses:
+            chain_name, symbol = evm_chain(chain_id)
+            chain = holdings[chain_name] = {}
+            native[chain_name] = symbol
+            _add(chain, symbol, 0, EVM_DECIMALS, contract="native")
+            for address, outcome in zip(evm_addresses, evm_results):
+                if isinstance(outcome, BaseException):
+                    errors += 1
+                    logger.warning(
+                        "evm_balance_fetch_error", chain=chain_name, address=address[:10], error=str(outcome)
+                    )
+                    continue
+                _add(chain, symbol, outcome, EVM_DECIMALS, contract="native")
+
+        prices = await get_price_oracle().prices({s for chain in holdings.values() for s in chain})
 
         total_usd = Decimal("0")
-        tokens = {}
-
-        # Get native token balance (ETH, MATIC, BNB, etc.)
-        native_symbol = self._get_native_token_symbol(chain)
-        native_balance = await self.evm_client.get_balance(address, chain)
-        native_price = await self._get_token_price(native_symbol)
-        native_usd = Decimal(str(native_balance)) * native_price
-
-        total_usd += native_usd
-        tokens[native_symbol] = {
-            "amount": Decimal(str(native_balance)),
-            "usd_value": native_usd,
-            "symbol": native_symbol,
-            "decimals": 18,
-            "contract": "native",
-        }
-
-        # Get ERC-20 token balances
-        erc20_balances = await self.evm_client.get_erc20_balances(address, chain)
-
-        for contract_address, balance_data in erc20_balances.items():
-            symbol = balance_data["symbol"]
-            amount = Decimal(str(balance_data["balance"]))
-            decimals = balance_data["decimals"]
-
-            # Convert to human readable
-            readable_amount = amount / (10**decimals)
-
-            # Get price and USD value
-            token_price = await self._get_token_price(symbol)
-            usd_value = readable_amount * token_price
-
-            tokens[symbol] = {
-                "amount": readable_amount,
-                "usd_value": usd_value,
-                "symbol": symbol,
-                "decimals": decimals,
-                "contract": contract_address,
+        chains: Dict[str, Any] = {}
+        tokens: Dict[str, Any] = defaultdict(lambda: {"total_amount": 0.0, "total_usd": 0.0, "chain_distribution": {}})
+        for chain_name, chain in holdings.items():
+            chain_usd = Decimal("0")
+            priced = {}
+            for symbol, held in chain.items():
+                amount = Decimal(held.pop("raw")) / Decimal(10) ** held["decimals"]
+                usd = amount * prices[symbol]
+                chain_usd += usd
+                priced[symbol] = {"amount": float(amount), "usd_value": float(usd), "symbol": symbol, **held}
+                summary = tokens[symbol]
+                summary["total_amount"] += float(amount)
+                summary["total_usd"] += float(usd)
+                summary["chain_distribution"][chain_name] = {"amount": float(amount), "usd_value": float(usd)}
+            native_token = priced[native[chain_name]]
+            chains[chain_name] = {
+                "total_usd": float(chain_usd),
+                "native_token": {k: native_token[k] for k in ("symbol", "amount", "usd_value")},
+                "token_count": len(priced),
+                "tokens": priced,
             }
-
-            total_usd += usd_value
+            total_usd += chain_usd
 
         return {
-            "total_usd": total_usd,
-            "native_token": {"symbol": native_symbol, "amount": float(native_balance), "usd_value": float(native_usd)},
-            "tokens": tokens,
+            "computed_at": time.time(),
+            "total_usd": float(total_usd),
+            "chains": chains,
+            "tokens": dict(tokens),
+            "failed_wallets": errors,
         }
 
-    def _get_native_token_symbol(self, chain: str) -> str:
-        """Get the native token symbol for a chain."""
+    # -- Response ---------------------------------------------------------
 
-        native_tokens = {
-            "ethereum": "ETH",
-            "polygon": "MATIC",
-            "bsc": "BNB",
-            "arbitrum": "ETH",
-            "optimism": "ETH",
-            "avalanche": "AVAX",
+    async def _balance(self, agent: Agent, snapshot: Dict[str, Any]) -> Dict[str, Any]:
+        locked_balances = await self._get_locked_balances(agent.id)
+        pending_txs = await self._get_pending_transactions(agent.id)
+        total = snapshot["total_usd"]
+        locked = locked_balances["total_usd"]
+        computed_at = snapshot["computed_at"]
+        return {
+            "agent_id": str(agent.id),
+            "total_balance_usd": total,
+            "available_balance_usd": total - locked,
+            "locked_balance_usd": locked,
+            "chain_breakdown": snapshot["chains"],
+            "token_summary": snapshot["tokens"],
+            "pending_transactions": pending_txs,
+            "locked_balances": locked_balances,
+            "last_updated": datetime.fromtimestamp(computed_at, timezone.utc).isoformat(),
+            "snapshot_age_seconds": round(max(0.0, time.time() - computed_at), 3),
         }
-        return native_tokens.get(chain, "ETH")
 
     async def _get_pending_transactions(self, agent_id: uuid.UUID) -> List[Dict[str, Any]]:
         """Get pending transactions that might affect balance."""
-
         result = await self.session.execute(
             select(Transaction)
             .join(Wallet, Transaction.wallet_id == Wallet.id)
-            .where(Wallet.agent_id == agent_id, Transaction.status.in_(["pending", "processing"]))
+            .where(Wallet.agent_id == agent_id, Transaction.status.in_(["pending", "submitted"]))
             .order_by(Transaction.created_at.desc())
             .limit(10)
         )
-
-        pending_txs = result.scalars().all()
-
         return [
             {
                 "transaction_id": str(tx.id),
-                "type": tx.type,
+                "type": tx.tx_type,
                 "amount_lamports": tx.amount_lamports,
                 "token_mint": tx.token_mint,
                 "status": tx.status,
-                "created_at": tx.created_at.isoformat(),
-                "estimated_completion": tx.created_at + tx.estimated_completion_time
-                if hasattr(tx, "estimated_completion_time")
-                else None,
+                "created_at": tx.created_at.isoformat() if tx.created_at else None,
             }
-            for tx in pending_txs
+            for tx in result.scalars().all()
         ]
 
     async def _get_locked_balances(self, agent_id: uuid.UUID) -> Dict[str, Any]:
-        """Get balances locked in escrows and pending transactions."""
-
-        # Get locked balances from active escrows
-        escrow_result = await self.session.execute(
+        """Get balances locked in escrows."""
+        result = await self.session.execute(
             select(
-                func.sum(Escrow.amount_lamports).label("total_locked"),
                 Escrow.token_mint,
+                func.sum(Escrow.amount_lamports).label("total_locked"),
                 func.count(Escrow.id).label("escrow_count"),
             )
             .join(Wallet, Escrow.funder_wallet_id == Wallet.id)
             .where(Wallet.agent_id == agent_id, Escrow.status.in_(["created", "funded"]))
             .group_by(Escrow.token_mint)
         )
+        rows = [(token_info(row.token_mint), row) for row in result.all()]
+        prices = await get_price_oracle().prices({info.symbol for info, _ in rows})
 
         locked_by_token = {}
         total_locked_usd = Decimal("0")
-
-        for row in escrow_result.all():
-            token_mint = row.token_mint or "SOL"
-            token_symbol = await self._get_token_symbol(token_mint, "solana")
+        for info, row in rows:
             amount_lamports = row.total_locked or 0
-
-            # Convert to human readable amount
-            if token_symbol == "SOL":
-                readable_amount = Decimal(str(amount_lamports)) / Decimal("1000000000")  # 9 decimals
-            else:
-                readable_amount = Decimal(str(amount_lamports)) / Decimal(
-                    "1000000"
-                )  # Assume 6 decimals for most tokens
-
-            # Get USD value
-            token_price = await self._get_token_price(token_symbol)
-            usd_value = readable_amount * token_price
-
-            locked_by_token[token_symbol] = {
-                "amount": float(readable_amount),
+            amount = Decimal(amount_lamports) / Decimal(10) ** info.decimals
+            usd_value = amount * prices[info.symbol]
+            locked_by_token[info.symbol] = {
+                "amount": float(amount),
                 "amount_lamports": amount_lamports,
                 "usd_value": float(usd_value),
                 "escrow_count": row.escrow_count,
             }
-
             total_locked_usd += usd_value
 
         return {
-            "total_usd": total_locked_usd,
+            "total_usd": float(total_locked_usd),
             "by_token": locked_by_token,
             "total_escrows": sum(data["escrow_count"] for data in locked_by_token.values()),
         }
 
-    async def _get_spending_policies(self, agent_id: uuid.UUID) -> List[Policy]:
-        """Get active spending policies for an agent."""
+    # -- Policies ---------------------------------------------------------
 
+    async def _get_spending_policies(self, agent: Agent) -> List[Policy]:
+        """Enabled org-wide and agent-scoped policies that apply to the agent."""
         result = await self.session.execute(
             select(Policy)
-            .join(Agent, Policy.agent_id == Agent.id)
-            .where(Agent.id == agent_id, Policy.is_active, Policy.type.in_(["spending_limit", "daily_limit"]))
+            .where(
+                Policy.org_id == agent.org_id,
+                Policy.enabled,
+                or_(Policy.scope_type == "org", (Policy.scope_type == "agent") & (Policy.scope_id == agent.id)),
+            )
+            .order_by(Policy.priority)
         )
-
-        return result.scalars().all()
-
-    async def _apply_policy_limits(
-        self, agent_id: uuid.UUID, token: str, available_amount: float, available_usd: float, policies: List[Policy]
+        return list(result.scalars().all())
+
+    async def _get_daily_spending(self, agent: Agent) -> int:
+        """Lamports the agent has spent today across its wallets."""
+        result = await self.session.execute(select(Wallet.id).where(Wallet.agent_id == agent.id))
+        spent = await SpendLedger(self.session).get_many(agent.org_id, agent.id, list(result.scalars().all()))
+        return sum(spent.values())
+
+    def _apply_policy_limits(
+        self,
+        token: str,
+        token_data: Dict[str, Any],
+        policies: List[Policy],
+        spent_lamports: int,
     ) -> Dict[str, Any]:
         """Apply policy limits to determine actual spending power."""
-
+        available_amount = token_data["total_amount"]
         daily_limit_amount = available_amount
-        daily_limit_usd = available_usd
+        daily_limit_usd = token_data["total_usd"]
+        price = daily_limit_usd / available_amount if available_amount else 0.0
+        spent = spent_lamports / 1e9 if token == "SOL" else 0.0
 
-        # Apply each policy
         for policy in policies:
             rules = policy.rules or {}
-
-            # Token-specific limits
-            if "tokens" in rules and token in rules["tokens"]:
-                token_rules = rules["tokens"][token]
-                if "daily_limit" in token_rules:
-                    daily_limit_amount = min(daily_limit_amount, token_rules["daily_limit"])
-
-            # USD limits
+            if token == "SOL" and rules.get("daily_limit_lamports") is not None:
+                daily_limit_amount = min(daily_limit_amount, rules["daily_limit_lamports"] / 1e9)
+            token_rules = (rules.get("tokens") or {}).get(token) or {}
+            if "daily_limit" in token_rules:
+                daily_limit_amount = min(daily_limit_amount, token_rules["daily_limit"])
             if "daily_usd_limit" in rules:
                 daily_limit_usd = min(daily_limit_usd, rules["daily_usd_limit"])
 
-        # Calculate remaining daily limit (would need to track daily spending)
-        daily_spent = await self._get_daily_spending(agent_id, token)
-        remaining_today = max(0, daily_limit_amount - daily_spent["amount"])
-
         return {
             "daily_limit_amount": daily_limit_amount,
-            "daily_limit_usd": daily_limit_usd,
-            "daily_spent_amount": daily_spent["amount"],
-            "daily_spent_usd": daily_spent["usd"],
-            "remaining_today": remaining_today,
+            "daily_limit_usd": min(daily_limit_usd, daily_limit_amount * price),
+            "daily_spent_amount": spent,
+            "daily_spent_usd": spent * price,
+            "remaining_today": max(0.0, daily_limit_amount - spent),
             "reset_time": "00:00:00 UTC",  # Daily limits reset at midnight UTC
         }
 
-    async def _get_daily_spending(self, agent_id: uuid.UUID, token: str) -> Dict[str, float]:
-        """Get today's spending for an agent in a specific token."""
-
-        from datetime import date
-
-        date.today()
-
-        # This would query transaction history for today
-        # Simplified implementation - would need proper date filtering
-        return {
-            "amount": 0.0,  # Amount of token spent today
-            "usd": 0.0,  # USD value spent today
-        }
-
-    async def _get_token_price(self, symbol: str) -> Decimal:
-        """Get current token price in USD."""
-
-        # This would integrate with a price API like CoinGecko, CoinMarketCap, or Jupiter
-        # For now, return mock prices
-        mock_prices = {
-            "SOL": Decimal("100.0"),
-            "USDC": Decimal("1.0"),
-            "ETH": Decimal("3000.0"),
-            "MATIC": Decimal("0.8"),
-            "BNB": Decimal("300.0"),
-            "AVAX": Decimal("35.0"),
-        }
-
-        return mock_prices.get(symbol, Decimal("0.0"))
-
-    async def _get_token_symbol(self, mint_address: str, chain: str) -> str:
-        """Get token symbol from mint address."""
-
-        # This would query a token registry or on-chain data
-        # For now, return the mint address or a known symbol
-        known_tokens = {
-            "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v": "USDC",  # USDC on Solana
-            "So11111111111111111111111111111111111111112": "SOL",  # Wrapped SOL
-        }
-
-        return known_tokens.get(mint_address, mint_address[:8] + "...")
-
-    async def refresh_balance_cache(self, agent_id: uuid.UUID) -> Dict[str, Any]:
-        """Force refresh of cached balance data."""
 
-        # This could implement caching with Redis to avoid repeated RPC calls
-        # For now, just return fresh data
-        return await self.get_universal_balance(agent_id)
+def _add(chain: Dict[str, dict], symbol: str, raw: int, decimals: int, **ids: str) -> None:
+    held = chain.setdefault(symbol, {"raw": 0, "decimals": decimals, **ids})
+    held["raw"] += raw
+
+
+async def _load_snapshot(agent_id: uuid.UUID) -> Dict[str, Any] | None:
+    try:
+        r = await get_redis()
+        raw = await r.get(balance_snapshot_key(agent_id))
+    except Exception:
+        return None
+    return json.loads(raw) if raw else None
+
+
+async def _store_snapshot(agent_id: uuid.UUID, snapshot: Dict[str, Any]) -> None:
+    if snapshot["failed_wallets"]:
+        # A partial crawl undercounts: serve it to this caller only, never as a snapshot
+        logger.info("balance_snapshot_skipped", agent_id=str(agent_id), failed_wallets=snapshot["failed_wallets"])
+        return
+    ttl = max(1, int(get_settings().balance_snapshot_stale_seconds))
+    try:
+        r = await get_redis()
+        await r.set(balance_snapshot_key(agent_id), json.dumps(snapshot), ex=ttl)
+    except Exception:
+        logger.debug("balance_snapshot_redis_unavailable", msg="Redis down — balances crawled on every call")
+
+
+def _revalidate(agent_id: uuid.UUID) -> None:
+    """Refresh the agent's snapshot in the background, once at a time."""
+    task = _revalidating.get(agent_id)
+    if task is not None and not task.done():
+        return
+    task = asyncio.create_task(_refresh_snapshot(agent_id))
+    _revalidating[agent_id] = task
+    task.add_done_callback(lambda _: _revalidating.pop(agent_id, None))
+
+
+async def _refresh_snapshot(agent_id: uuid.UUID) -> None:
+    try:
+        factory = get_session_factory()
+        async with factory() as db:
+            service = UniversalBalanceService(db)
+            agent = await service._get_agent(agent_id)
+            await _store_snapshot(agent_id, await service._crawl(agent))
+    except Exception as e:
+        logger.warning("balance_snapshot_refresh_failed", agent_id=str(agent_id), error=str(e))
@@ -164,29 +164,51 @@ class UsdcBillingService:
         return self._to_dict(sub, org.tier)
 
     async def get_subscription(self, org_id: uuid.UUID) -> dict:
-        """Return the current subscription state, lazily expiring overdue subs.
+        """Return the current subscription state.
 
-        If the paid period has ended the org is downgraded back to free.
+        Read-only: an overdue subscription is reported as expired on the free
+        tier, and the subscription_expiry worker makes the downgrade stick.
         """
         org = await self.db.get(Organization, org_id)
         if not org:
             raise NotFoundError("Organization not found")
 
         sub = await self._latest(org_id)
-        now = datetime.now(timezone.utc)
-
+        info = self._to_dict(sub, org.tier)
         period_end = _as_utc(sub.period_end) if sub else None
-        if sub and sub.status == "active" and period_end is not None and period_end < now:
+        if sub and sub.status == "active" and period_end is not None and period_end < datetime.now(timezone.utc):
+            info.update(status="expired", org_tier="free")
+        return info
+
+    async def expire_overdue(self, limit: int | None = None) -> list[uuid.UUID]:
+        """Expire active subscriptions whose paid period has ended.
+
+        Called by the subscription_expiry worker. An org drops back to free
+        only when the expired subscription is its latest one -- an older
+        plan running out must not undo a newer upgrade. Returns the ids of
+        the downgraded orgs so the caller can drop their cached auth after
+        committing.
+        """
+        now = datetime.now(timezone.utc)
+        query = (
+            select(BillingSubscription)
+            .where(BillingSubscription.status == "active", BillingSubscription.period_end < now)
+            .order_by(BillingSubscription.period_end)
+        )
+        if limit is not None:
+            query = query.limit(limit)
+        downgraded: list[uuid.UUID] = []
+        for sub in (await self.db.scalars(query)).all():
             sub.status = "expired"
-            org.tier = "free"
-            await self.db.flush()
-            logger.info(
-                "subscription_expired",
-                org_id=str(org_id),
-                tier=sub.tier,
-            )
-
-        return self._to_dict(sub, org.tier)
+            latest = await self._latest(sub.org_id)
+            if latest is not None and latest.id == sub.id:
+                org = await self.db.get(Organization, sub.org_id)
+                if org is not None:
+                    org.tier = "free"
+                    downgraded.append(sub.org_id)
+            logger.info("subscription_expired", org_id=str(sub.org_id), tier=sub.tier)
+        await self.db.flush()
+        return downgraded
 
     async def renew(
         self,
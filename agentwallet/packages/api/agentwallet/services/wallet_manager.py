@@ -3,6 +3,8 @@
 Never exposes private keys through the API layer.
 """
 
+import asyncio
+import json
 import uuid
 
 import httpx
@@ -10,12 +12,15 @@ from solders.keypair import Keypair
 from sqlalchemy import func, select
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.config import get_settings
 from ..core.exceptions import NotFoundError, TierLimitError
 from ..core.kms import get_key_manager
 from ..core.logging import get_logger
 from ..core.redis_client import CacheService
-from ..core.solana import get_balance, get_token_accounts
+from ..core.solana import get_balance, get_rpc_client, get_token_accounts
 from ..models.wallet import Wallet
+from .balance_tracker import balance_cache_key, track_balance
+from .data_keys import org_data_key
 
 logger = get_logger(__name__)
 
@@ -23,9 +28,15 @@ TIER_WALLET_LIMITS = {"free": 5, "pro": 50, "enterprise": 999999}
 
 
 class WalletManager:
-    def __init__(self, db: AsyncSession, cache: CacheService | None = None):
+    def __init__(
+        self,
+        db: AsyncSession,
+        cache: CacheService | None = None,
+        rpc: httpx.AsyncClient | None = None,
+    ):
         self.db = db
         self.cache = cache
+        self.rpc = rpc or get_rpc_client()
         self.km = get_key_manager()
 
     async def create_wallet(
@@ -46,7 +57,7 @@ class WalletManager:
         # Generate keypair
         kp = Keypair()
         address = str(kp.pubkey())
-        encrypted_key = self.km.encrypt(bytes(kp))
+        encrypted_key = await self.km.encrypt_async(bytes(kp), data_key=await org_data_key(self.db, org_id))
 
         wallet = Wallet(
             org_id=org_id,
@@ -95,20 +106,23 @@ class WalletManager:
         return list(result.scalars().all()), total or 0
 
     async def get_balance(self, wallet_id: uuid.UUID, org_id: uuid.UUID) -> dict:
-        """Get SOL + SPL token balances for a wallet. Uses Redis cache."""
+        """Get SOL + SPL token balances for a wallet. Uses Redis cache.
+
+        Entries are kept current by transfer invalidation and the balance
+        tracker (see services.balance_tracker), so they can live for minutes.
+        """
         wallet = await self.get_wallet(wallet_id, org_id)
+        key = balance_cache_key(wallet.address)
 
-        # Check cache
         if self.cache:
-            import json
-
-            cached = await self.cache.get(f"bal:{wallet.address}")
+            cached = await self.cache.get(key)
             if cached:
                 return json.loads(cached)
 
-        async with httpx.AsyncClient(timeout=15) as client:
-            lamports = await get_balance(client, wallet.address)
-            tokens = await get_token_accounts(client, wallet.address)
+        lamports, tokens = await asyncio.gather(
+            get_balance(self.rpc, wallet.address),
+            get_token_accounts(self.rpc, wallet.address),
+        )
 
         result = {
             "address": wallet.address,
@@ -117,15 +131,18 @@ class WalletManager:
             "tokens": tokens,
         }
 
-        # Cache for 30 seconds
         if self.cache:
-            import json
-
-            await self.cache.set(f"bal:{wallet.address}", json.dumps(result), ttl=30)
+            ttl = get_settings().balance_cache_seconds
+            await self.cache.set(key, json.dumps(result), ttl=ttl)
+            await track_balance(wallet.address, ttl)
 
         return result
 
-    def _decrypt_keypair(self, wallet: Wallet) -> Keypair:
-        """Decrypt wallet private key. Internal only -- never expose via API."""
-        raw = self.km.decrypt(wallet.encrypted_key)
+    async def decrypt_keypair(self, wallet: Wallet) -> Keypair:
+        """Decrypt wallet private key for signing. Internal only -- never expose via API.
+
+        KMS calls run off the event loop, and hot wallets' keys are served
+        from the key manager's short-lived secret cache when it is enabled.
+        """
+        raw = await self.km.decrypt_async(wallet.encrypted_key, cache=True)
         return Keypair.from_bytes(raw)
@@ -0,0 +1,332 @@
+"""Webhook delivery engine -- concurrent, per-endpoint-fair HTTP delivery.
+
+A batch of due deliveries is claimed with FOR UPDATE SKIP LOCKED and
+leased by pushing ``next_retry_at`` past the delivery timeout; the lease
+is renewed while the batch drains, so several dispatcher processes can run
+side by side without re-claiming each other's rows, and a crashed one's
+claims simply come due again. Deliveries are then POSTed concurrently:
+
+- a global semaphore bounds in-flight requests;
+- each endpoint gets its own small semaphore and its own connection pool,
+  so one slow subscriber cannot occupy every slot;
+- a per-endpoint circuit breaker stops hammering an endpoint that keeps
+  failing and defers its deliveries until the cooldown has passed; it is
+  checked again once a delivery gets its slot, so rows queued behind a
+  failing endpoint are deferred instead of POSTed one after another;
+- a batch claims at most ``webhook_batch_per_endpoint`` rows per
+  subscription, so one backed-up endpoint cannot fill every batch.
+
+Bodies are serialized and HMAC-signed once, when the delivery row is
+created, and reused verbatim on every retry.
+"""
+
+import asyncio
+import hashlib
+import hmac
+import json
+import time
+import uuid
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlsplit
+
+import httpx
+from sqlalchemy import func, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..core.config import get_settings
+from ..core.logging import get_logger
+from ..models.webhook import Webhook, WebhookDelivery
+
+logger = get_logger(__name__)
+
+MAX_ATTEMPTS = 5
+MAX_BACKOFF_SECONDS = 300
+
+
+def serialize_payload(payload: dict) -> str:
+    return json.dumps(payload)
+
+
+def sign_body(secret: str, body: str) -> str:
+    return hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+
+
+class CircuitBreaker:
+    """Consecutive-failure breaker: closed -> open (cooldown) -> half-open (one probe)."""
+
+    def __init__(self, threshold: int, cooldown_seconds: float):
+        self.threshold = threshold
+        self.cooldown_seconds = cooldown_seconds
+        self.failures = 0
+        self.opened_at: float | None = None
+        self._probing = False
+
+    def is_open(self, now: float | None = None) -> bool:
+        """True while allow() would refuse; unlike allow(), never takes the probe."""
+        if self.opened_at is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.opened_at < self.cooldown_seconds or self._probing
+
+    def allow(self, now: float | None = None) -> bool:
+        if self.opened_at is None:
+            return True
+        now = time.monotonic() if now is None else now
+        if now - self.opened_at < self.cooldown_seconds or self._probing:
+            return False
+        self._probing = True  # half-open: let exactly one request through
+        return True
+
+    def retry_in(self, now: float | None = None) -> float:
+        if self.opened_at is None:
+            return 0.0
+        now = time.monotonic() if now is None else now
+        return max(1.0, self.cooldown_seconds - (now - self.opened_at))
+
+    def record(self, success: bool, now: float | None = None) -> None:
+        self._probing = False
+        if success:
+            self.failures = 0
+            self.opened_at = None
+            return
+        self.failures += 1
+        if self.failures >= self.threshold:
+            self.opened_at = time.monotonic() if now is None else now
+
+
+@dataclass
+class _Endpoint:
+    client: httpx.AsyncClient
+    slots: asyncio.Semaphore
+    breaker: CircuitBreaker
+
+
+class WebhookDeliveryEngine:
+    def __init__(self, transport: httpx.AsyncBaseTransport | None = None):
+        settings = get_settings()
+        self.transport = transport
+        self.batch_size = settings.webhook_batch_size
+        self.batch_per_endpoint = settings.webhook_batch_per_endpoint
+        self.timeout = settings.webhook_timeout_seconds
+        self.per_endpoint = settings.webhook_per_endpoint_concurrency
+        self.breaker_threshold = settings.webhook_breaker_threshold
+        self.breaker_cooldown = settings.webhook_breaker_cooldown_seconds
+        self.lease_seconds = self.timeout * 3
+        self._slots = asyncio.Semaphore(settings.webhook_max_concurrency)
+        self._endpoints: dict[str, _Endpoint] = {}
+
+    def _endpoint(self, url: str) -> _Endpoint:
+        parts = urlsplit(url)
+        key = f"{parts.scheme}://{parts.netloc}"
+        endpoint = self._endpoints.get(key)
+        if endpoint is None:
+            endpoint = _Endpoint(
+                client=httpx.AsyncClient(
+                    transport=self.transport,
+                    timeout=self.timeout,
+                    limits=httpx.Limits(
+                        max_connections=self.per_endpoint,
+                        max_keepalive_connections=self.per_endpoint,
+                    ),
+                ),
+                slots=asyncio.Semaphore(self.per_endpoint),
+                breaker=CircuitBreaker(self.breaker_threshold, self.breaker_cooldown),
+            )
+            self._endpoints[key] = endpoint
+        return endpoint
+
+    async def close(self) -> None:
+        for endpoint in self._endpoints.values():
+            await endpoint.client.aclose()
+        self._endpoints.clear()
+
+    async def claim(self, db: AsyncSession) -> list:
+        """Lease a batch of due deliveries to this process and commit the lease."""
+        now = datetime.now(timezone.utc)
+        # Oldest due rows, at most batch_per_endpoint of them per subscription
+        ranked = (
+            select(
+                WebhookDelivery.id,
+                func.row_number()
+                .over(partition_by=WebhookDelivery.webhook_id, order_by=WebhookDelivery.created_at)
+                .label("rank"),
+            )
+            .where(
+                WebhookDelivery.delivered_at.is_(None),
+                WebhookDelivery.attempts < MAX_ATTEMPTS,
+                (WebhookDelivery.next_retry_at.is_(None) | (WebhookDelivery.next_retry_at <= now)),
+            )
+            .subquery()
+        )
+        due = (
+            select(WebhookDelivery.id)
+            .where(WebhookDelivery.id.in_(select(ranked.c.id).where(ranked.c.rank <= self.batch_per_endpoint)))
+            .order_by(WebhookDelivery.created_at)
+            .limit(self.batch_size)
+        )
+        if db.bind.dialect.name == "postgresql":
+            due = due.with_for_update(skip_locked=True)
+        result = await db.execute(
+            update(WebhookDelivery)
+            .where(WebhookDelivery.id.in_(due.scalar_subquery()))
+            .values(
+                attempts=WebhookDelivery.attempts + 1,
+                next_retry_at=now + timedelta(seconds=self.lease_seconds),
+            )
+            .returning(
+                WebhookDelivery.id,
+                WebhookDelivery.webhook_id,
+                WebhookDelivery.event_type,
+                WebhookDelivery.payload,
+                WebhookDelivery.body,
+                WebhookDelivery.signature,
+                WebhookDelivery.attempts,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.all()
+        await db.commit()
+        return claimed
+
+    async def run_batch(self, db: AsyncSession) -> int:
+        """Claim and deliver one batch. Returns the number of deliveries claimed."""
+        claimed = await self.claim(db)
+        if not claimed:
+            return 0
+
+        hooks = {
+            row.id: row
+            for row in await db.execute(
+                select(Webhook.id, Webhook.url, Webhook.secret).where(Webhook.id.in_({d.webhook_id for d in claimed}))
+            )
+        }
+        undelivered = {d.id for d in claimed}
+        drained = asyncio.Event()
+
+        async def deliver(d):
+            try:
+                return await self._deliver(d, hooks.get(d.webhook_id))
+            finally:
+                undelivered.discard(d.id)
+
+        renewer = asyncio.create_task(self._renew_lease(db, undelivered, drained))
+        try:
+            outcomes = await asyncio.gather(*(deliver(d) for d in claimed))
+        finally:
+            drained.set()
+            await renewer
+
+        await db.execute(update(WebhookDelivery), outcomes)
+        await db.commit()
+        return len(claimed)
+
+    async def _renew_lease(self, db: AsyncSession, undelivered: set, drained: asyncio.Event) -> None:
+        """Extend the lease on claimed rows still in flight every third of it.
+
+        A slow endpoint drains its share of the batch a few slots at a time,
+        which can outlast one lease; without renewal another dispatcher
+        would re-claim (and re-deliver) the rows still queued here.
+        """
+        while True:
+            try:
+                await asyncio.wait_for(drained.wait(), self.lease_seconds / 3)
+                return
+            except asyncio.TimeoutError:
+                pass
+            if not undelivered:
+                continue
+            try:
+                await db.execute(
+                    update(WebhookDelivery)
+                    .where(WebhookDelivery.id.in_(list(undelivered)), WebhookDelivery.delivered_at.is_(None))
+                    .values(next_retry_at=datetime.now(timezone.utc) + timedelta(seconds=self.lease_seconds))
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+            except Exception as e:
+                logger.warning("webhook_lease_renew_failed", deliveries=len(undelivered), error=str(e))
+
+    async def _deliver(self, delivery, hook) -> dict:
+        outcome = {"id": delivery.id, "attempts": delivery.attempts}
+        if hook is None:
+            # Subscription deleted: give up on the delivery
+            outcome.update(attempts=MAX_ATTEMPTS, response_body="Webhook no longer exists")
+            return outcome
+
+        body = delivery.body
+        signature = delivery.signature
+        if body is None or signature is None:
+            # Rows created before deliveries were pre-signed
+            body = serialize_payload(delivery.payload)
+            signature = sign_body(hook.secret, body)
+            outcome.update(body=body, signature=signature)
+
+        endpoint = self._endpoint(hook.url)
+        if endpoint.breaker.is_open():
+            return _defer(outcome, delivery, endpoint)
+
+        # Endpoint slot first: waiting on a busy endpoint must not hold a global slot
+        async with endpoint.slots:
+            # The breaker may have opened while this delivery queued for the slot
+            if not endpoint.breaker.allow():
+                return _defer(outcome, delivery, endpoint)
+            async with self._slots:
+                try:
+                    resp = await endpoint.client.post(
+                        hook.url,
+                        content=body,
+                        headers={
+                            "Content-Type": "application/json",
+                            "X-AgentWallet-Signature": f"sha256={signature}",
+                            "X-AgentWallet-Event": delivery.event_type,
+                            "X-AgentWallet-Delivery": str(delivery.id),
+                        },
+                    )
+                except Exception as e:
+                    logger.warning(
+                        "webhook_delivery_failed",
+                        delivery_id=str(delivery.id),
+                        error=str(e),
+                        attempt=delivery.attempts,
+                    )
+                    endpoint.breaker.record(False)
+                    outcome.update(next_retry_at=_backoff(delivery.attempts), response_body=str(e)[:1000])
+                    return outcome
+
+        ok = 200 <= resp.status_code < 300
+        # 4xx other than 429 is the subscriber's answer, not an outage
+        endpoint.breaker.record(ok or (400 <= resp.status_code < 500 and resp.status_code != 429))
+        outcome.update(status_code=resp.status_code, response_body=resp.text[:1000])
+        if ok:
+            outcome.update(delivered_at=datetime.now(timezone.utc))
+            logger.info("webhook_delivered", delivery_id=str(delivery.id), status=resp.status_code)
+        else:
+            outcome.update(next_retry_at=_backoff(delivery.attempts))
+        return outcome
+
+
+def _defer(outcome: dict, delivery, endpoint: _Endpoint) -> dict:
+    """Circuit open: retry after the cooldown without spending an attempt."""
+    outcome.update(
+        attempts=delivery.attempts - 1,
+        next_retry_at=datetime.now(timezone.utc) + timedelta(seconds=endpoint.breaker.retry_in()),
+    )
+    return outcome
+
+
+def _backoff(attempts: int) -> datetime:
+    return datetime.now(timezone.utc) + timedelta(seconds=min(2**attempts, MAX_BACKOFF_SECONDS))
+
+
+def new_delivery_row(webhook_id: uuid.UUID, secret: str, event_type: str, payload: dict, body: str) -> dict:
+    """Row for a bulk WebhookDelivery insert, signed once up front."""
+    return {
+        "id": uuid.uuid4(),
+        "webhook_id": webhook_id,
+        "event_type": event_type,
+        "payload": payload,
+        "body": body,
+        "signature": sign_body(secret, body),
+        "attempts": 0,
+    }
@@ -0,0 +1,105 @@
+"""Two-tier x402 payment verification cache.
+
+Tier 1 is a bounded in-process LRU with per-entry expiry; tier 2 is Redis,
+shared by every API replica, so a payment signature is verified on-chain
+once cluster-wide instead of once per process.
+
+Entries expire with the route's ``max_deadline_seconds``. Accepted
+payments are additionally remembered for ``retention_seconds`` past their
+deadline so a replayed proof is still recognised (and rejected as expired)
+rather than re-verified from scratch. Only definitive rejections are
+cached -- a failure to reach the RPC says nothing about the payment.
+"""
+
+import json
+import time
+from collections import OrderedDict
+
+from ..core.logging import get_logger
+from ..core.redis_client import get_redis
+
+logger = get_logger(__name__)
+
+_REDIS_PREFIX = "x402:sig:"
+
+
+class VerificationCache:
+    def __init__(self, max_entries: int = 10_000, retention_seconds: float = 3600.0):
+        self.max_entries = max_entries
+        self.retention_seconds = retention_seconds
+        # signature -> {valid, verified_at, payee, amount, token_mint, evict_at}
+        self._entries: OrderedDict[str, dict] = OrderedDict()
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _lifetime(self, valid: bool, deadline_seconds: float) -> float:
+        return deadline_seconds + (self.retention_seconds if valid else 0)
+
+    def _store_local(self, signature: str, entry: dict) -> None:
+        self._entries[signature] = entry
+        self._entries.move_to_end(signature)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get(self, signature: str) -> dict | None:
+        now = time.time()
+        entry = self._entries.get(signature)
+        if entry is not None:
+            if entry["evict_at"] > now:
+                self._entries.move_to_end(signature)
+                self.local_hits += 1
+                return entry
+            del self._entries[signature]
+            self.evictions += 1
+
+        try:
+            r = await get_redis()
+            raw = await r.get(_REDIS_PREFIX + signature)
+        except Exception:
+            raw = None
+        if raw:
+            entry = json.loads(raw)
+            if entry.get("evict_at", 0) > now:
+                self._store_local(signature, entry)
+                self.redis_hits += 1
+                return entry
+
+        self.misses += 1
+        return None
+
+    async def put(self, signature: str, entry: dict, deadline_seconds: float) -> None:
+        lifetime = self._lifetime(entry.get("valid", False), deadline_seconds)
+        entry = {**entry, "evict_at": entry["verified_at"] + lifetime}
+        self._store_local(signature, entry)
+        try:
+            r = await get_redis()
+            await r.set(_REDIS_PREFIX + signature, json.dumps(entry), ex=max(1, int(lifetime)))
+        except Exception:
+            logger.debug("x402_cache_redis_unavailable", msg="Redis down — verification cached in-process only")
+
+    async def drop(self, signature: str) -> None:
+        self._entries.pop(signature, None)
+        try:
+            r = await get_redis()
+            await r.delete(_REDIS_PREFIX + signature)
+        except Exception:
+            pass
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self.local_hits = self.redis_hits = self.misses = self.evictions = 0
+
+    def stats(self) -> dict:
+        lookups = self.local_hits + self.redis_hits + self.misses
+        return {
+            "size": len(self._entries),
+            "max_entries": self.max_entries,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": round((self.local_hits + self.redis_hits) / lookups, 4) if lookups else 0.0,
+        }
@@ -24,7 +24,7 @@ from ..core.exceptions import (
     PolicyDeniedError,
 )
 from ..core.logging import get_logger
-from ..core.solana import transfer_sol
+from ..core.solana import get_rpc_client, transfer_sol
 from ..models.transaction import Transaction
 from .token_service import TokenService
 from .wallet_manager import WalletManager
@@ -344,7 +344,7 @@ class X402ClientMiddleware:
         """
         try:
             wallet = await self.wallet_mgr.get_wallet(self.wallet_id, self.org_id)
-            keypair = self.wallet_mgr._decrypt_keypair(wallet)
+            keypair = await self.wallet_mgr.decrypt_keypair(wallet)
 
             if token_mint and token_mint == USDC_MINT:
                 # USDC payment
@@ -355,14 +355,14 @@ class X402ClientMiddleware:
                 )
             else:
                 # SOL payment
-                async with httpx.AsyncClient(timeout=15) as client:
-                    get_settings()
-                    signature = await transfer_sol(
-                        client=client,
-                        from_keypair=keypair,
-                        to_address=pay_to,
-                        lamports=amount_lamports,
-                    )
+                client = get_rpc_client()
+                get_settings()
+                signature = await transfer_sol(
+                    client=client,
+                    from_keypair=keypair,
+                    to_address=pay_to,
+                    lamports=amount_lamports,
+                )
 
             # Record transaction in DB
             tx_record = Transaction(
@@ -415,14 +415,14 @@ class X402ClientMiddleware:
         """Transfer USDC using the Solana SPL token program."""
         from ..core.solana import transfer_spl_token
 
-        async with httpx.AsyncClient(timeout=15) as client:
-            return await transfer_spl_token(
-                client=client,
-                from_keypair=keypair,
-                to_address=to_address,
-                mint=USDC_MINT,
-                amount=amount_raw,
-            )
+        client = get_rpc_client()
+        return await transfer_spl_token(
+            client=client,
+            from_keypair=keypair,
+            to_address=to_address,
+            mint=USDC_MINT,
+            amount=amount_raw,
+        )
 
     def _format_response(
         self,
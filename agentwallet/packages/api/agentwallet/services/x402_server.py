@@ -14,16 +14,17 @@ import json
 import re
 import time
 import uuid
+from collections import OrderedDict
 from datetime import datetime, timezone
 
-import httpx
 from fastapi import Request
 from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.responses import JSONResponse
 
 from ..core.config import get_settings
 from ..core.logging import get_logger
-from ..core.solana import confirm_transaction, verify_transfer_on_chain
+from ..core.solana import confirm_transaction, get_rpc_client, verify_transfer_on_chain
+from .x402_cache import VerificationCache
 
 logger = get_logger(__name__)
 
@@ -36,6 +37,90 @@ def _usdc_mint() -> str:
 USDC_MINT = _usdc_mint()
 
 
+_GLOB_CHARS = "*?["
+
+
+class RouteMatcher:
+    """Indexed form of the x402 route table.
+
+    Exact paths live in a dict, glob patterns in a character trie keyed by
+    their literal prefix (so only globs that can match a path are tested),
+    and ``^`` patterns are precompiled regexes. Results are memoized per
+    (path, method). Specificity rules match the original linear scan: exact
+    3, regex 2, glob 1, +1 for an explicit method; ties go to the route
+    configured first.
+    """
+
+    MEMO_SIZE = 4096
+
+    def __init__(self, routes: list[dict]):
+        self.routes = routes
+        self._exact: dict[str, list[int]] = {}
+        self._glob_trie: dict = {}
+        self._regexes: list[tuple[int, re.Pattern]] = []
+        self._memo: OrderedDict[tuple[str, str], dict | None] = OrderedDict()
+
+        for index, route in enumerate(routes):
+            pattern = route["route_pattern"]
+            self._exact.setdefault(pattern, []).append(index)
+            cut = min((pattern.find(c) for c in _GLOB_CHARS if c in pattern), default=-1)
+            if cut >= 0:
+                node = self._glob_trie
+                for char in pattern[:cut]:
+                    node = node.setdefault(char, {})
+                node.setdefault(None, []).append((index, re.compile(fnmatch.translate(pattern))))
+            if pattern.startswith("^"):
+                try:
+                    self._regexes.append((index, re.compile(pattern)))
+                except re.error:
+                    pass
+
+    def _path_matches(self, path: str) -> dict[int, int]:
+        """route index -> path specificity, for every route whose pattern matches."""
+        found = {index: 3 for index in self._exact.get(path, ())}
+
+        node = self._glob_trie
+        globs = list(node.get(None, ()))
+        for char in path:
+            node = node.get(char)
+            if node is None:
+                break
+            globs.extend(node.get(None, ()))
+        for index, compiled in globs:
+            if index not in found and compiled.match(path):
+                found[index] = 1
+
+        for index, compiled in self._regexes:
+            if index not in found and compiled.match(path):
+                found[index] = 2
+        return found
+
+    def match(self, path: str, method: str) -> dict | None:
+        key = (path, method)
+        if key in self._memo:
+            self._memo.move_to_end(key)
+            return self._memo[key]
+
+        best_match = None
+        best_rank = None
+        for index, specificity in self._path_matches(path).items():
+            route = self.routes[index]
+            route_method = route["method"]
+            if route_method != "*" and route_method != method:
+                continue
+            if route_method != "*":
+                specificity += 1
+            rank = (specificity, -index)
+            if best_rank is None or rank > best_rank:
+                best_rank = rank
+                best_match = route
+
+        self._memo[key] = best_match
+        if len(self._memo) > self.MEMO_SIZE:
+            self._memo.popitem(last=False)
+        return best_match
+
+
 class X402PricingConfig:
     """In-memory x402 pricing configuration.
 
@@ -47,14 +132,18 @@ class X402PricingConfig:
         self.network: str = "solana-mainnet"
         self.default_pay_to: str | None = None
         self._routes: list[dict] = []
+        self._matcher: RouteMatcher | None = None
         # payment_id -> payment_record
         self._payments: dict[str, dict] = {}
         # signature -> cache entry {valid, verified_at, payee, amount, token_mint}
         # Cache stores the *verified* payment facts so replay protection can
         # be enforced on cache hits (deadline, payee, amount) without
         # re-parsing the transaction on every request.
-        self._verified_signatures: dict[str, dict] = {}
-        self._max_cache_size: int = 10000
+        settings = get_settings()
+        self.verification_cache = VerificationCache(
+            max_entries=settings.x402_verification_cache_size,
+            retention_seconds=settings.x402_replay_retention_seconds,
+        )
 
     def configure(
         self,
@@ -100,51 +189,10 @@ class X402PricingConfig:
         """
         if not self.enabled or not self._routes:
             return None
-
-        method = method.upper()
-        best_match = None
-        best_specificity = -1
-
-        for route in self._routes:
-            pattern = route["route_pattern"]
-            route_method = route["method"]
-
-            # Check method match
-            method_match = route_method == "*" or route_method == method
-            if not method_match:
-                continue
-
-            # Check path match
-            path_match = False
-            specificity = 0
-
-            # Exact match
-            if pattern == path:
-                path_match = True
-                specificity = 3
-            # Glob match
-            elif fnmatch.fnmatch(path, pattern):
-                path_match = True
-                specificity = 1
-            # Regex match (patterns starting with ^)
-            elif pattern.startswith("^"):
-                try:
-                    if re.match(pattern, path):
-                        path_match = True
-                        specificity = 2
-                except re.error:
-                    pass
-
-            if path_match:
-                # Method specificity bonus
-                if route_method != "*":
-                    specificity += 1
-
-                if specificity > best_specificity:
-                    best_specificity = specificity
-                    best_match = route
-
-        return best_match
+        # Rebuilt only when the route list is replaced (configure)
+        if self._matcher is None or self._matcher.routes is not self._routes:
+            self._matcher = RouteMatcher(self._routes)
+        return self._matcher.match(path, method.upper())
 
     def get_all_routes(self) -> list[dict]:
         return list(self._routes)
@@ -171,36 +219,32 @@ class X402PricingConfig:
         """Total lamports received via x402."""
         return sum(p.get("amount_lamports", 0) for p in self._payments.values() if p.get("status") == "verified")
 
-    def cache_verification(
+    async def cache_verification(
         self,
         signature: str,
         valid: bool,
         payee: str = "",
         amount: int = 0,
         token_mint: str | None = None,
+        max_deadline_seconds: float = 60,
     ) -> None:
-        # Evict oldest entries if cache is full
-        if len(self._verified_signatures) >= self._max_cache_size:
-            # Remove oldest 20% of entries
-            to_remove = list(self._verified_signatures.keys())[: self._max_cache_size // 5]
-            for key in to_remove:
-                del self._verified_signatures[key]
-        self._verified_signatures[signature] = {
-            "valid": valid,
-            "verified_at": time.time(),
-            "payee": payee,
-            "amount": amount,
-            "token_mint": token_mint,
-        }
+        await self.verification_cache.put(
+            signature,
+            {
+                "valid": valid,
+                "verified_at": time.time(),
+                "payee": payee,
+                "amount": amount,
+                "token_mint": token_mint,
+            },
+            max_deadline_seconds,
+        )
 
-    def is_signature_cached(self, signature: str) -> dict | None:
-        entry = self._verified_signatures.get(signature)
-        if entry is None:
-            return None
-        return entry
+    async def is_signature_cached(self, signature: str) -> dict | None:
+        return await self.verification_cache.get(signature)
 
-    def drop_signature_cache(self, signature: str) -> None:
-        self._verified_signatures.pop(signature, None)
+    async def drop_signature_cache(self, signature: str) -> None:
+        await self.verification_cache.drop(signature)
 
 
 # Singleton pricing config (shared across requests)
@@ -391,20 +435,20 @@ class X402ServerMiddleware(BaseHTTPMiddleware):
 
         # Check cache -- replay protection is enforced on cache hits too:
         # the proof must still be fresh AND match the current payee/amount.
-        cached = config.is_signature_cached(signature)
+        cached = await config.is_signature_cached(signature)
         if cached is not None:
             if not cached.get("valid"):
                 return {"valid": False, "error": "Previously rejected signature"}
-            # Deadline check on cache hit
+            # Deadline check on cache hit. The entry is kept past its deadline
+            # so replays keep getting rejected instead of being re-verified.
             if (time.time() - cached.get("verified_at", 0)) > max_deadline:
-                config.drop_signature_cache(signature)
                 return {"valid": False, "error": "Payment proof expired"}
             # Payee / amount must match current pricing (prevents cross-route reuse)
             if cached.get("payee") != pay_to:
-                config.drop_signature_cache(signature)
+                await config.drop_signature_cache(signature)
                 return {"valid": False, "error": "Payment proof does not match this endpoint's payee"}
             if cached.get("amount", 0) < expected_amount:
-                config.drop_signature_cache(signature)
+                await config.drop_signature_cache(signature)
                 return {"valid": False, "error": "Payment proof amount below current price"}
             return {
                 "valid": True,
@@ -418,30 +462,31 @@ class X402ServerMiddleware(BaseHTTPMiddleware):
         # Verify timestamp freshness
         timestamp = payload.get("timestamp", 0)
         if timestamp and (time.time() - timestamp) > max_deadline:
-            config.cache_verification(signature, False)
+            await config.cache_verification(signature, False, max_deadline_seconds=max_deadline)
             return {"valid": False, "error": "Payment proof expired"}
 
         # Verify on-chain -- real payer / recipient / amount from parsed tx
         try:
-            async with httpx.AsyncClient(timeout=15) as client:
-                confirmed = await confirm_transaction(client, signature, max_polls=5, poll_interval=1.0)
-                if not confirmed:
-                    config.cache_verification(signature, False)
-                    return {"valid": False, "error": "Transaction not confirmed on-chain"}
-                result = await verify_transfer_on_chain(
-                    client,
-                    signature,
-                    expected_pay_to=pay_to,
-                    expected_amount=expected_amount,
-                    token_mint=token_mint,
-                )
+            client = get_rpc_client()
+            confirmed = await confirm_transaction(client, signature, max_polls=5, poll_interval=1.0)
+            if not confirmed:
+                # A timeout or RPC error reads the same as an unconfirmed tx --
+                # never cache it, or one flaky poll rejects the payment cluster-wide.
+                return {"valid": False, "error": "Transaction not confirmed on-chain"}
+            result = await verify_transfer_on_chain(
+                client,
+                signature,
+                expected_pay_to=pay_to,
+                expected_amount=expected_amount,
+                token_mint=token_mint,
+            )
         except Exception as e:
             logger.error("x402_verification_rpc_error", signature=signature[:24], error=str(e))
-            config.cache_verification(signature, False)
             return {"valid": False, "error": f"RPC verification failed: {e}"}
 
         if not result["valid"]:
-            config.cache_verification(signature, False)
+            if not result.get("retryable"):
+                await config.cache_verification(signature, False, max_deadline_seconds=max_deadline)
             return {
                 "valid": False,
                 "signature": signature,
@@ -452,12 +497,13 @@ class X402ServerMiddleware(BaseHTTPMiddleware):
                 "confirmed_on_chain": True,
             }
 
-        config.cache_verification(
+        await config.cache_verification(
             signature,
             True,
             payee=pay_to,
             amount=result.get("amount", expected_amount),
             token_mint=result.get("token_mint", token_mint),
+            max_deadline_seconds=max_deadline,
         )
 
         return {
@@ -529,29 +575,27 @@ async def verify_payment_proof(
 
     # Verify on-chain -- real payer / recipient / amount from parsed tx
     try:
-        async with httpx.AsyncClient(timeout=15) as client:
-            confirmed = await confirm_transaction(client, signature, max_polls=10, poll_interval=1.5)
-            if not confirmed:
-                return {
-                    "valid": False,
-                    "signature": signature,
-                    "payer": payer,
-                    "amount_lamports": reported_amount,
-                    "token_mint": token_mint,
-                    "error": "Transaction not confirmed",
-                    "confirmed_on_chain": False,
-                }
-            expected_amount = expected_amount_lamports or (
-                int(expected_amount_usdc * 1e6) if expected_amount_usdc else 0
-            )
-            expected_mint = token_mint if "usdc" in (token_mint or "").lower() or expected_amount_usdc else None
-            result = await verify_transfer_on_chain(
-                client,
-                signature,
-                expected_pay_to=expected_pay_to,
-                expected_amount=expected_amount,
-                token_mint=expected_mint,
-            )
+        client = get_rpc_client()
+        confirmed = await confirm_transaction(client, signature, max_polls=10, poll_interval=1.5)
+        if not confirmed:
+            return {
+                "valid": False,
+                "signature": signature,
+                "payer": payer,
+                "amount_lamports": reported_amount,
+                "token_mint": token_mint,
+                "error": "Transaction not confirmed",
+                "confirmed_on_chain": False,
+            }
+        expected_amount = expected_amount_lamports or (int(expected_amount_usdc * 1e6) if expected_amount_usdc else 0)
+        expected_mint = token_mint if "usdc" in (token_mint or "").lower() or expected_amount_usdc else None
+        result = await verify_transfer_on_chain(
+            client,
+            signature,
+            expected_pay_to=expected_pay_to,
+            expected_amount=expected_amount,
+            token_mint=expected_mint,
+        )
     except Exception as e:
         return {
             "valid": False,
@@ -1,7 +1,6 @@
 """Analytics aggregator worker -- roll up daily transaction metrics."""
 
-from datetime import date
-
+from ..core.config import get_settings
 from ..core.database import get_session_factory
 from ..core.logging import get_logger
 from ..services.analytics_engine import AnalyticsEngine
@@ -11,14 +10,27 @@ logger = get_logger(__name__)
 
 
 class AnalyticsAggregatorWorker(BaseWorker):
+    """Fold new and changed transactions into the daily rollups.
+
+    Each pass only reads transactions changed since the stored watermark,
+    so the cost follows new activity rather than the day's total volume.
+    """
+
     name = "analytics_aggregator"
     interval_seconds = 60.0  # 1 minute
 
-    async def tick(self) -> None:
+    async def tick(self) -> bool | None:
+        batch_size = get_settings().analytics_rollup_batch_size
         factory = get_session_factory()
         async with factory() as db:
             engine = AnalyticsEngine(db)
-            count = await engine.aggregate_daily(date.today())
-            await db.commit()
-            if count:
-                logger.info("analytics_tick", rollups=count)
+            total = 0
+            while True:
+                folded = await engine.rollup(batch_size)
+                await db.commit()
+                total += folded
+                if folded < batch_size:
+                    break
+            if not total:
+                return False
+            logger.info("analytics_tick", transactions=total)
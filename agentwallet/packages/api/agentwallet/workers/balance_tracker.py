@@ -0,0 +1,24 @@
+"""Balance tracker worker -- keep cached wallet balances current."""
+
+from ..core.logging import get_logger
+from ..services.balance_tracker import BalanceTracker
+from .base import BaseWorker
+
+logger = get_logger(__name__)
+
+
+class BalanceTrackerWorker(BaseWorker):
+    """Poll cached managed wallets in bulk and rewrite balances that moved.
+
+    The poll interval bounds how long an inbound transfer (or one of ours
+    landing) can be missing from a cached balance, so a pass in which
+    nothing moved is not reported idle: backing off would stretch that bound.
+    """
+
+    name = "balance_tracker"
+    interval_seconds = 10.0
+
+    async def tick(self) -> None:
+        outcome = await BalanceTracker().sync()
+        if outcome["updated"] or outcome["dropped"]:
+            logger.info("balance_tracker_tick", **outcome)
@@ -1,12 +1,49 @@
-"""Base worker class -- tick loop pattern ported from moltfarm autopilot.py."""
+"""Base worker class -- tick loop pattern ported from moltfarm autopilot.py.
+
+The loop adapts to load: a tick that reports a backlog runs again at once,
+idle ticks back off exponentially (up to ``worker_idle_backoff_factor``
+times the interval), and every sleep is jittered so replicas drift apart.
+Exclusive workers only tick while their process holds the worker's lease,
+so any number of scheduler processes can run side by side.
+"""
 
 import asyncio
+import random
+import time
+from dataclasses import asdict, dataclass
 
+from ..core.config import get_settings
 from ..core.logging import get_logger
+from .lease import Lease
 
 logger = get_logger(__name__)
 
 
+@dataclass
+class WorkerStats:
+    ticks: int = 0
+    errors: int = 0
+    busy_ticks: int = 0  # reported more work waiting
+    idle_ticks: int = 0  # found nothing to do
+    standby_waits: int = 0  # skipped: another process holds the lease
+    total_seconds: float = 0.0
+    max_seconds: float = 0.0
+    last_seconds: float = 0.0
+
+    def record(self, seconds: float, result: bool | None) -> None:
+        self.ticks += 1
+        self.busy_ticks += result is True
+        self.idle_ticks += result is False
+        self.total_seconds += seconds
+        self.max_seconds = max(self.max_seconds, seconds)
+        self.last_seconds = seconds
+
+    def as_dict(self) -> dict:
+        stats = asdict(self)
+        stats["avg_seconds"] = self.total_seconds / self.ticks if self.ticks else 0.0
+        return stats
+
+
 class BaseWorker:
     """Base class for all background workers.
 
@@ -16,29 +53,106 @@ class BaseWorker:
 
     name: str = "base_worker"
     interval_seconds: float = 60.0
+    # Exclusive workers run in one process at a time (lease-guarded). Workers
+    # whose claims are already safe to run concurrently set this to False.
+    exclusive: bool = True
+
+    def __init__(self):
+        self.stats = WorkerStats()
+        self.lease: Lease | None = None
+        self._idle_streak = 0
+        self._tick_task: asyncio.Future | None = None
+        self._lease_lost = False
 
     async def setup(self) -> None:
         """Called once before the tick loop starts."""
 
-    async def tick(self) -> None:
-        """Called every interval_seconds. Override in subclass."""
+    async def tick(self) -> bool | None:
+        """Do one round of work. Override in subclass.
+
+        Return True when more work is already waiting (tick again at once),
+        False when there was nothing to do (back off), None otherwise.
+        """
         raise NotImplementedError
 
     async def teardown(self) -> None:
         """Called when the worker stops."""
 
+    async def wait_for_next_tick(self, delay: float) -> None:
+        """Sleep `delay` seconds between ticks. Override to wake early when work arrives."""
+        await asyncio.sleep(delay)
+
+    def next_delay(self, result: bool | None) -> float:
+        """Seconds to wait after a tick that returned `result`."""
+        if result is True:
+            self._idle_streak = 0
+            return 0.0
+        self._idle_streak = self._idle_streak + 1 if result is False else 0
+        factor = min(2.0**self._idle_streak, get_settings().worker_idle_backoff_factor)
+        return self.interval_seconds * max(factor, 1.0) * random.uniform(0.9, 1.1)
+
     async def run(self) -> None:
         """Main run loop."""
-        logger.info("worker_starting", worker=self.name, interval=self.interval_seconds)
+        settings = get_settings()
+        logger.info("worker_starting", worker=self.name, interval=self.interval_seconds, exclusive=self.exclusive)
         await self.setup()
+        keeper = None
         try:
+            if self.exclusive:
+                self.lease = Lease(self.name, settings.worker_lease_ttl_seconds)
+                keeper = asyncio.create_task(self._keep_lease())
+            # Jittered start: workers and replicas started together do not tick in lockstep
+            await asyncio.sleep(random.uniform(0, min(self.interval_seconds, settings.worker_start_jitter_seconds)))
             while True:
+                if self.lease is not None and not self.lease.held:
+                    self.stats.standby_waits += 1
+                    await asyncio.sleep(self.lease.ttl_seconds / 3)
+                    continue
+                delay = self.next_delay(await self._timed_tick())
+                if delay > 0:
+                    await self.wait_for_next_tick(delay)
+        except asyncio.CancelledError:
+            logger.info("worker_stopping", worker=self.name, **self.stats.as_dict())
+        finally:
+            if keeper is not None:
+                keeper.cancel()
+                await asyncio.gather(keeper, return_exceptions=True)
+            if self.lease is not None:
                 try:
-                    await self.tick()
+                    await self.lease.release()
                 except Exception as e:
-                    logger.error("worker_tick_error", worker=self.name, error=str(e))
-                await asyncio.sleep(self.interval_seconds)
+                    logger.warning("lease_release_failed", worker=self.name, error=str(e))
+            await self.teardown()
+
+    async def _timed_tick(self) -> bool | None:
+        started = time.monotonic()
+        result = None
+        self._lease_lost = False
+        self._tick_task = asyncio.ensure_future(self.tick())
+        try:
+            result = await self._tick_task
         except asyncio.CancelledError:
-            logger.info("worker_stopping", worker=self.name)
+            if not self._lease_lost:
+                raise
+            logger.warning("worker_tick_aborted", worker=self.name, reason="lease_lost")
+        except Exception as e:
+            self.stats.errors += 1
+            logger.error("worker_tick_error", worker=self.name, error=str(e))
         finally:
-            await self.teardown()
+            self._tick_task = None
+        elapsed = time.monotonic() - started
+        self.stats.record(elapsed, result)
+        logger.debug("worker_tick", worker=self.name, seconds=round(elapsed, 3), result=result)
+        return result
+
+    async def _keep_lease(self) -> None:
+        """Acquire and renew the lease; abort a running tick if it is lost."""
+        while True:
+            try:
+                await self.lease.acquire()
+            except Exception as e:
+                logger.warning("lease_renew_failed", worker=self.name, error=str(e))
+            if not self.lease.held and self._tick_task is not None and not self._tick_task.done():
+                self._lease_lost = True
+                self._tick_task.cancel()
+            await asyncio.sleep(self.lease.ttl_seconds / 3)
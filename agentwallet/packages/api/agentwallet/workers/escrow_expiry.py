@@ -1,7 +1,9 @@
-"""Escrow expiry worker -- expire stale escrows past their deadline."""
+"""Escrow expiry worker -- expire stale escrows and refund the funded ones."""
 
+from ..core.config import get_settings
 from ..core.database import get_session_factory
 from ..core.logging import get_logger
+from ..services.escrow_refunds import EscrowRefundPipeline
 from ..services.escrow_service import EscrowService
 from .base import BaseWorker
 
@@ -12,11 +14,22 @@ class EscrowExpiryWorker(BaseWorker):
     name = "escrow_expiry"
     interval_seconds = 300.0  # 5 minutes
 
-    async def tick(self) -> None:
+    async def tick(self) -> bool | None:
+        settings = get_settings()
         factory = get_session_factory()
         async with factory() as db:
             svc = EscrowService(db)
-            count = await svc.expire_stale_escrows()
-            await db.commit()
-            if count:
-                logger.info("escrow_expiry_tick", expired=count)
+            count = 0
+            while True:
+                batch = await svc.expire_stale_escrows(limit=settings.escrow_expiry_batch_size)
+                await db.commit()
+                count += batch
+                if batch < settings.escrow_expiry_batch_size:
+                    break
+
+            refunds = await EscrowRefundPipeline(db).run()
+            if not count and not any(refunds.values()):
+                return False
+            logger.info("escrow_expiry_tick", expired=count, **refunds)
+            # A full refund batch means more are queued
+            return refunds["submitted"] >= settings.escrow_refund_batch_size or None
@@ -0,0 +1,86 @@
+"""Worker leases -- at most one scheduler process runs an exclusive worker.
+
+A lease is a row in ``worker_leases`` claimed with a single
+INSERT ... ON CONFLICT DO UPDATE that only succeeds when the row is free,
+expired or already ours, so acquiring and renewing are the same atomic
+statement on Postgres and SQLite alike. The holder renews it well within
+its TTL; if the process dies the lease simply expires and a standby
+process takes over.
+"""
+
+import os
+import socket
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import case, delete, or_
+
+from ..core.database import get_session_factory, upsert_insert
+from ..core.logging import get_logger
+from ..models.worker_lease import WorkerLease
+
+logger = get_logger(__name__)
+
+# Identifies this scheduler process in lease rows
+PROCESS_ID = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+class Lease:
+    def __init__(self, name: str, ttl_seconds: float, owner: str = PROCESS_ID):
+        self.name = name
+        self.ttl_seconds = ttl_seconds
+        self.owner = owner
+        self._valid_until = 0.0  # local monotonic deadline of the last successful claim
+
+    @property
+    def held(self) -> bool:
+        return time.monotonic() < self._valid_until
+
+    async def acquire(self) -> bool:
+        """Take or renew the lease. Returns whether this process now holds it."""
+        # Measured before the round trip, so the local deadline never
+        # outlives the one written to the database
+        started = time.monotonic()
+        now = datetime.now(timezone.utc)
+        factory = get_session_factory()
+        async with factory() as db:
+            stmt = upsert_insert(db, WorkerLease).values(
+                name=self.name,
+                owner=self.owner,
+                acquired_at=now,
+                expires_at=now + timedelta(seconds=self.ttl_seconds),
+            )
+            excluded = stmt.excluded
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["name"],
+                set_={
+                    "owner": excluded.owner,
+                    "acquired_at": case(
+                        (WorkerLease.owner == excluded.owner, WorkerLease.acquired_at),
+                        else_=excluded.acquired_at,
+                    ),
+                    "expires_at": excluded.expires_at,
+                },
+                where=or_(WorkerLease.owner == excluded.owner, WorkerLease.expires_at < excluded.acquired_at),
+            ).returning(WorkerLease.owner)
+            claimed = (await db.execute(stmt)).first() is not None
+            await db.commit()
+
+        if claimed and not self.held:
+            logger.info("lease_acquired", lease=self.name, owner=self.owner)
+        elif not claimed and self.held:
+            logger.warning("lease_lost", lease=self.name, owner=self.owner)
+        self._valid_until = started + self.ttl_seconds if claimed else 0.0
+        return claimed
+
+    async def release(self) -> None:
+        """Give the lease up so a standby process can take over at once."""
+        if not self.held:
+            return
+        self._valid_until = 0.0
+        factory = get_session_factory()
+        async with factory() as db:
+            await db.execute(delete(WorkerLease).where(WorkerLease.name == self.name, WorkerLease.owner == self.owner))
+            await db.commit()
+        logger.info("lease_released", lease=self.name, owner=self.owner)
@@ -0,0 +1,46 @@
+"""Outbox relay worker -- turn committed domain events into webhook deliveries."""
+
+from ..core.config import get_settings
+from ..core.database import get_session_factory
+from ..core.logging import get_logger
+from ..core.pg_notify import OUTBOX_CHANNEL, ChannelListener
+from ..services.event_bus import relay_outbox
+from .base import BaseWorker
+
+logger = get_logger(__name__)
+
+
+class OutboxRelayWorker(BaseWorker):
+    """Relay outbox events as soon as they commit.
+
+    Sleeps on LISTEN agentwallet_outbox rather than polling; the poll
+    interval only bounds latency when a notification is missed.
+    """
+
+    name = "outbox_relay"
+
+    exclusive = False  # claims use SKIP LOCKED: replicas share the work
+
+    def __init__(self):
+        super().__init__()
+        self.interval_seconds = get_settings().outbox_poll_seconds
+        self.listener = ChannelListener(OUTBOX_CHANNEL)
+
+    async def setup(self) -> None:
+        await self.listener.start()
+
+    async def teardown(self) -> None:
+        await self.listener.stop()
+
+    async def wait_for_next_tick(self, delay: float) -> None:
+        await self.listener.wait(delay)
+
+    async def tick(self) -> bool | None:
+        batch_size = get_settings().outbox_relay_batch_size
+        factory = get_session_factory()
+        async with factory() as db:
+            relayed = await relay_outbox(db, batch_size)
+        if not relayed:
+            return False
+        # A full batch means more is waiting: go again without sleeping
+        return True if relayed >= batch_size else None
@@ -0,0 +1,27 @@
+"""Reputation scorer worker -- batch-rescore agents whose jobs changed."""
+
+from ..core.config import get_settings
+from ..core.database import get_session_factory
+from ..core.logging import get_logger
+from ..services.reputation_service import ReputationService
+from .base import BaseWorker
+
+logger = get_logger(__name__)
+
+
+class ReputationScorerWorker(BaseWorker):
+    name = "reputation_scorer"
+    interval_seconds = 15.0
+
+    async def tick(self) -> bool | None:
+        settings = get_settings()
+        factory = get_session_factory()
+        async with factory() as db:
+            rescored = await ReputationService(db).rescore_stale(
+                settings.reputation_rescore_batch_size, settings.reputation_debounce_seconds
+            )
+            await db.commit()
+            if not rescored:
+                return False
+            logger.info("reputation_scorer_tick", rescored=rescored)
+            return rescored >= settings.reputation_rescore_batch_size or None
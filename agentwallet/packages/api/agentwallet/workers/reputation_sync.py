@@ -15,7 +15,7 @@ class ReputationSyncWorker(BaseWorker):
     name = "reputation_sync"
     interval_seconds = 1800.0  # 30 minutes
 
-    async def tick(self) -> None:
+    async def tick(self) -> bool | None:
         factory = get_session_factory()
         async with factory() as db:
             # Find all confirmed identities
@@ -23,7 +23,7 @@ class ReputationSyncWorker(BaseWorker):
             identities = result.scalars().all()
 
             if not identities:
-                return
+                return False
 
             svc = ERC8004Service(db)
             synced = 0
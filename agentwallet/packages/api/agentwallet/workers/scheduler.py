@@ -1,12 +1,25 @@
-"""Worker scheduler -- runs all background workers concurrently."""
+"""Worker scheduler -- runs all background workers concurrently.
+
+Any number of scheduler processes may run: exclusive workers tick only in
+the process holding their lease (see workers.lease), the rest share work
+through SKIP LOCKED claims.
+"""
 
 import asyncio
 
 from ..core.config import get_settings
 from ..core.logging import get_logger, setup_logging
+from ..core.solana import close_rpc_clients, get_blockhash_provider
+from ..core.solana_pubsub import close_signature_subscriber
 from .analytics_aggregator import AnalyticsAggregatorWorker
+from .balance_tracker import BalanceTrackerWorker
+from .base import BaseWorker
 from .escrow_expiry import EscrowExpiryWorker
+from .lease import PROCESS_ID
+from .outbox_relay import OutboxRelayWorker
+from .reputation_scorer import ReputationScorerWorker
 from .reputation_sync import ReputationSyncWorker
+from .subscription_expiry import SubscriptionExpiryWorker
 from .task_worker import TaskWorker
 from .tx_processor import TxProcessorWorker
 from .usage_meter import UsageMeterWorker
@@ -15,6 +28,19 @@ from .webhook_dispatcher import WebhookDispatcherWorker
 logger = get_logger(__name__)
 
 
+async def _log_stats(workers: list[BaseWorker], every_seconds: float) -> None:
+    """Periodically log per-worker timing and lease state."""
+    while True:
+        await asyncio.sleep(every_seconds)
+        for w in workers:
+            logger.info(
+                "worker_stats",
+                worker=w.name,
+                lease_held=w.lease.held if w.lease is not None else None,
+                **w.stats.as_dict(),
+            )
+
+
 async def run_all_workers() -> None:
     """Start all background workers."""
     settings = get_settings()
@@ -22,17 +48,23 @@ async def run_all_workers() -> None:
 
     workers = [
         TxProcessorWorker(),
+        OutboxRelayWorker(),
         WebhookDispatcherWorker(),
         AnalyticsAggregatorWorker(),
         EscrowExpiryWorker(),
+        SubscriptionExpiryWorker(),
         UsageMeterWorker(),
         ReputationSyncWorker(),
+        ReputationScorerWorker(),
         TaskWorker(),
+        BalanceTrackerWorker(),
     ]
 
-    logger.info("scheduler_starting", workers=[w.name for w in workers])
+    logger.info("scheduler_starting", workers=[w.name for w in workers], process=PROCESS_ID)
 
+    get_blockhash_provider().start()
     tasks = [asyncio.create_task(w.run()) for w in workers]
+    tasks.append(asyncio.create_task(_log_stats(workers, settings.worker_stats_log_seconds)))
 
     try:
         await asyncio.gather(*tasks)
@@ -40,6 +72,10 @@ async def run_all_workers() -> None:
         for task in tasks:
             task.cancel()
         await asyncio.gather(*tasks, return_exceptions=True)
+    finally:
+        await get_blockhash_provider().stop()
+        await close_signature_subscriber()
+        await close_rpc_clients()
 
 
 def main() -> None:
@@ -0,0 +1,29 @@
+"""Subscription expiry worker -- downgrade orgs whose paid period has ended."""
+
+from ..core.config import get_settings
+from ..core.database import get_session_factory
+from ..core.logging import get_logger
+from ..services.auth_cache import invalidate_org_auth
+from ..services.usdc_billing import UsdcBillingService
+from .base import BaseWorker
+
+logger = get_logger(__name__)
+
+
+class SubscriptionExpiryWorker(BaseWorker):
+    name = "subscription_expiry"
+    interval_seconds = 60.0
+
+    async def tick(self) -> bool | None:
+        batch_size = get_settings().subscription_expiry_batch_size
+        factory = get_session_factory()
+        async with factory() as db:
+            orgs = await UsdcBillingService(db).expire_overdue(limit=batch_size)
+            # Commit before invalidating so no request can re-cache the old tier
+            await db.commit()
+        for org_id in orgs:
+            await invalidate_org_auth(org_id)
+        if not orgs:
+            return False
+        logger.info("subscription_expiry_tick", downgraded=len(orgs))
+        return len(orgs) >= batch_size or None
@@ -5,20 +5,26 @@ compatible model (X402_LLM_* env vars, same config as the playground x402
 demo), writes the delivery payload, and releases the escrow to the agent.
 Falls back to a deterministic demo response only when no LLM key is
 configured so the payment rail stays demonstrable end to end. When the
-provider rate-limits (429/5xx), the task is left queued and retried on the
-next tick instead of silently delivering a demo answer.
+provider rate-limits (429/5xx), the task is deferred until the provider's
+Retry-After and the provider's concurrency limit shrinks, instead of
+silently delivering a demo answer. Tasks run concurrently, several per
+worker and across replicas.
 """
 
 import asyncio
 import os
-import random
+import uuid
+from datetime import datetime, timedelta, timezone
 
-import httpx
-from sqlalchemy import select
+from sqlalchemy import or_, select, update
+from sqlalchemy.ext.asyncio import AsyncSession
 
+from ..core.config import get_settings
 from ..core.database import get_session_factory
 from ..core.logging import get_logger
+from ..models.escrow import Escrow
 from ..models.task import Task
+from ..services.llm_pool import LLMProvider, LLMRateLimitedError, close_llm_providers, get_llm_provider
 from ..services.task_service import TaskService
 from .base import BaseWorker
 
@@ -55,144 +61,150 @@ CATEGORY_PROMPTS = {
 }
 
 
-class LLMRateLimitedError(Exception):
-    """Raised when the LLM provider keeps rate-limiting after retries.
-
-    The task is left in the queue and retried on a later tick instead of
-    delivering a demo fallback that would look like real AI output.
-    """
-
-
-_LLM_RETRYABLE = {429, 500, 502, 503, 504}
-
 # Cap on consecutive worker execution failures per task before it is marked
-# failed and removed from the pickup queue (prevents queue head-of-line
-# blocking by a perpetually rate-limited task).
+# failed and removed from the pickup queue. Provider throttling (429) defers
+# the task without counting towards it.
 MAX_TASK_FAILURES = int(os.getenv("TASK_MAX_FAILURES", "5"))
 
 
-async def _call_llm(prompt: str, category: str = "general") -> tuple[str, str, str]:
+async def _call_llm(
+    prompt: str, category: str = "general", provider: LLMProvider | None = None
+) -> tuple[str, str, str]:
     """Call the configured OpenAI-compatible model; fall back to demo only when unconfigured.
 
-    Retries 429/5xx with exponential backoff + jitter (respecting Retry-After
-    when present). After max retries the call raises LLMRateLimitedError so
-    the worker re-queues the task instead of delivering a fake result.
+    Makes a single attempt through the pooled provider, which adapts its
+    concurrency to throttling; failures raise LLMRateLimitedError so the
+    worker defers the task instead of delivering a fake result.
 
     Returns (provider, model, response_text).
     """
-    base = (os.getenv("X402_LLM_BASE_URL") or os.getenv("OPENAI_COMPAT_BASE_URL") or "").rstrip("/")
-    key = os.getenv("X402_LLM_KEY") or os.getenv("OPENAI_COMPAT_API_KEY") or ""
-    model = os.getenv("X402_LLM_MODEL") or os.getenv("OPENAI_COMPAT_MODEL") or "demo"
-    max_attempts = int(os.getenv("X402_LLM_MAX_ATTEMPTS", "4"))
-
-    system_prompt = CATEGORY_PROMPTS.get(category, CATEGORY_PROMPTS["general"])
-
-    if not (base and key):
+    provider = provider or get_llm_provider()
+    if not provider.configured:
         return (
             "demo",
-            model,
+            provider.model,
             f"[demo AI · no LLM key configured on the API] Task executed successfully.\n\n"
             f"Prompt: {prompt[:200]}\n\n"
             f"Payment rail verified: the escrow for this task was funded on-chain and will "
             f"release to the agent's wallet on delivery. Point the API at any OpenAI-compatible "
             f"model (X402_LLM_BASE_URL) and this same flow returns a real AI deliverable.",
         )
+    system_prompt = CATEGORY_PROMPTS.get(category, CATEGORY_PROMPTS["general"])
+    content = await provider.complete(system_prompt, prompt)
+    return "openai-compatible", provider.model, content
 
-    last_status = 0
-    retry_after_sec = 0.0
-    resp = None
-    for attempt in range(max_attempts):
-        try:
-            async with httpx.AsyncClient(timeout=90) as client:
-                resp = await client.post(
-                    f"{base}/chat/completions",
-                    headers={"Authorization": f"Bearer {key}", "Content-Type": "application/json"},
-                    json={
-                        "model": model,
-                        "messages": [
-                            {"role": "system", "content": system_prompt},
-                            {"role": "user", "content": prompt},
-                        ],
-                        "max_tokens": 400,
-                    },
-                )
-            last_status = resp.status_code
-            if resp.status_code == 200:
-                data = resp.json()
-                content = (data.get("choices") or [{}])[0].get("message", {}).get("content")
-                if content:
-                    return "openai-compatible", model, content.strip()
-            if resp.status_code not in _LLM_RETRYABLE:
-                # Non-retryable (4xx etc.) — not a rate limit, so surface it.
-                raise LLMRateLimitedError(f"LLM returned HTTP {resp.status_code}: {resp.text[:200]}")
-            # Retryable: read Retry-After for the backoff window
-            try:
-                ra = resp.headers.get("Retry-After", "0")
-                retry_after_sec = float(ra) if ra else 0.0
-            except (ValueError, AttributeError):
-                retry_after_sec = 0.0
-        except (httpx.HTTPError, asyncio.TimeoutError) as e:
-            logger.warning("task_llm_call_failed", attempt=attempt + 1, error=str(e))
-
-        if attempt < max_attempts - 1:
-            delay = retry_after_sec if retry_after_sec > 0 else min(1.0 * (2**attempt), 8.0)
-            delay += random.uniform(0, 0.5)
-            logger.warning(
-                "task_llm_retry",
-                status=last_status,
-                attempt=attempt + 1,
-                backoff_s=round(delay, 1),
-            )
-            await asyncio.sleep(delay)
-            retry_after_sec = 0.0
 
-    raise LLMRateLimitedError(f"LLM rate-limited after {max_attempts} attempts (last HTTP {last_status})")
+class TaskWorker(BaseWorker):
+    """Execute funded tasks concurrently.
 
+    Each tick claims as many runnable tasks as there are free slots -- the
+    pool size, capped by the provider's current concurrency headroom -- and
+    runs them in the background. Claims lease a task (``claimed_until``)
+    under FOR UPDATE SKIP LOCKED, so replicas share the queue and a crashed
+    worker's tasks come due again when the lease runs out.
+    """
 
-class TaskWorker(BaseWorker):
     name = "task_worker"
     interval_seconds = 15.0
-
-    async def tick(self) -> None:
-        """Execute one funded/assigned task per tick.
+    exclusive = False  # claims use SKIP LOCKED: replicas share the work
+
+    def __init__(self):
+        super().__init__()
+        settings = get_settings()
+        self.pool_size = settings.task_pool_size
+        self.lease_seconds = settings.task_claim_lease_seconds
+        self._running: set[asyncio.Task] = set()
+        self._slot_freed = asyncio.Event()
+
+    async def teardown(self) -> None:
+        for run in self._running:
+            run.cancel()
+        await asyncio.gather(*self._running, return_exceptions=True)
+        await close_llm_providers()
+
+    async def wait_for_next_tick(self, delay: float) -> None:
+        # A finished task frees a slot: claim the next one straight away
+        try:
+            await asyncio.wait_for(self._slot_freed.wait(), delay)
+        except asyncio.TimeoutError:
+            pass
+        self._slot_freed.clear()
+
+    async def tick(self) -> bool | None:
+        provider = get_llm_provider()
+        free = min(self.pool_size - len(self._running), provider.headroom())
+        if free <= 0:
+            return None
+        factory = get_session_factory()
+        async with factory() as db:
+            claimed = await self.claim(db, free)
+        for task_id, org_id in claimed:
+            run = asyncio.create_task(self.execute(task_id, org_id, provider))
+            self._running.add(run)
+            run.add_done_callback(self._finished)
+        if not claimed:
+            return False
+        return None
+
+    def _finished(self, run: asyncio.Task) -> None:
+        self._running.discard(run)
+        self._slot_freed.set()
+
+    async def claim(self, db: AsyncSession, limit: int) -> list:
+        """Lease up to `limit` runnable tasks to this worker, oldest first.
 
         Only picks tasks whose escrow is funded (a task posted while the
-        funder had no SOL stays 'created' forever and would block the queue);
-        oldest-first so nothing starves.
+        funder had no SOL stays 'created' forever and would block the queue).
         """
-        from ..models.escrow import Escrow
+        now = datetime.now(timezone.utc)
+        runnable = (
+            select(Task.id)
+            .join(Escrow, Escrow.id == Task.escrow_id)
+            .where(
+                Task.status.in_(["assigned", "in_progress"]),
+                Escrow.status == "funded",
+                or_(Task.claimed_until.is_(None), Task.claimed_until <= now),
+            )
+            .order_by(Task.created_at)
+            .limit(limit)
+        )
+        if db.bind.dialect.name == "postgresql":
+            runnable = runnable.with_for_update(of=Task, skip_locked=True)
+        result = await db.execute(
+            update(Task)
+            .where(Task.id.in_(runnable.scalar_subquery()))
+            .values(claimed_until=now + timedelta(seconds=self.lease_seconds))
+            .returning(Task.id, Task.org_id)
+            .execution_options(synchronize_session=False)
+        )
+        claimed = result.all()
+        await db.commit()
+        return claimed
 
+    async def execute(self, task_id: uuid.UUID, org_id: uuid.UUID, provider: LLMProvider | None = None) -> None:
+        """Run one claimed task: assign if needed, call the model, deliver."""
         factory = get_session_factory()
         async with factory() as db:
             try:
                 svc = TaskService(db)
-                result = await db.execute(
-                    select(Task)
-                    .join(Escrow, Escrow.id == Task.escrow_id)
-                    .where(
-                        Task.status.in_(["assigned", "in_progress"]),
-                        Escrow.status == "funded",
-                    )
-                    .order_by(Task.created_at)
-                    .limit(1)
-                )
-                task = result.scalar_one_or_none()
-                if not task:
-                    return
+                task = await svc._get_task(task_id, org_id)
 
                 if not task.agent_id:
                     # Auto-assign the best available agent for the org
                     try:
                         assigned = await svc.auto_assign(task.id, task.org_id, task.capability)
-                        if not assigned:
-                            logger.info("task_no_agent", task_id=str(task.id))
-                            return
                     except Exception as e:
                         logger.warning("task_auto_assign_failed", task_id=str(task.id), error=str(e))
+                        assigned = None
+                    if not assigned:
+                        logger.info("task_no_agent", task_id=str(task.id))
+                        await self._defer(db, task, self.interval_seconds)
                         return
 
-                # Mark in progress
-                await svc.mark_in_progress(task.id, task.org_id)
+                if task.status != "in_progress":
+                    await svc.mark_in_progress(task.id, task.org_id)
+                # Commit before the model call: no transaction stays open across it
+                await db.commit()
 
                 # Build the prompt from the task
                 prompt = f"Task: {task.title}\n\nDescription: {task.description}"
@@ -202,16 +214,20 @@ class TaskWorker(BaseWorker):
                     prompt += f"\n\nRequirements: {task.requirements}"
 
                 try:
-                    provider, model, content = await _call_llm(prompt, task.category)
+                    provider_name, model, content = await _call_llm(prompt, task.category, provider)
                 except LLMRateLimitedError as e:
-                    # Retry the task on later ticks, but cap consecutive failures
-                    # so one perpetually rate-limited task can't block the queue.
-                    # Persist the counter (commit, not rollback) so it survives
-                    # across ticks; the task stays in_progress/assigned and is
-                    # re-picked until it either succeeds or hits the cap.
+                    if e.throttled:
+                        # Provider backpressure, not a task problem: retry once it clears
+                        await self._defer(db, task, e.retry_after)
+                        logger.info("task_llm_throttled", task_id=str(task.id), retry_after=e.retry_after)
+                        return
+                    # Cap consecutive failures so a task that keeps failing
+                    # leaves the queue; the counter is committed so it
+                    # survives across claims.
                     task.failure_count = (task.failure_count or 0) + 1
                     if task.failure_count >= MAX_TASK_FAILURES:
                         await svc.mark_failed(task.id, task.org_id)
+                        task.claimed_until = None
                         await db.commit()
                         logger.warning(
                             "task_failed_after_retries",
@@ -220,20 +236,19 @@ class TaskWorker(BaseWorker):
                             error=str(e),
                         )
                         return
-                    await db.commit()
+                    await self._defer(db, task, max(e.retry_after, self.interval_seconds * 2**task.failure_count))
                     logger.warning(
-                        "task_llm_rate_limited",
+                        "task_llm_failed",
                         task_id=str(task.id),
                         failure_count=task.failure_count,
                         error=str(e),
                     )
                     return
 
-                # Success — reset the failure counter so a later rate-limit
+                # Success — reset the failure counter so a later failure
                 # window starts fresh.
-                if task.failure_count:
-                    task.failure_count = 0
-                    await db.flush()
+                task.failure_count = 0
+                task.claimed_until = None
 
                 # Deliver + auto-release escrow to the agent
                 await svc.deliver(
@@ -241,7 +256,7 @@ class TaskWorker(BaseWorker):
                     org_id=task.org_id,
                     result_data={"output": content, "category": task.category},
                     delivery_notes="Delivered by task worker",
-                    provider=provider,
+                    provider=provider_name,
                     model=model,
                     auto_release=True,
                 )
@@ -250,8 +265,13 @@ class TaskWorker(BaseWorker):
                     "task_executed",
                     task_id=str(task.id),
                     status="released",
-                    provider=provider,
+                    provider=provider_name,
                     escrow_id=str(task.escrow_id) if task.escrow_id else None,
                 )
             except Exception as e:
-                logger.error("task_worker_tick_error", error=str(e))
+                logger.error("task_worker_execute_error", task_id=str(task_id), error=str(e))
+
+    async def _defer(self, db: AsyncSession, task: Task, seconds: float) -> None:
+        """Keep the task claimed for `seconds`, then let any worker pick it up again."""
+        task.claimed_until = datetime.now(timezone.utc) + timedelta(seconds=max(seconds, 1.0))
+        await db.commit()
@@ -1,42 +1,156 @@
 """Transaction processor worker -- confirm pending transactions."""
 
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 
-import httpx
-from sqlalchemy import select
+from sqlalchemy import select, update
 
+from ..core.config import get_settings
 from ..core.database import get_session_factory
 from ..core.logging import get_logger
-from ..core.solana import confirm_transaction
+from ..core.solana import confirm_transactions, get_block_height, get_rpc_client
+from ..models.outbox import build_event
 from ..models.transaction import Transaction
+from ..services.spend_ledger import SpendLedger
 from .base import BaseWorker
 
 logger = get_logger(__name__)
 
 
 class TxProcessorWorker(BaseWorker):
+    """Settle submitted transactions in bulk.
+
+    Each tick checks every in-flight signature with one getSignatureStatuses
+    pass (chunked and batched by core.solana) and applies the outcome with a
+    handful of set-based UPDATEs instead of touching rows one by one.
+    """
+
     name = "tx_processor"
     interval_seconds = 5.0
 
-    async def tick(self) -> None:
+    async def tick(self) -> bool | None:
+        settings = get_settings()
+        client = get_rpc_client()
         factory = get_session_factory()
         async with factory() as db:
-            result = await db.execute(select(Transaction).where(Transaction.status == "submitted").limit(50))
-            pending = result.scalars().all()
+            result = await db.execute(
+                select(
+                    Transaction.id,
+                    Transaction.org_id,
+                    Transaction.signature,
+                    Transaction.last_valid_block_height,
+                    Transaction.created_at,
+                    Transaction.wallet_id,
+                    Transaction.agent_id,
+                    Transaction.amount_lamports,
+                )
+                .where(Transaction.status == "submitted", Transaction.signature.is_not(None))
+                .order_by(Transaction.created_at)
+                .limit(settings.tx_confirm_batch_size)
+            )
+            pending = result.all()
 
             if not pending:
-                return
+                return False
+
+            # Read the block height *before* the statuses: a signature that
+            # is still unknown afterwards, with its blockhash already past
+            # this height, can never land.
+            block_height = None
+            if any(row.last_valid_block_height is not None for row in pending):
+                try:
+                    block_height = await get_block_height(client)
+                except Exception as e:
+                    logger.warning("block_height_fetch_failed", error=str(e))
+
+            statuses = await confirm_transactions(client, [row.signature for row in pending])
 
-            logger.info("processing_pending_txs", count=len(pending))
+            now = datetime.now(timezone.utc)
+            unknown_cutoff = now - timedelta(seconds=settings.tx_unknown_expiry_seconds)
+            confirmed, failed, expired = [], [], []
+            for row in pending:
+                if row.signature not in statuses:
+                    continue  # status read failed: never expire on an RPC error
+                status = statuses[row.signature]
+                if status in ("confirmed", "finalized"):
+                    confirmed.append(row.id)
+                elif status == "failed":
+                    failed.append(row.id)
+                elif row.last_valid_block_height is not None:
+                    if block_height is not None and block_height > row.last_valid_block_height:
+                        expired.append(row.id)
+                elif _as_utc(row.created_at) < unknown_cutoff:
+                    # No recorded expiry height: fall back to age, well past
+                    # the ~90s a blockhash stays valid.
+                    expired.append(row.id)
 
-            async with httpx.AsyncClient(timeout=15) as client:
-                for tx in pending:
-                    if not tx.signature:
-                        continue
-                    confirmed = await confirm_transaction(client, tx.signature)
-                    if confirmed:
-                        tx.status = "confirmed"
-                        tx.confirmed_at = datetime.now(timezone.utc)
-                    # Don't mark as failed yet -- might still be processing
+            # Guard on status so a concurrent writer's outcome is never overwritten
+            settled = {}
+            if confirmed:
+                result = await db.execute(
+                    update(Transaction)
+                    .where(Transaction.id.in_(confirmed), Transaction.status == "submitted")
+                    .values(status="confirmed", confirmed_at=now)
+                    .returning(Transaction.id)
+                    .execution_options(synchronize_session=False)
+                )
+                settled.update(dict.fromkeys(result.scalars().all(), ("confirmed", None)))
+            released = set()
+            for ids, error in (
+                (failed, "Transaction failed on-chain"),
+                (expired, "Blockhash expired before the transaction landed"),
+            ):
+                if not ids:
+                    continue
+                result = await db.execute(
+                    update(Transaction)
+                    .where(Transaction.id.in_(ids), Transaction.status == "submitted")
+                    .values(status="failed", error=error)
+                    .returning(Transaction.id)
+                    .execution_options(synchronize_session=False)
+                )
+                ids = result.scalars().all()
+                released.update(ids)
+                settled.update(dict.fromkeys(ids, ("failed", error)))
 
+            # Bulk UPDATEs bypass the ORM's state capture: add their events here
+            db.add_all(
+                build_event(
+                    "transaction",
+                    row.id,
+                    row.org_id,
+                    settled[row.id][0],
+                    "submitted",
+                    {
+                        "agent_id": row.agent_id,
+                        "wallet_id": row.wallet_id,
+                        "signature": row.signature,
+                        "amount_lamports": row.amount_lamports,
+                        "error": settled[row.id][1],
+                    },
+                )
+                for row in pending
+                if row.id in settled
+            )
             await db.commit()
+
+            # Failed transfers no longer count towards today's spend
+            ledger = SpendLedger(db)
+            for row in pending:
+                if row.id in released:
+                    await ledger.release(row.agent_id, row.wallet_id, row.amount_lamports, row.created_at)
+
+            logger.info(
+                "processed_pending_txs",
+                checked=len(pending),
+                confirmed=len(confirmed),
+                failed=len(failed),
+                expired=len(expired),
+            )
+            # A full batch means more is in flight: go again without sleeping
+            if len(pending) >= settings.tx_confirm_batch_size:
+                return True
+
+
+def _as_utc(value: datetime) -> datetime:
+    """SQLite hands back naive timestamps; treat them as UTC."""
+    return value if value.tzinfo else value.replace(tzinfo=timezone.utc)
@@ -1,54 +1,38 @@
 """Usage meter worker -- count usage for billing."""
 
-from datetime import datetime, timezone
-
-from sqlalchemy import func, select
+from datetime import datetime, timedelta, timezone
 
 from ..core.database import get_session_factory
 from ..core.logging import get_logger
-from ..models.organization import Organization
-from ..models.transaction import Transaction
-from ..services.billing import BillingService
+from ..services.billing import BillingService, billing_period
 from .base import BaseWorker
 
 logger = get_logger(__name__)
 
 
 class UsageMeterWorker(BaseWorker):
+    """Meter every org's period usage from the analytics rollups in bulk.
+
+    A pass is a couple of grouped queries plus one upsert regardless of the
+    number of orgs, so it runs often enough to keep tier checks current.
+    """
+
     name = "usage_meter"
-    interval_seconds = 3600.0  # 1 hour
+    interval_seconds = 300.0  # 5 minutes
 
-    async def tick(self) -> None:
+    async def tick(self) -> bool | None:
         factory = get_session_factory()
+        now = datetime.now(timezone.utc)
         async with factory() as db:
-            # Get all active orgs
-            result = await db.execute(select(Organization.id).where(Organization.is_active.is_(True)))
-            org_ids = [row[0] for row in result.all()]
-
             billing = BillingService(db)
-            now = datetime.now(timezone.utc)
-            period_start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-
-            for org_id in org_ids:
-                # Count transactions this period
-                await db.scalar(
-                    select(func.count()).where(
-                        Transaction.org_id == org_id,
-                        Transaction.created_at >= period_start,
-                    )
-                )
-                await db.scalar(
-                    select(func.coalesce(func.sum(Transaction.amount_lamports), 0)).where(
-                        Transaction.org_id == org_id,
-                        Transaction.created_at >= period_start,
-                    )
-                )
-
-                await billing.increment_usage(
-                    org_id=org_id,
-                    tx_count=0,  # don't double-count, just sync
-                    tx_volume=0,
-                )
-
+            orgs = await billing.meter_usage(now)
+            # Early in a period, also settle the previous one: its last
+            # transactions may have reached the rollups after it ended
+            period_start, _ = billing_period(now)
+            if now - period_start < timedelta(days=1):
+                await billing.meter_usage(period_start - timedelta(seconds=1))
             await db.commit()
-            logger.info("usage_meter_tick", orgs_processed=len(org_ids))
+            if not orgs:
+                return False
+            logger.info("usage_meter_tick", orgs_metered=orgs)
+            return None
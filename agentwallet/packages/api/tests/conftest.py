@@ -258,6 +258,16 @@ def mock_redis():
             yield mock_client
 
 
+@pytest.fixture(autouse=True)
+def reset_auth_cache():
+    """Resolved auth contexts are process-global; start every test cold."""
+    from agentwallet.services.auth_cache import get_auth_cache
+
+    get_auth_cache().clear()
+    yield
+    get_auth_cache().clear()
+
+
 @pytest.fixture
 def mock_solana_rpc():
     """Mock Solana RPC calls."""
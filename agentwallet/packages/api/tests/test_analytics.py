@@ -0,0 +1,217 @@
+"""Tests for the incremental analytics rollups."""
+
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from agentwallet.core.exceptions import ValidationError
+from agentwallet.core.hll import HyperLogLog, merge_sketches
+from agentwallet.models.analytics_daily import AnalyticsDaily
+from agentwallet.models.transaction import Transaction
+from agentwallet.services.analytics_engine import AnalyticsEngine
+from sqlalchemy import select
+
+
+async def _drain(engine: AnalyticsEngine) -> None:
+    while await engine.rollup():
+        pass
+
+
+async def _rollups(db_session, org_id) -> dict:
+    db_session.expire_all()
+    rows = (await db_session.execute(select(AnalyticsDaily).where(AnalyticsDaily.org_id == org_id))).scalars().all()
+    return {
+        row.agent_id: (
+            row.tx_count,
+            row.total_spend_lamports,
+            row.total_fees_lamports,
+            row.failed_tx_count,
+            row.unique_destinations,
+        )
+        for row in rows
+    }
+
+
+@pytest.mark.asyncio
+async def test_rollup_applies_new_rows_and_late_status_changes(db_session, test_org, test_agent, test_wallet):
+    org_id, agent_id = test_org.id, test_agent.id
+    txs = [
+        Transaction(
+            org_id=org_id,
+            agent_id=agent_id if i < 2 else None,
+            wallet_id=test_wallet.id,
+            tx_type="transfer_sol",
+            status="submitted",
+            from_address=test_wallet.address,
+            to_address=f"Dest{i % 2}",
+            amount_lamports=1_000 * (i + 1),
+            platform_fee_lamports=10,
+        )
+        for i in range(3)
+    ]
+    db_session.add_all(txs)
+    await db_session.commit()
+
+    engine = AnalyticsEngine(db_session)
+    await _drain(engine)
+    await db_session.commit()
+    assert await _rollups(db_session, org_id) == {
+        None: (3, 6_000, 30, 0, 2),
+        agent_id: (2, 3_000, 20, 0, 2),
+    }
+
+    # A late failure only moves failed_tx_count; re-running is a no-op
+    txs[0].status = "failed"
+    await db_session.commit()
+    await _drain(engine)
+    await _drain(engine)
+    await db_session.commit()
+    assert await _rollups(db_session, org_id) == {
+        None: (3, 6_000, 30, 1, 2),
+        agent_id: (2, 3_000, 20, 1, 2),
+    }
+
+    # Backfilling the day recounts it to the same totals
+    today = datetime.now(timezone.utc).date()
+    assert await engine.backfill(today, today) >= 3
+    await _drain(engine)
+    await db_session.commit()
+    assert await _rollups(db_session, org_id) == {
+        None: (3, 6_000, 30, 1, 2),
+        agent_id: (2, 3_000, 20, 1, 2),
+    }
+
+
+@pytest.mark.asyncio
+async def test_rollup_counts_destinations_from_sketches(db_session, test_org, test_wallet):
+    """A later pass grows the day's distinct count from its sketch, not a rescan of the day."""
+    from sqlalchemy import event
+
+    def add(destinations):
+        db_session.add_all(
+            Transaction(
+                org_id=test_org.id,
+                wallet_id=test_wallet.id,
+                tx_type="transfer_sol",
+                status="submitted",
+                from_address=test_wallet.address,
+                to_address=address,
+                amount_lamports=1_000,
+            )
+            for address in destinations
+        )
+
+    engine = AnalyticsEngine(db_session)
+    add(["DestA", "DestB"])
+    await db_session.commit()
+    await _drain(engine)
+
+    statements = []
+    sync_engine = db_session.bind.sync_engine
+
+    def capture(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(sync_engine, "before_cursor_execute", capture)
+    try:
+        add(["DestB", "DestC"])
+        await db_session.commit()
+        await _drain(engine)
+        await db_session.commit()
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", capture)
+
+    assert (await _rollups(db_session, test_org.id))[None] == (4, 4_000, 0, 0, 3)
+    assert not any("count(distinct" in statement.lower() for statement in statements)
+
+
+def test_hyperloglog_estimates_and_merges():
+    a, b = HyperLogLog(), HyperLogLog()
+    for i in range(5_000):
+        a.add(f"addr-{i}")
+    for i in range(2_500, 10_000):
+        b.add(f"addr-{i}")
+    assert abs(a.count() - 5_000) < 5_000 * 0.06
+    merged = merge_sketches([a.to_bytes(), None, b.to_bytes()])
+    assert abs(merged.count() - 10_000) < 10_000 * 0.06
+
+    small = HyperLogLog()
+    for address in ["x", "y", "z", "x"]:
+        small.add(address)
+    assert small.count() == 3
+
+
+@pytest.mark.asyncio
+async def test_query_picks_coarsest_cube_and_merges_distincts(db_session, test_org, test_agent, test_wallet):
+    org_id, agent_id = test_org.id, test_agent.id
+    day1 = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0) - timedelta(days=3)
+    day2 = day1 + timedelta(days=1)
+    # The same two destinations on both days, one of them paid in a token
+    spec = [
+        (day1 + timedelta(hours=10), "DestA", None, 1_000),
+        (day1 + timedelta(hours=10, minutes=30), "DestB", "MintX", 2_000),
+        (day2 + timedelta(hours=11), "DestA", None, 3_000),
+        (day2 + timedelta(hours=11), "DestB", "MintX", 4_000),
+    ]
+    db_session.add_all(
+        Transaction(
+            org_id=org_id,
+            agent_id=agent_id,
+            wallet_id=test_wallet.id,
+            tx_type="transfer_sol",
+            status="confirmed",
+            from_address=test_wallet.address,
+            to_address=to_address,
+            token_mint=mint,
+            amount_lamports=amount,
+            platform_fee_lamports=0,
+            created_at=created,
+        )
+        for created, to_address, mint, amount in spec
+    )
+    await db_session.commit()
+
+    engine = AnalyticsEngine(db_session)
+    await _drain(engine)
+    await db_session.commit()
+    end = day2 + timedelta(days=1)
+
+    totals = await engine.query(org_id, day1, end)
+    assert totals["cube"] == "daily"
+    assert totals["rows"] == [
+        {
+            "tx_count": 4,
+            "total_spend_lamports": 10_000,
+            "total_fees_lamports": 0,
+            "failed_tx_count": 0,
+            "unique_destinations": 2,  # not 2 per day summed
+        }
+    ]
+
+    by_day = await engine.query(org_id, day1, end, group_by="day")
+    assert by_day["cube"] == "daily"
+    assert [(r["day"], r["tx_count"], r["unique_destinations"]) for r in by_day["rows"]] == [
+        (day1.date().isoformat(), 2, 2),
+        (day2.date().isoformat(), 2, 2),
+    ]
+
+    by_token = await engine.query(org_id, day1, end, group_by="token")
+    assert by_token["cube"] == "hourly"
+    assert {r["token"]: (r["total_spend_lamports"], r["unique_destinations"]) for r in by_token["rows"]} == {
+        "MintX": (6_000, 1),
+        "SOL": (4_000, 1),
+    }
+
+    # Not day-aligned: falls back to the hourly cube
+    partial = await engine.query(org_id, day1 + timedelta(hours=10), day1 + timedelta(hours=11), agent_id=agent_id)
+    assert partial["cube"] == "hourly"
+    assert partial["rows"][0]["tx_count"] == 2
+
+    by_destination = await engine.query(org_id, day1, end, group_by="destination")
+    assert by_destination["cube"] == "destination_daily"
+    assert by_destination["rows"] == [
+        {"destination": "DestB", "tx_count": 2, "total_spend_lamports": 6_000},
+        {"destination": "DestA", "tx_count": 2, "total_spend_lamports": 4_000},
+    ]
+
+    with pytest.raises(ValidationError):
+        await engine.query(org_id, day1, end, group_by="destination", agent_id=agent_id)
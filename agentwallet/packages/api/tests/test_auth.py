@@ -86,3 +86,64 @@ async def test_unauthenticated_access(unauthed_client):
     """Test that protected endpoints require auth."""
     resp = await unauthed_client.get("/v1/agents")
     assert resp.status_code == 401
+
+
+# ── Auth context cache ─────────────────────────────────────────────────
+
+
+async def _make_api_key(db_session, org_id, raw_key):
+    from agentwallet.api.middleware.auth import hash_api_key
+    from agentwallet.models.api_key import ApiKey
+
+    api_key = ApiKey(
+        org_id=org_id,
+        key_hash=hash_api_key(raw_key),
+        key_prefix=raw_key[:15] + "...",
+        name="cached",
+        permissions={"agents": "r"},
+    )
+    db_session.add(api_key)
+    await db_session.commit()
+    return api_key
+
+
+@pytest.mark.asyncio
+async def test_api_key_auth_is_cached_and_revocation_invalidates(client, test_org, db_session):
+    """Repeat API-key requests skip the DB lookup; revoking drops the cache entry at once."""
+    from unittest.mock import patch
+
+    from agentwallet.services.auth_cache import get_auth_cache
+
+    raw_key = f"aw_live_{'c' * 40}"
+    api_key = await _make_api_key(db_session, test_org.id, raw_key)
+
+    resp = await client.get("/v1/auth/api-keys", headers={"X-API-Key": raw_key})
+    assert resp.status_code == 200
+    assert get_auth_cache()._local[f"key:{api_key.key_hash}"][1]["org_id"] == str(test_org.id)
+
+    # Served from the cache: the ApiKey lookup is never reached
+    with patch("agentwallet.api.middleware.auth.select", side_effect=AssertionError("db lookup")):
+        resp = await client.get("/v1/auth/api-keys", headers={"X-API-Key": raw_key})
+    assert resp.status_code == 200
+
+    resp = await client.delete(f"/v1/auth/api-keys/{api_key.id}")
+    assert resp.status_code == 200
+    resp = await client.get("/v1/auth/api-keys", headers={"X-API-Key": raw_key})
+    assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_api_key_usage_is_flushed_in_one_batch(test_org, db_session):
+    """Touches are coalesced in memory and written with a single flush."""
+    from agentwallet.services.auth_cache import ApiKeyUsageRecorder
+
+    keys = [await _make_api_key(db_session, test_org.id, f"aw_live_usage{i}_{'u' * 30}") for i in range(3)]
+    recorder = ApiKeyUsageRecorder(flush_interval=60)
+    for key in keys + keys:
+        recorder.touch(key.id)
+
+    assert await recorder.flush() == 3
+    assert await recorder.flush() == 0
+    for key in keys:
+        await db_session.refresh(key)
+        assert key.last_used_at is not None
@@ -227,3 +227,57 @@ async def test_billing_unauthenticated(unauthed_client):
     """Billing endpoints require auth."""
     resp = await unauthed_client.get("/v1/billing/plans")
     assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_tier_change_is_committed_before_auth_invalidation(client, test_org, test_wallet):
+    """A request re-caching auth right after invalidation must already see the new tier."""
+    seen = []
+
+    async def _invalidate(org_id):
+        seen.append(await _org_tier(org_id))
+
+    with _mock_transfer(), patch("agentwallet.api.routers.billing.invalidate_org_auth", new=_invalidate):
+        resp = await client.post(
+            "/v1/billing/subscribe",
+            json={"tier": "enterprise", "from_wallet_id": str(test_wallet.id)},
+        )
+        assert resp.status_code == 201
+        resp = await client.post("/v1/billing/cancel")
+        assert resp.status_code == 200
+
+    assert seen == ["enterprise", "free"]
+
+
+@pytest.mark.asyncio
+async def test_overdue_subscription_is_expired_by_the_worker(client, test_org, test_wallet):
+    """Reading an overdue subscription writes nothing; the worker downgrades the org."""
+    from datetime import datetime, timedelta, timezone
+
+    from agentwallet.models.billing_subscription import BillingSubscription
+    from agentwallet.workers.subscription_expiry import SubscriptionExpiryWorker
+    from sqlalchemy import update
+
+    with _mock_transfer():
+        await client.post(
+            "/v1/billing/subscribe",
+            json={"tier": "pro", "from_wallet_id": str(test_wallet.id)},
+        )
+    async with get_session_factory()() as session:
+        await session.execute(
+            update(BillingSubscription)
+            .where(BillingSubscription.org_id == test_org.id)
+            .values(period_end=datetime.now(timezone.utc) - timedelta(days=1))
+        )
+        await session.commit()
+
+    resp = await client.get("/v1/billing/subscription")
+    assert resp.json()["subscription"]["status"] == "expired"
+    assert resp.json()["subscription"]["org_tier"] == "free"
+    assert await _org_tier(test_org.id) == "pro"
+
+    invalidate = AsyncMock()
+    with patch("agentwallet.workers.subscription_expiry.invalidate_org_auth", new=invalidate):
+        await SubscriptionExpiryWorker().tick()
+    assert await _org_tier(test_org.id) == "free"
+    invalidate.assert_any_await(test_org.id)
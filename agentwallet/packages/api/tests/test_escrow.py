@@ -1,6 +1,15 @@
 """Tests for escrow operations."""
 
+from datetime import datetime, timedelta, timezone
+
 import pytest
+from agentwallet.core.solana import CachedBlockhash, build_sol_transfers
+from agentwallet.models.escrow import Escrow
+from agentwallet.models.outbox import OutboxEvent
+from agentwallet.models.wallet import Wallet
+from solders.hash import Hash
+from solders.keypair import Keypair
+from sqlalchemy import select
 
 
 @pytest.mark.asyncio
@@ -197,7 +206,7 @@ async def test_escrow_release_disburses_from_platform(client, db_session, test_e
 
 
 @pytest.mark.asyncio
-async def test_escrow_refund_returns_to_funder(client, db_session, test_escrow, test_wallet, monkeypatch):
+async def test_escrow_refund_returns_to_funder(client, db_session, test_escrow, test_wallet, mock_redis, monkeypatch):
     """Refund must return custody funds to the funder's wallet address."""
     from agentwallet.services import escrow_service as svc
     from solders.keypair import Keypair
@@ -230,6 +239,8 @@ async def test_escrow_refund_returns_to_funder(client, db_session, test_escrow,
     assert sent["from"] == str(platform_kp.pubkey())
     assert sent["to"] == test_wallet.address
     assert sent["lamports"] == test_escrow.amount_lamports
+    # The funder's cached balance is dropped once the refund is sent
+    assert any(f"bal:{test_wallet.address}" in call.args for call in mock_redis.delete.await_args_list)
 
 
 @pytest.mark.asyncio
@@ -263,3 +274,272 @@ async def test_escrow_dispute(client, db_session, test_escrow):
     data = resp.json()
     assert data["status"] == "disputed"
     assert data["dispute_reason"] == "work not delivered"
+
+
+def _expired_escrow(db_session, org_id, wallet_id, status, lamports=200_000_000):
+    escrow = Escrow(
+        org_id=org_id,
+        funder_wallet_id=wallet_id,
+        recipient_address="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+        amount_lamports=lamports,
+        status=status,
+        conditions={},
+        expires_at=datetime.now(timezone.utc) - timedelta(hours=1),
+    )
+    db_session.add(escrow)
+    return escrow
+
+
+async def _funder_wallet(db_session, org_id):
+    wallet = Wallet(
+        org_id=org_id,
+        address=str(Keypair().pubkey()),
+        wallet_type="agent",
+        encrypted_key="encrypted_test_key_placeholder",
+    )
+    db_session.add(wallet)
+    await db_session.flush()
+    return wallet
+
+
+@pytest.mark.asyncio
+async def test_expire_stale_escrows_queues_funded_refunds(db_session, test_org):
+    """One bulk UPDATE expires stale escrows; only funded ones are queued for refund."""
+    from agentwallet.services.escrow_service import EscrowService
+
+    wallet = await _funder_wallet(db_session, test_org.id)
+    created = _expired_escrow(db_session, test_org.id, wallet.id, "created")
+    funded = _expired_escrow(db_session, test_org.id, wallet.id, "funded")
+    await db_session.commit()
+    created_id, funded_id = created.id, funded.id
+
+    svc = EscrowService(db_session)
+    while await svc.expire_stale_escrows(limit=1):
+        pass
+    await db_session.commit()
+
+    rows = {
+        e.id: e
+        for e in (
+            await db_session.execute(
+                select(Escrow).where(Escrow.id.in_([created_id, funded_id])).execution_options(populate_existing=True)
+            )
+        ).scalars()
+    }
+    assert rows[created_id].status == "expired"
+    assert rows[created_id].refund_status is None
+    assert rows[funded_id].status == "expired"
+    assert rows[funded_id].refund_status == "pending"
+    assert rows[funded_id].completed_at is not None
+
+    events = (
+        await db_session.execute(
+            select(OutboxEvent).where(OutboxEvent.org_id == test_org.id, OutboxEvent.event_type == "escrow.expired")
+        )
+    ).scalars()
+    previous = {e.payload["resource_id"]: e.payload["previous_state"] for e in events}
+    assert previous[str(created_id)] == "created"
+    assert previous[str(funded_id)] == "funded"
+
+
+@pytest.mark.asyncio
+async def test_escrow_refund_pipeline_packs_and_reconciles(db_session, test_org, monkeypatch):
+    """Refunds are packed per funder, recorded before sending, and resent only once expired."""
+    from agentwallet.services import escrow_refunds as pipeline_mod
+    from agentwallet.services.escrow_refunds import EscrowRefundPipeline
+    from agentwallet.services.escrow_service import EscrowService
+
+    wallets = [await _funder_wallet(db_session, test_org.id) for _ in range(3)]
+    escrows = [_expired_escrow(db_session, test_org.id, w.id, "funded") for w in wallets]
+    escrows.append(_expired_escrow(db_session, test_org.id, wallets[0].id, "funded", lamports=50_000_000))
+    await db_session.commit()
+    ids = [e.id for e in escrows]
+    addresses = {w.address for w in wallets}
+    await EscrowService(db_session).expire_stale_escrows()
+    await db_session.commit()
+
+    built, sent = [], []
+    state = {"block_height": 50, "status": None, "rpc_error": False}
+
+    def fake_build(keypair, transfers, blockhash):
+        tx = build_sol_transfers(keypair, transfers, blockhash)
+        built.append({a: lamports for a, lamports in transfers if a in addresses})
+        return tx
+
+    class FakeBlockhashes:
+        async def get(self, client):
+            return CachedBlockhash(Hash.new_unique(), 100, 0.0)
+
+    async def fake_submit(client, raw):
+        sent.append(raw)
+        return "ignored"
+
+    async def fake_confirm(client, sigs):
+        # An RPC error leaves the chunk's signatures out of the result
+        return {} if state["rpc_error"] else {sig: state["status"] for sig in sigs}
+
+    async def fake_height(client):
+        return state["block_height"]
+
+    async def fake_balance(client, address):
+        return 10**12
+
+    async def fake_rent(client):
+        return 890_880
+
+    monkeypatch.setattr(pipeline_mod, "build_sol_transfers", fake_build)
+    monkeypatch.setattr(pipeline_mod, "get_blockhash_provider", lambda: FakeBlockhashes())
+    monkeypatch.setattr(pipeline_mod, "submit_transaction", fake_submit)
+    monkeypatch.setattr(pipeline_mod, "confirm_transactions", fake_confirm)
+    monkeypatch.setattr(pipeline_mod, "get_block_height", fake_height)
+    monkeypatch.setattr(pipeline_mod, "get_balance", fake_balance)
+    monkeypatch.setattr(pipeline_mod, "get_rent_exempt_min", fake_rent)
+    monkeypatch.setattr(pipeline_mod, "load_platform_keypair", lambda: Keypair())
+
+    async def load():
+        result = await db_session.execute(
+            select(Escrow).where(Escrow.id.in_(ids)).execution_options(populate_existing=True)
+        )
+        return {e.id: e for e in result.scalars()}
+
+    pipeline = EscrowRefundPipeline(db_session, rpc=object())
+
+    # First pass: one packed transaction, one transfer per funder wallet
+    assert await pipeline.submit() >= 4
+    ours = [b for b in built if b]
+    assert len(ours) == 1
+    assert ours[0] == {
+        wallets[0].address: 250_000_000,
+        wallets[1].address: 200_000_000,
+        wallets[2].address: 200_000_000,
+    }
+    rows = await load()
+    assert {e.refund_status for e in rows.values()} == {"submitted"}
+    assert len({e.refund_signature for e in rows.values()}) == 1
+    assert all(e.refund_attempts == 1 for e in rows.values())
+
+    # Unknown signature, blockhash still valid: leave it alone
+    await pipeline.reconcile()
+    assert {e.refund_status for e in (await load()).values()} == {"submitted"}
+
+    # Blockhash expired but the status read failed: it may have landed, keep it
+    state["block_height"] = 200
+    state["rpc_error"] = True
+    await pipeline.reconcile()
+    assert {e.refund_status for e in (await load()).values()} == {"submitted"}
+    state["rpc_error"] = False
+
+    # Blockhash expired without landing: re-queued, resent one wallet per tx
+    await pipeline.reconcile()
+    assert {e.refund_status for e in (await load()).values()} == {"pending"}
+    built.clear()
+    await pipeline.submit()
+    assert sorted(len(b) for b in built if b) == [1, 1, 1]
+    rows = await load()
+    assert len({e.refund_signature for e in rows.values()}) == 3
+    assert all(e.refund_attempts == 2 for e in rows.values())
+
+    # Landed: refunded
+    state["status"] = "finalized"
+    outcome = await pipeline.run()
+    assert outcome["refunded"] >= 4
+    assert {e.refund_status for e in (await load()).values()} == {"refunded"}
+
+
+@pytest.mark.asyncio
+async def test_refund_skips_funders_whose_balance_read_fails(db_session, test_org, monkeypatch):
+    """A funder with an unknown balance gets no guessed top-up; its escrows wait for the next pass."""
+    from unittest.mock import AsyncMock
+
+    import httpx
+    from agentwallet.services import escrow_refunds as pipeline_mod
+    from agentwallet.services.escrow_refunds import EscrowRefundPipeline
+    from agentwallet.services.escrow_service import EscrowService
+
+    ok_wallet, down_wallet = [await _funder_wallet(db_session, test_org.id) for _ in range(2)]
+    ok = _expired_escrow(db_session, test_org.id, ok_wallet.id, "funded")
+    down = _expired_escrow(db_session, test_org.id, down_wallet.id, "funded")
+    await db_session.commit()
+    ok_id, down_id = ok.id, down.id
+    await EscrowService(db_session).expire_stale_escrows()
+    await db_session.commit()
+
+    built = []
+
+    def fake_build(keypair, transfers, blockhash):
+        built.extend(address for address, _ in transfers)
+        return build_sol_transfers(keypair, transfers, blockhash)
+
+    async def fake_balance(client, address):
+        if address == down_wallet.address:
+            raise httpx.ConnectError("rpc down")
+        return 10**12
+
+    class FakeBlockhashes:
+        async def get(self, client):
+            return CachedBlockhash(Hash.new_unique(), 100, 0.0)
+
+    monkeypatch.setattr(pipeline_mod, "build_sol_transfers", fake_build)
+    monkeypatch.setattr(pipeline_mod, "get_blockhash_provider", lambda: FakeBlockhashes())
+    monkeypatch.setattr(pipeline_mod, "submit_transaction", AsyncMock(return_value="ignored"))
+    monkeypatch.setattr(pipeline_mod, "get_balance", fake_balance)
+    monkeypatch.setattr(pipeline_mod, "get_rent_exempt_min", AsyncMock(return_value=890_880))
+    monkeypatch.setattr(pipeline_mod, "load_platform_keypair", lambda: Keypair())
+
+    await EscrowRefundPipeline(db_session, rpc=object()).submit()
+
+    assert ok_wallet.address in built and down_wallet.address not in built
+    rows = {
+        e.id: e
+        for e in (
+            await db_session.execute(
+                select(Escrow).where(Escrow.id.in_([ok_id, down_id])).execution_options(populate_existing=True)
+            )
+        ).scalars()
+    }
+    assert rows[ok_id].refund_status == "submitted"
+    assert (rows[down_id].refund_status, rows[down_id].refund_attempts) == ("pending", 0)
+
+
+@pytest.mark.asyncio
+async def test_release_loses_cleanly_to_expiry(db_session, test_org, monkeypatch):
+    """A release racing expiry sees "expired", and only expired escrows are ever refunded."""
+    from unittest.mock import AsyncMock
+
+    from agentwallet.core.exceptions import EscrowStateError
+    from agentwallet.services import escrow_refunds as pipeline_mod
+    from agentwallet.services import escrow_service as svc
+    from agentwallet.services.escrow_refunds import EscrowRefundPipeline
+    from agentwallet.services.escrow_service import EscrowService
+
+    wallet = await _funder_wallet(db_session, test_org.id)
+    escrow = _expired_escrow(db_session, test_org.id, wallet.id, "funded")
+    await db_session.commit()
+    transfer = AsyncMock(return_value="sig-release")
+    monkeypatch.setattr(svc, "transfer_sol", transfer)
+    monkeypatch.setattr(svc, "load_platform_keypair", lambda: Keypair())
+    monkeypatch.setattr(svc, "confirm_transaction", AsyncMock(return_value=True))
+    monkeypatch.setattr(EscrowService, "_rent_exempt_shortfall", AsyncMock(return_value=0))
+
+    # Expiry lands after the escrow was loaded into the session as "funded"
+    service = EscrowService(db_session, rpc=object())
+    assert (await service.get_escrow(escrow.id, test_org.id)).status == "funded"
+    await service.expire_stale_escrows()
+    with pytest.raises(EscrowStateError):
+        await service.release_escrow(escrow.id, test_org.id)
+    transfer.assert_not_awaited()
+
+    # A refund queued on an escrow that is not expired is never claimed
+    released = _expired_escrow(db_session, test_org.id, wallet.id, "released")
+    released.refund_status = "pending"
+    await db_session.commit()
+    monkeypatch.setattr(pipeline_mod, "get_rent_exempt_min", AsyncMock(return_value=890_880))
+    monkeypatch.setattr(pipeline_mod, "get_balance", AsyncMock(return_value=10**12))
+    monkeypatch.setattr(pipeline_mod, "load_platform_keypair", lambda: Keypair())
+    monkeypatch.setattr(pipeline_mod, "submit_transaction", AsyncMock())
+    blockhashes = AsyncMock()
+    blockhashes.get.return_value = CachedBlockhash(Hash.new_unique(), 100, 0.0)
+    monkeypatch.setattr(pipeline_mod, "get_blockhash_provider", lambda: blockhashes)
+    await EscrowRefundPipeline(db_session, rpc=object()).submit()
+    await db_session.refresh(released)
+    assert released.refund_status == "pending" and released.refund_signature is None
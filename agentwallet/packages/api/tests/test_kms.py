@@ -0,0 +1,95 @@
+"""Tests for KMS envelope encryption and the decrypted-key cache."""
+
+import asyncio
+import base64
+import uuid
+
+import pytest
+from agentwallet.core.kms import ENVELOPE_PREFIX, KeyManager, LocalKMS, SecretCache
+from solders.keypair import Keypair
+
+
+@pytest.mark.asyncio
+async def test_envelope_uses_one_data_key_per_org(db_session, test_org):
+    from unittest.mock import patch
+
+    from agentwallet.models.organization import Organization
+    from agentwallet.services.data_keys import org_data_key, rotate_org_data_key
+
+    kms = LocalKMS()
+    km = KeyManager(kms_client=kms)
+    other = Organization(name="Other Org", email=f"other-{uuid.uuid4().hex[:8]}@example.com")
+    db_session.add(other)
+    await db_session.flush()
+    secrets = [bytes(Keypair()) for _ in range(5)]
+    with patch("agentwallet.services.data_keys.get_key_manager", return_value=km):
+        sealed = [await km.encrypt_async(s, data_key=await org_data_key(db_session, test_org.id)) for s in secrets[:3]]
+        sealed.append(await km.encrypt_async(secrets[3], data_key=await org_data_key(db_session, other.id)))
+
+        assert all(c.startswith(ENVELOPE_PREFIX) for c in sealed)
+        assert kms.calls["generate_data_key"] == 2
+        # However long the org lives, its key is the stored one
+        assert await org_data_key(db_session, test_org.id) == KeyManager._open(sealed[0])[0]
+        assert kms.calls["generate_data_key"] == 2
+
+        # Rotation is explicit; wallets sealed before it keep decrypting
+        rotated = await rotate_org_data_key(db_session, test_org.id)
+        sealed.append(await km.encrypt_async(secrets[4], data_key=await org_data_key(db_session, test_org.id)))
+        assert KeyManager._open(sealed[-1])[0] == rotated
+
+    # A fresh process unwraps each data key once, however many wallets
+    # decrypt concurrently
+    restarted = KeyManager(kms_client=kms)
+    plaintexts = await asyncio.gather(*(restarted.decrypt_async(c) for c in sealed))
+    assert plaintexts == secrets
+    assert kms.calls["decrypt"] == 3  # org A before and after rotation, org B
+    assert restarted.decrypt(sealed[0]) == secrets[0]
+    assert kms.calls["decrypt"] == 3
+
+
+@pytest.mark.asyncio
+async def test_pre_envelope_kms_ciphertext_still_decrypts():
+    kms = LocalKMS()
+    km = KeyManager(kms_client=kms)
+    legacy = base64.b64encode(kms._master.encrypt(b"legacy-secret")).decode()
+
+    assert await km.decrypt_async(legacy) == b"legacy-secret"
+    assert km.decrypt(legacy) == b"legacy-secret"
+
+
+@pytest.mark.asyncio
+async def test_secret_cache_serves_hot_keys_and_wipes_on_eviction():
+    kms = LocalKMS()
+    km = KeyManager(kms_client=kms)
+    km.secrets = SecretCache(ttl_seconds=60, max_entries=1)
+    first, second = bytes(Keypair()), bytes(Keypair())
+    data_key = km.new_data_key()
+    sealed_first = km.encrypt(first, data_key=data_key)
+    sealed_second = km.encrypt(second, data_key=data_key)
+
+    assert await km.decrypt_async(sealed_first, cache=True) == first
+    km._data_keys.clear()
+    assert await km.decrypt_async(sealed_first, cache=True) == first
+    assert kms.calls["decrypt"] == 0  # served from the secret cache
+
+    buf, _ = next(iter(km.secrets._entries.values()))
+    await km.decrypt_async(sealed_second, cache=True)
+    assert len(km.secrets) == 1
+    assert buf.read() == bytes(len(first))  # evicted entry was zeroed
+
+
+def test_secret_cache_sweeps_expired_entries_on_insert(monkeypatch):
+    from agentwallet.core import kms
+
+    now = [100.0]
+    monkeypatch.setattr(kms.time, "monotonic", lambda: now[0])
+    cache = SecretCache(ttl_seconds=10, max_entries=2)
+    cache.put("a", b"secret-a")
+    buf, _ = next(iter(cache._entries.values()))
+    now[0] += 11
+    cache.put("b", b"secret-b")
+    assert len(cache) == 1 and cache.get("b") == b"secret-b"
+    assert buf.read() == bytes(len(b"secret-a"))  # expired entry was wiped without a lookup
+    cache.put("c", b"secret-c")
+    cache.put("d", b"secret-d")
+    assert len(cache) == 2
@@ -1,9 +1,16 @@
 """Tests for marketplace endpoints — services, jobs, reputation."""
 
 import uuid
+from datetime import datetime, timedelta, timezone
 
 import pytest
+from agentwallet.core.exceptions import ValidationError
+from agentwallet.models.agent import Agent
+from agentwallet.models.marketplace import AgentReputation, Job, Service
+from agentwallet.services.marketplace_search import ServiceSearch
+from agentwallet.services.reputation_service import ReputationService
 from httpx import AsyncClient
+from sqlalchemy import select
 
 
 @pytest.fixture
@@ -59,6 +66,24 @@ async def test_discover_services_by_capability(client: AsyncClient, service_payl
     assert resp.status_code == 200
 
 
+@pytest.mark.asyncio
+async def test_search_services_endpoint(client: AsyncClient, service_payload):
+    await client.post("/v1/marketplace/services", json=service_payload)
+    resp = await client.get(
+        "/v1/marketplace/services/search",
+        params={"query": "analysis reporting", "agent_id": service_payload["agent_id"]},
+    )
+    assert resp.status_code == 200
+    data = resp.json()
+    assert [s["name"] for s in data["data"]] == ["Data Analysis Service"]
+    assert data["total"] == 1
+    assert data["facets"]["capability"] == {"analysis": 1, "reporting": 1}
+    assert data["next_cursor"] is None
+
+    resp = await client.get("/v1/marketplace/services/search", params={"cursor": "not-a-cursor"})
+    assert resp.status_code == 422
+
+
 @pytest.mark.asyncio
 async def test_get_service(client: AsyncClient, service_payload):
     create_resp = await client.post("/v1/marketplace/services", json=service_payload)
@@ -152,3 +177,184 @@ async def test_unauthorized_access():
     async with AC(transport=transport, base_url="http://test") as unauthed:
         resp = await unauthed.get("/v1/marketplace/services")
         assert resp.status_code in (401, 403)
+
+
+# ── Reputation Scoring ─────────────────────────────────────
+
+
+async def _jobs_fixture(db_session, org_id):
+    seller, buyer = Agent(org_id=org_id, name="Seller"), Agent(org_id=org_id, name="Buyer")
+    db_session.add_all([seller, buyer])
+    await db_session.flush()
+    sold = Service(agent_id=seller.id, name="Sold", description="d", price_lamports=1_000_000)
+    bought = Service(agent_id=buyer.id, name="Bought", description="d", price_lamports=250_000)
+    db_session.add_all([sold, bought])
+    await db_session.flush()
+
+    start = datetime.now(timezone.utc) - timedelta(days=2)
+
+    def job(service, buyer_id, seller_id, status, rating=None, hours=None, deadline_hours=None):
+        return Job(
+            service_id=service.id,
+            buyer_agent_id=buyer_id,
+            seller_agent_id=seller_id,
+            status=status,
+            rating=rating,
+            created_at=start,
+            started_at=start + timedelta(minutes=30) if hours else None,
+            completed_at=start + timedelta(hours=hours) if hours else None,
+            deadline=start + timedelta(hours=deadline_hours) if deadline_hours else None,
+        )
+
+    db_session.add_all(
+        [
+            job(sold, buyer.id, seller.id, "completed", rating=5, hours=2, deadline_hours=3),
+            job(sold, buyer.id, seller.id, "completed", rating=4, hours=4, deadline_hours=3),
+            job(sold, buyer.id, seller.id, "completed", hours=6),
+            job(sold, buyer.id, seller.id, "cancelled"),
+            # The seller buying from someone else
+            job(bought, seller.id, buyer.id, "completed", hours=1),
+        ]
+    )
+    await db_session.commit()
+    return seller.id, buyer.id
+
+
+@pytest.mark.asyncio
+async def test_reputation_statistics_from_one_grouped_pass(db_session, test_org):
+    seller_id, buyer_id = await _jobs_fixture(db_session, test_org.id)
+    svc = ReputationService(db_session)
+
+    score = await svc.calculate_score(seller_id)
+    await db_session.commit()
+    rep = await svc.get_or_create_reputation(seller_id)
+    assert (rep.total_jobs, rep.completed_jobs, rep.cancelled_jobs) == (4, 3, 1)
+    assert (rep.rating_count, rep.avg_rating, rep.five_star_count, rep.four_star_count) == (2, 4.5, 1, 1)
+    assert (rep.total_earnings_lamports, rep.total_spent_lamports) == (3_000_000, 250_000)
+    assert rep.avg_completion_time_hours == pytest.approx(4.0, abs=0.01)
+    assert rep.response_time_hours == pytest.approx(0.5, abs=0.01)
+    assert rep.on_time_delivery_rate == 0.5
+    assert rep.first_job_at is not None and rep.score == score
+
+    # Batch mode agrees with the single-agent path
+    scores = await svc.rescore([seller_id, buyer_id])
+    assert scores[seller_id] == pytest.approx(score)
+    assert set(scores) == {seller_id, buyer_id}
+
+
+@pytest.mark.asyncio
+async def test_reputation_updates_are_queued_and_debounced(db_session, test_org):
+    seller_id, _ = await _jobs_fixture(db_session, test_org.id)
+    svc = ReputationService(db_session)
+
+    await svc.update_agent_reputation(seller_id)
+    await svc.update_agent_reputation(seller_id)
+    await db_session.commit()
+
+    async def reputation():
+        result = await db_session.execute(
+            select(AgentReputation)
+            .where(AgentReputation.agent_id == seller_id)
+            .execution_options(populate_existing=True)
+        )
+        return result.scalar_one()
+
+    queued = await reputation()
+    assert queued.stale_at is not None
+    assert queued.total_jobs == 0  # not scored on the request path
+
+    # Still inside the debounce window
+    await svc.rescore_stale(limit=1000, debounce_seconds=3600)
+    await db_session.commit()
+    assert (await reputation()).stale_at is not None
+
+    assert await svc.rescore_stale(limit=1000, debounce_seconds=0) >= 1
+    await db_session.commit()
+    scored = await reputation()
+    assert scored.stale_at is None
+    assert (scored.total_jobs, scored.completed_jobs) == (4, 3)
+
+
+@pytest.mark.asyncio
+async def test_repeated_marks_do_not_postpone_the_rescore(db_session, test_org):
+    from datetime import datetime, timedelta, timezone
+
+    from sqlalchemy import update
+
+    seller_id, _ = await _jobs_fixture(db_session, test_org.id)
+    svc = ReputationService(db_session)
+    await svc.mark_stale([seller_id])
+    first_mark = datetime.now(timezone.utc) - timedelta(seconds=60)
+    await db_session.execute(
+        update(AgentReputation).where(AgentReputation.agent_id == seller_id).values(stale_at=first_mark)
+    )
+
+    # Job changes keep coming inside every debounce window
+    await svc.mark_stale([seller_id])
+    await db_session.commit()
+
+    assert await svc.rescore_stale(limit=1000, debounce_seconds=30) >= 1
+    await db_session.commit()
+    result = await db_session.execute(
+        select(AgentReputation.stale_at, AgentReputation.total_jobs).where(AgentReputation.agent_id == seller_id)
+    )
+    assert tuple(result.one()) == (None, 4)
+
+
+# ── Service Search ─────────────────────────────────────────
+
+
+@pytest.mark.asyncio
+async def test_service_search_ranks_facets_and_pages(db_session, test_org):
+    agent = Agent(org_id=test_org.id, name="Searcher")
+    db_session.add(agent)
+    await db_session.flush()
+
+    def service(name, description, capabilities, price_usdc, rating=None, success=0.0, active=True):
+        return Service(
+            agent_id=agent.id,
+            name=name,
+            description=description,
+            capabilities=capabilities,
+            price_lamports=int(price_usdc * 1_000_000),
+            avg_rating=rating,
+            success_rate=success,
+            is_active=active,
+        )
+
+    bot = service("Solana trading bot", "Automated trades on DEXes", ["trading", "defi"], 5, rating=4.5, success=0.9)
+    signals = service("Market signals", "Research notes for trading desks", ["research", "trading"], 50, rating=3.0)
+    art = service("Image generation", "Pictures from prompts", ["art"], 0.5)
+    retired = service("Legacy trading", "Retired trading service", ["trading"], 1, active=False)
+    db_session.add_all([bot, signals, art, retired])
+    await db_session.commit()
+
+    search = ServiceSearch(db_session)
+    first = await search.search(query="Trading", agent_id=agent.id, limit=1, facets=True)
+    assert [s.id for s in first["services"]] == [bot.id]
+    assert first["agent_names"] == {agent.id: "Searcher"}
+    assert first["total"] == 2
+    assert first["facets"]["capability"] == {"trading": 2, "defi": 1, "research": 1}
+    assert first["facets"]["price_usdc"] == {"<1": 0, "1-10": 1, "10-100": 1, "100+": 0}
+
+    second = await search.search(query="Trading", agent_id=agent.id, limit=1, cursor=first["next_cursor"])
+    assert [s.id for s in second["services"]] == [signals.id]
+    assert second["next_cursor"] is None and second["facets"] is None
+
+    # Capability filter reads the inverted index, which follows updates
+    assert [s.id for s in (await search.search(capability="art", agent_id=agent.id))["services"]] == [art.id]
+    art.capabilities = ["art", "design"]
+    await db_session.commit()
+    assert [s.id for s in (await search.search(capability="design", agent_id=agent.id))["services"]] == [art.id]
+
+    # Renamed services are re-indexed for text search
+    art.name = "Diagram trading charts"
+    await db_session.commit()
+    assert {s.id for s in (await search.search(query="trading", agent_id=agent.id))["services"]} == {
+        bot.id,
+        signals.id,
+        art.id,
+    }
+
+    with pytest.raises(ValidationError):
+        await search.search(cursor="garbage")
@@ -164,7 +164,7 @@ async def test_playground_transfer_insufficient(client, test_wallet, monkeypatch
         def __init__(self, db):
             self.db = db
 
-        def _decrypt_keypair(self, wallet):
+        async def decrypt_keypair(self, wallet):
             return _fake_platform_kp()
 
     monkeypatch.setattr(pg.solana, "get_balance", fake_balance)
@@ -70,3 +70,256 @@ async def test_policies_unauthenticated(unauthed_client):
     """Test accessing policies without auth should fail."""
     resp = await unauthed_client.get("/v1/policies")
     assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_policy_plan_is_cached_and_invalidated_on_write(client, db_session, test_org, test_wallet):
+    """Evaluations reuse the compiled plan until the policies router writes."""
+    from unittest.mock import patch
+
+    from agentwallet.services import policy_compiler
+    from agentwallet.services.permission_engine import PermissionEngine
+
+    blocked = "BLoCKed1111111111111111111111111111111111111"
+    resp = await client.post(
+        "/v1/policies",
+        json={
+            "name": "Wallet blacklist",
+            "rules": {"destination_blacklist": [blocked], "time_window": {"start": "00:00", "end": "23:59"}},
+            "scope_type": "wallet",
+            "scope_id": str(test_wallet.id),
+            "priority": 1,
+        },
+    )
+    assert resp.status_code == 201
+    policy_id = resp.json()["id"]
+
+    engine = PermissionEngine(db_session)
+    loads = []
+    real_load = policy_compiler._load_applicable
+
+    async def counting_load(*args):
+        loads.append(args)
+        return await real_load(*args)
+
+    with patch.object(policy_compiler, "_load_applicable", counting_load):
+        denied = await engine.evaluate(test_org.id, None, test_wallet.id, blocked, 1_000)
+        again = await engine.evaluate(test_org.id, None, test_wallet.id, blocked, 1_000)
+        assert denied.outcome == again.outcome == "deny"
+        assert denied.denied_by == "Wallet blacklist"
+        assert len(loads) == 1
+
+        resp = await client.patch(f"/v1/policies/{policy_id}", json={"rules": {"destination_blacklist": []}})
+        assert resp.status_code == 200
+        allowed = await engine.evaluate(test_org.id, None, test_wallet.id, blocked, 1_000)
+        assert allowed.outcome == "allow"
+        assert len(loads) == 2
+
+
+def test_compile_policy_preparses_rules():
+    import uuid
+
+    from agentwallet.services.policy_compiler import compile_policy
+
+    compiled = compile_policy(
+        uuid.uuid4(),
+        "p",
+        {
+            "destination_whitelist": ["a", "b"],
+            "token_whitelist": [],
+            "time_window": {"start": "09:00", "end": "17:30", "timezone": "Not/AZone"},
+        },
+    )
+    assert compiled.destination_whitelist == frozenset({"a", "b"})
+    assert compiled.token_whitelist is None
+    assert compiled.destination_blacklist == frozenset()
+    assert (compiled.time_window.start_minutes, compiled.time_window.end_minutes) == (540, 1050)
+    assert compiled.time_window.tz.utcoffset(None).total_seconds() == 0
+
+
+class _LedgerRedis:
+    """Just enough Redis for the spend ledger (scripts emulated in Python)."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def mget(self, keys):
+        return [self.store.get(key) for key in keys]
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.store:
+            return None
+        self.store[key] = str(value)
+        return True
+
+    async def eval(self, script, numkeys, *args):
+        from agentwallet.services import spend_ledger
+
+        keys, argv = args[:numkeys], args[numkeys:]
+        if script == spend_ledger.RESERVE_SCRIPT:
+            current = int(self.store.get(keys[0], 0))
+            amount, limit = int(argv[0]), int(argv[1])
+            if limit >= 0 and current + amount > limit:
+                return [0, current]
+            for key in keys:
+                self.store[key] = str(int(self.store.get(key, 0)) + amount)
+            return [1, current + amount]
+        for key in keys:
+            if key in self.store:
+                self.store[key] = str(int(self.store[key]) - int(argv[0]))
+        return 1
+
+
+@pytest.mark.asyncio
+async def test_daily_limit_reserves_spend_in_ledger(db_session, test_org, test_agent, test_wallet):
+    """An allowed transfer holds its amount, so the next one sees the new total."""
+    from unittest.mock import AsyncMock, patch
+
+    from agentwallet.models import Policy, Transaction
+    from agentwallet.services.permission_engine import PermissionEngine
+
+    db_session.add(
+        Policy(
+            org_id=test_org.id,
+            name="Wallet daily cap",
+            scope_type="wallet",
+            scope_id=test_wallet.id,
+            rules={"daily_limit_lamports": 10_000},
+            priority=1,
+        )
+    )
+    # Already submitted today: the ledger is rebuilt from this on first read
+    db_session.add(
+        Transaction(
+            org_id=test_org.id,
+            agent_id=test_agent.id,
+            wallet_id=test_wallet.id,
+            tx_type="transfer_sol",
+            status="submitted",
+            from_address=test_wallet.address,
+            to_address="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+            amount_lamports=3_000,
+        )
+    )
+    await db_session.commit()
+
+    fake = _LedgerRedis()
+    to = "5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3"
+    with patch("agentwallet.services.spend_ledger.get_redis", AsyncMock(return_value=fake)):
+        engine = PermissionEngine(db_session)
+        first = await engine.evaluate(test_org.id, test_agent.id, test_wallet.id, to, 6_000)
+        second = await engine.evaluate(test_org.id, test_agent.id, test_wallet.id, to, 6_000)
+        assert first.outcome == "allow" and first.reserved_lamports == 6_000
+        assert second.outcome == "deny" and second.denied_by == "Wallet daily cap"
+        assert second.reserved_lamports == 0
+
+        # The first transfer failed: its reservation frees up the budget
+        await engine.release_spend(first, test_agent.id, test_wallet.id)
+        third = await engine.evaluate(test_org.id, test_agent.id, test_wallet.id, to, 6_000)
+        assert third.outcome == "allow"
+
+    wallet_keys = [k for k in fake.store if str(test_wallet.id) in k]
+    assert len(wallet_keys) == 2 and all(fake.store[k] == "9000" for k in wallet_keys)
+
+
+@pytest.mark.asyncio
+async def test_batch_reservation_denies_only_transfers_past_the_limit(db_session, test_org, test_agent, test_wallet):
+    """When a batch no longer fits together, earlier transfers keep their reservation."""
+    from unittest.mock import AsyncMock, patch
+
+    from agentwallet.models import Policy, Transaction
+    from agentwallet.services.permission_engine import PermissionEngine
+
+    db_session.add(
+        Policy(
+            org_id=test_org.id,
+            name="Batch daily cap",
+            scope_type="wallet",
+            scope_id=test_wallet.id,
+            rules={"daily_limit_lamports": 10_000},
+            priority=1,
+        )
+    )
+    # Spent by a concurrent transfer after this batch read today's total
+    db_session.add(
+        Transaction(
+            org_id=test_org.id,
+            agent_id=test_agent.id,
+            wallet_id=test_wallet.id,
+            tx_type="transfer_sol",
+            status="submitted",
+            from_address=test_wallet.address,
+            to_address="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+            amount_lamports=3_000,
+        )
+    )
+    await db_session.commit()
+
+    to = "5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3"
+    with patch("agentwallet.services.spend_ledger.get_redis", AsyncMock(return_value=_LedgerRedis())):
+        engine = PermissionEngine(db_session)
+        engine._get_daily_spend = AsyncMock(return_value=0)
+        evaluations = await engine.evaluate_batch(
+            test_org.id, test_agent.id, test_wallet.id, [(to, 4_000), (to, 4_000), (to, 4_000)]
+        )
+
+    assert [e.outcome for e in evaluations] == ["allow", "deny", "deny"]
+    assert evaluations[0].reserved_lamports == 4_000
+    assert "11000" in evaluations[1].denial_reason  # refused by the ledger, not the plan check
+
+
+@pytest.mark.asyncio
+async def test_ledger_reads_many_wallets_in_one_grouped_query(db_session, test_org, test_agent, test_wallet):
+    """Counters come from one MGET; the missing ones are rebuilt from one grouped sum."""
+    import uuid
+    from unittest.mock import AsyncMock, patch
+
+    from agentwallet.models import Transaction, Wallet
+    from agentwallet.services.spend_ledger import SpendLedger, _counter_key, spend_day
+    from sqlalchemy import event
+
+    other = Wallet(
+        org_id=test_org.id,
+        agent_id=test_agent.id,
+        address=f"Test{uuid.uuid4().hex[:28]}Addr",
+        encrypted_key="encrypted_test_key_placeholder",
+    )
+    db_session.add(other)
+    await db_session.flush()
+    for wallet, amount in ((test_wallet, 3_000), (other, 4_000), (other, 500)):
+        db_session.add(
+            Transaction(
+                org_id=test_org.id,
+                agent_id=test_agent.id,
+                wallet_id=wallet.id,
+                tx_type="transfer_sol",
+                status="submitted",
+                from_address=wallet.address,
+                to_address="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+                amount_lamports=amount,
+            )
+        )
+    await db_session.commit()
+
+    fake = _LedgerRedis()
+    idle = uuid.uuid4()
+    fake.store[_counter_key(spend_day(), idle, test_agent.id)] = "700"
+    queries = []
+    engine = db_session.bind.sync_engine
+
+    def listener(conn, cursor, statement, *args):
+        queries.append(statement)
+
+    event.listen(engine, "before_cursor_execute", listener)
+    try:
+        with patch("agentwallet.services.spend_ledger.get_redis", AsyncMock(return_value=fake)):
+            spent = await SpendLedger(db_session).get_many(test_org.id, test_agent.id, [test_wallet.id, other.id, idle])
+    finally:
+        event.remove(engine, "before_cursor_execute", listener)
+
+    assert spent == {test_wallet.id: 3_000, other.id: 4_500, idle: 700}
+    assert len(queries) == 1 and "GROUP BY" in queries[0]
+    assert fake.store[_counter_key(spend_day(), other.id, test_agent.id)] == "4500"
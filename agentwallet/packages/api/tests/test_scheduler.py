@@ -0,0 +1,85 @@
+"""Tests for worker leases and the adaptive tick loop."""
+
+import asyncio
+import uuid
+
+import pytest
+from agentwallet.workers.base import BaseWorker
+from agentwallet.workers.lease import Lease
+
+
+@pytest.mark.asyncio
+async def test_lease_is_exclusive_until_released_or_expired():
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    first = Lease(name, ttl_seconds=30, owner="proc-a")
+    second = Lease(name, ttl_seconds=30, owner="proc-b")
+
+    assert await first.acquire()
+    assert await first.acquire()  # renewal
+    assert first.held
+    assert not await second.acquire()
+    assert not second.held
+
+    await first.release()
+    assert not first.held
+    assert await second.acquire()
+
+    # An expired lease is free for the taking
+    stale = Lease(name, ttl_seconds=-1, owner="proc-b")
+    assert await stale.acquire()
+    assert await first.acquire()
+    assert not await second.acquire()
+
+
+class _Worker(BaseWorker):
+    name = "test_worker"
+    interval_seconds = 10.0
+
+    def __init__(self, results):
+        super().__init__()
+        self.results = list(results)
+
+    async def tick(self):
+        result = self.results.pop(0)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+
+def test_next_delay_runs_backlog_immediately_and_backs_off_when_idle():
+    worker = _Worker([])
+    assert worker.next_delay(True) == 0.0
+    assert 9.0 <= worker.next_delay(None) <= 11.0
+    idle = [worker.next_delay(False) for _ in range(6)]
+    assert 18.0 <= idle[0] <= 22.0
+    assert 36.0 <= idle[1] <= 44.0
+    assert all(72.0 <= d <= 88.0 for d in idle[2:])  # capped at 8x
+    assert 9.0 <= worker.next_delay(None) <= 11.0  # work resets the back-off
+
+
+@pytest.mark.asyncio
+async def test_timed_tick_records_stats_and_survives_errors():
+    worker = _Worker([True, False, RuntimeError("boom")])
+    assert await worker._timed_tick() is True
+    assert await worker._timed_tick() is False
+    assert await worker._timed_tick() is None
+    stats = worker.stats.as_dict()
+    assert (stats["ticks"], stats["busy_ticks"], stats["idle_ticks"], stats["errors"]) == (3, 1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_aborts_running_tick():
+    worker = _Worker([])
+    started = asyncio.Event()
+
+    async def slow_tick():
+        started.set()
+        await asyncio.sleep(60)
+
+    worker.tick = slow_tick
+    running = asyncio.create_task(worker._timed_tick())
+    await started.wait()
+    worker._lease_lost = True
+    worker._tick_task.cancel()
+    assert await running is None
+    assert worker.stats.ticks == 1
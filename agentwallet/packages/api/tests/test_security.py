@@ -16,12 +16,12 @@ def reset_x402_config():
     config.enabled = False
     config._routes = []
     config._payments = {}
-    config._verified_signatures = {}
+    config.verification_cache.clear()
     yield
     config.enabled = False
     config._routes = []
     config._payments = {}
-    config._verified_signatures = {}
+    config.verification_cache.clear()
 
 
 def _proof(signature: str, amount: str = "100000", timestamp: int | None = None) -> str:
@@ -83,7 +83,7 @@ async def test_replay_proof_expires_after_deadline(client, test_agent):
 
         # Backdate the cache entry beyond max_deadline (60s)
         config = get_pricing_config()
-        entry = config._verified_signatures[sig]
+        entry = config.verification_cache._entries[sig]
         entry["verified_at"] = time.time() - 3600
 
         # Replay: must be rejected even though it's cached
@@ -269,3 +269,46 @@ async def test_user_org_mismatch_token_rejected(client, test_org, db_session):
     token = create_access_token(user.id, test_org.id)
     resp = await client.get("/v1/agents", headers={"Authorization": f"Bearer {token}"})
     assert resp.status_code == 401
+
+
+# ── Rate limiting ──────────────────────────────────────────────────────
+
+
+def test_local_gcra_bursts_then_refills():
+    """A full bucket admits `limit` requests at once, then one per emission interval."""
+    from agentwallet.api.middleware.rate_limit import LocalGCRA
+
+    limiter = LocalGCRA()
+    buckets = [("rl:org:/route", 6)]  # one request every 10s
+    results = [limiter.check(buckets, now=1000.0) for _ in range(7)]
+
+    assert [r.allowed for r in results] == [True] * 6 + [False]
+    assert [r.remaining for r in results[:6]] == [5, 4, 3, 2, 1, 0]
+    assert results[-1].retry_after_seconds == pytest.approx(10.0)
+    assert results[-1].headers()["Retry-After"] == "10"
+
+    assert not limiter.check(buckets, now=1009.0).allowed
+    assert limiter.check(buckets, now=1010.0).allowed
+
+
+def test_local_gcra_org_budget_spans_routes():
+    """The org-wide bucket binds once the org spreads requests over many routes."""
+    from agentwallet.api.middleware.rate_limit import LocalGCRA
+
+    limiter = LocalGCRA()
+    allowed = [limiter.check([(f"rl:org:/r{i}", 3), ("rl:org", 4)], now=0.0) for i in range(5)]
+
+    assert [r.allowed for r in allowed] == [True] * 4 + [False]
+    # The tighter per-route bucket is reported until the org budget runs out
+    assert allowed[0].limit == 3 and allowed[0].remaining == 2
+    assert allowed[3].limit == 4 and allowed[3].remaining == 0
+
+
+@pytest.mark.asyncio
+async def test_rate_limit_headers_on_response(client):
+    """Rate-limited routes report their remaining quota."""
+    resp = await client.get("/v1/agents")
+    assert resp.status_code == 200
+    assert resp.headers["RateLimit-Limit"] == "600"
+    assert int(resp.headers["RateLimit-Remaining"]) < 600
+    assert "RateLimit-Reset" in resp.headers
@@ -0,0 +1,294 @@
+"""Tests for the shared Solana RPC client layer in core/solana.py."""
+
+import httpx
+import pytest
+from agentwallet.core import solana
+
+
+def _rpc_transport(handler):
+    """httpx transport that answers JSON-RPC bodies with handler(body)."""
+    import json
+
+    async def _handle(request: httpx.Request) -> httpx.Response:
+        return httpx.Response(200, json=handler(json.loads(request.content)), request=request)
+
+    return httpx.MockTransport(_handle)
+
+
+@pytest.mark.asyncio
+async def test_get_rpc_client_is_shared_per_endpoint():
+    await solana.close_rpc_clients()
+    a = solana.get_rpc_client()
+    b = solana.get_rpc_client()
+    other = solana.get_rpc_client("https://rpc.example.test")
+    assert a is b
+    assert other is not a
+
+    await solana.close_rpc_clients()
+    assert a.is_closed
+    assert solana.get_rpc_client() is not a
+    await solana.close_rpc_clients()
+
+
+@pytest.mark.asyncio
+async def test_rpc_post_tracks_pool_stats():
+    url = solana._rpc_url()
+    before = solana.rpc_pool_stats().get(url, {}).get("requests", 0)
+
+    transport = _rpc_transport(lambda body: {"jsonrpc": "2.0", "id": body["id"], "result": {"value": 42}})
+    async with httpx.AsyncClient(transport=transport) as client:
+        assert await solana.get_balance(client, "11111111111111111111111111111111") == 42
+
+    stats = solana.rpc_pool_stats()[url]
+    assert stats["requests"] == before + 1
+    assert stats["in_flight"] == 0
+    assert stats["peak_in_flight"] >= 1
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_sent_as_one_batch():
+    import asyncio
+
+    requests = []
+
+    def handler(body):
+        requests.append(body)
+        if isinstance(body, list):
+            return [{"jsonrpc": "2.0", "id": req["id"], "result": {"value": req["params"][0][-1:]}} for req in body]
+        return {"jsonrpc": "2.0", "id": body["id"], "result": {"value": body["params"][0][-1:]}}
+
+    async with httpx.AsyncClient(transport=_rpc_transport(handler)) as client:
+        results = await asyncio.gather(*(solana._rpc_call(client, "getBalance", [f"addr{i}"]) for i in range(5)))
+
+    assert len(requests) == 1
+    assert isinstance(requests[0], list) and len(requests[0]) == 5
+    assert [r["result"]["value"] for r in results] == ["0", "1", "2", "3", "4"]
+
+
+@pytest.mark.asyncio
+async def test_batch_falls_back_when_endpoint_rejects_arrays():
+    import asyncio
+
+    def handler(body):
+        if isinstance(body, list):
+            return {"jsonrpc": "2.0", "id": None, "error": {"code": -32600, "message": "batch not supported"}}
+        return {"jsonrpc": "2.0", "id": body["id"], "result": {"value": 7}}
+
+    async with httpx.AsyncClient(transport=_rpc_transport(handler)) as client:
+        balances = await asyncio.gather(solana.get_balance(client, "a"), solana.get_balance(client, "b"))
+
+    assert balances == [7, 7]
+
+
+@pytest.mark.asyncio
+async def test_batcher_does_not_keep_its_client_alive():
+    import gc
+    import weakref
+
+    transport = _rpc_transport(lambda body: {"jsonrpc": "2.0", "id": body["id"], "result": {"value": 1}})
+    client = httpx.AsyncClient(transport=transport)
+    await solana.get_balance(client, "a")
+    assert client in solana._batchers
+
+    ref = weakref.ref(client)
+    await client.aclose()
+    del client
+    gc.collect()
+    assert ref() is None
+
+
+@pytest.mark.asyncio
+async def test_confirm_transactions_chunks_and_maps_statuses():
+    signatures = [f"sig{i}" for i in range(300)]
+    calls = []
+
+    def status_for(sig):
+        n = int(sig[3:])
+        if n % 3 == 0:
+            return {"err": None, "confirmationStatus": "finalized"}
+        if n % 3 == 1:
+            return {"err": {"InstructionError": [0, "Custom"]}, "confirmationStatus": "confirmed"}
+        return None
+
+    def handler(body):
+        reqs = body if isinstance(body, list) else [body]
+        calls.extend(reqs)
+        out = [
+            {"jsonrpc": "2.0", "id": r["id"], "result": {"value": [status_for(s) for s in r["params"][0]]}}
+            for r in reqs
+        ]
+        return out if isinstance(body, list) else out[0]
+
+    async with httpx.AsyncClient(transport=_rpc_transport(handler)) as client:
+        statuses = await solana.confirm_transactions(client, signatures)
+
+    assert [len(c["params"][0]) for c in calls] == [256, 44]
+    assert statuses["sig0"] == "finalized"
+    assert statuses["sig1"] == "failed"
+    assert statuses["sig2"] is None
+    assert len(statuses) == 300
+
+
+def _blockhash_handler(counter):
+    from solders.hash import Hash
+
+    def handler(body):
+        reqs = body if isinstance(body, list) else [body]
+        counter.extend(r["method"] for r in reqs)
+        out = [
+            {
+                "jsonrpc": "2.0",
+                "id": r["id"],
+                "result": {"value": {"blockhash": str(Hash.new_unique()), "lastValidBlockHeight": 1000 + len(counter)}},
+            }
+            for r in reqs
+        ]
+        return out if isinstance(body, list) else out[0]
+
+    return handler
+
+
+@pytest.mark.asyncio
+async def test_blockhash_provider_serves_warm_hash_and_single_flights():
+    import asyncio
+
+    calls = []
+    provider = solana.BlockhashProvider(max_age=30.0, refresh_interval=10.0)
+    async with httpx.AsyncClient(transport=_rpc_transport(_blockhash_handler(calls))) as client:
+        first = await asyncio.gather(*(provider.get(client) for _ in range(10)))
+        again = await provider.get(client)
+
+    assert calls == ["getLatestBlockhash"]
+    assert len({str(c.blockhash) for c in first}) == 1
+    assert again.blockhash == first[0].blockhash
+    assert again.last_valid_block_height == 1001
+
+
+@pytest.mark.asyncio
+async def test_blockhash_provider_refetches_after_invalidate_or_expiry():
+    calls = []
+    provider = solana.BlockhashProvider(max_age=30.0, refresh_interval=10.0)
+    async with httpx.AsyncClient(transport=_rpc_transport(_blockhash_handler(calls))) as client:
+        a = await provider.get(client)
+        provider.invalidate()
+        b = await provider.get(client)
+        provider.max_age = 0.0
+        c = await provider.get(client)
+
+    assert len(calls) == 3
+    assert a.blockhash != b.blockhash != c.blockhash
+
+
+def test_blockhash_not_found_invalidates_shared_cache():
+    provider = solana.get_blockhash_provider()
+    provider._current = solana.CachedBlockhash(blockhash=None, last_valid_block_height=1, fetched_at=1e12)
+
+    err = solana._send_error({"code": -32002, "message": "Transaction simulation failed: Blockhash not found"})
+
+    assert isinstance(err, solana.RetryableError)
+    assert provider._current is None
+
+
+async def _pubsub_stand_in(notify: dict):
+    """Local websocket server speaking just enough Solana PubSub.
+
+    notify maps signature -> err value to push after the subscription ack
+    (absent signatures never get a notification).
+    """
+    import json
+
+    from websockets.asyncio.server import serve
+
+    async def handler(ws):
+        sub_ids = iter(range(100, 10_000))
+        async for raw in ws:
+            msg = json.loads(raw)
+            if msg["method"] != "signatureSubscribe":
+                continue
+            sub_id = next(sub_ids)
+            await ws.send(json.dumps({"jsonrpc": "2.0", "id": msg["id"], "result": sub_id}))
+            sig = msg["params"][0]
+            if sig in notify:
+                note = {"context": {"slot": 1}, "value": {"err": notify[sig]}}
+                await ws.send(
+                    json.dumps(
+                        {
+                            "jsonrpc": "2.0",
+                            "method": "signatureNotification",
+                            "params": {"result": note, "subscription": sub_id},
+                        }
+                    )
+                )
+
+    return await serve(handler, "127.0.0.1", 0)
+
+
+@pytest.mark.asyncio
+async def test_signature_subscriber_resolves_from_notifications():
+    import asyncio
+
+    from agentwallet.core.solana_pubsub import SignatureSubscriber
+
+    server = await _pubsub_stand_in({"ok-sig": None, "bad-sig": {"InstructionError": [0, "Custom"]}})
+    port = server.sockets[0].getsockname()[1]
+    subscriber = SignatureSubscriber(f"ws://127.0.0.1:{port}")
+
+    # Status lookups report "unknown", so outcomes must come from the socket
+    unknown = _rpc_transport(
+        lambda body: (
+            [{"jsonrpc": "2.0", "id": r["id"], "result": {"value": [None]}} for r in body]
+            if isinstance(body, list)
+            else {"jsonrpc": "2.0", "id": body["id"], "result": {"value": [None]}}
+        )
+    )
+    try:
+        async with httpx.AsyncClient(transport=unknown) as client:
+            ok, bad, silent = await asyncio.gather(
+                subscriber.confirm(client, "ok-sig", timeout=2.0),
+                subscriber.confirm(client, "bad-sig", timeout=2.0),
+                subscriber.confirm(client, "silent-sig", timeout=0.2),
+            )
+        assert (ok, bad, silent) == (True, False, False)
+        assert subscriber.connected
+    finally:
+        await subscriber.close()
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_confirm_transaction_falls_back_to_polling_without_socket(monkeypatch):
+    from agentwallet.core import solana_pubsub
+
+    settings = solana.get_settings()
+    monkeypatch.setattr(settings, "rpc_confirm_mode", "websocket")
+    monkeypatch.setattr(solana_pubsub, "_subscriber", solana_pubsub.SignatureSubscriber("ws://127.0.0.1:1"))
+
+    def handler(body):
+        status = {"value": [{"err": None, "confirmationStatus": "confirmed"}]}
+        if isinstance(body, list):
+            return [{"jsonrpc": "2.0", "id": r["id"], "result": status} for r in body]
+        return {"jsonrpc": "2.0", "id": body["id"], "result": status}
+
+    async with httpx.AsyncClient(transport=_rpc_transport(handler)) as client:
+        assert await solana.confirm_transaction(client, "some-sig", max_polls=1, poll_interval=0.01)
+
+
+def test_repeated_message_under_one_blockhash_signs_uniquely():
+    from solders.hash import Hash
+    from solders.keypair import Keypair
+
+    provider = solana.BlockhashProvider(max_age=30.0, refresh_interval=10.0)
+    payer, to = Keypair(), str(Keypair().pubkey())
+    blockhash = Hash.new_unique()
+    solana._blockhash_provider, previous = provider, solana._blockhash_provider
+    try:
+        txs = [solana.build_sol_transfers(payer, [(to, 1_000)], blockhash) for _ in range(3)]
+        later = solana.build_sol_transfers(payer, [(to, 1_000)], Hash.new_unique())
+    finally:
+        solana._blockhash_provider = previous
+
+    assert len({tx.signatures[0] for tx in txs}) == 3
+    # The first signing carries no extra instruction, nor does one under a new hash
+    assert len(txs[0].message.instructions) == 1 and len(txs[1].message.instructions) == 2
+    assert len(later.message.instructions) == 1
@@ -1,102 +1,89 @@
-"""Tests for TaskWorker LLM rate-limit handling."""
+"""Tests for the pooled LLM provider used by TaskWorker."""
 
+import time
 
 import httpx
 import pytest
-from agentwallet.workers.task_worker import LLMRateLimitedError, _call_llm
+from agentwallet.services.llm_pool import AdaptiveLimiter, LLMProvider, LLMRateLimitedError
+from agentwallet.workers.task_worker import _call_llm
 
 
 class FakeTransport(httpx.AsyncBaseTransport):
-    """Returns a canned response for every request."""
+    """Returns the queued responses in order, repeating the last one."""
 
-    def __init__(self, status_code: int, json_body: dict | None = None, retry_after: str | None = None):
-        self.status_code = status_code
-        self.json_body = json_body
-        self.retry_after = retry_after
+    def __init__(self, *responses: tuple[int, dict | None, str | None]):
+        self.responses = list(responses)
+        self.calls = 0
 
     async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        status_code, json_body, retry_after = self.responses[min(self.calls, len(self.responses) - 1)]
+        self.calls += 1
         return httpx.Response(
-            self.status_code,
-            headers={"Retry-After": self.retry_after} if self.retry_after else {},
-            json=self.json_body,
+            status_code,
+            headers={"Retry-After": retry_after} if retry_after else {},
+            json=json_body,
             request=request,
         )
 
 
-def _patch_transport(monkeypatch, status_code, json_body=None, retry_after=None):
-    """Monkeypatch httpx.AsyncClient to use the fake transport."""
-    import httpx as _httpx
+def _provider(transport, max_concurrency=4) -> LLMProvider:
+    return LLMProvider("https://llm.test/v1", "test-key", "test-model", max_concurrency, transport=transport)
 
-    class FakeClient(_httpx.AsyncClient):
-        def __init__(self, *args, **kwargs):
-            kwargs["transport"] = FakeTransport(status_code, json_body, retry_after)
-            super().__init__(*args, **kwargs)
 
-    monkeypatch.setattr(_httpx, "AsyncClient", FakeClient)
+ANSWER = (200, {"choices": [{"message": {"content": "Real AI answer"}}]}, None)
 
 
 @pytest.mark.asyncio
-async def test_200_returns_openai_compatible(monkeypatch):
-    monkeypatch.setenv("X402_LLM_BASE_URL", "https://llm.test/v1")
-    monkeypatch.setenv("X402_LLM_KEY", "test-key")
-    _patch_transport(
-        monkeypatch,
-        200,
-        {"choices": [{"message": {"content": "Real AI answer"}}]},
-    )
-    provider, model, content = await _call_llm("hello", "general")
-    assert provider == "openai-compatible"
-    assert content == "Real AI answer"
+async def test_200_returns_openai_compatible():
+    transport = FakeTransport(ANSWER)
+    provider = _provider(transport)
+    for _ in range(2):
+        assert await _call_llm("hello", "general", provider) == ("openai-compatible", "test-model", "Real AI answer")
+    client = provider.client
+    assert transport.calls == 2 and provider.client is client  # one pooled client
+    await provider.close()
 
 
 @pytest.mark.asyncio
-async def test_no_key_falls_back_to_demo(monkeypatch):
-    monkeypatch.delenv("X402_LLM_BASE_URL", raising=False)
-    monkeypatch.delenv("X402_LLM_KEY", raising=False)
-    monkeypatch.delenv("OPENAI_COMPAT_BASE_URL", raising=False)
-    monkeypatch.delenv("OPENAI_COMPAT_API_KEY", raising=False)
-    provider, model, content = await _call_llm("hello", "general")
-    assert provider == "demo"
+async def test_no_key_falls_back_to_demo():
+    provider = LLMProvider("", "", "demo", 4)
+    provider_name, model, content = await _call_llm("hello", "general", provider)
+    assert provider_name == "demo"
     assert "demo AI" in content
+    await provider.close()
 
 
 @pytest.mark.asyncio
-async def test_429_after_retries_raises_rate_limited(monkeypatch):
-    monkeypatch.setenv("X402_LLM_BASE_URL", "https://llm.test/v1")
-    monkeypatch.setenv("X402_LLM_KEY", "test-key")
-    monkeypatch.setenv("X402_LLM_MAX_ATTEMPTS", "3")
-    # Always 429 → after 3 attempts must raise, never demo
-    _patch_transport(monkeypatch, 429, retry_after="1")
-    with pytest.raises(LLMRateLimitedError, match="rate-limited after 3 attempts"):
-        await _call_llm("hello", "general")
+async def test_429_raises_throttled_and_shrinks_concurrency():
+    provider = _provider(FakeTransport((429, None, "30")))
+    with pytest.raises(LLMRateLimitedError) as exc:
+        await _call_llm("hello", "general", provider)
+    assert exc.value.throttled
+    assert exc.value.retry_after == 30.0
+    assert provider.limiter.limit == 2
+    assert provider.headroom() == 0  # paused for Retry-After
+    await provider.close()
 
 
 @pytest.mark.asyncio
-async def test_retry_then_success(monkeypatch):
-    monkeypatch.setenv("X402_LLM_BASE_URL", "https://llm.test/v1")
-    monkeypatch.setenv("X402_LLM_KEY", "test-key")
-    monkeypatch.setenv("X402_LLM_MAX_ATTEMPTS", "3")
-
-    import httpx as _httpx
-
-    calls = {"n": 0}
-
-    class RetryTransport(_httpx.AsyncBaseTransport):
-        async def handle_async_request(self, request: _httpx.Request) -> _httpx.Response:
-            calls["n"] += 1
-            if calls["n"] < 3:
-                return _httpx.Response(429, request=request)
-            body = {"choices": [{"message": {"content": "OK after retries"}}]}
-            return _httpx.Response(200, json=body, request=request)
-
-    class FakeClient(_httpx.AsyncClient):
-        def __init__(self, *args, **kwargs):
-            kwargs["transport"] = RetryTransport()
-            super().__init__(*args, **kwargs)
-
-    monkeypatch.setattr(_httpx, "AsyncClient", FakeClient)
-
-    provider, model, content = await _call_llm("hello", "general")
-    assert provider == "openai-compatible"
-    assert content == "OK after retries"
-    assert calls["n"] == 3
+async def test_server_error_backs_off_but_counts_as_failure():
+    provider = _provider(FakeTransport((503, None, None), ANSWER))
+    with pytest.raises(LLMRateLimitedError) as exc:
+        await _call_llm("hello", "general", provider)
+    assert not exc.value.throttled
+    assert provider.limiter.limit == 2
+    await provider.close()
+
+
+@pytest.mark.asyncio
+async def test_limiter_recovers_additively():
+    limiter = AdaptiveLimiter(4)
+    await limiter.acquire()
+    await limiter.release(throttled=True)
+    assert limiter.limit == 2
+    for _ in range(2):
+        await limiter.acquire()
+        await limiter.release()
+    assert limiter.limit == 3
+    limiter.paused_until = time.monotonic() + 60
+    assert limiter.headroom() == 0
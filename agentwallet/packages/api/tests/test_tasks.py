@@ -1,7 +1,7 @@
 """Tests for the human-facing task marketplace endpoints."""
 
 import uuid
-from unittest.mock import AsyncMock, MagicMock, patch
+from unittest.mock import AsyncMock, patch
 
 import pytest
 from httpx import AsyncClient
@@ -48,8 +48,8 @@ def mock_escrow_fund():
             new=AsyncMock(return_value=kp),
         ),
         patch(
-            "agentwallet.services.wallet_manager.WalletManager._decrypt_keypair",
-            new=MagicMock(return_value=kp),
+            "agentwallet.services.wallet_manager.WalletManager.decrypt_keypair",
+            new=AsyncMock(return_value=kp),
         ),
     ):
         yield sig
@@ -213,9 +213,7 @@ async def test_run_and_deliver(client: AsyncClient, task_payload, org_wallet, mo
 
 
 @pytest.mark.asyncio
-async def test_mark_failed_after_repeated_failures(
-    client: AsyncClient, task_payload, org_wallet, mock_escrow_fund
-):
+async def test_mark_failed_after_repeated_failures(client: AsyncClient, task_payload, org_wallet, mock_escrow_fund):
     """Repeated worker failures should persist the counter and cap at failed."""
     from agentwallet.core.database import get_session_factory
     from agentwallet.services.task_service import TaskService
@@ -241,6 +239,38 @@ async def test_mark_failed_after_repeated_failures(
         assert task.failure_count == 5
 
 
+@pytest.mark.asyncio
+async def test_task_worker_claims_and_executes(
+    client: AsyncClient, monkeypatch, test_agent, test_wallet, task_payload, org_wallet, mock_escrow_fund
+):
+    """A claimed task is leased away from other claims and executes to release."""
+    from agentwallet.core.database import get_session_factory
+    from agentwallet.services.task_service import TaskService
+    from agentwallet.workers.task_worker import TaskWorker
+
+    for var in ("X402_LLM_BASE_URL", "X402_LLM_KEY", "OPENAI_COMPAT_BASE_URL", "OPENAI_COMPAT_API_KEY"):
+        monkeypatch.delenv(var, raising=False)
+    created = await client.post("/v1/marketplace/tasks", json=task_payload)
+    task_id = uuid.UUID(created.json()["id"])
+    org_id = uuid.UUID(created.json()["org_id"])
+
+    worker = TaskWorker()
+    async with get_session_factory()() as db:
+        await TaskService(db).assign_agent(task_id, org_id, test_agent.id)
+        await db.commit()
+        first = {row.id for row in await worker.claim(db, 1000)}
+        second = {row.id for row in await worker.claim(db, 1000)}
+    assert task_id in first
+    assert task_id not in second
+
+    await worker.execute(task_id, org_id)
+    async with get_session_factory()() as db:
+        task = await TaskService(db)._get_task(task_id, org_id)
+        assert task.status == "released"
+        assert task.provider == "demo"
+        assert task.claimed_until is None
+
+
 @pytest.mark.asyncio
 async def test_refund_task(client: AsyncClient, task_payload, org_wallet, mock_escrow_fund):
     created = await client.post("/v1/marketplace/tasks", json=task_payload)
@@ -50,3 +50,265 @@ async def test_transactions_unauthenticated(unauthed_client):
     """Test accessing transactions without auth should fail."""
     resp = await unauthed_client.get("/v1/transactions")
     assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_tx_processor_settles_submitted_in_bulk(db_session, test_org, test_wallet):
+    """One status pass confirms, fails and expires submitted transactions."""
+    import uuid
+    from unittest.mock import AsyncMock, patch
+
+    from agentwallet.models import Transaction
+    from agentwallet.workers.tx_processor import TxProcessorWorker
+
+    tag = uuid.uuid4().hex[:8]
+    heights = {"landed": 500, "reverted": 500, "expired": 100, "inflight": 900}
+    txs = {}
+    for name, height in heights.items():
+        tx = Transaction(
+            org_id=test_org.id,
+            wallet_id=test_wallet.id,
+            tx_type="transfer_sol",
+            status="submitted",
+            signature=f"{name}-{tag}",
+            last_valid_block_height=height,
+            from_address=test_wallet.address,
+            to_address="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+            amount_lamports=1_000,
+        )
+        db_session.add(tx)
+        txs[name] = tx
+    await db_session.commit()
+
+    statuses = AsyncMock(
+        side_effect=lambda client, sigs: (
+            dict.fromkeys(sigs)
+            | {
+                f"landed-{tag}": "finalized",
+                f"reverted-{tag}": "failed",
+            }
+        )
+    )
+    with (
+        patch("agentwallet.workers.tx_processor.confirm_transactions", statuses),
+        patch("agentwallet.workers.tx_processor.get_block_height", AsyncMock(return_value=400)),
+    ):
+        await TxProcessorWorker().tick()
+
+    statuses.assert_awaited_once()
+    for tx in txs.values():
+        await db_session.refresh(tx)
+    assert txs["landed"].status == "confirmed" and txs["landed"].confirmed_at is not None
+    assert txs["reverted"].status == "failed"
+    assert txs["expired"].status == "failed" and "expired" in txs["expired"].error
+    assert txs["inflight"].status == "submitted"
+
+
+@pytest.mark.asyncio
+async def test_batch_transfer_packs_per_wallet(db_session, test_org, test_wallet, monkeypatch):
+    """A batch is policy-checked once, packed per wallet with one fee transfer, and recorded before sending."""
+    from unittest.mock import AsyncMock
+
+    from agentwallet.core.solana import MAX_TRANSFERS_PER_TX, CachedBlockhash
+    from agentwallet.services import transaction_engine as engine_mod
+    from agentwallet.services.transaction_engine import TransactionEngine
+    from solders.hash import Hash
+    from solders.keypair import Keypair
+
+    platform = str(Keypair().pubkey())
+    monkeypatch.setattr(engine_mod.get_settings(), "platform_wallet_address", platform)
+    sent = []
+
+    class FakeBlockhashes:
+        async def get(self, client):
+            return CachedBlockhash(Hash.new_unique(), 777, 0.0)
+
+    async def fake_submit(client, raw):
+        sent.append(raw)
+        return {"success": True}
+
+    async def fake_balance(client, address):
+        return 10**12
+
+    monkeypatch.setattr(engine_mod, "get_blockhash_provider", lambda: FakeBlockhashes())
+    monkeypatch.setattr(engine_mod, "submit_transaction", fake_submit)
+    monkeypatch.setattr(engine_mod, "get_balance", fake_balance)
+
+    engine = TransactionEngine(db_session)
+    engine.wallet_mgr.decrypt_keypair = AsyncMock(return_value=Keypair())
+    evaluate_batch = engine.permission_engine.evaluate_batch
+    engine.permission_engine.evaluate_batch = AsyncMock(side_effect=evaluate_batch)
+
+    count = MAX_TRANSFERS_PER_TX + 5
+    transfers = [
+        {"from_wallet_id": test_wallet.id, "to_address": str(Keypair().pubkey()), "amount_sol": 0.01}
+        for _ in range(count)
+    ]
+    transfers.insert(3, {"from_wallet_id": test_wallet.id, "to_address": "not-an-address", "amount_sol": 0.01})
+    results = await engine.batch_transfer_sol(test_org.id, "free", transfers)
+
+    assert len(results) == count + 1
+    assert results[3]["transaction"] is None and "Invalid destination" in results[3]["error"]
+    txs = [r["transaction"] for i, r in enumerate(results) if i != 3]
+    assert all(r["error"] is None for i, r in enumerate(results) if i != 3)
+    assert [tx.to_address for tx in txs] == [t["to_address"] for i, t in enumerate(transfers) if i != 3]
+    assert engine.permission_engine.evaluate_batch.await_count == 1
+    assert engine.wallet_mgr.decrypt_keypair.await_count == 1
+
+    # Recipients plus one platform-fee transfer per pack, signature recorded up front
+    assert len(sent) == 2
+    signatures = [tx.signature for tx in txs]
+    assert len(set(signatures)) == 2
+    assert signatures.count(signatures[0]) == MAX_TRANSFERS_PER_TX - 1
+    assert all(tx.status == "submitted" and tx.last_valid_block_height == 777 for tx in txs)
+    assert all(tx.platform_fee_lamports > 0 for tx in txs)
+
+
+@pytest.mark.asyncio
+async def test_batch_transfer_rejected_pack_fails_as_unit(db_session, test_org, test_wallet, monkeypatch):
+    """A pack the RPC rejects marks its rows failed; other items keep their own errors."""
+    import uuid
+    from unittest.mock import AsyncMock
+
+    from agentwallet.core.exceptions import TransactionFailedError
+    from agentwallet.core.solana import CachedBlockhash
+    from agentwallet.models import Transaction
+    from agentwallet.services import transaction_engine as engine_mod
+    from agentwallet.services.transaction_engine import TransactionEngine
+    from solders.hash import Hash
+    from solders.keypair import Keypair
+    from sqlalchemy import select
+
+    class FakeBlockhashes:
+        async def get(self, client):
+            return CachedBlockhash(Hash.new_unique(), 777, 0.0)
+
+    async def fake_balance(client, address):
+        return 10**12
+
+    monkeypatch.setattr(engine_mod, "get_blockhash_provider", lambda: FakeBlockhashes())
+    monkeypatch.setattr(
+        engine_mod, "submit_transaction", AsyncMock(side_effect=TransactionFailedError("simulation failed"))
+    )
+    monkeypatch.setattr(engine_mod, "get_balance", fake_balance)
+
+    engine = TransactionEngine(db_session)
+    engine.wallet_mgr.decrypt_keypair = AsyncMock(return_value=Keypair())
+
+    key = f"batch-{uuid.uuid4().hex}"
+    to = str(Keypair().pubkey())
+    transfers = [
+        {"from_wallet_id": test_wallet.id, "to_address": to, "amount_sol": 0.01, "idempotency_key": key},
+        {"from_wallet_id": test_wallet.id, "to_address": to, "amount_sol": 0.01, "idempotency_key": key},
+        {"from_wallet_id": test_wallet.id, "to_address": to, "amount_sol": 0.02, "idempotency_key": key},
+        {"from_wallet_id": uuid.uuid4(), "to_address": to, "amount_sol": 0.01},
+    ]
+    results = await engine.batch_transfer_sol(test_org.id, "free", transfers)
+
+    assert engine_mod.submit_transaction.await_count == 1
+    assert results[0]["transaction"] is None
+    assert "simulation failed" in results[0]["error"]
+    assert results[1] == results[0]
+    recorded = await db_session.scalar(select(Transaction).where(Transaction.idempotency_key == key))
+    assert recorded.status == "failed" and "simulation failed" in recorded.error
+    assert "already used with different params" in results[2]["error"]
+    assert "Wallet not found" in results[3]["error"]
+
+
+@pytest.mark.asyncio
+async def test_tx_processor_keeps_submitted_on_status_rpc_error(db_session, test_org, test_wallet):
+    """A getSignatureStatuses error never expires or fails a transaction, however old."""
+    import json
+    import uuid
+    from datetime import datetime, timedelta, timezone
+    from unittest.mock import AsyncMock, patch
+
+    import httpx
+    from agentwallet.models import Transaction
+    from agentwallet.workers.tx_processor import TxProcessorWorker
+
+    tag = uuid.uuid4().hex[:8]
+    txs = [
+        Transaction(
+            org_id=test_org.id,
+            wallet_id=test_wallet.id,
+            tx_type="transfer_sol",
+            status="submitted",
+            signature=f"{name}-{tag}",
+            last_valid_block_height=height,
+            created_at=datetime.now(timezone.utc) - timedelta(hours=1),
+            from_address=test_wallet.address,
+            to_address="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+            amount_lamports=1_000,
+        )
+        for name, height in (("past-height", 100), ("no-height", None))
+    ]
+    db_session.add_all(txs)
+    await db_session.commit()
+
+    async def handle(request):
+        body = json.loads(request.content)
+        reqs = body if isinstance(body, list) else [body]
+        out = [{"jsonrpc": "2.0", "id": r["id"], "error": {"code": -32005, "message": "overloaded"}} for r in reqs]
+        return httpx.Response(200, json=out if isinstance(body, list) else out[0], request=request)
+
+    async with httpx.AsyncClient(transport=httpx.MockTransport(handle)) as rpc:
+        with (
+            patch("agentwallet.workers.tx_processor.get_rpc_client", return_value=rpc),
+            patch("agentwallet.workers.tx_processor.get_block_height", AsyncMock(return_value=400)),
+        ):
+            await TxProcessorWorker().tick()
+
+    for tx in txs:
+        await db_session.refresh(tx)
+        assert tx.status == "submitted" and tx.error is None
+
+
+@pytest.mark.asyncio
+async def test_transfer_releases_reservation_when_record_fails(db_session, test_org, test_wallet):
+    """A failure between the policy reservation and the send gives the reservation back."""
+    from unittest.mock import AsyncMock, MagicMock
+
+    from agentwallet.services.permission_engine import PolicyEvaluation
+    from agentwallet.services.transaction_engine import TransactionEngine
+
+    engine = TransactionEngine(db_session)
+    evaluation = PolicyEvaluation()
+    evaluation.reserved_lamports = 1_000
+    engine.permission_engine.evaluate = AsyncMock(return_value=evaluation)
+    engine.permission_engine.release_spend = AsyncMock()
+    engine.fee_collector.calculate_fee = MagicMock(side_effect=RuntimeError("fee table unavailable"))
+
+    with pytest.raises(RuntimeError):
+        await engine.transfer_sol(
+            test_org.id, "free", test_wallet.id, "5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3", 1_000
+        )
+    engine.permission_engine.release_spend.assert_awaited_once_with(evaluation, None, test_wallet.id)
+
+
+@pytest.mark.asyncio
+async def test_token_confirmation_timeout_leaves_transaction_for_the_processor(db_session, test_org, test_wallet):
+    """An unconfirmed token transfer stays "submitted", so the tx processor can settle (and release) it."""
+    from unittest.mock import AsyncMock, patch
+
+    from agentwallet.models import Transaction
+    from agentwallet.services.token_service import TokenService
+
+    tx = Transaction(
+        org_id=test_org.id,
+        wallet_id=test_wallet.id,
+        tx_type="token_transfer",
+        status="submitted",
+        signature="token-timeout-sig",
+        from_address=test_wallet.address,
+        to_address="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+        amount_lamports=1_000,
+    )
+    db_session.add(tx)
+    await db_session.commit()
+
+    with patch("agentwallet.services.token_service.confirm_transaction", AsyncMock(return_value=False)):
+        await TokenService(db_session)._confirm_transaction(tx.id, "token-timeout-sig")
+
+    await db_session.refresh(tx)
+    assert tx.status == "submitted"
@@ -0,0 +1,192 @@
+"""Tests for concurrent balance aggregation, snapshots and the price oracle."""
+
+import asyncio
+import json
+import uuid
+from decimal import Decimal
+from unittest.mock import patch
+
+import httpx
+import pytest
+from agentwallet.models.wallet import Wallet
+from agentwallet.services import universal_balance_service as balances
+from agentwallet.services.token_prices import PriceOracle, get_price_oracle
+from agentwallet.services.universal_balance_service import UniversalBalanceService
+
+USDC = "EPjFWdd5AufqSSqeM2qN1xzybapC8G4wEGGkZwyTDt1v"
+
+
+@pytest.fixture
+def redis_store(mock_redis):
+    """Back the mocked Redis get/set with a dict."""
+    store: dict[str, str] = {}
+
+    async def _get(key):
+        return store.get(key)
+
+    async def _set(key, value, ex=None, **kwargs):
+        store[key] = value
+        return True
+
+    async def _delete(*keys):
+        return sum(store.pop(key, None) is not None for key in keys)
+
+    mock_redis.get.side_effect = _get
+    mock_redis.set.side_effect = _set
+    mock_redis.delete.side_effect = _delete
+    return store
+
+
+@pytest.fixture
+def chain_rpc():
+    """Fake chain reads: 1 SOL + 5 USDC per Solana wallet, 1 ETH per EVM address."""
+    calls = {"solana": 0, "evm": 0, "in_flight": 0, "peak": 0}
+
+    async def _tracked(result):
+        calls["in_flight"] += 1
+        calls["peak"] = max(calls["peak"], calls["in_flight"])
+        await asyncio.sleep(0.01)
+        calls["in_flight"] -= 1
+        return result
+
+    async def get_balance(client, address):
+        calls["solana"] += 1
+        return await _tracked(1_000_000_000)
+
+    async def get_token_accounts(client, owner):
+        return await _tracked([{"mint": USDC, "amount": 5_000_000, "decimals": 6, "ui_amount": 5.0}])
+
+    async def get_native_balance(client, address):
+        calls["evm"] += 1
+        return await _tracked(10**18)
+
+    get_price_oracle().clear()
+    with (
+        patch.object(balances, "get_balance", get_balance),
+        patch.object(balances, "get_token_accounts", get_token_accounts),
+        patch.object(balances, "get_native_balance", get_native_balance),
+    ):
+        yield calls
+
+
+async def _add_wallets(db_session, test_org, test_agent, n: int) -> None:
+    for _ in range(n):
+        db_session.add(
+            Wallet(
+                org_id=test_org.id,
+                agent_id=test_agent.id,
+                address=f"Test{uuid.uuid4().hex[:28]}Addr",
+                encrypted_key="encrypted_test_key_placeholder",
+            )
+        )
+    test_agent.evm_address = "0x" + "ab" * 20
+    await db_session.commit()
+
+
+@pytest.mark.asyncio
+async def test_universal_balance_fans_out_and_prices_once(
+    db_session, test_org, test_agent, test_wallet, chain_rpc, redis_store
+):
+    await _add_wallets(db_session, test_org, test_agent, 2)
+
+    result = await UniversalBalanceService(db_session).get_universal_balance(test_agent.id)
+
+    assert chain_rpc["solana"] == 3 and chain_rpc["evm"] == 1
+    assert chain_rpc["peak"] > 1  # wallets were read concurrently
+    solana = result["chain_breakdown"]["solana"]
+    assert solana["native_token"]["amount"] == pytest.approx(3.0)
+    assert solana["tokens"]["USDC"]["amount"] == pytest.approx(15.0)
+    assert result["chain_breakdown"]["base"]["tokens"]["ETH"]["amount"] == pytest.approx(1.0)
+    assert result["total_balance_usd"] == pytest.approx(3 * 100 + 15 + 3000)
+    # Every symbol priced in one oracle lookup
+    assert get_price_oracle().fetches == 1
+
+
+@pytest.mark.asyncio
+async def test_snapshot_is_served_then_revalidated(
+    db_session, test_org, test_agent, test_wallet, chain_rpc, redis_store
+):
+    service = UniversalBalanceService(db_session)
+    first = await service.get_universal_balance(test_agent.id)
+    assert chain_rpc["solana"] == 1
+
+    # Fresh snapshot: no chain reads, for balances or spending power
+    await service.get_universal_balance(test_agent.id)
+    power = await service.get_spending_power(test_agent.id)
+    assert chain_rpc["solana"] == 1
+    assert power["balance_snapshot"]["total_balance_usd"] == first["total_balance_usd"]
+
+    # Stale snapshot: served at once, refreshed in the background
+    key = f"balance:snapshot:{test_agent.id}"
+    snapshot = json.loads(redis_store[key])
+    snapshot["computed_at"] -= 60
+    redis_store[key] = json.dumps(snapshot)
+    stale = await service.get_universal_balance(test_agent.id)
+    assert stale["snapshot_age_seconds"] >= 60
+    await balances._revalidating[test_agent.id]
+    assert chain_rpc["solana"] == 2
+    assert json.loads(redis_store[key])["computed_at"] > snapshot["computed_at"]
+
+    # Forced refresh always crawls
+    await service.refresh_balance_cache(test_agent.id)
+    assert chain_rpc["solana"] == 3
+
+
+@pytest.mark.asyncio
+async def test_price_oracle_caches_and_keeps_last_price_on_feed_failure():
+    requests = []
+    fail = False
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request.url.params["ids"])
+        if fail:
+            return httpx.Response(503)
+        return httpx.Response(200, json={"data": {"SOL": {"price": 150.5}}})
+
+    oracle = PriceOracle(ttl_seconds=60, feed_url="https://prices.test/price", transport=httpx.MockTransport(handler))
+    assert await oracle.prices(["SOL", "ETH"]) == {"SOL": Decimal("150.5"), "ETH": Decimal("3000.0")}
+    assert await oracle.prices(["SOL"]) == {"SOL": Decimal("150.5")}
+    assert requests == ["ETH,SOL"]
+
+    oracle.ttl_seconds = 0
+    fail = True
+    assert (await oracle.prices(["SOL"]))["SOL"] == Decimal("150.5")
+    assert len(requests) == 2
+    await oracle.close()
+
+
+@pytest.mark.asyncio
+async def test_partial_crawl_is_not_stored_as_snapshot(
+    db_session, test_org, test_agent, test_wallet, chain_rpc, redis_store
+):
+    await _add_wallets(db_session, test_org, test_agent, 1)
+    key = f"balance:snapshot:{test_agent.id}"
+
+    async def flaky_balance(client, address):
+        if address == test_wallet.address:
+            raise httpx.ConnectError("rpc down")
+        return 1_000_000_000
+
+    with patch.object(balances, "get_balance", flaky_balance):
+        partial = await UniversalBalanceService(db_session).get_universal_balance(test_agent.id)
+    assert partial["chain_breakdown"]["solana"]["native_token"]["amount"] == pytest.approx(1.0)
+    assert key not in redis_store
+
+    # The next call crawls again instead of serving the undercount as fresh
+    result = await UniversalBalanceService(db_session).get_universal_balance(test_agent.id)
+    assert result["chain_breakdown"]["solana"]["native_token"]["amount"] == pytest.approx(2.0)
+    assert json.loads(redis_store[key])["failed_wallets"] == 0
+
+
+@pytest.mark.asyncio
+async def test_transfer_drops_the_spending_agents_snapshot(db_session, test_agent, test_wallet, chain_rpc, redis_store):
+    from agentwallet.services.balance_tracker import invalidate_balances
+
+    service = UniversalBalanceService(db_session)
+    await service.get_universal_balance(test_agent.id)
+    assert f"balance:snapshot:{test_agent.id}" in redis_store
+
+    await invalidate_balances(test_wallet.address, "recipient", agent_ids=[test_wallet.agent_id])
+    assert f"balance:snapshot:{test_agent.id}" not in redis_store
+    await service.get_spending_power(test_agent.id)
+    assert chain_rpc["solana"] == 2
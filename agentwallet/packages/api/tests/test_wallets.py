@@ -1,6 +1,10 @@
 """Tests for wallet operations."""
 
+import json
+from unittest.mock import AsyncMock
+
 import pytest
+from solders.keypair import Keypair
 
 
 @pytest.mark.asyncio
@@ -63,3 +67,109 @@ async def test_wallets_unauthenticated(unauthed_client):
     """Test accessing wallets without auth should fail."""
     resp = await unauthed_client.get("/v1/wallets")
     assert resp.status_code == 401
+
+
+@pytest.mark.asyncio
+async def test_balance_tracker_rewrites_moved_balances(mock_redis, monkeypatch):
+    """Tracked wallets are polled in bulk; only entries whose balance moved are rewritten."""
+    import time
+
+    from agentwallet.core.config import get_settings
+    from agentwallet.core.solana import associated_token_address
+    from agentwallet.services import balance_tracker
+    from agentwallet.services.balance_tracker import (
+        TRACKED_KEY,
+        BalanceTracker,
+        balance_cache_key,
+        invalidate_balances,
+        track_balance,
+    )
+    from agentwallet.workers.balance_tracker import BalanceTrackerWorker
+
+    usdc = get_settings().usdc_mint_address
+    moved, still, lapsed, recached, other = (str(Keypair().pubkey()) for _ in range(5))
+
+    store = {
+        balance_cache_key(a): json.dumps({"address": a, "sol_balance": 1.0, "lamports": 10**9, "tokens": []})
+        for a in (moved, still, recached)
+    }
+    bonk = {"mint": "DezXAZ8z7PnrnRJjz3wXBoRgixCa6xjnB7YaB1pPB263", "amount": 1, "decimals": 5, "ui_amount": 1e-5}
+    store[balance_cache_key(other)] = json.dumps({"address": other, "lamports": 10**9, "tokens": [bonk]})
+    written = {}
+    tracked: dict[str, float] = {}
+
+    async def zadd(key, mapping):
+        assert key == TRACKED_KEY
+        tracked.update(mapping)
+
+    async def zremrangebyscore(key, low, high):
+        for address in [a for a, expires in tracked.items() if expires <= high]:
+            del tracked[address]
+
+    async def zrange(key, start, end):
+        return sorted(tracked, key=tracked.get)[start : end + 1]
+
+    async def mget(keys):
+        return [store.get(k) for k in keys]
+
+    async def eval_(script, numkeys, key, tracked_key, expected, *args):
+        if store.get(key) != expected:
+            return 0
+        if script == balance_tracker.DROP_SCRIPT:
+            del store[key]
+            tracked.pop(args[0])
+        else:
+            store[key] = written[key] = args[0]
+            tracked[args[2]] = args[3]
+        return 1
+
+    mock_redis.zadd = AsyncMock(side_effect=zadd)
+    mock_redis.zremrangebyscore = AsyncMock(side_effect=zremrangebyscore)
+    mock_redis.zrange = AsyncMock(side_effect=zrange)
+    mock_redis.mget = AsyncMock(side_effect=mget)
+    mock_redis.eval = AsyncMock(side_effect=eval_)
+
+    for address in (moved, still, recached, other):
+        await track_balance(address, 30)
+    tracked[lapsed] = time.time() - 1  # its cache entry has expired
+
+    fresh = json.dumps({"address": recached, "sol_balance": 3.0, "lamports": 3 * 10**9, "tokens": []})
+    chain = {
+        moved: {"lamports": 2 * 10**9},
+        still: {"lamports": 10**9},
+        recached: {"lamports": 2 * 10**9},
+        associated_token_address(moved, usdc): {
+            "lamports": 2039280,
+            "data": {"parsed": {"info": {"tokenAmount": {"amount": "2500000", "decimals": 6}}}},
+        },
+    }
+    polled = []
+
+    async def fake_accounts(client, addresses):
+        polled.extend(addresses)
+        # A transfer invalidates `recached` mid-poll and a read re-caches it
+        store[balance_cache_key(recached)] = fresh
+        return [chain.get(a) for a in addresses]
+
+    monkeypatch.setattr(balance_tracker, "get_multiple_accounts", fake_accounts)
+
+    outcome = await BalanceTracker().sync()
+
+    assert lapsed not in polled and lapsed not in tracked  # expired entries are forgotten
+    assert other not in polled  # holds a token the tracker cannot follow: dropped
+    assert balance_cache_key(other) not in store
+    assert outcome["updated"] == 1 and outcome["dropped"] == 1
+    assert list(written) == [balance_cache_key(moved)]
+    entry = json.loads(written[balance_cache_key(moved)])
+    assert entry["lamports"] == 2 * 10**9
+    assert entry["tokens"] == [{"mint": usdc, "amount": 2500000, "decimals": 6, "ui_amount": 2.5}]
+    assert store[balance_cache_key(recached)] == fresh
+    assert tracked[moved] > tracked[still]  # the rewrite extended its tracking with its TTL
+    assert other not in tracked
+
+    # Nothing moved since: the worker still polls at its normal cadence
+    chain[recached] = {"lamports": 3 * 10**9}
+    assert await BalanceTrackerWorker().tick() is None
+
+    await invalidate_balances(moved, None, moved)
+    mock_redis.delete.assert_awaited_with(balance_cache_key(moved))
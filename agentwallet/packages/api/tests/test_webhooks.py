@@ -0,0 +1,236 @@
+"""Tests for the event outbox and webhook fan-out."""
+
+import asyncio
+import hashlib
+import hmac
+
+import httpx
+import pytest
+from agentwallet.models.outbox import OutboxEvent
+from agentwallet.models.webhook import Webhook, WebhookDelivery
+from agentwallet.services.event_bus import is_subscribed, relay_outbox
+from agentwallet.services.webhook_delivery import CircuitBreaker, WebhookDeliveryEngine
+from sqlalchemy import select
+
+
+def test_subscription_patterns():
+    assert is_subscribed(["transaction.confirmed"], "transaction.confirmed")
+    assert is_subscribed(["escrow.*"], "escrow.funded")
+    assert is_subscribed(["*"], "task.delivered")
+    assert not is_subscribed(["escrow.*"], "transaction.confirmed")
+    assert not is_subscribed([], "transaction.confirmed")
+
+
+@pytest.mark.asyncio
+async def test_state_change_is_captured_in_the_same_transaction(db_session, test_transaction):
+    """Changing a tracked status writes an outbox event with the old and new state."""
+    org_id = test_transaction.org_id
+    test_transaction.status = "submitted"
+    test_transaction.signature = "sig-outbox-capture"
+    await db_session.commit()
+
+    events = (await db_session.execute(select(OutboxEvent).where(OutboxEvent.org_id == org_id))).scalars().all()
+    submitted = [e for e in events if e.event_type == "transaction.submitted"]
+    assert len(submitted) == 1
+    payload = submitted[0].payload
+    assert payload["resource_id"] == str(test_transaction.id)
+    assert payload["previous_state"] == "pending"
+    assert payload["data"]["signature"] == "sig-outbox-capture"
+
+    # A rolled-back change leaves no event behind
+    test_transaction.status = "confirmed"
+    await db_session.flush()
+    await db_session.rollback()
+    leftover = await db_session.scalar(
+        select(OutboxEvent.id)
+        .where(OutboxEvent.org_id == org_id, OutboxEvent.event_type == "transaction.confirmed")
+        .limit(1)
+    )
+    assert leftover is None
+
+
+@pytest.mark.asyncio
+async def test_relay_fans_out_to_matching_webhooks(db_session, test_org, test_transaction):
+    """The relay creates one delivery per subscribed webhook and drains the outbox."""
+    subscribed = Webhook(org_id=test_org.id, url="https://example.com/a", events=["transaction.*"], secret="s1")
+    other = Webhook(org_id=test_org.id, url="https://example.com/b", events=["escrow.funded"], secret="s2")
+    paused = Webhook(org_id=test_org.id, url="https://example.com/c", events=["*"], secret="s3", is_active=False)
+    db_session.add_all([subscribed, other, paused])
+    test_transaction.status = "submitted"
+    await db_session.commit()
+
+    assert await relay_outbox(db_session, limit=10_000) >= 2  # pending + submitted
+
+    deliveries = (
+        (
+            await db_session.execute(
+                select(WebhookDelivery).where(WebhookDelivery.webhook_id.in_([subscribed.id, other.id, paused.id]))
+            )
+        )
+        .scalars()
+        .all()
+    )
+    assert {d.webhook_id for d in deliveries} == {subscribed.id}
+    assert sorted(d.event_type for d in deliveries) == ["transaction.pending", "transaction.submitted"]
+    assert await db_session.scalar(select(OutboxEvent.id).limit(1)) is None
+
+
+# ── Delivery engine ────────────────────────────────────────────────────
+
+
+def test_circuit_breaker_opens_and_probes():
+    breaker = CircuitBreaker(threshold=2, cooldown_seconds=30)
+    breaker.record(False, now=0)
+    assert breaker.allow(now=1)
+    breaker.record(False, now=1)
+    assert not breaker.allow(now=2)  # open
+    assert breaker.is_open(now=31) is False  # checking does not take the probe
+    assert breaker.allow(now=31)  # half-open probe
+    assert not breaker.allow(now=31)  # only one probe at a time
+    breaker.record(True, now=32)
+    assert breaker.allow(now=32)
+
+
+@pytest.mark.asyncio
+async def test_engine_delivers_concurrently_with_presigned_bodies(db_session, test_org, test_transaction):
+    """Deliveries go out in parallel, capped per endpoint, with the signature computed at relay time."""
+    fast = Webhook(org_id=test_org.id, url="https://fast.example/hook", events=["*"], secret="fast-secret")
+    down = Webhook(org_id=test_org.id, url="https://down.example/hook", events=["*"], secret="down-secret")
+    db_session.add_all([fast, down])
+    await db_session.commit()
+    for status in ("submitted", "confirmed", "failed"):
+        test_transaction.status = status
+        await db_session.commit()
+    await relay_outbox(db_session, limit=10_000)
+    fast_id, down_id = fast.id, down.id
+
+    in_flight, peak, seen = 0, 0, []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        nonlocal in_flight, peak
+        if request.url.host == "down.example":
+            return httpx.Response(503)
+        if request.url.host != "fast.example":
+            return httpx.Response(200)  # other tests' leftover deliveries
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.05)
+        in_flight -= 1
+        seen.append(request)
+        return httpx.Response(200, text="ok")
+
+    engine = WebhookDeliveryEngine(transport=httpx.MockTransport(handler))
+    engine.per_endpoint = 2
+    try:
+        await engine.run_batch(db_session)
+    finally:
+        await engine.close()
+
+    assert len(seen) == 4 and peak == 2
+    for request in seen:
+        expected = hmac.new(b"fast-secret", request.content, hashlib.sha256).hexdigest()
+        assert request.headers["X-AgentWallet-Signature"] == f"sha256={expected}"
+
+    db_session.expire_all()
+    deliveries = (
+        (await db_session.execute(select(WebhookDelivery).where(WebhookDelivery.webhook_id.in_([fast_id, down_id]))))
+        .scalars()
+        .all()
+    )
+    delivered = [d for d in deliveries if d.webhook_id == fast_id]
+    retrying = [d for d in deliveries if d.webhook_id == down_id]
+    assert all(d.delivered_at is not None and d.status_code == 200 for d in delivered)
+    assert all(d.delivered_at is None and d.status_code == 503 and d.attempts == 1 for d in retrying)
+    assert all(d.next_retry_at is not None for d in retrying)
+
+
+@pytest.mark.asyncio
+async def test_engine_renews_lease_while_a_slow_endpoint_drains(db_session, test_org):
+    """Rows still queued behind a slow endpoint keep their lease, so no other dispatcher re-claims them."""
+    from datetime import datetime, timedelta, timezone
+
+    from agentwallet.services.webhook_delivery import new_delivery_row
+    from sqlalchemy import insert
+
+    slow = Webhook(org_id=test_org.id, url="https://slow.example/hook", events=["*"], secret="slow-secret")
+    db_session.add(slow)
+    await db_session.commit()
+    slow_id = slow.id
+    await db_session.execute(
+        insert(WebhookDelivery),
+        [
+            new_delivery_row(slow_id, "slow-secret", "transaction.confirmed", {"n": n}, f'{{"n": {n}}}')
+            for n in range(3)
+        ],
+    )
+    await db_session.commit()
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host == "slow.example":
+            await asyncio.sleep(0.2)
+        return httpx.Response(200)
+
+    engine = WebhookDeliveryEngine(transport=httpx.MockTransport(handler))
+    engine.per_endpoint = 1
+    engine.lease_seconds = 0.3
+    started = datetime.now(timezone.utc)
+    try:
+        await engine.run_batch(db_session)
+    finally:
+        await engine.close()
+
+    db_session.expire_all()
+    deliveries = (
+        (await db_session.execute(select(WebhookDelivery).where(WebhookDelivery.webhook_id == slow_id))).scalars().all()
+    )
+    assert all(d.delivered_at is not None and d.attempts == 1 for d in deliveries)
+    # The last row waited ~0.4s, past its 0.3s claim lease, and was renewed
+    last_lease = max(d.next_retry_at.replace(tzinfo=timezone.utc) for d in deliveries)
+    assert last_lease > started + timedelta(seconds=0.5)
+
+
+@pytest.mark.asyncio
+async def test_engine_defers_queued_rows_once_the_breaker_opens(db_session, test_org):
+    """Rows queued behind a failing endpoint are deferred, not POSTed, once it trips."""
+    from agentwallet.services.webhook_delivery import new_delivery_row
+    from sqlalchemy import insert
+
+    dead = Webhook(org_id=test_org.id, url="https://dead.example/hook", events=["*"], secret="dead-secret")
+    db_session.add(dead)
+    await db_session.commit()
+    dead_id = dead.id
+    await db_session.execute(
+        insert(WebhookDelivery),
+        [
+            new_delivery_row(dead_id, "dead-secret", "transaction.confirmed", {"n": n}, f'{{"n": {n}}}')
+            for n in range(6)
+        ],
+    )
+    await db_session.commit()
+
+    posts = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        if request.url.host != "dead.example":
+            return httpx.Response(200)
+        posts.append(request)
+        await asyncio.sleep(0.01)
+        return httpx.Response(503)
+
+    engine = WebhookDeliveryEngine(transport=httpx.MockTransport(handler))
+    engine.per_endpoint = 1
+    engine.batch_per_endpoint = 4
+    engine.breaker_threshold = 2
+    try:
+        await engine.run_batch(db_session)
+    finally:
+        await engine.close()
+
+    db_session.expire_all()
+    deliveries = (
+        (await db_session.execute(select(WebhookDelivery).where(WebhookDelivery.webhook_id == dead_id))).scalars().all()
+    )
+    assert len(posts) == 2  # the breaker opened after two failures
+    assert sorted(d.attempts for d in deliveries) == [0, 0, 0, 0, 1, 1]
+    # Only batch_per_endpoint rows were claimed; the rest were never touched
+    assert sum(d.next_retry_at is None for d in deliveries) == 2
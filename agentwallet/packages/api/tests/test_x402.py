@@ -15,12 +15,12 @@ def reset_x402_config():
     config.enabled = False
     config._routes = []
     config._payments = {}
-    config._verified_signatures = {}
+    config.verification_cache.clear()
     yield
     config.enabled = False
     config._routes = []
     config._payments = {}
-    config._verified_signatures = {}
+    config.verification_cache.clear()
 
 
 # ── Router: configure / status / verify ──────────────────────────────
@@ -310,3 +310,180 @@ async def test_paywall_rejects_insufficient_payment(client, test_agent):
     assert resp.status_code == 402
     body = resp.json()
     assert "Invalid payment" in body["error"]
+
+
+# ── Verification cache ───────────────────────────────────────────────
+
+
+class _SharedRedis:
+    """Dict-backed stand-in for the Redis tier shared across replicas."""
+
+    def __init__(self):
+        self.store = {}
+
+    async def get(self, key):
+        return self.store.get(key)
+
+    async def set(self, key, value, ex=None):
+        self.store[key] = value
+
+    async def delete(self, key):
+        self.store.pop(key, None)
+
+
+@pytest.mark.asyncio
+async def test_verification_cache_is_shared_across_replicas_via_redis():
+    import time
+
+    from agentwallet.services.x402_cache import VerificationCache
+
+    shared = _SharedRedis()
+    entry = {"valid": True, "verified_at": time.time(), "payee": "p", "amount": 5, "token_mint": None}
+    with patch("agentwallet.services.x402_cache.get_redis", AsyncMock(return_value=shared)):
+        replica_a, replica_b = VerificationCache(), VerificationCache()
+        await replica_a.put("sig-1", entry, deadline_seconds=60)
+
+        assert (await replica_b.get("sig-1"))["amount"] == 5  # from Redis
+        assert (await replica_b.get("sig-1"))["amount"] == 5  # now local
+        assert await replica_b.get("sig-2") is None
+
+    assert replica_b.stats()["redis_hits"] == 1
+    assert replica_b.stats()["local_hits"] == 1
+    assert replica_b.stats()["misses"] == 1
+
+
+@pytest.mark.asyncio
+async def test_verification_cache_lru_and_deadline_eviction():
+    import time
+
+    from agentwallet.services.x402_cache import VerificationCache
+
+    cache = VerificationCache(max_entries=2, retention_seconds=0)
+    now = time.time()
+    for sig in ("a", "b"):
+        await cache.put(sig, {"valid": True, "verified_at": now}, deadline_seconds=60)
+    await cache.get("a")  # "b" becomes least recently used
+    await cache.put("c", {"valid": True, "verified_at": now}, deadline_seconds=60)
+    assert list(cache._entries) == ["a", "c"]
+
+    # Past its deadline: pushes "a" out of the LRU, then expires on read
+    await cache.put("old", {"valid": False, "verified_at": now - 120}, deadline_seconds=60)
+    assert await cache.get("old") is None
+    assert cache.stats()["evictions"] == 3
+
+
+@pytest.mark.asyncio
+async def test_rpc_failures_are_not_cached_as_rejections(client, test_agent):
+    """A transient RPC error must not reject the same payment on a retry."""
+    config = get_pricing_config()
+    config.configure(
+        pricing=[
+            {
+                "route_pattern": "/agents/*",
+                "method": "GET",
+                "price_lamports": 1_000_000,
+                "description": "Pay to view agents",
+                "pay_to": "5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+            }
+        ],
+        enabled=True,
+        network="solana-mainnet",
+    )
+    proof = base64.b64encode(
+        json.dumps({"payload": {"signature": "7" * 87, "timestamp": 9999999999}}).encode()
+    ).decode()
+    verified = {
+        "valid": True,
+        "payer": "9WzDXwBbmkg8ZTbNMqUxvQRAyrZzDsGYdLVL9zYtAWWM",
+        "payee": "5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+        "amount": 1_000_000,
+        "token_mint": None,
+    }
+    not_found = {"valid": False, "retryable": True, "error": "Transaction not found on-chain"}
+
+    shared = _SharedRedis()
+    with patch("agentwallet.services.x402_cache.get_redis", AsyncMock(return_value=shared)):
+        failures = [
+            (AsyncMock(side_effect=RuntimeError("rpc timeout")), AsyncMock()),
+            (AsyncMock(return_value=False), AsyncMock()),
+            (AsyncMock(return_value=True), AsyncMock(return_value=not_found)),
+        ]
+        for confirm, verify in failures:
+            with (
+                patch("agentwallet.services.x402_server.confirm_transaction", new=confirm),
+                patch("agentwallet.services.x402_server.verify_transfer_on_chain", new=verify),
+            ):
+                resp = await client.get(f"/v1/agents/{test_agent.id}", headers={"X-PAYMENT": proof})
+            assert resp.status_code == 402
+            assert not shared.store
+
+        with (
+            patch("agentwallet.services.x402_server.confirm_transaction", new=AsyncMock(return_value=True)),
+            patch("agentwallet.services.x402_server.verify_transfer_on_chain", new=AsyncMock(return_value=verified)),
+        ):
+            resp = await client.get(f"/v1/agents/{test_agent.id}", headers={"X-PAYMENT": proof})
+    assert resp.status_code == 200
+
+
+# ── Route matcher ────────────────────────────────────────────────────
+
+
+def _linear_match(routes, path, method):
+    """Reference: the original per-request linear scan."""
+    import fnmatch
+    import re
+
+    best, best_spec = None, -1
+    for route in routes:
+        pattern, route_method = route["route_pattern"], route["method"]
+        if route_method not in ("*", method):
+            continue
+        if pattern == path:
+            spec = 3
+        elif fnmatch.fnmatch(path, pattern):
+            spec = 1
+        elif pattern.startswith("^") and re.match(pattern, path):
+            spec = 2
+        else:
+            continue
+        spec += route_method != "*"
+        if spec > best_spec:
+            best, best_spec = route, spec
+    return best
+
+
+def test_compiled_route_matcher_agrees_with_linear_scan():
+    config = get_pricing_config()
+    config.configure(
+        pricing=[
+            {"route_pattern": "/v1/agents/*", "method": "GET", "price_lamports": 1},
+            {"route_pattern": "/v1/agents/*", "price_lamports": 2},
+            {"route_pattern": "/v1/agents/special", "price_lamports": 3},
+            {"route_pattern": r"^/v1/agents/[0-9a-f-]{36}$", "method": "GET", "price_lamports": 4},
+            {"route_pattern": "/v1/*/stats", "price_lamports": 5},
+            {"route_pattern": "/v1/wallets/?", "method": "POST", "price_lamports": 6},
+            {"route_pattern": r"^/v1/market", "price_lamports": 7},
+            {"route_pattern": "*", "method": "DELETE", "price_lamports": 8},
+        ],
+        default_pay_to="5Gv8eWrN7B9dqTCEKH8kKTq1nAzx8RWJ9vL4J5eZ8sX3",
+    )
+    paths = [
+        "/v1/agents/special",
+        "/v1/agents/123e4567-e89b-12d3-a456-426614174000",
+        "/v1/agents/x",
+        "/v1/analytics/stats",
+        "/v1/wallets/1",
+        "/v1/marketplace/services",
+        "/health",
+        "/",
+    ]
+    for path in paths:
+        for method in ("GET", "POST", "DELETE"):
+            expected = _linear_match(config.get_all_routes(), path, method)
+            assert config.get_pricing_for_route(path, method) is expected, (path, method)
+            # Memoized second lookup returns the same rule
+            assert config.get_pricing_for_route(path, method.lower()) is expected
+
+    config.configure(pricing=[{"route_pattern": "/v1/agents/special", "price_lamports": 9}])
+    assert config.get_pricing_for_route("/v1/agents/special", "GET")["price_lamports"] == 9
+    assert config.get_pricing_for_route("/v1/agents/x", "GET") is None